@@ -3,6 +3,7 @@ header('Content-Type: application/json');
 header('Access-Control-Allow-Origin: *');
 
 require_once '../database/db_connection.php';
+require_once '../database/content_store.php';
 
 try {
     $conversation_id = $_GET['conversation_id'] ?? null;
@@ -11,14 +12,18 @@ try {
         throw new Exception('ID de conversación requerido');
     }
     
+    // Con el almacén de contenidos los cuerpos largos están en message_contents
+    list($message_text, $contents_join) = message_text_sql($pdo);
+    
     $sql = "SELECT 
                 m.id,
                 m.author_role,
-                m.content_text,
+                $message_text AS content_text,
                 m.created_at,
                 m.create_time,
                 m.conversation_id
             FROM messages m
+            $contents_join
             WHERE m.conversation_id = :conversation_id
             ORDER BY 
                 CASE 
@@ -27,16 +27,28 @@ try {
     $params = [];
     $param_types = [];
     
-    // Filtro por texto (si se proporciona)
+    // Filtro por texto (si se proporciona): índice FULLTEXT ft_messages_parts
+    // (scripts/python/search_index.py build) con palabras de al menos 3 letras,
+    // LIKE solo para búsquedas más cortas
     if (!empty($query)) {
+        preg_match_all('/[\p{L}\p{N}_]+/u', mb_strtolower($query, 'UTF-8'), $words);
+        $terms = array_unique(array_filter($words[0], function($word) {
+            return mb_strlen($word, 'UTF-8') >= 3;
+        }));
+        if (!empty($terms)) {
+            $text_condition = "MATCH(sub_messages.parts) AGAINST (? IN BOOLEAN MODE)";
+            $params[] = implode(' ', array_map(function($term) { return '+' . $term . '*'; }, $terms));
+        } else {
+            $text_condition = "sub_messages.parts LIKE ?";
+            $params[] = "%$query%";
+        }
         $sql .= " AND conv.conversation_id IN (
                     SELECT DISTINCT sub_messages.conversation_id
                     FROM iunaorg_chatBeto.messages sub_messages
-                    WHERE sub_messages.parts LIKE ?
+                    WHERE $text_condition
                       AND sub_messages.parts IS NOT NULL
                       AND sub_messages.parts <> ''
                   )";
-        $params[] = "%$query%";
         $param_types[] = PDO::PARAM_STR;
     }
     
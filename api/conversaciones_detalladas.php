@@ -6,6 +6,7 @@
 
 header('Content-Type: application/json; charset=UTF-8');
 require_once '../database/db_connection.php';
+require_once '../database/content_store.php';
 
 try {
     // Parámetros opcionales
@@ -14,6 +15,9 @@ try {
     $offset = isset($_GET['offset']) ? intval($_GET['offset']) : 0;
     $search = isset($_GET['search']) ? trim($_GET['search']) : '';
     
+    // Con el almacén de contenidos los cuerpos largos están en message_contents
+    list($message_text, $contents_join) = message_text_sql($pdo);
+    
     // Consulta SQL optimizada con todas las estadísticas
     $sql = "SELECT 
                 c.id,
@@ -37,7 +41,7 @@ try {
                 -- Contenido
                 GROUP_CONCAT(
                     CASE WHEN m.author_role = 'user' 
-                    THEN SUBSTRING(m.content_text, 1, 100) 
+                    THEN SUBSTRING($message_text, 1, 100) 
                     END 
                     ORDER BY m.create_time 
                     SEPARATOR ' | '
@@ -52,6 +56,7 @@ try {
             FROM conversations c
             LEFT JOIN projects p ON c.project_id = p.id
             LEFT JOIN messages m ON c.id = m.conversation_id
+            $contents_join
             WHERE 1=1";
     
     $params = [];
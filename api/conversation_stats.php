@@ -1,13 +1,15 @@
 <?php
 header('Content-Type: text/plain');
 require_once '../database/db_connection.php';
+require_once '../database/content_store.php';
 
 try {
-    // Ver cuántos mensajes tiene cada conversación
+    // Ver cuántos mensajes tiene cada conversación (los cuerpos deduplicados tienen content_text NULL y content_hash)
+    $has_text = content_store_enabled($pdo) ? '(m.content_text IS NOT NULL OR m.content_hash IS NOT NULL)' : 'm.content_text IS NOT NULL';
     $sql = "SELECT c.title, COUNT(m.id) as message_count
             FROM conversations c 
             LEFT JOIN messages m ON m.conversation_id = c.id 
-            WHERE m.content_text IS NOT NULL 
+            WHERE $has_text 
             GROUP BY c.id, c.title 
             ORDER BY message_count DESC 
             LIMIT 10";
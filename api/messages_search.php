@@ -6,6 +6,10 @@
  * - messages.role (NO author_role)  
  * - messages.content (NO content_text)
  * 
+ * Búsqueda con índice FULLTEXT (scripts/python/search_index.py build): los
+ * resultados se ordenan por relevancia e incluyen 'relevance' y 'snippet'.
+ * Si la búsqueda no tiene palabras de al menos 3 letras se usa LIKE.
+ *
  * API: /api/messages_search.php?project_id=1&search=texto&role=user&limit=20&offset=0
  */
 
@@ -20,6 +24,51 @@ if ($_SERVER['REQUEST_METHOD'] === 'OPTIONS') {
 }
 
 require_once '../database/db_connection.php';
+require_once '../database/content_store.php';
+
+define('FT_MIN_TOKEN', 3);      // innodb_ft_min_token_size: palabras más cortas no se indexan
+define('SNIPPET_RADIUS', 80);
+
+// Palabras de la búsqueda que el índice FULLTEXT puede encontrar
+function search_terms($search) {
+    preg_match_all('/[\p{L}\p{N}_]+/u', mb_strtolower($search, 'UTF-8'), $matches);
+    $terms = array_filter($matches[0], function($term) {
+        return mb_strlen($term, 'UTF-8') >= FT_MIN_TOKEN;
+    });
+    return array_values(array_unique($terms));
+}
+
+// Consulta IN BOOLEAN MODE: todas las palabras obligatorias, por prefijo
+function boolean_query($terms) {
+    return implode(' ', array_map(function($term) { return '+' . $term . '*'; }, $terms));
+}
+
+// Fragmento alrededor de la primera coincidencia, escapado y con <mark>
+function make_snippet($text, $terms) {
+    if ($text === null || $text === '') {
+        return '';
+    }
+    $lower = mb_strtolower($text, 'UTF-8');
+    $center = null;
+    foreach ($terms as $term) {
+        $pos = mb_strpos($lower, $term, 0, 'UTF-8');
+        if ($pos !== false && ($center === null || $pos < $center)) {
+            $center = $pos;
+        }
+    }
+    $center = $center ?? 0;
+    $length = mb_strlen($text, 'UTF-8');
+    $start = max(0, $center - SNIPPET_RADIUS);
+    $end = min($length, $center + SNIPPET_RADIUS * 2);
+
+    $fragment = preg_replace('/\s+/u', ' ', mb_substr($text, $start, $end - $start, 'UTF-8'));
+    $snippet = htmlspecialchars(trim($fragment), ENT_QUOTES, 'UTF-8');
+    if (!empty($terms)) {
+        $quoted = array_map(function($term) { return preg_quote(htmlspecialchars($term, ENT_QUOTES, 'UTF-8'), '/'); }, $terms);
+        $snippet = preg_replace('/(' . implode('|', $quoted) . ')[\p{L}\p{N}_]*/iu', '<mark>$0</mark>', $snippet);
+    }
+    return ($start > 0 ? '…' : '') . $snippet . ($end < $length ? '…' : '');
+}
 
 try {
     // Parámetros de entrada
@@ -39,62 +88,127 @@ try {
         $params[] = $project_id;
     }
     
-    // Filtro de búsqueda en contenido y título  
-    if (!empty($search)) {
-        $where_conditions[] = '(m.content_text LIKE ? OR c.title LIKE ?)';
-        $params[] = '%' . $search . '%';
-        $params[] = '%' . $search . '%';
-    }
-    
     // Filtro por rol
     if (!empty($role)) {
         $where_conditions[] = 'm.author_role = ?';
         $params[] = $role;
     }
     
-    $where_clause = !empty($where_conditions) ? implode(' AND ', $where_conditions) : '1=1';
+    $terms = search_terms($search);
+    $use_fulltext = !empty($terms);
+    
+    // Con el almacén de contenidos los cuerpos largos están en message_contents
+    $store = content_store_enabled($pdo);
+    list($message_text, $contents_join) = message_text_sql($pdo);
+    $has_text = $store ? '(m.content_text IS NOT NULL OR m.content_hash IS NOT NULL)' : 'm.content_text IS NOT NULL';
+    
+    // Filtro de búsqueda por LIKE solo cuando no hay palabras indexables
+    if (!empty($search) && !$use_fulltext) {
+        $where_conditions[] = "($message_text LIKE ? OR c.title LIKE ?)";
+        $params[] = '%' . $search . '%';
+        $params[] = '%' . $search . '%';
+    }
     
-    // 📋 CONSULTA PRINCIPAL - ESTRUCTURA REAL CONFIRMADA POR PRUEBAS
-    $sql = "
-        SELECT 
-            c.id as conversation_id,
-            c.title as conversation_title,
-            c.project_id,
-            m.id as message_id,
-            m.author_role as message_role,
-            m.content_text as message_content,
-            m.created_at as message_created_at,
-            m.author_name
-        FROM conversations c
-        LEFT JOIN messages m ON m.conversation_id = c.id
-        WHERE $where_clause AND m.content_text IS NOT NULL
-        ORDER BY m.created_at DESC
-        LIMIT ? OFFSET ?
-    ";
+    $where_clause = !empty($where_conditions) ? implode(' AND ', $where_conditions) : '1=1';
     
-    $params[] = $limit;
-    $params[] = $offset;
+    if ($use_fulltext) {
+        // 🔎 Cada rama del UNION usa su propio índice FULLTEXT (un OR entre
+        // contenido y título obligaría a recorrer la tabla completa)
+        $against = boolean_query($terms);
+        $contents_branch = $store ? "
+                UNION ALL
+                SELECT m.id, MATCH(mc.content_text) AGAINST (? IN BOOLEAN MODE) AS score
+                FROM message_contents mc
+                INNER JOIN messages m ON m.content_hash = mc.content_hash
+                INNER JOIN conversations c ON c.id = m.conversation_id
+                WHERE MATCH(mc.content_text) AGAINST (? IN BOOLEAN MODE) AND $where_clause" : '';
+        $hits_sql = "
+            SELECT id, MAX(score) AS score
+            FROM (
+                SELECT m.id, MATCH(m.content_text) AGAINST (? IN BOOLEAN MODE) AS score
+                FROM messages m
+                INNER JOIN conversations c ON c.id = m.conversation_id
+                WHERE MATCH(m.content_text) AGAINST (? IN BOOLEAN MODE) AND $where_clause
+                UNION ALL
+                SELECT m.id, MATCH(c.title) AGAINST (? IN BOOLEAN MODE) AS score
+                FROM conversations c
+                INNER JOIN messages m ON m.conversation_id = c.id
+                WHERE MATCH(c.title) AGAINST (? IN BOOLEAN MODE) AND $where_clause
+                  AND $has_text$contents_branch
+            ) matched
+            GROUP BY id
+        ";
+        $hits_params = array_merge([$against, $against], $params, [$against, $against], $params);
+        if ($store) {
+            $hits_params = array_merge($hits_params, [$against, $against], $params);
+        }
+        
+        // 📋 CONSULTA PRINCIPAL: paginar sobre los ids ordenados por relevancia
+        $sql = "
+            SELECT 
+                c.id as conversation_id,
+                c.title as conversation_title,
+                c.project_id,
+                m.id as message_id,
+                m.author_role as message_role,
+                $message_text as message_content,
+                m.created_at as message_created_at,
+                m.author_name,
+                hits.score as relevance
+            FROM ($hits_sql ORDER BY score DESC LIMIT ? OFFSET ?) hits
+            INNER JOIN messages m ON m.id = hits.id
+            INNER JOIN conversations c ON c.id = m.conversation_id
+            $contents_join
+            ORDER BY hits.score DESC, m.created_at DESC
+        ";
+        $count_sql = "SELECT COUNT(*) as total FROM ($hits_sql) hits";
+        $count_params = $hits_params;
+        $params = array_merge($hits_params, [$limit, $offset]);
+    } else {
+        // 📋 CONSULTA PRINCIPAL - ESTRUCTURA REAL CONFIRMADA POR PRUEBAS
+        $sql = "
+            SELECT 
+                c.id as conversation_id,
+                c.title as conversation_title,
+                c.project_id,
+                m.id as message_id,
+                m.author_role as message_role,
+                $message_text as message_content,
+                m.created_at as message_created_at,
+                m.author_name,
+                NULL as relevance
+            FROM conversations c
+            LEFT JOIN messages m ON m.conversation_id = c.id
+            $contents_join
+            WHERE $where_clause AND $has_text
+            ORDER BY m.created_at DESC
+            LIMIT ? OFFSET ?
+        ";
+        $count_sql = "
+            SELECT COUNT(*) as total
+            FROM conversations c
+            LEFT JOIN messages m ON m.conversation_id = c.id
+            $contents_join
+            WHERE $where_clause AND $has_text
+        ";
+        $count_params = $params;
+        $params[] = $limit;
+        $params[] = $offset;
+    }
     
     $stmt = $pdo->prepare($sql);
     $stmt->execute($params);
     $messages = $stmt->fetchAll(PDO::FETCH_ASSOC);
     
     // 📊 CONTAR TOTAL PARA PAGINACIÓN
-    $count_sql = "
-        SELECT COUNT(*) as total
-        FROM conversations c
-        LEFT JOIN messages m ON m.conversation_id = c.id
-        WHERE $where_clause AND m.content_text IS NOT NULL
-    ";
-    
-    $count_params = array_slice($params, 0, -2); // Remover limit y offset
     $count_stmt = $pdo->prepare($count_sql);
     $count_stmt->execute($count_params);
     $total_result = $count_stmt->fetch(PDO::FETCH_ASSOC);
     $total_messages = intval($total_result['total']);
     
     // 🔄 FORMATEAR DATOS PARA EL FRONTEND
-    $formatted_data = array_map(function($row) {
+    $snippet_terms = $use_fulltext ? $terms : (empty($search) ? [] : [mb_strtolower($search, 'UTF-8')]);
+    $formatted_data = array_map(function($row) use ($snippet_terms) {
         return [
             'conversationId' => $row['conversation_id'],
             'conversationTitle' => $row['conversation_title'],
@@ -103,7 +217,9 @@ try {
             'messageRole' => $row['message_role'],
             'messageContent' => $row['message_content'],
             'messageTimestamp' => $row['message_created_at'],
-            'authorName' => $row['author_name']
+            'authorName' => $row['author_name'],
+            'relevance' => $row['relevance'] !== null ? round(floatval($row['relevance']), 4) : null,
+            'snippet' => make_snippet($row['message_content'], $snippet_terms)
         ];
     }, $messages);
     
@@ -120,7 +236,8 @@ try {
         'filters' => [
             'projectId' => $project_id,
             'search' => $search,
-            'role' => $role
+            'role' => $role,
+            'mode' => $use_fulltext ? 'fulltext' : 'like'
         ],
         'meta' => [
             'timestamp' => date('c'),
@@ -7,8 +7,8 @@ header('Content-Type: text/plain');
 require_once '../database/db_connection.php';
 
 try {
-    // Contar total de conversaciones
-    $stmt = $pdo->query("SELECT COUNT(*) as total FROM conversations");
+    // Total de conversaciones (precalculado en stats_rollup)
+    $stmt = $pdo->query("SELECT conversations FROM stats_rollup WHERE dimension = 'total' AND bucket = ''");
     $total_conversations = $stmt->fetchColumn();
     
     echo "=== ESTADÍSTICAS DE CONVERSACIONES ===\n\n";
@@ -26,13 +26,13 @@ try {
     
     echo "\n=== MENSAJES POR CONVERSACIÓN (Top 5) ===\n";
     
-    // Contar mensajes por conversación
+    // Mensajes por conversación (precalculados, índice por dimension + messages)
     $stmt = $pdo->query("
-        SELECT c.title, COUNT(m.id) as message_count 
-        FROM conversations c 
-        LEFT JOIN messages m ON m.conversation_id = c.id 
-        GROUP BY c.id, c.title 
-        ORDER BY message_count DESC 
+        SELECT c.title, s.messages as message_count 
+        FROM stats_rollup s 
+        INNER JOIN conversations c ON c.id = s.bucket 
+        WHERE s.dimension = 'conversation' 
+        ORDER BY s.messages DESC 
         LIMIT 5
     ");
     
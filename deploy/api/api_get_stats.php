@@ -11,13 +11,15 @@ try {
     $stmt = $pdo->query("SELECT COUNT(*) as count FROM projects");
     $projects_count = $stmt->fetch(PDO::FETCH_ASSOC)['count'];
     
-    // Total de conversaciones
-    $stmt = $pdo->query("SELECT COUNT(*) as count FROM conversations");
-    $conversations_count = $stmt->fetch(PDO::FETCH_ASSOC)['count'];
-    
-    // Total de mensajes
-    $stmt = $pdo->query("SELECT COUNT(*) as count FROM messages");
-    $messages_count = $stmt->fetch(PDO::FETCH_ASSOC)['count'];
+    // Totales precalculados (stats_rollup, mantenida por los importadores;
+    // recalcular con: python scripts/python/stats_rollup.py rebuild)
+    $stmt = $pdo->query("SELECT conversations, messages FROM stats_rollup WHERE dimension = 'total' AND bucket = ''");
+    $totals = $stmt->fetch(PDO::FETCH_ASSOC);
+    if (!$totals) {
+        throw new Exception('Estadísticas no calculadas: ejecutar python stats_rollup.py rebuild');
+    }
+    $conversations_count = $totals['conversations'];
+    $messages_count = $totals['messages'];
     
     // Conversaciones sincronizadas con OpenAI
     $stmt = $pdo->query("SELECT COUNT(*) as count FROM conversations WHERE openai_thread_id IS NOT NULL");
@@ -31,11 +33,11 @@ try {
     $stmt = $pdo->prepare("
         SELECT 
             p.name,
-            COUNT(c.id) as conversation_count
-        FROM projects p
-        LEFT JOIN conversations c ON p.id = c.project_id
-        GROUP BY p.id, p.name
-        ORDER BY conversation_count DESC
+            s.conversations as conversation_count
+        FROM stats_rollup s
+        INNER JOIN projects p ON s.bucket = CAST(p.id AS CHAR)
+        WHERE s.dimension = 'project'
+        ORDER BY s.conversations DESC
         LIMIT 5
     ");
     $stmt->execute();
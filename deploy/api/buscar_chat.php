@@ -2,6 +2,7 @@
 header('Content-Type: application/json; charset=UTF-8');
 header('Access-Control-Allow-Origin: *');
 require_once __DIR__ . '/../database/db_connection.php';
+require_once __DIR__ . '/../database/content_store.php';
 
 try {
     // Parámetros de búsqueda
@@ -28,6 +29,9 @@ try {
                 WHERE 1=1";
     } else {
         // Buscar en contenido de mensajes con filtros más estrictos
+        // (con el almacén de contenidos los cuerpos largos están en message_contents)
+        list($message_text, $contents_join) = message_text_sql($pdo);
+        $has_text = content_store_enabled($pdo) ? '(m.content_text IS NOT NULL OR m.content_hash IS NOT NULL)' : 'm.content_text IS NOT NULL';
         $sql = "SELECT 
                     c.id as conversation_id,
                     COALESCE(c.title, 'Sin título') as title,
@@ -36,15 +40,16 @@ try {
                     m.id,
                     m.create_time,
                     m.author_role AS message_role,
-                    COALESCE(m.content_text, '') AS message_content
+                    COALESCE($message_text, '') AS message_content
                 FROM messages m
                 INNER JOIN conversations c ON m.conversation_id = c.id
                 LEFT JOIN projects p ON c.project_id = p.id
+                $contents_join
                 WHERE m.author_role IN ('user', 'assistant')
-                  AND m.content_text IS NOT NULL
-                  AND m.content_text != ''
-                  AND m.content_text NOT LIKE '%[object Object]%'
-                  AND LENGTH(m.content_text) > 3";
+                  AND $has_text
+                  AND $message_text != ''
+                  AND $message_text NOT LIKE '%[object Object]%'
+                  AND LENGTH($message_text) > 3";
     }
     
     $params = [];
@@ -59,7 +64,7 @@ try {
             $param_types[] = PDO::PARAM_STR;
         } else {
             // Buscar en contenido de mensajes
-            $sql .= " AND m.content_text LIKE ?";
+            $sql .= " AND $message_text LIKE ?";
             $params[] = "%$query%";
             $param_types[] = PDO::PARAM_STR;
         }
@@ -1,6 +1,7 @@
 <?php
 header('Content-Type: application/json; charset=utf-8');
 require_once __DIR__ . '/../database/db_connection.php';
+require_once __DIR__ . '/../database/content_store.php';
 
 try {
     // Parámetros de entrada
@@ -41,7 +42,9 @@ try {
         $sql .= " ORDER BY c.create_time DESC LIMIT " . $limit;
         
     } else {
-        // Buscar en contenido de mensajes
+        // Buscar en contenido de mensajes (con el almacén de contenidos los cuerpos largos están en message_contents)
+        list($message_text, $contents_join) = message_text_sql($pdo);
+        $has_text = content_store_enabled($pdo) ? '(m.content_text IS NOT NULL OR m.content_hash IS NOT NULL)' : 'm.content_text IS NOT NULL';
         $sql = "
             SELECT 
                 c.id as conversation_id,
@@ -49,17 +52,18 @@ try {
                 p.name as project_name,
                 m.create_time,
                 m.author_role as message_role,
-                m.content_text as message_content
+                $message_text as message_content
             FROM messages m
             INNER JOIN conversations c ON m.conversation_id = c.id
             LEFT JOIN projects p ON c.project_id = p.id
-            WHERE m.content_text IS NOT NULL AND m.content_text != ''
+            $contents_join
+            WHERE $has_text AND $message_text != ''
         ";
         
         $params = [];
         
         if (!empty($query)) {
-            $sql .= " AND m.content_text LIKE ?";
+            $sql .= " AND $message_text LIKE ?";
             $params[] = '%' . $query . '%';
         }
         
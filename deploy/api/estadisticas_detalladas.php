@@ -6,56 +6,55 @@ try {
     // Usar la función de conexión existente
     $pdo = connect_to_db();
     
-    // Total de mensajes
-    $stmt = $pdo->query("SELECT COUNT(*) as total_messages FROM messages");
-    $totalMessages = $stmt->fetch(PDO::FETCH_ASSOC)['total_messages'];
+    // Estadísticas precalculadas (stats_rollup, mantenida por los importadores;
+    // recalcular con: python scripts/python/stats_rollup.py rebuild)
+    $stmt = $pdo->query("SELECT conversations, messages FROM stats_rollup WHERE dimension = 'total' AND bucket = ''");
+    $totals = $stmt->fetch(PDO::FETCH_ASSOC);
+    if (!$totals) {
+        throw new Exception('Estadísticas no calculadas: ejecutar python stats_rollup.py rebuild');
+    }
+    $totalMessages = $totals['messages'];
+    $totalConversations = $totals['conversations'];
     
-    // Total de conversaciones
-    $stmt = $pdo->query("SELECT COUNT(*) as total_conversations FROM conversations");
-    $totalConversations = $stmt->fetch(PDO::FETCH_ASSOC)['total_conversations'];
-    
-        // Proyectos con conteos desde tabla normalizada
-        $stmt = $pdo->query("
-            SELECT p.name as project_name, COUNT(c.conversation_id) as count 
-            FROM projects p
-            LEFT JOIN conversations c ON p.id = c.project_id 
-            GROUP BY p.id, p.name 
-            ORDER BY count DESC
-        ");
-        $categories = $stmt->fetchAll(PDO::FETCH_ASSOC);    // Modelos más utilizados
+    // Proyectos con conteos
     $stmt = $pdo->query("
-        SELECT model, COUNT(*) as count 
-        FROM conversations 
-        WHERE model IS NOT NULL 
-        GROUP BY model 
+        SELECT p.name as project_name, COALESCE(s.conversations, 0) as count 
+        FROM projects p
+        LEFT JOIN stats_rollup s ON s.dimension = 'project' AND s.bucket = CAST(p.id AS CHAR)
         ORDER BY count DESC
     ");
+    $categories = $stmt->fetchAll(PDO::FETCH_ASSOC);
+    
+    // Modelos más utilizados
+    $stmt = $pdo->query("
+        SELECT bucket as model, conversations as count 
+        FROM stats_rollup 
+        WHERE dimension = 'model' AND bucket <> '' AND conversations > 0 
+        ORDER BY conversations DESC
+    ");
     $models = $stmt->fetchAll(PDO::FETCH_ASSOC);
     
-    // Actividad por mes
+    // Actividad por mes (bucket 'AAAA-MM')
     $stmt = $pdo->query("
         SELECT 
-            YEAR(create_time) as year, 
-            MONTH(create_time) as month, 
-            COUNT(*) as conversations 
-        FROM conversations 
-        WHERE create_time IS NOT NULL 
-        GROUP BY YEAR(create_time), MONTH(create_time) 
-        ORDER BY year DESC, month DESC 
+            CAST(LEFT(bucket, 4) AS UNSIGNED) as year, 
+            CAST(SUBSTRING(bucket, 6, 2) AS UNSIGNED) as month, 
+            conversations 
+        FROM stats_rollup 
+        WHERE dimension = 'month' AND bucket <> '' AND conversations > 0 
+        ORDER BY bucket DESC 
         LIMIT 12
     ");
     $monthlyActivity = $stmt->fetchAll(PDO::FETCH_ASSOC);
     
-    // Promedio de mensajes por conversación
+    // Promedio de mensajes por conversación (entre las conversaciones con mensajes)
     $stmt = $pdo->query("
-        SELECT AVG(message_count) as avg_messages_per_conversation
-        FROM (
-            SELECT conversation_id, COUNT(*) as message_count 
-            FROM messages 
-            GROUP BY conversation_id
-        ) as conv_counts
+        SELECT COUNT(*) as conversations_with_messages 
+        FROM stats_rollup 
+        WHERE dimension = 'conversation' AND messages > 0
     ");
-    $avgMessages = $stmt->fetch(PDO::FETCH_ASSOC)['avg_messages_per_conversation'];
+    $conversationsWithMessages = $stmt->fetch(PDO::FETCH_ASSOC)['conversations_with_messages'];
+    $avgMessages = $conversationsWithMessages > 0 ? $totalMessages / $conversationsWithMessages : 0;
     
     $response = [
         'total_messages' => $totalMessages,
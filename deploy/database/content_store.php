@@ -0,0 +1,29 @@
+<?php
+/**
+ * Almacén de contenidos (scripts/python/content_store.py)
+ * Con el almacén activo, los cuerpos largos de messages se guardan una sola vez
+ * en message_contents: el mensaje queda con content_text NULL y content_hash.
+ * Las consultas que muestran el texto usan message_text_sql().
+ */
+
+// ¿messages tiene content_hash? (se consulta una vez por petición)
+function content_store_enabled($pdo) {
+    static $enabled = null;
+    if ($enabled === null) {
+        $stmt = $pdo->query("SELECT COUNT(*) FROM information_schema.COLUMNS
+                             WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'messages' AND COLUMN_NAME = 'content_hash'");
+        $enabled = intval($stmt->fetchColumn()) > 0;
+    }
+    return $enabled;
+}
+
+// [expresión del texto, LEFT JOIN] para leer el cuerpo completo de un mensaje
+function message_text_sql($pdo, $alias = 'm', $contents_alias = 'mc') {
+    if (!content_store_enabled($pdo)) {
+        return ["$alias.content_text", ''];
+    }
+    return [
+        "COALESCE($alias.content_text, $contents_alias.content_text)",
+        "LEFT JOIN message_contents $contents_alias ON $contents_alias.content_hash = $alias.content_hash"
+    ];
+}
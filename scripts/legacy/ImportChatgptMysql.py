@@ -3,15 +3,11 @@ import os
 import pymysql
 import zipfile
 from datetime import datetime
-
-# Configuración de la base de datos
-DB_CONFIG = {
-    "host": "sv46.byethost46.org",
-    "user": "iunaorg_b3toh",
-    "password": "elgeneral2018",
-    "database": "iunaorg_chatBeto",
-    "port": 3306
-}
+import sys
+# Los módulos compartidos (db_pool, conversations_stream...) están en scripts/python
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python'))
+from db_pool import connect
+from conversations_stream import iter_conversations
 
 ZIP_FILE = "conversations.zip"
 EXTRACT_PATH = "./extracted"
@@ -19,7 +15,7 @@ EXTRACT_PATH = "./extracted"
 def connect_to_db():
     """Conecta a la base de datos MySQL"""
     try:
-        connection = pymysql.connect(**DB_CONFIG, charset="utf8mb4", cursorclass=pymysql.cursors.DictCursor)
+        connection = connect(driver=pymysql.connect, cursorclass=pymysql.cursors.DictCursor)
         print("[OK] Conectado a la base de datos correctamente.")
         return connection
     except pymysql.MySQLError as e:
@@ -115,22 +111,23 @@ def process_conversations():
     """Carga y procesa el archivo JSON de conversaciones."""
     file_path = os.path.join(EXTRACT_PATH, "conversations.json")
     if not os.path.exists(file_path):
-        print(f"[ERROR] No se encontró el archivo {file_path}")
+        # Leer directamente desde el ZIP del export, sin extraerlo
+        file_path = ZIP_FILE
+    if not os.path.exists(file_path):
+        print(f"[ERROR] No se encontró {os.path.join(EXTRACT_PATH, 'conversations.json')} ni {ZIP_FILE}")
         return
     
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            data = json.load(file)
-            for conversation in data:
-                if not isinstance(conversation, dict):
-                    print("[WARNING] Conversación inválida encontrada y omitida.")
-                    continue
-                
-                conversation_id = conversation.get("conversation_id") or "unknown"
-                title = conversation.get("title", "Sin título")
-                messages = conversation.get("mapping", {})
-                
-                insert_conversation(conversation_id, title, messages)
+        for conversation in iter_conversations(file_path):
+            if not isinstance(conversation, dict):
+                print("[WARNING] Conversación inválida encontrada y omitida.")
+                continue
+            
+            conversation_id = conversation.get("conversation_id") or "unknown"
+            title = conversation.get("title", "Sin título")
+            messages = conversation.get("mapping", {})
+            
+            insert_conversation(conversation_id, title, messages)
     except Exception as e:
         print(f"[ERROR] No se pudo procesar el JSON: {e}")
 
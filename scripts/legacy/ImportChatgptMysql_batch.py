@@ -3,15 +3,11 @@ import os
 import pymysql
 from datetime import datetime
 import time
-
-# Configuración de la base de datos
-DB_CONFIG = {
-    "host": "sv46.byethost46.org",
-    "user": "iunaorg_b3toh",
-    "password": "elgeneral2018",
-    "database": "iunaorg_chatBeto",
-    "port": 3306
-}
+import sys
+# Los módulos compartidos (db_pool, conversations_stream...) están en scripts/python
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python'))
+from db_pool import connect
+from conversations_stream import ConversationStream, open_export
 
 ZIP_FILE = "conversations.zip"
 EXTRACT_PATH = "./extracted"
@@ -19,7 +15,7 @@ EXTRACT_PATH = "./extracted"
 def connect_to_db():
     """Conecta a la base de datos MySQL"""
     try:
-        connection = pymysql.connect(**DB_CONFIG, charset="utf8mb4", cursorclass=pymysql.cursors.DictCursor)
+        connection = connect(driver=pymysql.connect, cursorclass=pymysql.cursors.DictCursor)
         return connection
     except pymysql.MySQLError as e:
         print(f"[ERROR] No se pudo conectar a MySQL: {e}")
@@ -99,7 +95,10 @@ def process_conversations_batch():
     """Procesa conversaciones por lotes para mejor rendimiento"""
     file_path = os.path.join(EXTRACT_PATH, "conversations.json")
     if not os.path.exists(file_path):
-        print(f"[ERROR] No se encontró el archivo {file_path}")
+        # Leer directamente desde el ZIP del export, sin extraerlo
+        file_path = ZIP_FILE
+    if not os.path.exists(file_path):
+        print(f"[ERROR] No se encontró {os.path.join(EXTRACT_PATH, 'conversations.json')} ni {ZIP_FILE}")
         return
     
     print("[INFO] Obteniendo conversaciones existentes...")
@@ -107,17 +106,17 @@ def process_conversations_batch():
     print(f"[INFO] Conversaciones ya existentes: {len(existing_conversations)}")
     
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            data = json.load(file)
+        file, total_bytes = open_export(file_path)
+        with file:
+            stream = ConversationStream(file)
             
-            total_conversations = len(data)
             processed = 0
             imported = 0
             skipped = 0
             
-            print(f"[INFO] Total de conversaciones en archivo: {total_conversations}")
+            print(f"[INFO] Tamaño del archivo: {total_bytes:,} bytes")
             
-            for conversation in data:
+            for conversation in stream:
                 processed += 1
                 
                 if not isinstance(conversation, dict):
@@ -131,7 +130,7 @@ def process_conversations_batch():
                 if conversation_id in existing_conversations:
                     skipped += 1
                     if processed % 100 == 0:
-                        print(f"[INFO] Progreso: {processed}/{total_conversations} | Importadas: {imported} | Saltadas: {skipped}")
+                        print(f"[INFO] Progreso: {processed} ({stream.offset / total_bytes:.1%}) | Importadas: {imported} | Saltadas: {skipped}")
                     continue
                 
                 # Import new conversation
@@ -142,7 +141,7 @@ def process_conversations_batch():
                 
                 # Progress update
                 if processed % 50 == 0:
-                    print(f"[INFO] Progreso: {processed}/{total_conversations} | Importadas: {imported} | Saltadas: {skipped}")
+                    print(f"[INFO] Progreso: {processed} ({stream.offset / total_bytes:.1%}) | Importadas: {imported} | Saltadas: {skipped}")
                     time.sleep(0.1)  # Small delay to prevent overwhelming the server
             
             print(f"\n[RESUMEN FINAL]")
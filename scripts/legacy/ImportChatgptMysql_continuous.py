@@ -9,25 +9,35 @@ import time
 import sys
 from datetime import datetime
 import signal
+import os
+# Los módulos compartidos (db_pool, conversations_stream...) están en scripts/python
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python'))
+from conversations_stream import ConversationStream, open_export
+from import_checkpoint import ImportCheckpoint
+from db_pool import ConnectionPool, is_connection_lost
 
-# Configuración de conexión
-DB_CONFIG = {
-    'host': 'sv46.byethost46.org',
-    'user': 'iunaorg_b3toh',
-    'password': 'elgeneral2018',
-    'database': 'iunaorg_chatBeto',
-    'charset': 'utf8mb4',
-    'connect_timeout': 60,
-    'read_timeout': 60,
-    'write_timeout': 60,
-    'autocommit': True
-}
+# Una sola conexión reutilizada para todas las conversaciones (antes se abría una por conversación),
+# configurada desde el .env (env_loader.get_db_config)
+pool = ConnectionPool(size=1, connect=pymysql.connect,
+                      connect_timeout=60, read_timeout=60, write_timeout=60, autocommit=True)
 
 # Variables globales para estadísticas
 total_processed = 0
 total_messages = 0
 start_time = time.time()
 
+# Checkpoint de la última conversación ya escrita (cada conversación se confirma sola).
+# Tras un fallo la posición deja de avanzar: al reanudar se reintenta desde esa conversación
+checkpoint = None
+last_position = None
+failed_conversations = 0
+
+def save_checkpoint():
+    if checkpoint and last_position:
+        index, offset, conv_id = last_position
+        checkpoint.save(index, offset, conv_id,
+                        total_processed=total_processed, total_messages=total_messages)
+
 def signal_handler(sig, frame):
     """Manejador para interrupciones elegantes"""
     elapsed = time.time() - start_time
@@ -39,13 +49,17 @@ def signal_handler(sig, frame):
     if total_processed > 0:
         print(f"   📈 Promedio: {total_messages/total_processed:.1f} mensajes/conv")
         print(f"   🚀 Velocidad: {total_processed/elapsed:.2f} conv/segundo")
+    save_checkpoint()
+    if last_position:
+        print(f"   ⏯️  Checkpoint guardado: se reanudará desde la conversación #{last_position[0]}")
     sys.exit(0)
 
 signal.signal(signal.SIGINT, signal_handler)
 
 def create_connection():
     try:
-        connection = pymysql.connect(**DB_CONFIG)
+        # Conexión del pool: se verifica con ping si estuvo inactiva y se reabre si el servidor la cerró
+        connection = pool.acquire()
         return connection
     except Exception as e:
         print(f"❌ Error conexión: {e}")
@@ -53,26 +67,25 @@ def create_connection():
         return None
 
 def get_existing_conversations():
-    connection = create_connection()
-    if not connection:
-        return set()
     try:
-        with connection.cursor() as cursor:
-            cursor.execute("SELECT conversation_id FROM conversations")
-            return set(row[0] for row in cursor.fetchall())
-    except:
+        with pool.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT conversation_id FROM conversations")
+                return set(row[0] for row in cursor.fetchall())
+    except Exception as e:
+        print(f"❌ Error conexión: {e}")
         return set()
-    finally:
-        connection.close()
 
 def process_conversation_ultra_optimized(conversation_id, title, mapping):
-    """Versión ultra-optimizada para procesamiento rápido"""
+    """Versión ultra-optimizada para procesamiento rápido.
+    Devuelve los mensajes escritos, o None si la conversación no se pudo escribir"""
     global total_processed, total_messages
     
     connection = create_connection()
     if not connection:
-        return 0
+        return None
     
+    broken = False
     try:
         with connection.cursor() as cursor:
             # Insertar conversación
@@ -151,13 +164,14 @@ def process_conversation_ultra_optimized(conversation_id, title, mapping):
             
     except Exception as e:
         print(f"❌ Error conv {conversation_id}: {e}")
-        return 0
+        broken = is_connection_lost(e)
+        return None
     finally:
-        connection.close()
+        pool.release(connection, broken)
 
 def continuous_import():
     """Proceso de importación continua sin interrupciones"""
-    global start_time
+    global start_time, checkpoint, last_position, total_processed, total_messages, failed_conversations
     
     print("🚀 IMPORTACIÓN CONTINUA AUTOMÁTICA")
     print("=" * 60)
@@ -166,52 +180,68 @@ def continuous_import():
     existing = get_existing_conversations()
     print(f"📊 Conversaciones existentes: {len(existing)}")
     
-    # Cargar datos
+    # Abrir datos en streaming (una conversación a la vez)
+    # Acepta conversations.json o el ZIP original del export como argumento
+    file_path = sys.argv[1] if len(sys.argv) > 1 else 'extracted/conversations.json'
     try:
-        with open('extracted/conversations.json', 'r', encoding='utf-8') as f:
-            conversations = json.load(f)
-        print(f"📁 Conversaciones en archivo: {len(conversations)}")
+        conversations_fp, total_bytes = open_export(file_path)
+        print(f"📁 Tamaño del archivo: {total_bytes / 1024 / 1024:.1f} MB")
     except Exception as e:
-        print(f"❌ Error cargando JSON: {e}")
+        print(f"❌ Error abriendo JSON: {e}")
         return
     
-    # Calcular trabajo pendiente
-    remaining = len(conversations) - len(existing)
-    print(f"🎯 Conversaciones a procesar: {remaining}")
-    print("=" * 60)
+    # Reanudar desde el checkpoint de una ejecución interrumpida (--restart lo ignora)
+    checkpoint = ImportCheckpoint('ImportChatgptMysql_continuous', file_path)
+    if '--restart' not in sys.argv and checkpoint.load():
+        total_processed = checkpoint.state['stats'].get('total_processed', 0)
+        total_messages = checkpoint.state['stats'].get('total_messages', 0)
+        print(f"⏯️  Reanudando desde la conversación #{checkpoint.index} (byte {checkpoint.offset:,})")
     
-    if remaining == 0:
-        print("✅ ¡Todas las conversaciones ya están importadas!")
-        return
+    print("=" * 60)
     
     # Procesar continuamente
     start_time = time.time()
     last_report_time = start_time
+    stream = ConversationStream(conversations_fp, start_offset=checkpoint.offset, start_index=checkpoint.index)
     
-    for i, conv in enumerate(conversations):
+    def advance(position):
+        """La posición del checkpoint solo avanza si no quedó atrás ninguna conversación sin escribir"""
+        global last_position
+        if not failed_conversations:
+            last_position = position
+    
+    for i, conv in enumerate(stream, checkpoint.index):
         try:
             conv_id = conv.get('conversation_id') or conv.get('id')
+            position = (stream.index, stream.offset, conv_id)
             if not conv_id or conv_id in existing:
+                advance(position)
                 continue
             
             title = conv.get('title', 'Sin título')
             mapping = conv.get('mapping', {})
             
             if not mapping:
+                advance(position)
                 continue
             
-            # Procesar conversación
+            # Procesar conversación (la posición avanza solo cuando ya está escrita)
             msg_count = process_conversation_ultra_optimized(conv_id, title, mapping)
+            if msg_count is None:
+                failed_conversations += 1
+            advance(position)
             
             current_time = time.time()
             
-            # Reporte cada 25 conversaciones o cada 2 minutos
+            # Reporte (y checkpoint) cada 25 conversaciones o cada 2 minutos
             if total_processed % 25 == 0 or (current_time - last_report_time) >= 120:
+                save_checkpoint()
                 elapsed = current_time - start_time
                 rate = total_processed / elapsed if elapsed > 0 else 0
-                eta_minutes = (remaining - total_processed) / rate / 60 if rate > 0 else 0
+                progress = stream.offset / total_bytes if total_bytes else 1
+                eta_minutes = elapsed * (1 - progress) / progress / 60 if progress > 0 else 0
                 
-                print(f"📊 {total_processed:3d}/{remaining} | {total_messages:5d} msgs | "
+                print(f"📊 {total_processed:3d} ({progress:.1%}) | {total_messages:5d} msgs | "
                       f"{rate:.2f}/seg | ETA: {eta_minutes:.1f}min | "
                       f"Tiempo: {elapsed/60:.1f}min")
                 last_report_time = current_time
@@ -223,6 +253,16 @@ def continuous_import():
             print(f"⚠️  Error conv {i+1}: {e}")
             continue
     
+    conversations_fp.close()
+    if failed_conversations:
+        # Se conserva el checkpoint anterior a la primera conversación fallida para reintentarla
+        save_checkpoint()
+        print(f"⚠️  {failed_conversations} conversaciones sin escribir: vuelve a ejecutar para reintentarlas "
+              f"(las ya escritas se omiten)")
+    else:
+        checkpoint.clear()
+    pool.close()
+    
     # Resumen final
     elapsed = time.time() - start_time
     print("\n" + "=" * 60)
@@ -4,14 +4,14 @@ import json
 import time
 import sys
 from datetime import datetime
+import os
+# Los módulos compartidos (db_pool, conversations_stream...) están en scripts/python
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python'))
+from db_pool import connect
+from conversations_stream import ConversationStream, open_export
 
-# Configuración de conexión
-DB_CONFIG = {
-    'host': 'sv46.byethost46.org',
-    'user': 'iunaorg_b3toh',
-    'password': 'elgeneral2018',
-    'database': 'iunaorg_chatBeto',
-    'charset': 'utf8mb4',
+# Configuración de conexión: credenciales del .env (env_loader.get_db_config), aquí solo opciones del conector
+DB_OPTIONS = {
     'connect_timeout': 60,
     'read_timeout': 60,
     'write_timeout': 60,
@@ -20,7 +20,7 @@ DB_CONFIG = {
 
 def create_connection():
     try:
-        connection = pymysql.connect(**DB_CONFIG)
+        connection = connect(driver=pymysql.connect, **DB_OPTIONS)
         return connection
     except Exception as e:
         print(f"❌ Error conexión: {e}")
@@ -150,25 +150,25 @@ def main_import_process():
     existing = get_existing_conversations()
     print(f"📊 Conversaciones existentes: {len(existing)}")
     
-    # Cargar datos
+    # Abrir datos en streaming (una conversación a la vez)
+    # Acepta conversations.json o el ZIP original del export como argumento
+    file_path = sys.argv[1] if len(sys.argv) > 1 else 'extracted/conversations.json'
     try:
-        with open('extracted/conversations.json', 'r', encoding='utf-8') as f:
-            conversations = json.load(f)
-        print(f"📁 Conversaciones en archivo: {len(conversations)}")
+        conversations_fp, total_bytes = open_export(file_path)
+        print(f"📁 Tamaño del archivo: {total_bytes / 1024 / 1024:.1f} MB")
     except Exception as e:
-        print(f"❌ Error cargando JSON: {e}")
+        print(f"❌ Error abriendo JSON: {e}")
         return
     
     # Procesar
     processed = 0
     total_messages = 0
     start_time = time.time()
-    remaining = len(conversations) - len(existing)
+    stream = ConversationStream(conversations_fp)
     
-    print(f"🎯 Conversaciones a procesar: {remaining}")
     print("=" * 50)
     
-    for i, conv in enumerate(conversations):
+    for i, conv in enumerate(stream):
         try:
             conv_id = conv.get('conversation_id') or conv.get('id')
             if not conv_id or conv_id in existing:
@@ -191,9 +191,10 @@ def main_import_process():
                 if processed % 10 == 0:
                     elapsed = time.time() - start_time
                     rate = processed / elapsed if elapsed > 0 else 0
-                    eta_minutes = (remaining - processed) / rate / 60 if rate > 0 else 0
+                    progress = stream.offset / total_bytes if total_bytes else 1
+                    eta_minutes = elapsed * (1 - progress) / progress / 60 if progress > 0 else 0
                     
-                    print(f"✅ {processed:3d}/{remaining} | {total_messages:5d} msgs | "
+                    print(f"✅ {processed:3d} ({progress:.1%}) | {total_messages:5d} msgs | "
                           f"{rate:.2f}/seg | ETA: {eta_minutes:.1f}min")
                 
                 # Pausa mínima para no saturar servidor
@@ -205,6 +206,8 @@ def main_import_process():
         except Exception as e:
             continue
     
+    conversations_fp.close()
+    
     # Estadísticas finales
     elapsed = time.time() - start_time
     print("\n" + "=" * 50)
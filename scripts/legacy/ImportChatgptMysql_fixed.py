@@ -4,14 +4,15 @@ import json
 import time
 import sys
 from datetime import datetime
+import os
+# Los módulos compartidos (db_pool, conversations_stream...) están en scripts/python
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python'))
+from db_pool import connect
+from conversations_stream import ConversationStream, open_export
 
 # Configuración de conexión a la base de datos
-DB_CONFIG = {
-    'host': 'sv46.byethost46.org',
-    'user': 'iunaorg_b3toh',
-    'password': 'elgeneral2018',
-    'database': 'iunaorg_chatBeto',
-    'charset': 'utf8mb4',
+# Credenciales desde el .env (env_loader.get_db_config); aquí solo opciones del conector
+DB_OPTIONS = {
     'connect_timeout': 30,
     'read_timeout': 30,
     'write_timeout': 30,
@@ -21,7 +22,7 @@ DB_CONFIG = {
 def create_connection():
     """Crea una conexión robusta a la base de datos"""
     try:
-        connection = pymysql.connect(**DB_CONFIG)
+        connection = connect(driver=pymysql.connect, **DB_OPTIONS)
         return connection
     except Exception as e:
         print(f"❌ Error al conectar a la base de datos: {e}")
@@ -143,22 +144,24 @@ def process_conversations_fixed():
     existing_conversations = get_existing_conversations()
     print(f"[INFO] Conversaciones ya existentes: {len(existing_conversations)}")
     
-    # Cargar archivo JSON
+    # Abrir archivo JSON en streaming (una conversación a la vez)
+    # Acepta conversations.json o el ZIP original del export como argumento
+    file_path = sys.argv[1] if len(sys.argv) > 1 else 'extracted/conversations.json'
     try:
-        with open('extracted/conversations.json', 'r', encoding='utf-8') as f:
-            conversations = json.load(f)
+        conversations_fp, total_bytes = open_export(file_path)
     except Exception as e:
-        print(f"❌ Error cargando archivo JSON: {e}")
+        print(f"❌ Error abriendo archivo JSON: {e}")
         return
     
-    print(f"[INFO] Total de conversaciones en archivo: {len(conversations)}")
+    print(f"[INFO] Tamaño del archivo: {total_bytes:,} bytes")
     
     # Procesar conversaciones
     processed_count = 0
     total_messages = 0
     start_time = time.time()
+    stream = ConversationStream(conversations_fp)
     
-    for i, conversation in enumerate(conversations):
+    for i, conversation in enumerate(stream):
         try:
             # Obtener ID de conversación
             conversation_id = conversation.get('conversation_id') or conversation.get('id')
@@ -189,11 +192,11 @@ def process_conversations_fixed():
                 # Mostrar progreso cada 25 conversaciones
                 if processed_count % 25 == 0:
                     elapsed = time.time() - start_time
+                    progress = stream.offset / total_bytes if total_bytes else 1
                     rate = processed_count / elapsed if elapsed > 0 else 0
-                    remaining = len(conversations) - len(existing_conversations) - processed_count
-                    eta = remaining / rate if rate > 0 else 0
+                    eta = elapsed * (1 - progress) / progress if progress > 0 else 0
                     
-                    print(f"📊 Progreso: {processed_count} conversaciones | "
+                    print(f"📊 Progreso: {processed_count} conversaciones ({progress:.1%}) | "
                           f"{total_messages} mensajes | "
                           f"{rate:.2f} conv/seg | "
                           f"ETA: {eta/60:.1f} min")
@@ -210,6 +213,8 @@ def process_conversations_fixed():
             print(f"❌ Error procesando conversación {i+1}: {e}")
             continue
     
+    conversations_fp.close()
+    
     elapsed = time.time() - start_time
     print(f"\n✅ Importación completada!")
     print(f"📊 Estadísticas finales:")
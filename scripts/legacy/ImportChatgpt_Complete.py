@@ -9,7 +9,10 @@ import time
 import sys
 import os
 from datetime import datetime
+# Los módulos compartidos (db_pool, conversations_stream...) están en scripts/python
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python'))
 from env_loader import EnvLoader
+from conversations_stream import ConversationStream, open_export
 
 def get_db_config():
     """Obtiene la configuración de base de datos desde variables de entorno"""
@@ -203,16 +206,15 @@ def import_conversations_from_json(json_file_path):
     existing_conversations = get_existing_conversations()
     existing_messages = get_existing_messages()
     
-    # Cargar JSON
-    print("📖 Cargando archivo JSON...")
+    # Abrir JSON (o el ZIP del export) en streaming
+    print("📖 Abriendo archivo JSON...")
     try:
-        with open(json_file_path, 'r', encoding='utf-8') as file:
-            conversations_data = json.load(file)
+        conversations_fp, total_bytes = open_export(json_file_path)
     except Exception as e:
         print(f"❌ Error leyendo JSON: {e}")
         return False
     
-    print(f"📊 Conversaciones en archivo: {len(conversations_data)}")
+    print(f"📊 Tamaño del archivo: {total_bytes:,} bytes")
     
     # Procesar conversaciones
     total_conversations = 0
@@ -220,8 +222,9 @@ def import_conversations_from_json(json_file_path):
     processed = 0
     
     start_time = time.time()
+    stream = ConversationStream(conversations_fp)
     
-    for conversation_data in conversations_data:
+    for conversation_data in stream:
         # Generar ID si no existe
         conversation_id = conversation_data.get('id', f"conv_{processed}")
         if not conversation_id or conversation_id == 'conv_':
@@ -243,8 +246,10 @@ def import_conversations_from_json(json_file_path):
         # Progreso cada 10 conversaciones
         if processed % 10 == 0:
             elapsed = time.time() - start_time
-            progress = (processed / len(conversations_data)) * 100
-            print(f"📈 Progreso: {processed}/{len(conversations_data)} ({progress:.1f}%) | Tiempo: {elapsed:.1f}s")
+            progress = stream.offset / total_bytes * 100 if total_bytes else 100
+            print(f"📈 Progreso: {processed} ({progress:.1f}%) | Tiempo: {elapsed:.1f}s")
+    
+    conversations_fp.close()
     
     # Resumen final
     elapsed = time.time() - start_time
@@ -285,6 +290,12 @@ def main():
     print("🤖 IMPORTADOR COMPLETO DE CHATGPT")
     print("=" * 60)
     
+    # Export ZIP original pasado como argumento: se lee sin extraer a disco
+    if len(sys.argv) > 1:
+        success = import_conversations_from_json(sys.argv[1])
+        print("\n🎉 ¡Importación completada exitosamente!" if success else "\n❌ Error en la importación")
+        return
+    
     # Directorio de archivos extraídos
     extracted_dir = "./extracted"
     
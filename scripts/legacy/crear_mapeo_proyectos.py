@@ -6,12 +6,12 @@ Utiliza el análisis de similitud previo para asignar conversaciones a proyectos
 
 import json
 import re
-from difflib import SequenceMatcher
 from datetime import datetime
-
-def similarity(a, b):
-    """Calcula similitud entre dos strings"""
-    return SequenceMatcher(None, a.lower(), b.lower()).ratio()
+import os
+import sys
+# Los módulos compartidos (db_pool, conversations_stream...) están en scripts/python
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'python'))
+from trigram_matcher import TrigramIndex
 
 def load_projects():
     """Carga la lista de proyectos desde el archivo"""
@@ -41,35 +41,26 @@ def load_conversations():
 def map_conversation_to_project(conversation_title, projects):
     """
     Mapea una conversación a un proyecto basándose en similitud
+    projects puede ser una lista de nombres o un TrigramIndex ya construido
     Retorna: (project_name, confidence_score, mapping_type)
     """
-    title_lower = conversation_title.lower()
+    if not isinstance(projects, TrigramIndex):
+        projects = TrigramIndex(projects)
     
     # Buscar coincidencias exactas
-    for project in projects:
-        if project.lower() == title_lower:
-            return (project, 1.0, 'exact')
+    exact_matches = projects.exact(conversation_title)
+    if exact_matches:
+        return (exact_matches[0], 1.0, 'exact')
     
     # Buscar coincidencias parciales (proyecto contenido en título)
-    partial_matches = []
-    for project in projects:
-        if project.lower() in title_lower:
-            partial_matches.append((project, 0.8, 'partial'))
+    partial_matches = projects.contained_in(conversation_title)
     
     if partial_matches:
         # Retornar la coincidencia parcial más larga (más específica)
-        best_match = max(partial_matches, key=lambda x: len(x[0]))
-        return best_match
-    
-    # Buscar por similitud alta
-    best_similarity = 0
-    best_project = None
+        return (max(partial_matches, key=len), 0.8, 'partial')
     
-    for project in projects:
-        score = similarity(project, conversation_title)
-        if score > best_similarity:
-            best_similarity = score
-            best_project = project
+    # Buscar por similitud alta (solo entre los candidatos con más trigramas en común)
+    best_project, best_similarity = projects.best_match(conversation_title)
     
     # Solo considerar similitudes altas como válidas
     if best_similarity > 0.7:
@@ -86,6 +77,7 @@ def create_project_mapping():
         return
     
     print(f"Proyectos cargados: {len(projects)}")
+    project_index = TrigramIndex(projects)
     
     print("Cargando conversaciones...")
     conversations = load_conversations()
@@ -123,7 +115,7 @@ def create_project_mapping():
             continue
         
         # Mapear conversación a proyecto
-        project_name, confidence, mapping_type = map_conversation_to_project(title, projects)
+        project_name, confidence, mapping_type = map_conversation_to_project(title, project_index)
         
         conversation_data = {
             'conversation_id': conv_id,
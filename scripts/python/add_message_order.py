@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# Agregar position / is_canonical / branch_id a messages y completarlos desde el export
+
+import mysql.connector
+import os
+import sys
+from conversations_stream import default_export_path, iter_conversations
+from message_tree import linearize
+from db_pool import connect
+
+BACKFILL_BATCH = 20000  # filas por UPDATE con JOIN
+INSERT_BATCH_SIZE = 1000
+
+def add_order_columns(cursor):
+    """Columnas de orden e índice para leer la transcripción por rango de índice"""
+    try:
+        cursor.execute("""
+            ALTER TABLE messages
+            ADD COLUMN position INT NULL,
+            ADD COLUMN is_canonical TINYINT(1) NOT NULL DEFAULT 1,
+            ADD COLUMN branch_id INT NOT NULL DEFAULT 0,
+            ADD INDEX idx_transcript (conversation_id, is_canonical, position)
+        """)
+        print("  ✅ Campos añadidos: position, is_canonical, branch_id (índice idx_transcript)")
+    except mysql.connector.Error as e:
+        if "Duplicate column name" in str(e):
+            print("  ℹ️ Los campos ya existen, continuando...")
+        else:
+            raise
+
+def apply_batch(cursor, batch):
+    cursor.execute("TRUNCATE TABLE tmp_message_order")
+    for start in range(0, len(batch), INSERT_BATCH_SIZE):
+        cursor.executemany("""
+            INSERT INTO tmp_message_order (id, position, is_canonical, branch_id)
+            VALUES (%s, %s, %s, %s)
+        """, batch[start:start + INSERT_BATCH_SIZE])
+    cursor.execute("""
+        UPDATE messages m
+        INNER JOIN tmp_message_order t ON t.id = m.id
+        SET m.position = t.position, m.is_canonical = t.is_canonical, m.branch_id = t.branch_id
+    """)
+    return cursor.rowcount
+
+def add_message_order(export_path=None):
+    try:
+        conversations_file = export_path or default_export_path(os.path.dirname(__file__))
+        print(f"🌳 Calculando orden de mensajes desde {conversations_file}...")
+
+        connection = connect(autocommit=False)
+        cursor = connection.cursor()
+
+        # 1. ESTRUCTURA
+        print("\n🔧 Actualizando tabla 'messages'...")
+        add_order_columns(cursor)
+
+        cursor.execute("""
+            CREATE TEMPORARY TABLE tmp_message_order (
+                id VARCHAR(36) NOT NULL PRIMARY KEY,
+                position INT NOT NULL,
+                is_canonical TINYINT(1) NOT NULL,
+                branch_id INT NOT NULL
+            ) DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+        """)
+
+        # 2. BACKFILL por lotes: linealizar cada árbol y aplicar con un UPDATE por lote
+        print("\n💌 Completando posición y rama de los mensajes existentes...")
+
+        batch = []
+        conversations = 0
+        updated = 0
+        dead_branch_nodes = 0
+
+        for conv in iter_conversations(conversations_file):
+            mapping = conv.get('mapping') or {}
+            if not mapping:
+                continue
+            conversations += 1
+
+            for msg_id, order in linearize(mapping, conv.get('current_node')).items():
+                batch.append((msg_id, order.position, int(order.is_canonical), order.branch_id))
+                if not order.is_canonical:
+                    dead_branch_nodes += 1
+
+            if len(batch) >= BACKFILL_BATCH:
+                updated += apply_batch(cursor, batch)
+                connection.commit()
+                batch = []
+                print(f"    🔄 {conversations:,} conversaciones | {updated:,} mensajes actualizados")
+
+        if batch:
+            updated += apply_batch(cursor, batch)
+        connection.commit()
+
+        cursor.execute("SELECT COUNT(*) FROM messages WHERE position IS NULL")
+        missing = cursor.fetchone()[0]
+
+        print(f"\n✅ Orden de mensajes completado:")
+        print(f"  💬 Conversaciones procesadas: {conversations:,}")
+        print(f"  💌 Mensajes actualizados: {updated:,}")
+        print(f"  🌿 Nodos en ramas abandonadas (no canónicos): {dead_branch_nodes:,}")
+        if missing:
+            print(f"  ⚠️ Mensajes sin posición (no están en este export): {missing:,}")
+
+        cursor.execute("DROP TEMPORARY TABLE IF EXISTS tmp_message_order")
+        cursor.close()
+        connection.close()
+        return True
+
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+if __name__ == "__main__":
+    # Uso: python add_message_order.py [conversations.json | export.zip]
+    add_message_order(sys.argv[1] if len(sys.argv) > 1 else None)
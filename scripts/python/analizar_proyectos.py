@@ -1,9 +1,6 @@
 #!/usr/bin/env python3
 import re
-from difflib import SequenceMatcher
-
-def similarity(a, b):
-    return SequenceMatcher(None, a.lower(), b.lower()).ratio()
+from trigram_matcher import TrigramIndex
 
 # Leer proyectos del listado
 with open('proyectos_nombres.txt', 'r', encoding='utf-8') as f:
@@ -20,26 +17,17 @@ print("\n=== ANÁLISIS DE COINCIDENCIAS ===\n")
 encontrados = []
 no_encontrados = []
 
+# Índice de trigramas sobre los títulos: cada proyecto solo se compara a fondo con sus candidatos
+indice_titulos = TrigramIndex(titulos)
+
 for proyecto in proyectos:
-    mejor_coincidencia = None
-    mejor_score = 0
-    
-    # Buscar coincidencias exactas o parciales
-    coincidencias_exactas = []
-    coincidencias_parciales = []
+    # Buscar coincidencias exactas o parciales (proyecto contenido en título)
+    coincidencias_exactas = indice_titulos.exact(proyecto)
+    coincidencias_parciales = [titulo for titulo in indice_titulos.containing(proyecto)
+                               if titulo not in coincidencias_exactas]
     
-    for titulo in titulos:
-        # Coincidencia exacta (ignorando case)
-        if proyecto.lower() == titulo.lower():
-            coincidencias_exactas.append(titulo)
-        # Coincidencia parcial (proyecto contenido en título)
-        elif proyecto.lower() in titulo.lower():
-            coincidencias_parciales.append(titulo)
-        # Similarity score alto
-        score = similarity(proyecto, titulo)
-        if score > mejor_score:
-            mejor_score = score
-            mejor_coincidencia = titulo
+    # Similarity score alto
+    mejor_coincidencia, mejor_score = indice_titulos.best_match(proyecto)
     
     if coincidencias_exactas:
         print(f"✅ EXACTA - '{proyecto}' → {coincidencias_exactas}")
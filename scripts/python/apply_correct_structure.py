@@ -90,6 +90,7 @@ def apply_correct_structure():
           `openai_thread_id` varchar(100) DEFAULT NULL,
           PRIMARY KEY (`id`),
           KEY `project_id` (`project_id`),
+          FULLTEXT KEY `ft_conversations_title` (`title`),
           CONSTRAINT `conversations_ibfk_1` FOREIGN KEY (`project_id`) REFERENCES `projects` (`id`) ON DELETE SET NULL
         ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
         """
@@ -117,8 +118,13 @@ def apply_correct_structure():
           `channel` varchar(50) DEFAULT NULL,
           `recipient` varchar(50) DEFAULT 'all',
           `metadata` longtext CHARACTER SET utf8mb4 COLLATE utf8mb4_bin DEFAULT NULL CHECK (json_valid(`metadata`)),
+          `position` int(11) DEFAULT NULL,
+          `is_canonical` tinyint(1) NOT NULL DEFAULT 1,
+          `branch_id` int(11) NOT NULL DEFAULT 0,
           PRIMARY KEY (`id`),
           KEY `conversation_id` (`conversation_id`),
+          KEY `idx_transcript` (`conversation_id`, `is_canonical`, `position`),
+          FULLTEXT KEY `ft_messages_content` (`content_text`),
           CONSTRAINT `messages_ibfk_1` FOREIGN KEY (`conversation_id`) REFERENCES `conversations` (`id`) ON DELETE CASCADE
         ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
         """
@@ -5,6 +5,7 @@ Script para asignar proyectos a conversaciones basándose en sus títulos
 import pymysql
 import re
 from env_loader import EnvLoader
+from keyword_classifier import KeywordAutomaton
 
 def get_db_config():
     """Obtiene la configuración de base de datos desde variables de entorno"""
@@ -29,6 +30,53 @@ def create_connection():
         print(f"❌ Error al conectar: {e}")
         return None
 
+# Patrones específicos para identificar proyectos (el orden define la prioridad)
+PROJECT_PATTERNS = {
+    # Desarrollo y herramientas
+    'VS Code': ['vs code', 'vscode', 'visual studio code'],
+    'GitHub': ['github', 'git hub'],
+    'ChatGPT': ['chatgpt', 'chat gpt', 'openai'],
+    'Xubuntu': ['xubuntu', 'ubuntu'],
+    'Python': ['python', 'py', 'django', 'flask'],
+    'JavaScript': ['javascript', 'js', 'node', 'react', 'vue'],
+    'PHP': ['php', 'laravel', 'symfony'],
+    'MySQL': ['mysql', 'mariadb', 'base de datos'],
+    'Docker': ['docker', 'contenedor'],
+    
+    # Diseño y creatividad
+    'Photoshop': ['photoshop', 'ps', 'adobe'],
+    'GIMP': ['gimp'],
+    'Diseño Web': ['diseño web', 'web design', 'css', 'html'],
+    'WordPress': ['wordpress', 'wp'],
+    'Elementor': ['elementor'],
+    'Wix': ['wix'],
+    
+    # Freelancing y negocios
+    'Fiverr': ['fiverr'],
+    'Upwork': ['upwork'],
+    'Freelancer': ['freelancer'],
+    'LinkedIn': ['linkedin'],
+    'Facebook': ['facebook'],
+    
+    # Proyectos específicos
+    'AFIP': ['afip', 'factura electronica', 'dolibarr'],
+    'WhatsApp': ['whatsapp', 'wa', 'bot'],
+    'VGR': ['vgr-', 'vgr '],
+    'ENARGAS': ['enargas', 'metrogas'],
+    'Cerámica': ['ceramica', 'ceramic'],
+    'Salud': ['salud', 'health', 'medicina'],
+    'IA': ['inteligencia artificial', 'ia', 'ai', 'machine learning'],
+    
+    # Herramientas
+    'XAMPP': ['xampp', 'lampp'],
+    'Moodle': ['moodle'],
+    'Google': ['google', 'gmail'],
+    'Windows': ['windows'],
+    'Android': ['android'],
+}
+
+PROJECT_MATCHER = KeywordAutomaton(PROJECT_PATTERNS)
+
 def extract_project_from_title(title):
     """Extrae el nombre del proyecto del título de la conversación"""
     if not title:
@@ -36,58 +84,10 @@ def extract_project_from_title(title):
     
     title = title.strip()
     
-    # Patrones específicos para identificar proyectos
-    patterns = {
-        # Desarrollo y herramientas
-        'VS Code': ['vs code', 'vscode', 'visual studio code'],
-        'GitHub': ['github', 'git hub'],
-        'ChatGPT': ['chatgpt', 'chat gpt', 'openai'],
-        'Xubuntu': ['xubuntu', 'ubuntu'],
-        'Python': ['python', 'py', 'django', 'flask'],
-        'JavaScript': ['javascript', 'js', 'node', 'react', 'vue'],
-        'PHP': ['php', 'laravel', 'symfony'],
-        'MySQL': ['mysql', 'mariadb', 'base de datos'],
-        'Docker': ['docker', 'contenedor'],
-        
-        # Diseño y creatividad
-        'Photoshop': ['photoshop', 'ps', 'adobe'],
-        'GIMP': ['gimp'],
-        'Diseño Web': ['diseño web', 'web design', 'css', 'html'],
-        'WordPress': ['wordpress', 'wp'],
-        'Elementor': ['elementor'],
-        'Wix': ['wix'],
-        
-        # Freelancing y negocios
-        'Fiverr': ['fiverr'],
-        'Upwork': ['upwork'],
-        'Freelancer': ['freelancer'],
-        'LinkedIn': ['linkedin'],
-        'Facebook': ['facebook'],
-        
-        # Proyectos específicos
-        'AFIP': ['afip', 'factura electronica', 'dolibarr'],
-        'WhatsApp': ['whatsapp', 'wa', 'bot'],
-        'VGR': ['vgr-', 'vgr '],
-        'ENARGAS': ['enargas', 'metrogas'],
-        'Cerámica': ['ceramica', 'ceramic'],
-        'Salud': ['salud', 'health', 'medicina'],
-        'IA': ['inteligencia artificial', 'ia', 'ai', 'machine learning'],
-        
-        # Herramientas
-        'XAMPP': ['xampp', 'lampp'],
-        'Moodle': ['moodle'],
-        'Google': ['google', 'gmail'],
-        'Windows': ['windows'],
-        'Android': ['android'],
-    }
-    
-    title_lower = title.lower()
-    
-    # Buscar coincidencias
-    for project, keywords in patterns.items():
-        for keyword in keywords:
-            if keyword in title_lower:
-                return project
+    # Buscar coincidencias (una pasada por el título con el autómata de palabras clave)
+    project = PROJECT_MATCHER.first_label(title)
+    if project:
+        return project
     
     # Si contiene números al inicio, podría ser un proyecto numerado
     if re.match(r'^\d+\s+', title):
@@ -0,0 +1,115 @@
+"""
+Carga masiva con LOAD DATA LOCAL INFILE
+Acumula filas en un TSV temporal y las envía al servidor en una sola
+sentencia, en lugar de miles de INSERT vía executemany.
+
+Requiere local_infile habilitado en el servidor y en la conexión:
+  - mysql.connector: connect(..., allow_local_infile=True)
+  - pymysql:         connect(..., local_infile=True)
+"""
+import os
+import tempfile
+from typing import Iterable, Optional, Sequence
+
+FLUSH_ROWS = 50000
+
+_NULL = '\\N'
+_ESCAPES = str.maketrans({
+    '\\': '\\\\',
+    '\t': '\\t',
+    '\n': '\\n',
+    '\r': '\\r',
+    '\0': '\\0',
+})
+
+
+def format_tsv_value(value) -> str:
+    """Convierte un valor Python al formato de LOAD DATA (\\N para NULL)"""
+    if value is None:
+        return _NULL
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, bytes):
+        value = value.decode('utf-8', errors='replace')
+    return str(value).translate(_ESCAPES)
+
+
+class BulkLoader:
+    """Escritor de filas para una tabla usando LOAD DATA LOCAL INFILE.
+
+    ``columns`` sigue el mismo orden que las tuplas que hoy se pasan a
+    executemany; ``set_clause`` permite completar columnas calculadas en el
+    servidor (por ejemplo ``created_at = NOW()``). Con LOCAL, las claves
+    duplicadas se tratan como en INSERT IGNORE (advertencia, no error).
+
+    ``add`` solo escribe en el TSV; el importador decide cuándo llamar a
+    ``flush`` (normalmente cuando ``is_full()``) y cuándo hacer commit.
+    """
+
+    def __init__(self, cursor, table: str, columns: Sequence[str],
+                 set_clause: Optional[str] = None, flush_rows: int = FLUSH_ROWS):
+        self.cursor = cursor
+        self.table = table
+        self.columns = tuple(columns)
+        self.set_clause = set_clause
+        self.flush_rows = flush_rows
+        self.pending = 0
+        self.loaded = 0
+        self._file = None
+
+    def _open(self):
+        self._file = tempfile.NamedTemporaryFile(
+            mode='w', encoding='utf-8', newline='\n',
+            prefix=f'chatbeto_{self.table}_', suffix='.tsv', delete=False
+        )
+
+    def add(self, row: Sequence) -> None:
+        if self._file is None:
+            self._open()
+        self._file.write('\t'.join(format_tsv_value(value) for value in row))
+        self._file.write('\n')
+        self.pending += 1
+
+    def add_many(self, rows: Iterable[Sequence]) -> None:
+        for row in rows:
+            self.add(row)
+
+    def is_full(self) -> bool:
+        return self.pending >= self.flush_rows
+
+    def flush(self) -> int:
+        """Carga las filas pendientes; devuelve cuántas filas afectó el servidor"""
+        if self._file is None or self.pending == 0:
+            return 0
+
+        path = self._file.name
+        self._file.close()
+        self._file = None
+        pending, self.pending = self.pending, 0
+
+        sql = (
+            f"LOAD DATA LOCAL INFILE %s INTO TABLE {self.table} "
+            "CHARACTER SET utf8mb4 "
+            "FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' "
+            "LINES TERMINATED BY '\\n' "
+            f"({', '.join(self.columns)})"
+        )
+        if self.set_clause:
+            sql += f" SET {self.set_clause}"
+
+        try:
+            self.cursor.execute(sql, (path,))
+            affected = self.cursor.rowcount
+        except Exception as e:
+            raise RuntimeError(f"LOAD DATA LOCAL INFILE falló en {self.table} ({pending:,} filas): {e}") from e
+        finally:
+            os.unlink(path)
+
+        self.loaded += affected
+        return affected
+
+    def close(self) -> int:
+        """Carga lo pendiente y elimina el archivo temporal"""
+        return self.flush()
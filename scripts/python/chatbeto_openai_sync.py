@@ -4,33 +4,25 @@ Integración ChatBETO con API de OpenAI usando Project IDs reales
 Permite sincronizar conversaciones y mantener memoria externa por proyecto
 """
 
-import mysql.connector
-import json
 import os
 from openai import OpenAI
 from datetime import datetime
 import time
+from content_store import resolve_contents
+from db_pool import connect, ensure_alive
+from openai_async_sync import DEFAULT_CONCURRENCY, run_sync, thread_messages
+from openai_sync_journal import SyncJournal
+from openai_run_wait import DEFAULT_DEADLINE, RunCancelled, RunTimeout, stream_run, wait_for_run
 
 class ChatBETOSync:
-    def __init__(self, config_file='db_config.json', openai_key=None):
-        self.config_file = config_file
+    def __init__(self, openai_key=None):
         self.connection = None
         self.openai_client = None
+        self.api_key = None
         
-        # Cargar configuración
-        self.load_db_config()
+        # La base de datos se configura desde el .env (db_pool.connect)
         self.setup_openai_client(openai_key)
     
-    def load_db_config(self):
-        """Cargar configuración de base de datos"""
-        try:
-            with open(self.config_file, 'r') as f:
-                self.db_config = json.load(f)
-        except FileNotFoundError:
-            print(f"❌ No se encontró {self.config_file}")
-            return False
-        return True
-    
     def setup_openai_client(self, api_key=None):
         """Configurar cliente de OpenAI"""
         api_key = api_key or os.getenv('OPENAI_API_KEY')
@@ -41,6 +33,7 @@ class ChatBETOSync:
         
         try:
             self.openai_client = OpenAI(api_key=api_key)
+            self.api_key = api_key
             print("✅ Cliente OpenAI configurado")
             return True
         except Exception as e:
@@ -48,9 +41,12 @@ class ChatBETOSync:
             return False
     
     def connect_to_db(self):
-        """Conectar a la base de datos"""
+        """Conectar a la base de datos (reutiliza la conexión abierta si sigue viva)"""
         try:
-            self.connection = mysql.connector.connect(**self.db_config)
+            if self.connection is not None:
+                ensure_alive(self.connection)
+                return True
+            self.connection = connect()
             return True
         except Exception as e:
             print(f"❌ Error conectando a DB: {e}")
@@ -75,16 +71,56 @@ class ChatBETOSync:
         cursor.close()
         return projects
     
-    def get_conversation_messages(self, conversation_id):
-        """Obtener mensajes de una conversación específica"""
+    def get_conversation(self, conversation_id):
+        """Fila de conversations (o None si no existe)"""
+        if not self.connect_to_db():
+            return None
         cursor = self.connection.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT * FROM messages 
-            WHERE conversation_id = %s 
-            ORDER BY create_time ASC, created_at ASC
-        """, (conversation_id,))
+        cursor.execute("SELECT * FROM conversations WHERE id = %s", (conversation_id,))
+        conversation = cursor.fetchone()
+        cursor.close()
+        return conversation
+    
+    def save_thread_id(self, conversation_id, thread_id):
+        """Registrar el thread de OpenAI de una conversación ya sincronizada"""
+        cursor = self.connection.cursor()
+        cursor.execute(
+            "UPDATE conversations SET openai_thread_id = %s WHERE id = %s",
+            (thread_id, conversation_id)
+        )
+        self.connection.commit()
+        cursor.close()
+    
+    def get_sync_journal(self):
+        """Diario de sincronización (progreso por conversación para reanudar)"""
+        journal = SyncJournal(self.connection)
+        journal.ensure_table()
+        return journal
+    
+    def get_conversation_messages(self, conversation_id, include_branches=False):
+        """Obtener mensajes de una conversación específica
+        
+        Por defecto solo la rama canónica (la transcripción visible en ChatGPT),
+        leída en orden por el índice (conversation_id, is_canonical, position);
+        con include_branches=True se agregan las ramas abandonadas.
+        """
+        cursor = self.connection.cursor(dictionary=True)
+        if include_branches:
+            cursor.execute("""
+                SELECT * FROM messages 
+                WHERE conversation_id = %s 
+                ORDER BY branch_id ASC, position ASC
+            """, (conversation_id,))
+        else:
+            cursor.execute("""
+                SELECT * FROM messages 
+                WHERE conversation_id = %s AND is_canonical = 1
+                ORDER BY position ASC
+            """, (conversation_id,))
         
         messages = cursor.fetchall()
+        # Con el almacén de contenidos los cuerpos largos están en message_contents
+        resolve_contents(cursor, messages)
         cursor.close()
         return messages
     
@@ -124,10 +160,7 @@ class ChatBETOSync:
         if not self.connect_to_db():
             return False
         
-        # Obtener datos de la conversación
-        cursor = self.connection.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM conversations WHERE id = %s", (conversation_id,))
-        conversation = cursor.fetchone()
+        conversation = self.get_conversation(conversation_id)
         
         if not conversation:
             print(f"❌ Conversación {conversation_id} no encontrada")
@@ -138,64 +171,33 @@ class ChatBETOSync:
             print(f"✅ Conversación ya sincronizada (Thread: {conversation['openai_thread_id']})")
             return True
         
-        # Obtener mensajes
-        messages = self.get_conversation_messages(conversation_id)
-        print(f"📝 {len(messages)} mensajes encontrados")
-        
         if dry_run:
+            # Obtener mensajes
+            messages = self.get_conversation_messages(conversation_id)
+            print(f"📝 {len(messages)} mensajes encontrados")
+            payloads = thread_messages(messages)
             print(f"   [DRY RUN] Crearía thread para proyecto {project_chatgpt_id}")
-            print(f"   [DRY RUN] Enviaría {len(messages)} mensajes")
-            for i, msg in enumerate(messages[:3]):  # Mostrar solo los primeros 3
-                preview = msg['content_text'][:50] if msg['content_text'] else ''
-                print(f"   [DRY RUN] Mensaje {i+1}: [{msg['author_role']}] {preview}...")
-            if len(messages) > 3:
-                print(f"   [DRY RUN] ... y {len(messages) - 3} mensajes más")
+            print(f"   [DRY RUN] Enviaría {len(payloads)} mensajes")
+            for i, payload in enumerate(payloads[:3]):  # Mostrar solo los primeros 3
+                print(f"   [DRY RUN] Mensaje {i+1}: [{payload['role']}] {payload['content'][:50]}...")
+            if len(payloads) > 3:
+                print(f"   [DRY RUN] ... y {len(payloads) - 3} mensajes más")
             return True
         
-        # Crear thread en OpenAI
-        thread_id = self.create_openai_thread(
-            project_chatgpt_id, 
-            conversation.get('title', '')
-        )
-        
-        if not thread_id:
+        if not self.openai_client:
+            print("❌ Cliente OpenAI no disponible")
             return False
         
-        print(f"✅ Thread creado: {thread_id}")
-        
-        # Enviar mensajes al thread
-        messages_sent = 0
-        for message in messages:
-            try:
-                # Convertir rol del mensaje
-                role = "user" if message['author_role'] == 'user' else "assistant"
-                content = message['content_text'] or ''
-                
-                if content.strip():  # Solo enviar mensajes con contenido
-                    self.openai_client.beta.threads.messages.create(
-                        thread_id=thread_id,
-                        role=role,
-                        content=content[:32000]  # Limitar longitud para API
-                    )
-                    messages_sent += 1
-            
-            except Exception as e:
-                print(f"⚠️  Error enviando mensaje: {e}")
-        
-        print(f"✅ {messages_sent}/{len(messages)} mensajes enviados")
-        
-        # Actualizar conversation con thread_id
-        cursor.execute(
-            "UPDATE conversations SET openai_thread_id = %s WHERE id = %s",
-            (thread_id, conversation_id)
-        )
-        self.connection.commit()
-        
-        cursor.close()
-        return True
+        summary = run_sync(self, [(conversation_id, project_chatgpt_id)], api_key=self.api_key,
+                           concurrency=1, journal=self.get_sync_journal())
+        return summary['synced'] + summary['resumed'] + summary['skipped'] == 1
     
-    def sync_project_conversations(self, project_name, limit=None, dry_run=True):
-        """Sincronizar todas las conversaciones de un proyecto"""
+    def sync_project_conversations(self, project_name, limit=None, dry_run=True, concurrency=DEFAULT_CONCURRENCY):
+        """Sincronizar todas las conversaciones de un proyecto
+        
+        Sin dry_run se sincronizan `concurrency` conversaciones a la vez y el
+        ritmo lo fija el limitador (OPENAI_RPM / OPENAI_TPM), no una pausa fija.
+        """
         if not self.connect_to_db():
             return False
         
@@ -224,24 +226,49 @@ class ChatBETOSync:
         print(f"   ChatGPT Project ID: {project_chatgpt_id}")
         print(f"   Conversaciones a sincronizar: {len(results)}")
         
-        success_count = 0
-        for result in results:
-            if self.sync_conversation_to_openai(
-                result['conversation_id'], 
-                project_chatgpt_id, 
-                dry_run=dry_run
-            ):
-                success_count += 1
-            
-            if not dry_run:
-                time.sleep(1)  # Pausa para evitar rate limits
-        
-        print(f"\n✅ {success_count}/{len(results)} conversaciones sincronizadas")
         cursor.close()
-        return True
+        
+        if dry_run:
+            success_count = 0
+            for result in results:
+                if self.sync_conversation_to_openai(result['conversation_id'], project_chatgpt_id, dry_run=True):
+                    success_count += 1
+            print(f"\n✅ {success_count}/{len(results)} conversaciones sincronizadas")
+            return True
+        
+        if not self.openai_client:
+            print("❌ Cliente OpenAI no disponible")
+            return False
+        
+        started = time.time()
+        pending = [(result['conversation_id'], project_chatgpt_id)
+                   for result in results if not result['openai_thread_id']]
+        print(f"   Ya sincronizadas: {len(results) - len(pending)} | Concurrencia: {concurrency}")
+        summary = run_sync(self, pending, api_key=self.api_key, concurrency=concurrency,
+                           journal=self.get_sync_journal())
+        
+        print(f"\n✅ {summary['synced'] + summary['resumed'] + summary['skipped'] + len(results) - len(pending)}/{len(results)} "
+              f"conversaciones sincronizadas en {time.time() - started:.1f}s")
+        print(f"   📡 {summary['requests']} solicitudes | {summary['retries']} reintentos "
+              f"({summary['rate_limited']} por límite de velocidad) | {summary['waited']:.1f}s esperando cupo")
+        if summary['already_applied']:
+            print(f"   🔁 {summary['already_applied']} envíos ya habían llegado tras un error de conexión (no se repitieron)")
+        if summary['resumed']:
+            print(f"   ↪️ {summary['resumed']} conversaciones reanudadas desde el diario (sin duplicar threads ni mensajes)")
+        if summary['failed']:
+            print(f"   ⚠️ {summary['failed']} conversaciones con error (se reintentarán en la próxima ejecución)")
+        return summary['failed'] == 0
     
-    def query_openai_thread(self, conversation_id, user_message):
-        """Enviar un mensaje a un thread existente y obtener respuesta"""
+    def query_openai_thread(self, conversation_id, user_message, stream=False, on_text=None,
+                            deadline=DEFAULT_DEADLINE, cancel=None):
+        """Enviar un mensaje a un thread existente y obtener respuesta
+        
+        La respuesta se devuelve en cuanto el run termina (consultas con backoff
+        exponencial desde 0.1 s). Con stream=True el texto llega por eventos y
+        on_text recibe cada fragmento al instante. `deadline` limita la espera
+        total (el run se cancela al vencer) y `cancel` (threading.Event) permite
+        abandonarla desde otro hilo.
+        """
         if not self.openai_client:
             print("❌ Cliente OpenAI no disponible")
             return None
@@ -258,9 +285,12 @@ class ChatBETOSync:
         result = cursor.fetchone()
         if not result or not result['openai_thread_id']:
             print(f"❌ Conversación {conversation_id} no tiene thread asociado")
+            cursor.close()
             return None
         
         thread_id = result['openai_thread_id']
+        assistant_id = "asst_default"  # Usar asistente por defecto o crear uno específico
+        response_content = None
         
         try:
             # Enviar mensaje del usuario
@@ -270,44 +300,50 @@ class ChatBETOSync:
                 content=user_message
             )
             
-            # Crear run (esto activa el asistente)
-            run = self.openai_client.beta.threads.runs.create(
-                thread_id=thread_id,
-                assistant_id="asst_default"  # Usar asistente por defecto o crear uno específico
-            )
-            
-            # Esperar respuesta
-            while run.status in ['queued', 'in_progress']:
-                time.sleep(2)
-                run = self.openai_client.beta.threads.runs.retrieve(
+            if stream:
+                status, response_content = stream_run(
+                    self.openai_client, thread_id, assistant_id,
+                    on_text=on_text, deadline=deadline, cancel=cancel
+                )
+            else:
+                # Crear run (esto activa el asistente) y esperar a que termine
+                run = self.openai_client.beta.threads.runs.create(
                     thread_id=thread_id,
-                    run_id=run.id
+                    assistant_id=assistant_id
                 )
+                run = wait_for_run(self.openai_client, thread_id, run, deadline=deadline, cancel=cancel)
+                status = run.status
+                if status == 'completed':
+                    # Solo los mensajes de este run; el más reciente primero
+                    messages = self.openai_client.beta.threads.messages.list(thread_id=thread_id, run_id=run.id)
+                    for message in messages.data:
+                        if message.role == "assistant":
+                            response_content = message.content[0].text.value
+                            break
             
-            if run.status == 'completed':
-                # Obtener mensajes del thread
-                messages = self.openai_client.beta.threads.messages.list(thread_id=thread_id)
+            if status == 'completed' and response_content:
+                # Guardar respuesta en la base de datos
+                # (al final de la rama canónica)
+                cursor.execute("""
+                    INSERT INTO messages 
+                    (id, conversation_id, content_text, author_role, created_at,
+                     position, is_canonical, branch_id)
+                    SELECT UUID(), %s, %s, 'assistant', NOW(), COALESCE(MAX(position), -1) + 1, 1, 0
+                    FROM messages
+                    WHERE conversation_id = %s AND is_canonical = 1
+                """, (conversation_id, response_content, conversation_id))
+                
+                self.connection.commit()
+                cursor.close()
                 
-                # Encontrar la última respuesta del asistente
-                for message in messages.data:
-                    if message.role == "assistant":
-                        response_content = message.content[0].text.value
-                        
-                        # Guardar respuesta en la base de datos
-                        cursor.execute("""
-                            INSERT INTO messages 
-                            (id, conversation_id, content_text, author_role, created_at)
-                            VALUES (UUID(), %s, %s, 'assistant', NOW())
-                        """, (conversation_id, response_content))
-                        
-                        self.connection.commit()
-                        cursor.close()
-                        
-                        return response_content
+                return response_content
             
-            else:
-                print(f"❌ Run falló con estado: {run.status}")
+            print(f"❌ Run falló con estado: {status}")
                 
+        except RunTimeout as e:
+            print(f"⏱️ {e}")
+        except RunCancelled as e:
+            print(f"🛑 {e}")
         except Exception as e:
             print(f"❌ Error consultando thread: {e}")
         
@@ -336,6 +372,7 @@ class ChatBETOSync:
         """Cerrar conexión a la base de datos"""
         if self.connection:
             self.connection.close()
+            self.connection = None
 
 
 def main():
@@ -355,9 +392,11 @@ def main():
     
     print(f"\n# Sincronizar proyecto real:")
     print(f"sync.sync_project_conversations('ChatGPT', limit=1, dry_run=False)")
+    print(f"# (concurrency=8 para más conversaciones a la vez; cuota con OPENAI_RPM / OPENAI_TPM)")
     
     print(f"\n# Consultar thread existente:")
     print(f"response = sync.query_openai_thread('conversation_id', '¿Puedes resumir esta conversación?')")
+    print(f"response = sync.query_openai_thread('conversation_id', 'Hola', stream=True, on_text=lambda t: print(t, end='', flush=True))")
     
     # Ejemplo de sincronización (dry run)
     print(f"\n🧪 Ejecutando ejemplo (dry run)...")
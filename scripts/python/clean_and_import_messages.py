@@ -1,32 +1,32 @@
 #!/usr/bin/env python3
 # Limpiar tabla messages e importar mensajes desde conversations.json
 
-import mysql.connector
 import json
 import os
+import sys
 import uuid
 from datetime import datetime
+from bulk_loader import BulkLoader
+from message_extraction import MESSAGE_COLUMNS
+from message_tree import linearize
+from search_index import drop_fulltext_indexes, ensure_fulltext_indexes
+from stats_rollup import StatsDelta, ensure_stats_table, rebuild_stats, stats_initialized
+from import_metrics import ImportMetrics
+from db_pool import connect
 
-def clean_and_import_messages():
+def clean_and_import_messages(bulk_load=False):
+    metrics = None
     try:
-        # Leer credenciales
-        config_path = os.path.join(os.path.dirname(__file__), 'db_config.json')
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-        
+        metrics = ImportMetrics('clean_and_import_messages')
         print(f"🧹 Limpiando tabla messages e importando desde conversations.json...")
         
-        connection = mysql.connector.connect(
-            host=config['host'],
-            port=config['port'],
-            database=config['database'],
-            user=config['user'],
-            password=config['password'],
-            charset='utf8mb4',
-            autocommit=False
+        connection = connect(
+            autocommit=False,
+            allow_local_infile=bulk_load
         )
         
         cursor = connection.cursor()
+        ensure_stats_table(cursor)
         
         # 1. VERIFICAR estado actual
         print(f"\n📊 Estado actual:")
@@ -52,23 +52,37 @@ def clean_and_import_messages():
             # Limpiar tabla
             cursor.execute("DELETE FROM messages")
             deleted_count = cursor.rowcount
+            # Con messages vacía el recálculo solo recorre conversations; desde aquí, deltas por lote
+            rebuild_stats(cursor)
             connection.commit()
             print(f"  🗑️ {deleted_count:,} mensajes eliminados")
         else:
             print(f"\n✅ Tabla 'messages' ya está vacía")
+            if not stats_initialized(cursor):
+                rebuild_stats(cursor)
+                connection.commit()
+        
+        # Sin índice FULLTEXT durante la recarga: se construye una sola vez al final
+        suspended_indexes = drop_fulltext_indexes(cursor, 'messages')
+        if suspended_indexes:
+            print(f"  ⏸️ Índices FULLTEXT suspendidos durante la carga: {', '.join(suspended_indexes)}")
         
         # 3. CARGAR conversations.json
         conversations_file = os.path.join(os.path.dirname(__file__), 'extracted', 'conversations.json')
         print(f"\n📋 Cargando mensajes desde {conversations_file}...")
         
-        with open(conversations_file, 'r', encoding='utf-8') as f:
-            conversations_data = json.load(f)
+        with metrics.phase('parse'):
+            with open(conversations_file, 'r', encoding='utf-8') as f:
+                conversations_data = json.load(f)
+        metrics.export_path = conversations_file
+        metrics.set('bytes', os.path.getsize(conversations_file))
         
         print(f"✅ Cargadas {len(conversations_data)} conversaciones del JSON")
         
-        # 4. OBTENER conversation_ids válidos
-        cursor.execute("SELECT id FROM conversations")
-        valid_conversation_ids = set(row[0] for row in cursor.fetchall())
+        # 4. OBTENER conversation_ids válidos (con el proyecto y el modelo que usan las estadísticas)
+        cursor.execute("SELECT id, project_id, default_model_slug FROM conversations")
+        conversation_buckets = {conv_id: (project_id, model) for conv_id, project_id, model in cursor.fetchall()}
+        valid_conversation_ids = conversation_buckets.keys()
         print(f"  📋 {len(valid_conversation_ids):,} conversation_ids válidos en BD")
         
         # 5. CONTAR mensajes a importar
@@ -97,6 +111,16 @@ def clean_and_import_messages():
         skipped_count = 0
         batch_size = 500
         batch_data = []
+        # Contadores de stats_rollup: se aplican en la misma transacción que los mensajes.
+        # Si LOAD DATA ignora ids repetidos, los deltas por fila dejan de ser exactos y se recalcula al final
+        stats = StatsDelta()
+        exact_stats = True
+        
+        # Modo carga masiva: TSV temporal + LOAD DATA LOCAL INFILE en lugar de executemany
+        loader = None
+        if bulk_load:
+            loader = BulkLoader(cursor, 'messages', MESSAGE_COLUMNS, set_clause='created_at = NOW()')
+            print(f"  🚚 Carga masiva con LOAD DATA LOCAL INFILE (cada {loader.flush_rows:,} filas)")
         
         for conv_idx, conv in enumerate(conversations_data):
             conv_id = conv.get('id')
@@ -106,6 +130,8 @@ def clean_and_import_messages():
                 continue
             
             mapping = conv.get('mapping', {})
+            # Posición y rama de cada mensaje (transcripción visible = camino hasta current_node)
+            order = linearize(mapping, conv.get('current_node'))
             
             for msg_id, msg_data in mapping.items():
                 try:
@@ -138,10 +164,6 @@ def clean_and_import_messages():
                         skipped_count += 1
                         continue
                     
-                    # Limitar tamaño del contenido
-                    if len(content_text) > 50000:
-                        content_text = content_text[:50000] + "... [contenido truncado]"
-                    
                     # Otros campos
                     create_time = message.get('create_time', 0)
                     status = message.get('status', 'finished_successfully')
@@ -152,8 +174,7 @@ def clean_and_import_messages():
                     if parent_id == msg_id:  # Evitar auto-referencia
                         parent_id = None
                     
-                    # Agregar al batch
-                    batch_data.append((
+                    row = (
                         msg_id,               # id
                         conv_id,             # conversation_id
                         parent_id,           # parent_message_id
@@ -166,25 +187,45 @@ def clean_and_import_messages():
                         1,                   # end_turn
                         weight,              # weight
                         None,                # channel
-                        'all'                # recipient
-                    ))
+                        'all',               # recipient
+                        order[msg_id].position,           # position
+                        int(order[msg_id].is_canonical),  # is_canonical
+                        order[msg_id].branch_id           # branch_id
+                    )
+                    
+                    if loader:
+                        loader.add(row)
+                        if exact_stats:
+                            stats.add_message_rows((row,), conversation_buckets)
+                        continue
+                    
+                    # Agregar al batch
+                    batch_data.append(row)
                     
                     # Ejecutar batch
                     if len(batch_data) >= batch_size:
-                        cursor.executemany("""
-                            INSERT INTO messages (
-                                id, conversation_id, parent_message_id, content_type,
-                                content_text, author_role, author_name, create_time,
-                                created_at, status, end_turn, weight, channel, recipient
-                            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, NOW(), %s, %s, %s, %s, %s)
-                        """, batch_data)
+                        with metrics.phase('write'):
+                            cursor.executemany("""
+                                INSERT INTO messages (
+                                    id, conversation_id, parent_message_id, content_type,
+                                    content_text, author_role, author_name, create_time,
+                                    created_at, status, end_turn, weight, channel, recipient,
+                                    position, is_canonical, branch_id
+                                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, NOW(), %s, %s, %s, %s, %s, %s, %s, %s)
+                            """, batch_data)
                         
+                        stats.add_message_rows(batch_data, conversation_buckets)
                         imported_count += len(batch_data)
                         batch_data = []
                         
                         # Commit y progreso cada 5000 mensajes
                         if imported_count % 5000 == 0:
-                            connection.commit()
+                            with metrics.phase('stats'):
+                                stats.apply(cursor)
+                            with metrics.phase('commit'):
+                                connection.commit()
+                            metrics.set('rows', imported_count)
+                            metrics.progress()
                             progress = (conv_idx + 1) / len(conversations_data) * 100
                             print(f"    💌 {imported_count:,} mensajes importados... ({progress:.1f}%)")
                 
@@ -192,20 +233,59 @@ def clean_and_import_messages():
                     skipped_count += 1
                     if skipped_count <= 5:
                         print(f"    ⚠️ Error en mensaje {msg_id}: {str(e)[:80]}")
+            
+            # La carga masiva se envía fuera del try para que un fallo aborte la importación
+            if loader and loader.is_full():
+                sent = loader.pending
+                with metrics.phase('write'):
+                    loaded = loader.flush()
+                if loaded != sent and exact_stats:
+                    print(f"    ⚠️ {sent - loaded:,} mensajes repetidos omitidos; las estadísticas se recalcularán al terminar")
+                    exact_stats = False
+                    stats.counters.clear()
+                with metrics.phase('stats'):
+                    stats.apply(cursor)
+                with metrics.phase('commit'):
+                    connection.commit()
+                metrics.set('rows', loader.loaded)
+                metrics.progress()
+                progress = (conv_idx + 1) / len(conversations_data) * 100
+                print(f"    💌 {loader.loaded:,} mensajes importados... ({progress:.1f}%)")
         
         # Ejecutar batch final
-        if batch_data:
-            cursor.executemany("""
-                INSERT INTO messages (
-                    id, conversation_id, parent_message_id, content_type,
-                    content_text, author_role, author_name, create_time,
-                    created_at, status, end_turn, weight, channel, recipient
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, NOW(), %s, %s, %s, %s, %s)
-            """, batch_data)
-            imported_count += len(batch_data)
-        
-        # Commit final
-        connection.commit()
+        with metrics.phase('write'):
+            if loader:
+                sent = loader.pending
+                if loader.close() != sent:
+                    exact_stats = False
+                imported_count = loader.loaded
+            elif batch_data:
+                cursor.executemany("""
+                    INSERT INTO messages (
+                        id, conversation_id, parent_message_id, content_type,
+                        content_text, author_role, author_name, create_time,
+                        created_at, status, end_turn, weight, channel, recipient,
+                        position, is_canonical, branch_id
+                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, NOW(), %s, %s, %s, %s, %s, %s, %s, %s)
+                """, batch_data)
+                stats.add_message_rows(batch_data, conversation_buckets)
+                imported_count += len(batch_data)
+        
+        # Commit final (con las estadísticas del último lote)
+        with metrics.phase('stats'):
+            if exact_stats:
+                stats.apply(cursor)
+            else:
+                rebuild_stats(cursor)
+        with metrics.phase('commit'):
+            connection.commit()
+        
+        # Reconstruir el índice de búsqueda
+        with metrics.phase('index'):
+            ensure_fulltext_indexes(cursor, tables=['messages'])
+        metrics.set('rows', imported_count)
+        metrics.set('conversations', len(conversations_data))
+        metrics.print_summary(metrics.close(skipped=skipped_count))
         
         print(f"\n✅ Importación completada:")
         print(f"  💌 Mensajes importados: {imported_count:,}")
@@ -275,9 +355,12 @@ def clean_and_import_messages():
         
     except Exception as e:
         print(f"❌ Error: {e}")
+        if metrics:
+            metrics.close(status='error', error=str(e))
         import traceback
         traceback.print_exc()
         return False
 
 if __name__ == "__main__":
-    clean_and_import_messages()
\ No newline at end of file
+    # Uso: python clean_and_import_messages.py [--bulk]
+    clean_and_import_messages(bulk_load='--bulk' in sys.argv)
\ No newline at end of file
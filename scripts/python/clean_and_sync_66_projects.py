@@ -6,6 +6,7 @@ import json
 import os
 import re
 from datetime import datetime
+from project_counters import print_drift_report, reconcile_project_counters
 
 def clean_and_sync_projects():
     try:
@@ -186,26 +187,11 @@ def clean_and_sync_projects():
             if linked > 0:
                 print(f"    📁 Proyecto {project_id}: {linked} conversaciones vinculadas")
         
-        # 7. RECALCULAR contadores
+        # 7. RECALCULAR contadores (una pasada agrupada; solo se actualizan los que difieren)
         print(f"\n📊 Recalculando contadores...")
         
-        cursor.execute("""
-            UPDATE projects p 
-            SET 
-                conversation_count = (
-                    SELECT COUNT(*) FROM conversations c 
-                    WHERE c.project_id = p.id
-                ),
-                message_count = (
-                    SELECT COUNT(*) FROM messages m 
-                    INNER JOIN conversations c ON m.conversation_id = c.conversation_id
-                    WHERE c.project_id = p.id
-                ),
-                last_activity = (
-                    SELECT MAX(c.update_time) FROM conversations c 
-                    WHERE c.project_id = p.id
-                )
-        """)
+        drift = reconcile_project_counters(cursor, conversation_key='conversation_id')
+        print_drift_report(drift)
         
         # 8. ESTADÍSTICAS FINALES
         print(f"\n✅ Sincronización completada:")
@@ -4,6 +4,7 @@
 import mysql.connector
 import json
 import os
+from stats_rollup import ensure_stats_table, rebuild_stats
 
 def clean_conversations_and_messages_fixed():
     try:
@@ -62,6 +63,11 @@ def clean_conversations_and_messages_fixed():
         else:
             print(f"  ℹ️ Tabla 'conversations' ya está vacía")
         
+        # Las estadísticas precalculadas (stats_rollup) se ponen a cero con las tablas vacías
+        ensure_stats_table(cursor)
+        rebuild_stats(cursor)
+        print(f"  📊 Estadísticas (stats_rollup) reiniciadas")
+        
         # 4. VERIFICAR estructura de projects
         print(f"\n🔍 Verificando estructura de tabla 'projects'...")
         
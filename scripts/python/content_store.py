@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Almacén de contenidos deduplicado para messages.content_text
+Los prompts de sistema, las instrucciones personalizadas y los bloques de
+código pegados se repiten en miles de mensajes. Con el almacén activo, cada
+cuerpo largo (DEDUP_MIN_CHARS o más) se guarda una sola vez en
+message_contents, identificado por el SHA-256 del texto normalizado, y el
+mensaje guarda solo ese hash (messages.content_hash) con content_text = NULL.
+Los mensajes cortos siguen guardándose completos en messages.
+
+El hash se calcula durante la extracción (message_extraction, en los procesos
+de trabajo); el escritor solo inserta en message_contents los cuerpos que aún
+no vio. Quien lee el texto debe usar COALESCE(m.content_text, mc.content_text)
+con un LEFT JOIN a message_contents (ver message_text_sql y resolve_contents).
+
+Normalización: Unicode NFC, saltos de línea \\n y sin espacios al principio ni
+al final. El texto guardado es el normalizado.
+
+El almacén es opcional: se activa con `python content_store.py migrate` (que
+también deduplica los mensajes existentes) o importando con --dedup; desde
+entonces los importadores lo usan siempre.
+"""
+import hashlib
+import sys
+import unicodedata
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+DEDUP_MIN_CHARS = 512       # cuerpos más cortos: el hash y el JOIN cuestan más de lo que ahorran
+SEEN_LIMIT = 500000         # hashes recordados por el escritor (después se confía en INSERT IGNORE)
+FLUSH_BODIES = 500          # cuerpos nuevos por INSERT
+MIGRATE_BATCH = 2000        # mensajes por transacción al migrar
+
+CONTENTS_TABLE = 'message_contents'
+
+
+def normalize_content(text: str) -> str:
+    """Forma canónica del texto que se hashea y se guarda"""
+    return unicodedata.normalize('NFC', text.replace('\r\n', '\n').replace('\r', '\n')).strip()
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 (hex) del texto ya normalizado"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def dedup_content(text: str, min_chars: int = DEDUP_MIN_CHARS) -> Tuple[str, Optional[str]]:
+    """(texto, hash) para una fila de messages: hash None si el cuerpo se guarda en línea"""
+    if len(text) < min_chars:
+        return text, None
+    normalized = normalize_content(text)
+    return normalized, content_hash(normalized)
+
+
+# ---------------------------------------------------------------------------
+# Esquema
+# ---------------------------------------------------------------------------
+
+def content_store_enabled(cursor) -> bool:
+    """True si messages ya tiene content_hash (el almacén está en uso)"""
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'messages' AND COLUMN_NAME = 'content_hash'
+    """)
+    return cursor.fetchone()[0] > 0
+
+
+def ensure_content_store(cursor) -> bool:
+    """Crea message_contents y messages.content_hash si faltan; True si se creó algo.
+
+    Es DDL (commit implícito en MySQL): llamarlo antes de empezar a insertar.
+    """
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {CONTENTS_TABLE} (
+            content_hash CHAR(64) CHARACTER SET ascii NOT NULL,
+            content_text LONGTEXT NOT NULL,
+            char_count INT UNSIGNED NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (content_hash)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+    """)
+    if content_store_enabled(cursor):
+        return False
+    cursor.execute("""
+        ALTER TABLE messages
+            ADD COLUMN content_hash CHAR(64) CHARACTER SET ascii NULL AFTER content_text,
+            ADD INDEX idx_messages_content_hash (content_hash)
+    """)
+    return True
+
+
+def message_text_sql(enabled: bool, alias: str = 'm', contents_alias: str = 'mc') -> Tuple[str, str]:
+    """(expresión del texto, LEFT JOIN) para leer el cuerpo completo de un mensaje;
+    sin almacén (enabled=False), la columna tal cual y sin JOIN"""
+    if not enabled:
+        return f"{alias}.content_text", ''
+    return (f"COALESCE({alias}.content_text, {contents_alias}.content_text)",
+            f"LEFT JOIN {CONTENTS_TABLE} {contents_alias} ON {contents_alias}.content_hash = {alias}.content_hash")
+
+
+def resolve_contents(cursor, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Completa content_text de mensajes leídos como diccionarios (SELECT * FROM messages)"""
+    missing = {message['content_hash'] for message in messages
+               if message.get('content_text') is None and message.get('content_hash')}
+    if not missing:
+        return messages
+    placeholders = ', '.join(['%s'] * len(missing))
+    cursor.execute(f"SELECT content_hash, content_text FROM {CONTENTS_TABLE} WHERE content_hash IN ({placeholders})",
+                   list(missing))
+    bodies = {}
+    for row in cursor.fetchall():
+        digest, text = (row['content_hash'], row['content_text']) if isinstance(row, dict) else row
+        bodies[digest] = text
+    for message in messages:
+        if message.get('content_text') is None and message.get('content_hash'):
+            message['content_text'] = bodies.get(message['content_hash'])
+    return messages
+
+
+# ---------------------------------------------------------------------------
+# Escritura
+# ---------------------------------------------------------------------------
+
+class ContentStore:
+    """Escritor de cuerpos para los importadores.
+
+    Las filas llegan de la extracción con content_hash como última columna
+    (DEDUP_MESSAGE_COLUMNS). prepare() aparta el texto de las filas con hash
+    (content_text = NULL) y encola los cuerpos no vistos; flush() los inserta
+    con INSERT IGNORE. Hay que llamar a flush() antes de cada commit para que
+    mensajes y cuerpos queden en la misma transacción.
+    """
+
+    def __init__(self, cursor, seen_limit: int = SEEN_LIMIT):
+        from message_extraction import DEDUP_MESSAGE_COLUMNS
+        self.cursor = cursor
+        self.seen_limit = seen_limit
+        self._text = DEDUP_MESSAGE_COLUMNS.index('content_text')
+        self._seen: set = set()
+        self._pending: Dict[str, str] = {}
+        self.stats = {'references': 0, 'bodies_written': 0, 'chars_referenced': 0, 'chars_written': 0}
+
+    def prepare(self, rows: Sequence[tuple]) -> List[tuple]:
+        prepared = []
+        text_index = self._text
+        for row in rows:
+            digest = row[-1]
+            if digest is None:
+                prepared.append(row)
+                continue
+            self.add(digest, row[text_index])
+            prepared.append(row[:text_index] + (None,) + row[text_index + 1:])
+        return prepared
+
+    def add(self, digest: str, text: str) -> None:
+        """Registra una referencia al cuerpo `digest` (se encola si no se vio antes)"""
+        self.stats['references'] += 1
+        self.stats['chars_referenced'] += len(text)
+        if digest not in self._seen and digest not in self._pending:
+            self._pending[digest] = text
+
+    def is_full(self) -> bool:
+        return len(self._pending) >= FLUSH_BODIES
+
+    def flush(self) -> int:
+        """Inserta los cuerpos pendientes; devuelve cuántos eran nuevos para este escritor"""
+        if not self._pending:
+            return 0
+        self.cursor.executemany(f"""
+            INSERT IGNORE INTO {CONTENTS_TABLE} (content_hash, content_text, char_count)
+            VALUES (%s, %s, %s)
+        """, [(digest, text, len(text)) for digest, text in self._pending.items()])
+        written = len(self._pending)
+        self.stats['bodies_written'] += written
+        self.stats['chars_written'] += sum(len(text) for text in self._pending.values())
+        if len(self._seen) + written > self.seen_limit:
+            self._seen.clear()
+        self._seen.update(self._pending)
+        self._pending = {}
+        return written
+
+    def summary(self) -> str:
+        saved = self.stats['chars_referenced'] - self.stats['chars_written']
+        return (f"{self.stats['references']:,} cuerpos largos → {self.stats['bodies_written']:,} guardados "
+                f"({saved:,} caracteres no duplicados)")
+
+
+# ---------------------------------------------------------------------------
+# Mantenimiento
+# ---------------------------------------------------------------------------
+
+def migrate_existing(connection, min_chars: int = DEDUP_MIN_CHARS, batch: int = MIGRATE_BATCH) -> Dict[str, int]:
+    """Deduplica los mensajes ya guardados (recorrido por id, un commit por lote)"""
+    cursor = connection.cursor()
+    ensure_content_store(cursor)
+    store = ContentStore(cursor)
+    migrated = 0
+    last_id = ''
+    while True:
+        cursor.execute("""
+            SELECT id, content_text FROM messages
+            WHERE id > %s AND content_hash IS NULL AND CHAR_LENGTH(content_text) >= %s
+            ORDER BY id LIMIT %s
+        """, (last_id, min_chars, batch))
+        found = cursor.fetchall()
+        if not found:
+            break
+        updates = []
+        for message_id, text in found:
+            normalized, digest = dedup_content(text, min_chars)
+            if digest:
+                store.add(digest, normalized)
+                updates.append((digest, message_id))
+        store.flush()
+        cursor.executemany("UPDATE messages SET content_text = NULL, content_hash = %s WHERE id = %s", updates)
+        connection.commit()
+        migrated += len(updates)
+        last_id = found[-1][0]
+        print(f"    📦 {migrated:,} mensajes deduplicados...")
+    cursor.close()
+    return {'messages': migrated, **store.stats}
+
+
+def inline_all(connection, batch: int = MIGRATE_BATCH) -> int:
+    """Deshace la deduplicación: vuelve a copiar cada cuerpo en su mensaje y
+    quita messages.content_hash (los importadores dejan de usar el almacén)"""
+    cursor = connection.cursor()
+    restored = 0
+    while True:
+        cursor.execute("SELECT id FROM messages WHERE content_hash IS NOT NULL LIMIT %s", (batch,))
+        ids = [row[0] for row in cursor.fetchall()]
+        if not ids:
+            break
+        placeholders = ', '.join(['%s'] * len(ids))
+        cursor.execute(f"""
+            UPDATE messages m
+            INNER JOIN {CONTENTS_TABLE} mc ON mc.content_hash = m.content_hash
+            SET m.content_text = mc.content_text, m.content_hash = NULL
+            WHERE m.id IN ({placeholders})
+        """, ids)
+        if cursor.rowcount == 0:
+            raise RuntimeError("Hay mensajes con content_hash sin cuerpo en message_contents")
+        connection.commit()
+        restored += cursor.rowcount
+        print(f"    📤 {restored:,} mensajes restaurados...")
+    cursor.execute("ALTER TABLE messages DROP INDEX idx_messages_content_hash, DROP COLUMN content_hash")
+    cursor.close()
+    return restored
+
+
+def collect_garbage(cursor) -> int:
+    """Borra los cuerpos que ya no referencia ningún mensaje (p. ej. tras reescrituras incrementales)"""
+    cursor.execute(f"""
+        DELETE mc FROM {CONTENTS_TABLE} mc
+        LEFT JOIN messages m ON m.content_hash = mc.content_hash
+        WHERE m.id IS NULL
+    """)
+    return cursor.rowcount
+
+
+def store_stats(cursor) -> Dict[str, Any]:
+    """Referencias, cuerpos distintos, caracteres ahorrados y tamaño de las tablas"""
+    cursor.execute("SELECT COUNT(*) FROM messages")
+    total_messages = cursor.fetchone()[0]
+    cursor.execute(f"""
+        SELECT COUNT(*), COALESCE(SUM(mc.char_count), 0)
+        FROM messages m INNER JOIN {CONTENTS_TABLE} mc ON mc.content_hash = m.content_hash
+    """)
+    references, chars_referenced = cursor.fetchone()
+    cursor.execute(f"SELECT COUNT(*), COALESCE(SUM(char_count), 0) FROM {CONTENTS_TABLE}")
+    bodies, chars_stored = cursor.fetchone()
+    cursor.execute("""
+        SELECT TABLE_NAME, DATA_LENGTH, INDEX_LENGTH FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ('messages', %s)
+    """, (CONTENTS_TABLE,))
+    sizes = {table: {'data_bytes': int(data or 0), 'index_bytes': int(index or 0)}
+             for table, data, index in cursor.fetchall()}
+    return {
+        'messages': total_messages,
+        'references': references,
+        'bodies': bodies,
+        'chars_referenced': int(chars_referenced),
+        'chars_stored': int(chars_stored),
+        'chars_saved': int(chars_referenced) - int(chars_stored),
+        'table_sizes': sizes,
+    }
+
+
+if __name__ == "__main__":
+    # Uso:
+    #   python content_store.py migrate [--min-chars=512]   # crear el almacén y deduplicar lo existente
+    #   python content_store.py stats                       # ahorro y tamaño de las tablas
+    #   python content_store.py gc                          # borrar cuerpos sin referencias
+    #   python content_store.py inline                      # deshacer (volver a guardar el texto en messages)
+    from db_pool import connect
+
+    command = sys.argv[1] if len(sys.argv) > 1 else 'stats'
+    options = dict(arg[2:].partition('=')[::2] for arg in sys.argv[2:] if arg.startswith('--'))
+    connection = connect(autocommit=False)
+    cursor = connection.cursor()
+
+    if command == 'migrate':
+        min_chars = int(options.get('min-chars') or DEDUP_MIN_CHARS)
+        print(f"📦 Deduplicando cuerpos de {min_chars} caracteres o más...")
+        result = migrate_existing(connection, min_chars)
+        print(f"✅ {result['messages']:,} mensajes → {result['bodies_written']:,} cuerpos en {CONTENTS_TABLE}")
+        print("ℹ️ Ejecuta 'python content_store.py gc' si ya había cuerpos sin referencias y "
+              "OPTIMIZE TABLE messages para recuperar el espacio en disco")
+    elif command == 'stats':
+        if not content_store_enabled(cursor):
+            print("ℹ️ El almacén de contenidos no está activo (python content_store.py migrate)")
+        else:
+            stats = store_stats(cursor)
+            ratio = stats['references'] / stats['bodies'] if stats['bodies'] else 0
+            print(f"📊 Almacén de contenidos:")
+            print(f"  💌 Mensajes: {stats['messages']:,} ({stats['references']:,} con cuerpo en {CONTENTS_TABLE})")
+            print(f"  📦 Cuerpos distintos: {stats['bodies']:,} ({ratio:.1f} referencias por cuerpo)")
+            print(f"  ✂️ Caracteres no duplicados: {stats['chars_saved']:,} "
+                  f"({stats['chars_referenced']:,} referenciados, {stats['chars_stored']:,} guardados)")
+            for table, size in stats['table_sizes'].items():
+                print(f"  💾 {table}: {size['data_bytes'] / 1024 / 1024:,.1f} MB datos, "
+                      f"{size['index_bytes'] / 1024 / 1024:,.1f} MB índices")
+    elif command == 'gc':
+        deleted = collect_garbage(cursor)
+        connection.commit()
+        print(f"🧹 {deleted:,} cuerpos sin referencias eliminados")
+    elif command == 'inline':
+        restored = inline_all(connection)
+        print(f"✅ {restored:,} mensajes con el texto de nuevo en messages "
+              f"({CONTENTS_TABLE} se conserva: bórrala a mano si ya no se usa)")
+    else:
+        print("Uso: python content_store.py migrate [--min-chars=N] | stats | gc | inline")
+
+    cursor.close()
+    connection.close()
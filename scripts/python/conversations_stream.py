@@ -0,0 +1,181 @@
+"""
+Lector incremental de conversations.json
+Recorre el array principal del export de ChatGPT y entrega una conversación
+a la vez, sin cargar el archivo completo en memoria.
+"""
+import codecs
+import json
+import os
+import zipfile
+from typing import Any, BinaryIO, Iterator, Optional, Tuple, Union
+
+CHUNK_SIZE = 1024 * 1024  # 1 MB por lectura
+EXPORT_MEMBER = 'conversations.json'
+
+_WHITESPACE = ' \t\r\n'
+_DECODER = json.JSONDecoder()
+
+
+class ConversationStream:
+    """Iterador de conversaciones sobre el array principal de un export.
+
+    Solo mantiene en memoria la conversación que se está decodificando (más un
+    bloque de lectura), por lo que el consumo máximo es proporcional a la
+    conversación más grande y no al tamaño del archivo. ``offset`` indica la
+    posición en bytes justo después del último elemento entregado e ``index``
+    cuántos elementos se llevan leídos; ambos sirven para reanudar desde un
+    checkpoint con ``start_offset``/``start_index``.
+    """
+
+    def __init__(self, fileobj: BinaryIO, start_offset: int = 0,
+                 chunk_size: int = CHUNK_SIZE, start_index: int = 0):
+        self._file = fileobj
+        self._chunk_size = chunk_size
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buf = ''
+        self._eof = False
+        self._started = start_offset > 0
+        self.offset = start_offset
+        self.index = start_index
+
+        if start_offset:
+            fileobj.seek(start_offset)
+
+    def _fill(self, size: Optional[int] = None) -> bool:
+        """Lee al menos size bytes más del archivo; False si ya no hay datos"""
+        if self._eof:
+            return False
+        chunk = self._file.read(size or self._chunk_size)
+        if not chunk:
+            self._buf += self._decoder.decode(b'', final=True)
+            self._eof = True
+            return False
+        self._buf += self._decoder.decode(chunk)
+        return True
+
+    def _skip(self, pos: int, chars: str) -> int:
+        """Avanza sobre los caracteres indicados, leyendo más si hace falta"""
+        while True:
+            while pos < len(self._buf) and self._buf[pos] in chars:
+                pos += 1
+            if pos < len(self._buf) or not self._fill():
+                return pos
+
+    def _consume(self, pos: int) -> None:
+        """Libera del buffer todo lo ya consumido y actualiza el offset"""
+        self.offset += len(self._buf[:pos].encode('utf-8'))
+        self._buf = self._buf[pos:]
+
+    def _decode_value(self, pos: int):
+        """Decodifica el valor que empieza en pos, leyendo más datos si está incompleto.
+
+        Cada reintento al menos duplica el buffer, así que una conversación
+        partida entre bloques se decodifica en tiempo lineal amortizado.
+        """
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self._buf, pos)
+            except json.JSONDecodeError:
+                if not self._fill(max(self._chunk_size, len(self._buf))):
+                    raise ValueError(
+                        f"conversations.json truncado o inválido cerca del byte {self.offset}"
+                    ) from None
+                continue
+            # Un escalar solo está completo si ya se ve el delimitador que lo sigue
+            if (not isinstance(value, (dict, list))
+                    and self._buf[end:end + 1] not in tuple(_WHITESPACE + ',]')
+                    and self._fill()):
+                continue
+            return value, end
+
+    def __iter__(self) -> Iterator[Any]:
+        pos = 0
+
+        if not self._started:
+            pos = self._skip(pos, '\ufeff' + _WHITESPACE)
+            if self._buf[pos:pos + 1] != '[':
+                raise ValueError("conversations.json no contiene un array en el nivel principal")
+            pos += 1
+            self._started = True
+
+        while True:
+            pos = self._skip(pos, _WHITESPACE + ',')
+            if pos >= len(self._buf):
+                raise ValueError(
+                    f"conversations.json truncado o inválido cerca del byte {self.offset}"
+                )
+            if self._buf[pos] == ']':
+                self._consume(pos + 1)
+                return
+
+            value, end = self._decode_value(pos)
+            self._consume(end)
+            self.index += 1
+            pos = 0
+            yield value
+
+
+def _find_export_member(archive: zipfile.ZipFile) -> zipfile.ZipInfo:
+    """Busca conversations.json dentro del ZIP (en la raíz o en una subcarpeta)"""
+    candidates = [info for info in archive.infolist()
+                  if not info.is_dir() and os.path.basename(info.filename) == EXPORT_MEMBER]
+    if not candidates:
+        raise FileNotFoundError(f"{EXPORT_MEMBER} no encontrado dentro de {archive.filename}")
+    # Preferir el más cercano a la raíz
+    return min(candidates, key=lambda info: info.filename.count('/'))
+
+
+def open_export(path: str) -> Tuple[BinaryIO, Optional[int]]:
+    """Abre un export en modo binario y devuelve (archivo, tamaño en bytes).
+
+    ``path`` puede ser el conversations.json ya extraído o el ZIP original del
+    export de ChatGPT; en ese caso se devuelve el miembro conversations.json,
+    que se descomprime al vuelo sin escribirlo a disco. El llamador es
+    responsable de cerrar el archivo devuelto.
+    """
+    if zipfile.is_zipfile(path):
+        archive = zipfile.ZipFile(path)
+        try:
+            info = _find_export_member(archive)
+            member = archive.open(info)
+        finally:
+            # El miembro abierto mantiene vivo el descriptor hasta que se cierre
+            archive.close()
+        return member, info.file_size
+    return open(path, 'rb'), os.path.getsize(path)
+
+
+def default_export_path(base_dir: str) -> str:
+    """Ruta por defecto del export: extracted/conversations.json o, si no existe, un ZIP en base_dir"""
+    extracted = os.path.join(base_dir, 'extracted', EXPORT_MEMBER)
+    if os.path.exists(extracted):
+        return extracted
+    for name in sorted(os.listdir(base_dir)):
+        if name.lower().endswith('.zip'):
+            return os.path.join(base_dir, name)
+    return extracted
+
+
+def iter_conversations(source: Union[str, BinaryIO], start_offset: int = 0) -> Iterator[Any]:
+    """Entrega las conversaciones de un export una por una.
+
+    ``source`` puede ser una ruta (conversations.json o ZIP del export) o un
+    archivo ya abierto en modo binario.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        f, _size = open_export(source)
+        with f:
+            yield from ConversationStream(f, start_offset)
+    else:
+        yield from ConversationStream(source, start_offset)
+
+
+def export_size(path: str) -> Optional[int]:
+    """Tamaño en bytes del conversations.json (descomprimido si es un ZIP)"""
+    try:
+        if zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as archive:
+                return _find_export_member(archive).file_size
+        return os.path.getsize(path)
+    except (OSError, zipfile.BadZipFile):
+        return None
@@ -0,0 +1,184 @@
+"""
+Capa de conexión compartida a MySQL para los scripts Python
+Toma la configuración de env_loader.get_db_config() y mantiene un pool de
+conexiones reutilizables: contra el servidor remoto el handshake
+TCP+TLS+autenticación cuesta más que el propio INSERT, así que abrir una
+conexión por conversación domina el tiempo de importación.
+"""
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+from env_loader import get_db_config
+
+DEFAULT_POOL_SIZE = 4
+HEALTH_CHECK_IDLE = 30  # segundos sin uso antes de verificar la conexión con ping
+RECONNECT_RETRIES = 2
+
+# "MySQL server has gone away", "Lost connection to MySQL server" (también durante la consulta)
+CONNECTION_LOST_ERRNOS = {2006, 2013, 2055}
+
+
+def is_connection_lost(error: BaseException) -> bool:
+    """True si el error indica que el servidor cerró la conexión (mysql.connector o pymysql)"""
+    errno = getattr(error, 'errno', None)
+    if errno is None and error.args and isinstance(error.args[0], int):
+        errno = error.args[0]
+    return errno in CONNECTION_LOST_ERRNOS
+
+
+def _mysql_connect(**config):
+    import mysql.connector
+    return mysql.connector.connect(**config)
+
+
+def connect(driver: Optional[Callable[..., Any]] = None, **overrides):
+    """Conexión individual con la configuración del .env (para scripts de una sola conexión).
+
+    ``driver`` permite usar otro conector (p. ej. ``pymysql.connect``), como en ConnectionPool.
+    """
+    return (driver or _mysql_connect)(**dict(get_db_config(), **overrides))
+
+
+def ensure_alive(connection) -> None:
+    """Verifica una conexión de larga duración y la reabre si el servidor la cerró"""
+    connection.ping(reconnect=True)
+
+
+class ConnectionPool:
+    """Pool de conexiones con verificación de salud y reconexión.
+
+    Las conexiones se piden por lote (``connection()`` / ``batch()``) y se
+    devuelven al terminar, de modo que un importador hace un único handshake
+    por conexión en lugar de uno por operación. Una conexión que estuvo
+    inactiva más de HEALTH_CHECK_IDLE segundos se verifica con ping antes de
+    entregarla; si el servidor la cerró se descarta y se abre otra.
+
+    ``connect`` permite usar otro driver (p. ej. ``pymysql.connect``): solo se
+    necesita que la conexión tenga ping(), rollback() y close().
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, size: int = DEFAULT_POOL_SIZE,
+                 connect: Optional[Callable[..., Any]] = None, **overrides):
+        self.config = dict(config if config is not None else get_db_config(), **overrides)
+        self.size = size
+        self._connect = connect or _mysql_connect
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self.created = 0
+        self.reconnects = 0
+
+    def _open(self):
+        connection = self._connect(**self.config)
+        self.created += 1
+        return connection
+
+    def _is_healthy(self, connection, last_used: float) -> bool:
+        if time.time() - last_used < HEALTH_CHECK_IDLE:
+            return True
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, connection) -> None:
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def acquire(self, timeout: Optional[float] = None):
+        """Entrega una conexión sana (reutilizada o nueva); devolver con release()"""
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f"No hay conexiones libres en el pool ({self.size})")
+        try:
+            while True:
+                try:
+                    connection, last_used = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._open()
+                if self._is_healthy(connection, last_used):
+                    return connection
+                self._discard(connection)
+                self.reconnects += 1
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, connection, broken: bool = False) -> None:
+        """Devuelve la conexión al pool (o la cierra si quedó inutilizable)"""
+        try:
+            if broken:
+                self._discard(connection)
+            else:
+                self._idle.put((connection, time.time()))
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Conexión del pool durante el bloque; ante un error se hace rollback"""
+        connection = self.acquire()
+        broken = False
+        try:
+            yield connection
+        except BaseException as e:
+            broken = is_connection_lost(e)
+            if not broken:
+                try:
+                    connection.rollback()
+                except Exception:
+                    broken = True
+            raise
+        finally:
+            self.release(connection, broken)
+
+    @contextmanager
+    def batch(self, **cursor_options):
+        """Cursor dentro de una transacción: commit al salir del bloque, rollback si falla"""
+        with self.connection() as connection:
+            cursor = connection.cursor(**cursor_options)
+            try:
+                yield cursor
+                connection.commit()
+            finally:
+                cursor.close()
+
+    def run_batch(self, work: Callable[[Any], Any], retries: int = RECONNECT_RETRIES, **cursor_options):
+        """Ejecuta work(cursor) como una transacción y la repite con otra conexión
+        si el servidor cerró la conexión a mitad del lote"""
+        for attempt in range(retries + 1):
+            try:
+                with self.batch(**cursor_options) as cursor:
+                    return work(cursor)
+            except Exception as e:
+                if not is_connection_lost(e) or attempt >= retries:
+                    raise
+                self.reconnects += 1
+                print(f"  🔌 Conexión perdida ({e}), reintentando lote ({attempt + 1}/{retries})...")
+                time.sleep(min(2 ** attempt, 10))
+
+    def close(self) -> None:
+        """Cierra las conexiones inactivas del pool"""
+        while True:
+            try:
+                connection, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(connection)
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_pool(**overrides) -> ConnectionPool:
+    """Pool compartido del proceso (configurado desde el .env en la primera llamada)"""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = ConnectionPool(**overrides)
+        return _default_pool
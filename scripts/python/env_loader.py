@@ -3,11 +3,12 @@ Cargador de variables de entorno para Python
 Equivalente al env_loader.php
 """
 import os
-from typing import Any, Optional, Dict
+from typing import Any, Optional, Dict, List
 
 class EnvLoader:
     _loaded = False
     _env = {}
+    _process = {}  # variables que el proceso ya tenía antes de cargar el .env
     
     @classmethod
     def load(cls, path: Optional[str] = None) -> None:
@@ -40,6 +41,8 @@ class EnvLoader:
                         value = value[1:-1]
                     
                     # Guardar en diccionario interno y en variables de entorno
+                    if key in os.environ and key not in cls._env:
+                        cls._process[key] = os.environ[key]
                     cls._env[key] = value
                     os.environ[key] = value
         
@@ -50,6 +53,15 @@ class EnvLoader:
         cls.load()
         return cls._env.get(key, default)
     
+    @classmethod
+    def get_override(cls, key: str, default: Any = None) -> Any:
+        """Variable del proceso si está definida (tiene prioridad sobre el .env); sin .env, solo la del proceso"""
+        try:
+            cls.load()
+        except FileNotFoundError:
+            return os.environ.get(key, default)
+        return cls._process.get(key, cls._env.get(key, default))
+    
     @classmethod
     def get_all(cls) -> Dict[str, str]:
         cls.load()
@@ -63,6 +75,7 @@ def get_db_config():
     """Obtener configuración de base de datos desde .env"""
     return {
         'host': env('DB_HOST', 'localhost'),
+        'port': int(env('DB_PORT', '3306')),
         'database': env('DB_NAME', 'chatBeto'),
         'user': env('DB_USERNAME', 'root'),
         'password': env('DB_PASSWORD', ''),
@@ -75,4 +88,22 @@ def get_app_config():
         'name': env('APP_NAME', 'ChatBETO'),
         'environment': env('APP_ENV', 'production'),
         'debug': env('APP_DEBUG', 'false').lower() in ('true', '1', 'yes')
-    }
\ No newline at end of file
+    }
+
+def phase_list(value: Optional[str]) -> List[str]:
+    """'write, commit' -> ['write', 'commit']"""
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+def get_metrics_config():
+    """Configuración de métricas y perfilado de los importadores (ver import_metrics.py).
+
+    Una variable del proceso tiene prioridad sobre el .env, para activar algo en
+    una sola ejecución (IMPORT_PROFILE=write python import_messages_only.py ...);
+    sin .env (p. ej. en benchmarks) se usan solo las del proceso.
+    """
+    return {
+        'log': EnvLoader.get_override('IMPORT_METRICS_LOG'),
+        'prometheus': EnvLoader.get_override('IMPORT_METRICS_PROM'),
+        'profile': phase_list(EnvLoader.get_override('IMPORT_PROFILE')),
+        'tracemalloc': phase_list(EnvLoader.get_override('IMPORT_TRACEMALLOC'))
+    }
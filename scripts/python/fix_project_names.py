@@ -7,6 +7,7 @@ import pymysql
 import json
 import re
 from datetime import datetime
+from keyword_classifier import KeywordAutomaton
 
 # Configuración de conexión
 DB_CONFIG = {
@@ -29,47 +30,28 @@ def create_connection():
         print(f"❌ Error conexión: {e}")
         return None
 
+# Categorías por palabras clave (el orden define la prioridad)
+CATEGORY_KEYWORDS = {
+    'Desarrollo y Programación': ['python', 'javascript', 'php', 'html', 'css', 'sql', 'mysql',
+                                  'programming', 'código', 'script', 'desarrollo'],
+    'Inteligencia Artificial': ['chatgpt', 'openai', 'ia', 'artificial', 'machine learning', 'gpt'],
+    'Negocios y Marketing': ['negocio', 'marketing', 'ventas', 'cliente', 'estrategia', 'plan', 'mercadosur'],
+    'Diseño y Creatividad': ['diseño', 'design', 'photoshop', 'imagen', 'creativo', 'brand', 'logo'],
+    'Tecnología y Herramientas': ['github', 'git', 'vs code', 'linux', 'ubuntu', 'windows', 'servidor', 'hosting'],
+    'Educación y Aprendizaje': ['learn', 'tutorial', 'curso', 'enseñar', 'explicar', 'help', 'ayuda'],
+    'Escritura y Contenido': ['escribir', 'redactar', 'contenido', 'texto', 'artículo', 'blog'],
+}
+
+CATEGORY_MATCHER = KeywordAutomaton(CATEGORY_KEYWORDS)
+
 def categorize_conversation(title, model, messages_content):
     """
     Categoriza la conversación basándose en el título, modelo y contenido
     """
-    title_lower = title.lower()
-    content_lower = messages_content.lower()
-    
-    # Categorías de desarrollo y programación
-    if any(keyword in title_lower or keyword in content_lower for keyword in 
-           ['python', 'javascript', 'php', 'html', 'css', 'sql', 'mysql', 'programming', 'código', 'script', 'desarrollo']):
-        return "Desarrollo y Programación"
-    
-    # Categorías de IA y Machine Learning
-    if any(keyword in title_lower or keyword in content_lower for keyword in 
-           ['chatgpt', 'openai', 'ia', 'artificial', 'machine learning', 'gpt']):
-        return "Inteligencia Artificial"
-    
-    # Categorías de negocio y marketing
-    if any(keyword in title_lower or keyword in content_lower for keyword in 
-           ['negocio', 'marketing', 'ventas', 'cliente', 'estrategia', 'plan', 'mercadosur']):
-        return "Negocios y Marketing"
-    
-    # Categorías de diseño y creatividad
-    if any(keyword in title_lower or keyword in content_lower for keyword in 
-           ['diseño', 'design', 'photoshop', 'imagen', 'creativo', 'brand', 'logo']):
-        return "Diseño y Creatividad"
-    
-    # Categorías de tecnología y herramientas
-    if any(keyword in title_lower or keyword in content_lower for keyword in 
-           ['github', 'git', 'vs code', 'linux', 'ubuntu', 'windows', 'servidor', 'hosting']):
-        return "Tecnología y Herramientas"
-    
-    # Categorías de educación y aprendizaje
-    if any(keyword in title_lower or keyword in content_lower for keyword in 
-           ['learn', 'tutorial', 'curso', 'enseñar', 'explicar', 'help', 'ayuda']):
-        return "Educación y Aprendizaje"
-    
-    # Categorías de escritura y contenido
-    if any(keyword in title_lower or keyword in content_lower for keyword in 
-           ['escribir', 'redactar', 'contenido', 'texto', 'artículo', 'blog']):
-        return "Escritura y Contenido"
+    # Una sola pasada por el título y otra por el contenido con todas las palabras clave
+    category = CATEGORY_MATCHER.first_label(title, messages_content)
+    if category:
+        return category
     
     # Basado en el modelo usado
     if model:
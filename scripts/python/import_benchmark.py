@@ -0,0 +1,525 @@
+#!/usr/bin/env python3
+"""
+Benchmark de extremo a extremo de los importadores, con umbrales de regresión
+Genera exports sintéticos de varios tamaños (synthetic_export.py), ejecuta
+los importadores contra una base de pruebas y guarda, por importador y
+tamaño, filas/s, tiempo total, memoria máxima (RSS) y el tiempo por fase:
+
+  parse      lectura del export (dentro de ConversationStream, en la misma ejecución)
+  transform  conversión a filas en el proceso principal (resto del tiempo)
+  write      dentro de execute/executemany/LOAD DATA
+  commit     dentro de commit()
+
+Cada ejecución corre en un proceso aparte para que la memoria máxima sea la
+suya. Los resultados se comparan con una línea base guardada (local de cada
+máquina, no se versiona: se crea con run --save-baseline) y se marcan las
+métricas que empeoran más que el umbral (por defecto 10 %); con regresiones
+el proceso termina con código 1 (apto para CI).
+
+Backends:
+  mysql   los importadores reales (import_conversations_only, import_messages_only,
+          import_incremental) contra una base de pruebas (--database, nunca la del .env);
+          las tablas se crean con CREATE TABLE ... LIKE a partir de la base configurada
+  sqlite  sustituto sin servidor: mismas etapas de lectura y extracción, escritura
+          en SQLite; sirve para vigilar la parte Python en cualquier máquina
+"""
+import json
+import os
+import platform
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import conversations_stream
+
+BENCH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks')
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'import_baseline.json')  # la crea run --save-baseline
+DEFAULT_SIZES = (1000, 5000)
+DEFAULT_IMPORTERS = ('conversations', 'messages')
+DEFAULT_THRESHOLD = 10.0   # % de empeoramiento tolerado
+MIN_PHASE_SECONDS = 0.05   # diferencias de fase menores no cuentan (ruido)
+RESULT_MARKER = 'BENCH_RESULT '
+BENCH_TABLES = ('projects', 'conversations', 'messages')
+
+# Métricas comparadas: True = mayor es mejor
+COMPARED_METRICS = {'rows_per_sec': True, 'wall_time': False, 'peak_rss_mb': False}
+
+
+# ---------------------------------------------------------------------------
+# Medición
+# ---------------------------------------------------------------------------
+
+class PhaseTimer:
+    """Acumula segundos por fase"""
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+
+    def add(self, phase: str, seconds: float) -> None:
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def timed_iter(self, iterable: Iterable[Any], phase: str) -> Iterator[Any]:
+        """Entrega los elementos de `iterable` contando como `phase` el tiempo de obtener cada uno"""
+        iterator = iter(iterable)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.add(phase, time.perf_counter() - started)
+            yield item
+
+
+class TimedCursor:
+    """Cursor que cuenta el tiempo de execute/executemany como escritura"""
+
+    def __init__(self, cursor, timer: PhaseTimer):
+        self._cursor = cursor
+        self._timer = timer
+
+    def execute(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(*args, **kwargs)
+        finally:
+            self._timer.add('write', time.perf_counter() - started)
+
+    def executemany(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(*args, **kwargs)
+        finally:
+            self._timer.add('write', time.perf_counter() - started)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+
+class TimedConnection:
+    """Conexión cuyos cursores y commits se cronometran"""
+
+    def __init__(self, connection, timer: PhaseTimer):
+        self._connection = connection
+        self._timer = timer
+
+    def cursor(self, *args, **kwargs):
+        return TimedCursor(self._connection.cursor(*args, **kwargs), self._timer)
+
+    def commit(self):
+        started = time.perf_counter()
+        try:
+            return self._connection.commit()
+        finally:
+            self._timer.add('commit', time.perf_counter() - started)
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+def peak_rss_mb() -> Tuple[float, float]:
+    """(RSS máximo de este proceso, de sus hijos ya terminados) en MB (ru_maxrss está en KB en Linux)"""
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale)
+
+
+def time_parsing(timer: PhaseTimer) -> Dict[str, int]:
+    """Cronometra como 'parse' toda lectura con ConversationStream de este proceso (hijo de una medición).
+
+    Todos los importadores leen el export con ConversationStream (directamente o
+    con iter_conversations), así que la lectura se mide dentro de la ejecución
+    medida. Devuelve {'conversations': leídas}, que se actualiza durante la lectura.
+    """
+    original = conversations_stream.ConversationStream.__iter__
+    parsed = {'conversations': 0}
+
+    def timed(stream):
+        for conv in timer.timed_iter(original(stream), 'parse'):
+            parsed['conversations'] += 1
+            yield conv
+
+    conversations_stream.ConversationStream.__iter__ = timed
+    return parsed
+
+
+# ---------------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------------
+
+def _sqlite_schema(connection) -> None:
+    from import_conversations_only import CONVERSATION_COLUMNS
+    from message_extraction import MESSAGE_COLUMNS
+    connection.execute(f"CREATE TABLE conversations ({', '.join(CONVERSATION_COLUMNS)}, PRIMARY KEY (id))")
+    connection.execute(f"CREATE TABLE messages ({', '.join(MESSAGE_COLUMNS)}, PRIMARY KEY (id))")
+    connection.execute("CREATE INDEX idx_transcript ON messages (conversation_id, is_canonical, position)")
+    connection.commit()
+
+
+def sqlite_conversations(connection, export_path: str, workers: Optional[int]) -> int:
+    """Mismo recorrido que import_conversations_only (lotes de 100), escribiendo en SQLite"""
+    from conversations_stream import iter_conversations
+    from import_conversations_only import CONVERSATION_COLUMNS, conversation_row
+    cursor = connection.cursor()
+    sql = f"INSERT OR IGNORE INTO conversations VALUES ({', '.join(['?'] * len(CONVERSATION_COLUMNS))})"
+    batch, imported = [], 0
+    for conv in iter_conversations(export_path):
+        batch.append(conversation_row(conv, conv.get('id'), None))
+        if len(batch) >= 100:
+            cursor.executemany(sql, batch)
+            imported += len(batch)
+            batch = []
+    if batch:
+        cursor.executemany(sql, batch)
+        imported += len(batch)
+    connection.commit()
+    return imported
+
+
+def sqlite_messages(connection, export_path: str, workers: Optional[int]) -> int:
+    """Mismo recorrido que import_messages_only (lotes de 500, commit cada 5000), escribiendo en SQLite"""
+    from conversations_stream import iter_conversations
+    from message_extraction import MESSAGE_COLUMNS, iter_extracted_rows
+    cursor = connection.cursor()
+    sql = f"INSERT OR IGNORE INTO messages VALUES ({', '.join(['?'] * len(MESSAGE_COLUMNS))})"
+    imported = uncommitted = 0
+    for rows, _errors, _position in iter_extracted_rows(iter_conversations(export_path), workers=workers):
+        for start in range(0, len(rows), 500):
+            cursor.executemany(sql, rows[start:start + 500])
+        imported += len(rows)
+        uncommitted += len(rows)
+        if uncommitted >= 5000:
+            connection.commit()
+            uncommitted = 0
+    connection.commit()
+    return imported
+
+
+SQLITE_IMPORTERS: Dict[str, Tuple[Callable, str]] = {
+    'conversations': (sqlite_conversations, 'conversations'),
+    'messages': (sqlite_messages, 'messages'),
+}
+
+
+def _mysql_importer(name: str):
+    """(función(export, workers), tabla cuyas filas se cuentan, módulo donde inyectar la conexión)"""
+    if name == 'conversations':
+        import import_conversations_only as module
+        return (lambda path, workers: module.import_conversations_from_json(path)), 'conversations', module
+    if name == 'conversations-bulk':
+        import import_conversations_only as module
+        return (lambda path, workers: module.import_conversations_from_json(path, bulk_load=True)), 'conversations', module
+    if name == 'messages':
+        import import_messages_only as module
+        return (lambda path, workers: module.import_messages_from_json(path, workers, resume=False)), 'messages', module
+    if name == 'messages-bulk':
+        import import_messages_only as module
+        return (lambda path, workers: module.import_messages_from_json(path, workers, bulk_load=True, resume=False)), \
+            'messages', module
+    if name == 'incremental':
+        import import_incremental as module
+        return (lambda path, workers: module.import_incremental(path, resume=False)), 'conversations', module
+    raise ValueError(f"Importador desconocido: {name}")
+
+
+def _check_bench_database(database: Optional[str]) -> str:
+    from env_loader import get_db_config
+    if not database:
+        raise SystemExit("❌ El backend mysql necesita --database=<base de pruebas> (se vacía en cada tamaño)")
+    if database == get_db_config()['database']:
+        raise SystemExit(f"❌ {database} es la base configurada en .env: usa una base de pruebas aparte")
+    return database
+
+
+def mysql_prepare(database: str) -> None:
+    """Crea la base de pruebas con el esquema de la configurada y la vacía"""
+    from db_pool import connect
+    from env_loader import get_db_config
+    source = get_db_config()['database']
+    connection = connect(autocommit=True)
+    cursor = connection.cursor()
+    cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{database}` CHARACTER SET utf8mb4 COLLATE utf8mb4_general_ci")
+    for table in BENCH_TABLES:
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS `{database}`.`{table}` LIKE `{source}`.`{table}`")
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+    for table in ('messages', 'conversations', 'projects', 'stats_rollup'):
+        cursor.execute(f"SELECT COUNT(*) FROM information_schema.TABLES WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s",
+                       (database, table))
+        if cursor.fetchone()[0]:
+            cursor.execute(f"TRUNCATE TABLE `{database}`.`{table}`")
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+    cursor.close()
+    connection.close()
+
+
+# ---------------------------------------------------------------------------
+# Ejecución de una medición (proceso hijo)
+# ---------------------------------------------------------------------------
+
+def run_child(backend: str, importer: str, export_path: str, workers: Optional[int],
+              database: Optional[str], state_dir: str) -> Dict[str, Any]:
+    timer = PhaseTimer()
+    parsed = time_parsing(timer)
+
+    if backend == 'sqlite':
+        function, table = SQLITE_IMPORTERS[importer]
+        path = os.path.join(state_dir, 'bench.sqlite')
+        fresh = not os.path.exists(path)
+        raw = sqlite3.connect(path)
+        if fresh:
+            _sqlite_schema(raw)
+        before = raw.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        connection = TimedConnection(raw, timer)
+        started = time.perf_counter()
+        function(connection, export_path, workers)
+        wall = time.perf_counter() - started
+        rows = raw.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] - before
+        raw.close()
+    else:
+        import db_pool
+        function, table, module = _mysql_importer(importer)
+
+        def timed_connect(**overrides):
+            return TimedConnection(db_pool.connect(**dict(overrides, database=database)), timer)
+
+        module.connect = timed_connect  # el importador usa la base de pruebas y queda cronometrado
+        counter = db_pool.connect(database=database, autocommit=True)
+        cursor = counter.cursor()
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        before = cursor.fetchone()[0]
+        started = time.perf_counter()
+        ok = function(export_path, workers)
+        wall = time.perf_counter() - started
+        if ok is False:
+            raise SystemExit(f"❌ El importador {importer} terminó con error")
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        rows = cursor.fetchone()[0] - before
+        cursor.close()
+        counter.close()
+        if importer == 'incremental':
+            rows = parsed['conversations']  # re-importación: se mide el recorrido completo del export
+
+    # Fases disjuntas del proceso principal: transform es el tiempo que no es lectura, escritura ni commit
+    parse, write, commit = (timer.phases.get(phase, 0.0) for phase in ('parse', 'write', 'commit'))
+    main_rss, children_rss = peak_rss_mb()
+    return {
+        'rows': rows,
+        'conversations': parsed['conversations'],
+        'wall_time': round(wall, 3),
+        'rows_per_sec': round(rows / wall, 1) if wall > 0 else 0.0,
+        'peak_rss_mb': round(main_rss, 1),
+        'workers_peak_rss_mb': round(children_rss, 1),
+        'phases': {
+            'parse': round(parse, 3),
+            'transform': round(wall - parse - write - commit, 3),
+            'write': round(write, 3),
+            'commit': round(commit, 3),
+        },
+    }
+
+
+def measure(backend: str, importer: str, export_path: str, workers: Optional[int],
+            database: Optional[str], state_dir: str) -> Dict[str, Any]:
+    """Ejecuta run_child en un proceso nuevo y devuelve su resultado"""
+    command = [sys.executable, os.path.abspath(__file__), '_child', backend, importer, export_path, state_dir,
+               f"--workers={workers or ''}", f"--database={database or ''}"]
+    completed = subprocess.run(command, capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    for line in reversed(completed.stdout.splitlines()):
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER):])
+    raise RuntimeError(f"{importer}: sin resultado (código {completed.returncode})\n"
+                       f"{completed.stdout[-2000:]}\n{completed.stderr[-2000:]}")
+
+
+# ---------------------------------------------------------------------------
+# Suite y comparación
+# ---------------------------------------------------------------------------
+
+def synthetic_export_path(size: int, seed: int) -> str:
+    """Export sintético de `size` conversaciones (se genera una vez y se reutiliza)"""
+    from synthetic_export import SyntheticConfig, write_export
+    directory = os.path.join(BENCH_DIR, 'exports')
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"synthetic_{size}_seed{seed}.json")
+    if not os.path.exists(path):
+        print(f"🧪 Generando export sintético de {size:,} conversaciones...")
+        write_export(path, SyntheticConfig(conversations=size, seed=seed), progress_every=0)
+    return path
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_suite(backend: str = 'sqlite', sizes=DEFAULT_SIZES, importers=DEFAULT_IMPORTERS,
+              workers: Optional[int] = None, database: Optional[str] = None, seed: int = 1,
+              repeat: int = 1) -> Dict[str, Any]:
+    """Mide cada importador con cada tamaño; con repeat>1 se queda con la ejecución más rápida"""
+    if backend == 'mysql':
+        database = _check_bench_database(database)
+    elif backend != 'sqlite':
+        raise ValueError(f"Backend desconocido: {backend}")
+    unknown = [name for name in importers if backend == 'sqlite' and name not in SQLITE_IMPORTERS]
+    if unknown:
+        raise ValueError(f"Importadores sin sustituto SQLite: {', '.join(unknown)}")
+
+    results: Dict[str, Any] = {}
+    for size in sizes:
+        export_path = synthetic_export_path(size, seed)
+        best: Dict[str, Dict[str, Any]] = {}
+        for attempt in range(repeat):
+            # Cada repetición parte de la base vacía e importa en orden (messages necesita conversations)
+            with tempfile.TemporaryDirectory(prefix='chatbeto_bench_') as state_dir:
+                if backend == 'mysql':
+                    mysql_prepare(database)
+                for importer in importers:
+                    result = measure(backend, importer, export_path, workers, database, state_dir)
+                    key = f"{importer}@{size}"
+                    if key not in best or result['wall_time'] < best[key]['wall_time']:
+                        best[key] = result
+                    print(f"  ⏱️ {key:<24} {result['rows']:>9,} filas | {result['rows_per_sec']:>10,.0f} filas/s | "
+                          f"{result['wall_time']:>7.2f}s | {result['peak_rss_mb']:>6.0f} MB"
+                          + (f" (intento {attempt + 1}/{repeat})" if repeat > 1 else ''))
+        results.update(best)
+
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'backend': backend,
+            'git_commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'workers': workers,
+            'seed': seed,
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any],
+            threshold: float = DEFAULT_THRESHOLD) -> List[Dict[str, Any]]:
+    """Métricas que empeoran más de `threshold` % respecto de la línea base.
+
+    Solo se comparan mediciones con la misma clave (importador@tamaño) y el
+    mismo backend; en las fases se ignoran diferencias de menos de
+    MIN_PHASE_SECONDS, que en mediciones cortas son ruido.
+    """
+    if current['meta'].get('backend') != baseline['meta'].get('backend'):
+        raise ValueError(f"Backends distintos: {current['meta'].get('backend')} vs {baseline['meta'].get('backend')}")
+    regressions = []
+    for key, result in current['results'].items():
+        base = baseline['results'].get(key)
+        if not base:
+            continue
+        metrics = [(name, result.get(name), base.get(name), higher) for name, higher in COMPARED_METRICS.items()]
+        metrics += [(f"phases.{phase}", seconds, base.get('phases', {}).get(phase), False)
+                    for phase, seconds in result.get('phases', {}).items()]
+        for name, value, reference, higher_is_better in metrics:
+            if value is None or not reference:
+                continue
+            if name.startswith('phases.') and abs(value - reference) < MIN_PHASE_SECONDS:
+                continue
+            change = (value - reference) / reference * 100
+            worse = -change if higher_is_better else change
+            if worse > threshold:
+                regressions.append({'key': key, 'metric': name, 'baseline': reference, 'current': value,
+                                    'change_pct': round(change, 1)})
+    return regressions
+
+
+def print_regressions(regressions: List[Dict[str, Any]], threshold: float) -> None:
+    if not regressions:
+        print(f"✅ Sin regresiones (umbral {threshold:g} %)")
+        return
+    print(f"⚠️ {len(regressions)} regresiones (umbral {threshold:g} %):")
+    for item in regressions:
+        print(f"  ❌ {item['key']:<24} {item['metric']:<18} {item['baseline']:>10} → {item['current']:>10} "
+              f"({item['change_pct']:+.1f} %)")
+
+
+def _options(args: List[str]) -> Tuple[List[str], Dict[str, str]]:
+    """Separa argumentos posicionales de opciones --clave=valor"""
+    positional, options = [], {}
+    for arg in args:
+        if arg.startswith('--'):
+            key, _, value = arg[2:].partition('=')
+            options[key] = value
+        else:
+            positional.append(arg)
+    return positional, options
+
+
+if __name__ == "__main__":
+    # Uso:
+    #   python import_benchmark.py run [--backend=sqlite|mysql] [--database=chatbeto_bench]
+    #        [--sizes=1000,5000] [--importers=conversations,messages] [--workers=N] [--seed=1] [--repeat=1]
+    #        [--out=resultados.json] [--baseline=benchmarks/import_baseline.json] [--threshold=10] [--save-baseline]
+    #   python import_benchmark.py compare resultados.json [--baseline=...] [--threshold=10]
+    # Importadores mysql: conversations, conversations-bulk, messages, messages-bulk, incremental
+    command = sys.argv[1] if len(sys.argv) > 1 else ''
+    args, options = _options(sys.argv[2:])
+
+    if command == '_child':
+        backend, importer, export_path, state_dir = args
+        result = run_child(backend, importer, export_path,
+                           int(options['workers']) if options.get('workers') else None,
+                           options.get('database') or None, state_dir)
+        print(RESULT_MARKER + json.dumps(result))
+        sys.exit(0)
+
+    baseline_path = options.get('baseline') or DEFAULT_BASELINE
+    threshold = float(options.get('threshold') or DEFAULT_THRESHOLD)
+
+    if command == 'run':
+        backend = options.get('backend') or 'sqlite'
+        sizes = [int(size) for size in (options.get('sizes') or ','.join(map(str, DEFAULT_SIZES))).split(',')]
+        importers = (options.get('importers') or ','.join(DEFAULT_IMPORTERS)).split(',')
+        print(f"📏 Benchmark de importación ({backend}): tamaños {sizes}, importadores {importers}")
+        report = run_suite(backend, sizes, importers,
+                           workers=int(options['workers']) if options.get('workers') else None,
+                           database=options.get('database'), seed=int(options.get('seed') or 1),
+                           repeat=int(options.get('repeat') or 1))
+        os.makedirs(os.path.join(BENCH_DIR, 'results'), exist_ok=True)
+        out = options.get('out') or os.path.join(
+            BENCH_DIR, 'results', f"import_{backend}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        with open(out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Resultados en {out}")
+
+        if 'save-baseline' in options:
+            with open(baseline_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+            print(f"📌 Línea base actualizada: {baseline_path}")
+        elif os.path.exists(baseline_path):
+            with open(baseline_path, 'r', encoding='utf-8') as f:
+                regressions = compare(report, json.load(f), threshold)
+            print_regressions(regressions, threshold)
+            sys.exit(1 if regressions else 0)
+        else:
+            print(f"ℹ️ Sin línea base en {baseline_path} (créala con --save-baseline)")
+    elif command == 'compare' and args:
+        if not os.path.exists(baseline_path):
+            raise SystemExit(f"❌ Sin línea base en {baseline_path} (créala con run --save-baseline)")
+        with open(args[0], 'r', encoding='utf-8') as f:
+            current = json.load(f)
+        with open(baseline_path, 'r', encoding='utf-8') as f:
+            regressions = compare(current, json.load(f), threshold)
+        print_regressions(regressions, threshold)
+        sys.exit(1 if regressions else 0)
+    else:
+        print("Uso: python import_benchmark.py run [--backend=sqlite|mysql] [--sizes=...] | compare resultados.json")
@@ -0,0 +1,91 @@
+"""
+Diario de checkpoints para importaciones reanudables
+Después de cada lote confirmado (commit) el importador guarda la posición del
+export (índice, ID de conversación y offset en bytes); al reiniciar continúa
+desde ahí en lugar de volver a leer todo el archivo.
+"""
+import json
+import os
+import time
+from typing import Any, Dict, Optional
+
+CHECKPOINT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'checkpoints')
+
+
+class ImportCheckpoint:
+    """Checkpoint persistente de un importador para un export concreto.
+
+    El archivo se identifica por nombre del importador y guarda también la
+    identidad del export (ruta, tamaño y fecha de modificación): un checkpoint
+    de otro export se ignora. La escritura es atómica (archivo temporal +
+    os.replace), así que un corte a mitad de escritura no lo corrompe.
+    """
+
+    def __init__(self, name: str, export_path: str, directory: Optional[str] = None):
+        self.name = name
+        self.export_path = os.path.abspath(export_path)
+        self.directory = directory or CHECKPOINT_DIR
+        self.path = os.path.join(self.directory, f'{name}.json')
+        self.state: Dict[str, Any] = {}
+
+    def _export_identity(self) -> Dict[str, Any]:
+        stat = os.stat(self.export_path)
+        return {
+            'export_path': self.export_path,
+            'export_size': stat.st_size,
+            'export_mtime': int(stat.st_mtime),
+        }
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """Devuelve el estado guardado si corresponde al mismo export, o None"""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"  ⚠️ Checkpoint ilegible ({self.path}): {e}")
+            return None
+
+        identity = self._export_identity()
+        if any(state.get(key) != value for key, value in identity.items()):
+            print(f"  ⚠️ El checkpoint {self.path} es de otro export, se ignora")
+            return None
+
+        self.state = state
+        return state
+
+    @property
+    def offset(self) -> int:
+        return self.state.get('offset', 0)
+
+    @property
+    def index(self) -> int:
+        return self.state.get('index', 0)
+
+    def save(self, index: int, offset: int, conversation_id: Optional[str] = None, **stats) -> None:
+        """Guarda la posición del último lote confirmado"""
+        state = self._export_identity()
+        state.update({
+            'importer': self.name,
+            'index': index,
+            'offset': offset,
+            'conversation_id': conversation_id,
+            'saved_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'stats': stats,
+        })
+
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.state = state
+
+    def clear(self) -> None:
+        """Elimina el checkpoint al terminar la importación completa"""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.state = {}
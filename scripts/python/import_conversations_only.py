@@ -1,42 +1,79 @@
 #!/usr/bin/env python3
 # Importar conversaciones desde conversations.json a la base remota
 
-import mysql.connector
-import json
 import os
+import sys
 import uuid
 from datetime import datetime
-from collections import defaultdict
+from collections import Counter, defaultdict
+from conversations_stream import default_export_path, export_size, iter_conversations
+from bulk_loader import BulkLoader
+from search_index import ensure_fulltext_indexes
+from stats_rollup import StatsDelta, ensure_stats_table, rebuild_stats, stats_initialized
+from project_counters import print_drift_report, reconcile_project_counters
+from import_metrics import ImportMetrics
+from db_pool import connect
 
-def import_conversations_from_json():
+# Columnas de conversations en el orden de las filas del batch (created_at se completa con NOW())
+CONVERSATION_COLUMNS = (
+    'id', 'project_id', 'title', 'conversation_id',
+    'create_time', 'update_time',
+    'is_archived', 'is_starred', 'default_model_slug',
+    'gizmo_id', 'conversation_origin', 'chatgpt_gizmo_id', 'openai_thread_id'
+)
+
+def conversation_row(conv, conv_id, project_id):
+    """Fila de conversations (en el orden de CONVERSATION_COLUMNS) para una conversación del export"""
+    # Preparar datos de la conversación
+    title = (conv.get('title') or 'Sin título')[:500]
+    conversation_id = conv.get('conversation_id') or conv_id
+    create_time = conv.get('create_time', 0)
+    update_time = conv.get('update_time', 0)
+    gizmo_id = conv.get('gizmo_id')
+    
+    # Datos adicionales
+    is_archived = 1 if conv.get('is_archived', False) else 0
+    default_model = conv.get('default_model_slug', 'gpt-4')
+    
+    return (
+        conv_id, project_id, title, conversation_id,
+        create_time, update_time,
+        is_archived, 0, default_model,  # is_starred = 0 por defecto
+        gizmo_id, 'chatgpt', gizmo_id, None  # conversation_origin, chatgpt_gizmo_id, openai_thread_id
+    )
+
+_PROJECT = CONVERSATION_COLUMNS.index('project_id')
+_MODEL = CONVERSATION_COLUMNS.index('default_model_slug')
+_CREATE_TIME = CONVERSATION_COLUMNS.index('create_time')
+
+def add_conversation_stats(stats, rows):
+    """Suma a stats_rollup conversaciones nuevas (filas en el orden de CONVERSATION_COLUMNS), aún sin mensajes"""
+    for row in rows:
+        stats.add_conversation(row[0], row[_PROJECT], row[_MODEL], row[_CREATE_TIME], Counter())
+
+def import_conversations_from_json(export_path=None, bulk_load=False):
+    metrics = None
     try:
-        # Leer credenciales
-        config_path = os.path.join(os.path.dirname(__file__), 'db_config.json')
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-        
-        # Cargar conversations.json
-        conversations_file = os.path.join(os.path.dirname(__file__), 'extracted', 'conversations.json')
-        print(f"📋 Cargando conversaciones desde {conversations_file}...")
-        
-        with open(conversations_file, 'r', encoding='utf-8') as f:
-            conversations_data = json.load(f)
-        
-        print(f"✅ Cargadas {len(conversations_data)} conversaciones del JSON")
-        
-        # Conectar a base remota
-        connection = mysql.connector.connect(
-            host=config['host'],
-            port=config['port'],
-            database=config['database'],
-            user=config['user'],
-            password=config['password'],
-            charset='utf8mb4',
-            autocommit=False  # Usar transacciones para mejor rendimiento
+        # Leer conversations.json (o el ZIP del export) en streaming
+        conversations_file = export_path or default_export_path(os.path.dirname(__file__))
+        metrics = ImportMetrics('import_conversations_only', conversations_file)
+        print(f"📋 Leyendo conversaciones desde {conversations_file}...")
+        
+        # Conectar a base remota (configuración del .env)
+        connection = connect(
+            autocommit=False,  # Usar transacciones para mejor rendimiento
+            allow_local_infile=bulk_load
         )
         
         cursor = connection.cursor()
         
+        # Los deltas de estadísticas solo tienen sentido sobre una tabla ya calculada
+        ensure_stats_table(cursor)
+        if not stats_initialized(cursor):
+            print(f"📊 Calculando estadísticas iniciales...")
+            rebuild_stats(cursor)
+            connection.commit()
+        
         # 1. OBTENER mapeo de gizmo_ids a project_ids
         print(f"\n🎯 Obteniendo mapeo de gizmo_ids a proyectos...")
         
@@ -58,53 +95,40 @@ def import_conversations_from_json():
             project_name = project_names[project_id]
             print(f"    {i+1}. {gizmo_id[:20]}... -> Proyecto {project_id} ({project_name})")
         
-        # 2. ANALIZAR conversaciones por gizmo_id
-        print(f"\n📈 Analizando distribución de conversaciones...")
-        
+        # 2. PREPARAR proyecto por defecto (se crea al encontrar la primera conversación sin gizmo_id)
+        default_project_id = None
         gizmo_stats = defaultdict(int)
         no_gizmo_count = 0
         
-        for conv in conversations_data:
-            gizmo_id = conv.get('gizmo_id')
-            if gizmo_id:
-                gizmo_stats[gizmo_id] += 1
-            else:
-                no_gizmo_count += 1
-        
-        print(f"  🎯 Conversaciones con gizmo_id: {len(conversations_data) - no_gizmo_count:,}")
-        print(f"  ❓ Conversaciones sin gizmo_id: {no_gizmo_count:,}")
-        print(f"  📊 Gizmo_ids únicos: {len(gizmo_stats)}")
-        
-        # Top 10 gizmos por cantidad de conversaciones
-        top_gizmos = sorted(gizmo_stats.items(), key=lambda x: x[1], reverse=True)[:10]
-        print(f"\n🏆 Top 10 gizmo_ids por conversaciones:")
-        for i, (gizmo_id, count) in enumerate(top_gizmos, 1):
-            project_id = gizmo_to_project.get(gizmo_id, 'Sin proyecto')
-            project_name = project_names.get(project_id, 'Desconocido') if isinstance(project_id, int) else 'Sin mapear'
-            print(f"    {i:2d}. {gizmo_id[:25]:<25} | {count:4d} conv | {project_name}")
-        
-        # 3. CREAR proyecto por defecto para conversaciones sin gizmo_id
-        default_project_id = None
-        if no_gizmo_count > 0:
-            print(f"\n📁 Creando proyecto por defecto para conversaciones sin gizmo_id...")
-            
-            cursor.execute("""
-                INSERT INTO projects (name, description, is_starred, created_at)
-                VALUES (%s, %s, %s, NOW())
-            """, ('Conversaciones Generales', 'Conversaciones sin proyecto específico asignado', 0))
-            
-            default_project_id = cursor.lastrowid
-            print(f"  ✨ Proyecto por defecto creado: ID {default_project_id}")
-        
-        # 4. IMPORTAR conversaciones
+        # 3. IMPORTAR conversaciones
         print(f"\n💬 Importando conversaciones...")
         
         imported_count = 0
         skipped_count = 0
         batch_size = 100
         batch_data = []
-        
-        for i, conv in enumerate(conversations_data):
+        # Contadores de stats_rollup: se aplican en la misma transacción que las conversaciones
+        stats = StatsDelta()
+        
+        # Modo carga masiva: TSV temporal + LOAD DATA LOCAL INFILE en lugar de executemany
+        loader = None
+        if bulk_load:
+            loader = BulkLoader(cursor, 'conversations', CONVERSATION_COLUMNS, set_clause='created_at = NOW()')
+            print(f"  🚚 Carga masiva con LOAD DATA LOCAL INFILE")
+        
+        for i, conv in enumerate(metrics.timed_iter(iter_conversations(conversations_file), 'parse')):
+            # La carga masiva se envía fuera del try para que un fallo aborte la importación
+            if loader and loader.is_full():
+                with metrics.phase('write'):
+                    loader.flush()
+                with metrics.phase('stats'):
+                    stats.apply(cursor)
+                with metrics.phase('commit'):
+                    connection.commit()
+                metrics.set('rows', loader.loaded)
+                metrics.progress()
+                print(f"    💬 {loader.loaded:,} conversaciones importadas...")
+            
             try:
                 # Generar ID único
                 conv_id = conv.get('id') or str(uuid.uuid4())
@@ -113,46 +137,60 @@ def import_conversations_from_json():
                 gizmo_id = conv.get('gizmo_id')
                 project_id = None
                 
+                if gizmo_id:
+                    gizmo_stats[gizmo_id] += 1
+                else:
+                    no_gizmo_count += 1
+                
                 if gizmo_id and gizmo_id in gizmo_to_project:
                     project_id = gizmo_to_project[gizmo_id]
                 else:
+                    if default_project_id is None:
+                        print(f"\n📁 Creando proyecto por defecto para conversaciones sin proyecto...")
+                        cursor.execute("""
+                            INSERT INTO projects (name, description, is_starred, created_at)
+                            VALUES (%s, %s, %s, NOW())
+                        """, ('Conversaciones Generales', 'Conversaciones sin proyecto específico asignado', 0))
+                        default_project_id = cursor.lastrowid
+                        print(f"  ✨ Proyecto por defecto creado: ID {default_project_id}")
                     project_id = default_project_id
                 
-                # Preparar datos de la conversación
-                title = (conv.get('title') or 'Sin título')[:500]
-                conversation_id = conv.get('conversation_id') or conv_id
-                create_time = conv.get('create_time', 0)
-                update_time = conv.get('update_time', 0)
+                # Agregar al batch
+                with metrics.phase('transform'):
+                    row = conversation_row(conv, conv_id, project_id)
                 
-                # Datos adicionales
-                is_archived = 1 if conv.get('is_archived', False) else 0
-                default_model = conv.get('default_model_slug', 'gpt-4')
+                if loader:
+                    loader.add(row)
+                    add_conversation_stats(stats, [row])
+                    continue
                 
-                # Agregar al batch
-                batch_data.append((
-                    conv_id, project_id, title, conversation_id,
-                    create_time, update_time,
-                    is_archived, 0, default_model,  # is_starred = 0 por defecto
-                    gizmo_id, 'chatgpt', gizmo_id, None  # conversation_origin, chatgpt_gizmo_id, openai_thread_id
-                ))
+                batch_data.append(row)
                 
                 # Ejecutar batch cuando esté lleno
                 if len(batch_data) >= batch_size:
-                    cursor.executemany("""
-                        INSERT INTO conversations (
-                            id, project_id, title, conversation_id,
-                            create_time, update_time, created_at,
-                            is_archived, is_starred, default_model_slug,
-                            gizmo_id, conversation_origin, chatgpt_gizmo_id, openai_thread_id
-                        ) VALUES (%s, %s, %s, %s, %s, %s, NOW(), %s, %s, %s, %s, %s, %s, %s)
-                    """, batch_data)
+                    with metrics.phase('write'):
+                        cursor.executemany("""
+                            INSERT INTO conversations (
+                                id, project_id, title, conversation_id,
+                                create_time, update_time, created_at,
+                                is_archived, is_starred, default_model_slug,
+                                gizmo_id, conversation_origin, chatgpt_gizmo_id, openai_thread_id
+                            ) VALUES (%s, %s, %s, %s, %s, %s, NOW(), %s, %s, %s, %s, %s, %s, %s)
+                        """, batch_data)
                     
+                    # Solo lo que llegó a la BD cuenta en las estadísticas
+                    add_conversation_stats(stats, batch_data)
                     imported_count += len(batch_data)
                     batch_data = []
                     
                     # Commit periódico para evitar locks largos
                     if imported_count % 1000 == 0:
-                        connection.commit()
+                        with metrics.phase('stats'):
+                            stats.apply(cursor)
+                        with metrics.phase('commit'):
+                            connection.commit()
+                        metrics.set('rows', imported_count)
+                        metrics.progress()
                         print(f"    💬 {imported_count:,} conversaciones importadas...")
                 
             except Exception as e:
@@ -161,41 +199,67 @@ def import_conversations_from_json():
                     print(f"    ⚠️ Error en conversación {i+1}: {e}")
         
         # Ejecutar batch final
-        if batch_data:
-            cursor.executemany("""
-                INSERT INTO conversations (
-                    id, project_id, title, conversation_id,
-                    create_time, update_time, created_at,
-                    is_archived, is_starred, default_model_slug,
-                    gizmo_id, conversation_origin, chatgpt_gizmo_id, openai_thread_id
-                ) VALUES (%s, %s, %s, %s, %s, %s, NOW(), %s, %s, %s, %s, %s, %s, %s)
-            """, batch_data)
-            imported_count += len(batch_data)
+        with metrics.phase('write'):
+            if loader:
+                loader.close()
+                imported_count = loader.loaded
+            elif batch_data:
+                cursor.executemany("""
+                    INSERT INTO conversations (
+                        id, project_id, title, conversation_id,
+                        create_time, update_time, created_at,
+                        is_archived, is_starred, default_model_slug,
+                        gizmo_id, conversation_origin, chatgpt_gizmo_id, openai_thread_id
+                    ) VALUES (%s, %s, %s, %s, %s, %s, NOW(), %s, %s, %s, %s, %s, %s, %s)
+                """, batch_data)
+                add_conversation_stats(stats, batch_data)
+                imported_count += len(batch_data)
         
         # Commit final
-        connection.commit()
+        with metrics.phase('stats'):
+            stats.apply(cursor)
+        with metrics.phase('commit'):
+            connection.commit()
+        
+        # Índice de búsqueda sobre los títulos (se crea si falta)
+        with metrics.phase('index'):
+            ensure_fulltext_indexes(cursor, tables=['conversations'])
         
         print(f"\n✅ Importación de conversaciones completada:")
         print(f"  💬 Conversaciones importadas: {imported_count:,}")
         print(f"  ⚠️ Conversaciones omitidas: {skipped_count:,}")
         
-        # 5. ACTUALIZAR contadores en proyectos
+        # Distribución de conversaciones por gizmo_id
+        print(f"\n📈 Distribución de conversaciones:")
+        print(f"  🎯 Conversaciones con gizmo_id: {sum(gizmo_stats.values()):,}")
+        print(f"  ❓ Conversaciones sin gizmo_id: {no_gizmo_count:,}")
+        print(f"  📊 Gizmo_ids únicos: {len(gizmo_stats)}")
+        
+        # Top 10 gizmos por cantidad de conversaciones
+        top_gizmos = sorted(gizmo_stats.items(), key=lambda x: x[1], reverse=True)[:10]
+        print(f"\n🏆 Top 10 gizmo_ids por conversaciones:")
+        for i, (gizmo_id, count) in enumerate(top_gizmos, 1):
+            project_id = gizmo_to_project.get(gizmo_id, 'Sin proyecto')
+            project_name = project_names.get(project_id, 'Desconocido') if isinstance(project_id, int) else 'Sin mapear'
+            print(f"    {i:2d}. {gizmo_id[:25]:<25} | {count:4d} conv | {project_name}")
+        
+        # 4. ACTUALIZAR contadores en proyectos
         print(f"\n🔄 Actualizando contadores de proyectos...")
         
-        cursor.execute("""
-            UPDATE projects p 
-            SET conversation_count = (
-                SELECT COUNT(*) FROM conversations c 
-                WHERE c.project_id = p.id
-            )
-        """)
+        with metrics.phase('stats'):
+            drift = reconcile_project_counters(cursor)
+        print_drift_report(drift, limit=10)
         
-        affected_projects = cursor.rowcount
-        connection.commit()
+        affected_projects = len(drift)
+        with metrics.phase('commit'):
+            connection.commit()
         
         print(f"  ✅ {affected_projects} proyectos actualizados")
+        metrics.set('rows', imported_count)
+        metrics.set('bytes', export_size(conversations_file) or 0)
+        metrics.print_summary(metrics.close(skipped=skipped_count))
         
-        # 6. ESTADÍSTICAS FINALES
+        # 5. ESTADÍSTICAS FINALES
         print(f"\n📊 Estadísticas finales:")
         
         cursor.execute("SELECT COUNT(*) FROM conversations")
@@ -238,9 +302,13 @@ def import_conversations_from_json():
         
     except Exception as e:
         print(f"❌ Error: {e}")
+        if metrics:
+            metrics.close(status='error', error=str(e))
         import traceback
         traceback.print_exc()
         return False
 
 if __name__ == "__main__":
-    import_conversations_from_json()
\ No newline at end of file
+    # Uso: python import_conversations_only.py [conversations.json | export.zip] [--bulk]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    import_conversations_from_json(args[0] if args else None, bulk_load='--bulk' in sys.argv)
\ No newline at end of file
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# Importación incremental: solo conversaciones nuevas o modificadas según update_time
+
+import os
+import sys
+import time
+import uuid
+from conversations_stream import ConversationStream, default_export_path, open_export
+from message_extraction import DEDUP_MESSAGE_COLUMNS, MESSAGE_COLUMNS, extract_message_rows
+from content_store import ContentStore, content_store_enabled, ensure_content_store
+from import_conversations_only import CONVERSATION_COLUMNS, conversation_row
+from import_checkpoint import ImportCheckpoint
+from import_metrics import ImportMetrics
+from search_index import ensure_fulltext_indexes, optimize_fulltext
+from search_sidecar import DEFAULT_SIDECAR, SidecarWriter, load_project_mapping, open_sidecar, sidecar_rows
+from stats_rollup import (StatsDelta, ensure_stats_table, message_groups, rebuild_stats,
+                          stats_initialized, stored_message_groups)
+from db_pool import connect
+
+# update_time se guarda como decimal(20,6): comparar con esa precisión
+UPDATE_TIME_TOLERANCE = 1e-6
+COMMIT_EVERY = 200  # conversaciones por transacción
+OPTIMIZE_AFTER_DELETES = 10000  # mensajes reescritos a partir de los cuales se reorganiza el índice FULLTEXT
+
+DEFAULT_PROJECT_NAME = 'Conversaciones Generales'
+
+# Al reescribir una conversación no se pisan los datos propios de la BD
+# (is_starred lo marca el usuario y openai_thread_id lo escribe la sincronización)
+_UPSERT_COLUMNS = ('project_id', 'title', 'conversation_id', 'create_time', 'update_time',
+                   'is_archived', 'default_model_slug', 'gizmo_id', 'chatgpt_gizmo_id')
+
+UPSERT_CONVERSATION_SQL = f"""
+    INSERT INTO conversations ({', '.join(CONVERSATION_COLUMNS)}, created_at)
+    VALUES ({', '.join(['%s'] * len(CONVERSATION_COLUMNS))}, NOW())
+    ON DUPLICATE KEY UPDATE {', '.join(f'{col} = VALUES({col})' for col in _UPSERT_COLUMNS)}
+"""
+
+_MODEL = CONVERSATION_COLUMNS.index('default_model_slug')
+_CREATE_TIME = CONVERSATION_COLUMNS.index('create_time')
+
+INSERT_MESSAGES_SQL = f"""
+    INSERT INTO messages ({', '.join(MESSAGE_COLUMNS)}, created_at)
+    VALUES ({', '.join(['%s'] * len(MESSAGE_COLUMNS))}, NOW())
+"""
+
+INSERT_DEDUP_MESSAGES_SQL = f"""
+    INSERT INTO messages ({', '.join(DEDUP_MESSAGE_COLUMNS)}, created_at)
+    VALUES ({', '.join(['%s'] * len(DEDUP_MESSAGE_COLUMNS))}, NOW())
+"""
+
+
+def load_stored_update_times(cursor):
+    """Devuelve {id: update_time} de las conversaciones ya guardadas"""
+    cursor.execute("SELECT id, update_time FROM conversations")
+    return {conv_id: float(update_time) if update_time is not None else None
+            for conv_id, update_time in cursor.fetchall()}
+
+
+def classify_conversation(conv_id, update_time, stored_update_times):
+    """'new', 'changed' o 'unchanged' comparando update_time del export con el guardado"""
+    if conv_id not in stored_update_times:
+        return 'new'
+    stored = stored_update_times[conv_id]
+    if stored is None or update_time is None:
+        return 'changed' if stored != update_time else 'unchanged'
+    if float(update_time) > stored + UPDATE_TIME_TOLERANCE:
+        return 'changed'
+    return 'unchanged'
+
+
+def refresh_sidecar(sidecar, projects, conv, conv_id, rows):
+    """Reemplaza la conversación en el índice local con las filas ya extraídas"""
+    sidecar.replace_conversation(conv_id, conv.get('title') or '', projects.get(conv_id), conv.get('update_time'))
+    sidecar.add_messages(sidecar_rows(rows))
+
+
+def import_incremental(export_path=None, resume=True, dedup=False):
+    metrics = None
+    try:
+        conversations_file = export_path or default_export_path(os.path.dirname(__file__))
+        metrics = ImportMetrics('import_incremental', conversations_file)
+        conversations_fp, total_bytes = open_export(conversations_file)
+        print(f"📋 Importación incremental desde {conversations_file} ({total_bytes or 0:,} bytes)...")
+
+        connection = connect(autocommit=False)
+
+        cursor = connection.cursor()
+
+        # Los deltas de estadísticas solo tienen sentido sobre una tabla ya calculada
+        ensure_stats_table(cursor)
+        if not stats_initialized(cursor):
+            print(f"📊 Calculando estadísticas iniciales...")
+            rebuild_stats(cursor)
+            connection.commit()
+
+        # Almacén de contenidos: cada cuerpo largo se guarda una sola vez (si ya está en uso o con --dedup)
+        store = None
+        if dedup or content_store_enabled(cursor):
+            ensure_content_store(cursor)
+            store = ContentStore(cursor)
+            print(f"📦 Cuerpos largos deduplicados en message_contents")
+        insert_messages_sql = INSERT_DEDUP_MESSAGES_SQL if store else INSERT_MESSAGES_SQL
+
+        # 1. ESTADO guardado: update_time por conversación y mapeo gizmo -> proyecto
+        print(f"\n🔍 Leyendo estado guardado...")
+
+        stored_update_times = load_stored_update_times(cursor)
+        print(f"  💬 {len(stored_update_times):,} conversaciones en BD")
+
+        cursor.execute("SELECT id, chatgpt_project_id FROM projects WHERE chatgpt_project_id IS NOT NULL")
+        gizmo_to_project = {gizmo_id: project_id for project_id, gizmo_id in cursor.fetchall()}
+        print(f"  📁 {len(gizmo_to_project)} proyectos con gizmo_id mapeados")
+
+        cursor.execute("SELECT id FROM projects WHERE name = %s", (DEFAULT_PROJECT_NAME,))
+        row = cursor.fetchone()
+        default_project_id = row[0] if row else None
+
+        # 2. COMPARAR y reescribir solo lo nuevo o modificado
+        print(f"\n🔄 Comparando update_time del export con la BD...")
+
+        counts = {'new': 0, 'changed': 0, 'unchanged': 0}
+        messages_written = 0
+        messages_deleted = 0
+        pending_commit = 0
+        start_time = time.time()
+        # Contadores de stats_rollup: se aplican en la misma transacción que los mensajes
+        stats = StatsDelta()
+
+        # Checkpoint: al reanudar se saltan las conversaciones ya confirmadas
+        checkpoint = ImportCheckpoint('import_incremental', conversations_file)
+        resumed = resume and checkpoint.load()
+        if resumed:
+            saved = checkpoint.state['stats']
+            counts.update(saved.get('counts', {}))
+            messages_written = saved.get('messages_written', 0)
+            messages_deleted = saved.get('messages_deleted', 0)
+            print(f"  ⏯️ Reanudando desde la conversación #{checkpoint.index:,} (byte {checkpoint.offset:,})")
+
+        stream = ConversationStream(conversations_fp, start_offset=checkpoint.offset, start_index=checkpoint.index)
+
+        # Índice local SQLite: se mantiene al día (solo si ya se generó alguna vez) en la misma pasada,
+        # con las filas que se extraen para MySQL, sin volver a leer el export
+        sidecar = sidecar_projects = None
+        if os.path.exists(DEFAULT_SIDECAR):
+            sidecar = SidecarWriter(open_sidecar(DEFAULT_SIDECAR))
+            sidecar_projects = load_project_mapping()
+            print(f"  🔎 Índice local {os.path.basename(DEFAULT_SIDECAR)} se actualiza en la misma pasada")
+
+        for conv in metrics.timed_iter(stream, 'parse'):
+            conv_id = conv.get('id') or str(uuid.uuid4())
+            status = classify_conversation(conv_id, conv.get('update_time'), stored_update_times)
+            counts[status] += 1
+            # El índice local compara su propio update_time: puede estar atrasado respecto a la BD
+            sidecar_stale = sidecar is not None and sidecar.needs_update(conv_id, conv.get('update_time'))
+
+            if status == 'unchanged':
+                if sidecar_stale:
+                    with metrics.phase('transform'):
+                        rows, _errors = extract_message_rows(conv_id, conv.get('mapping') or {},
+                                                             conv.get('current_node'))
+                    with metrics.phase('sidecar'):
+                        refresh_sidecar(sidecar, sidecar_projects, conv, conv_id, rows)
+                continue
+
+            # Determinar project_id
+            gizmo_id = conv.get('gizmo_id')
+            project_id = gizmo_to_project.get(gizmo_id) if gizmo_id else None
+            if project_id is None:
+                if default_project_id is None:
+                    cursor.execute("""
+                        INSERT INTO projects (name, description, is_starred, created_at)
+                        VALUES (%s, %s, %s, NOW())
+                    """, (DEFAULT_PROJECT_NAME, 'Conversaciones sin proyecto específico asignado', 0))
+                    default_project_id = cursor.lastrowid
+                    print(f"  ✨ Proyecto por defecto creado: ID {default_project_id}")
+                project_id = default_project_id
+
+            # Una conversación modificada se reescribe completa: el árbol de mensajes puede haber cambiado.
+            # Antes se descuenta de las estadísticas lo que aportaba la versión guardada.
+            if status == 'changed':
+                with metrics.phase('write'):
+                    cursor.execute("SELECT project_id, default_model_slug, create_time FROM conversations WHERE id = %s",
+                                   (conv_id,))
+                    old_project_id, old_model, old_create_time = cursor.fetchone()
+                    stats.add_conversation(conv_id, old_project_id, old_model, old_create_time,
+                                           stored_message_groups(cursor, conv_id), sign=-1)
+                    cursor.execute("DELETE FROM messages WHERE conversation_id = %s", (conv_id,))
+                    messages_deleted += cursor.rowcount
+
+            with metrics.phase('transform'):
+                row = conversation_row(conv, conv_id, project_id)
+                rows, errors = extract_message_rows(conv_id, conv.get('mapping') or {}, conv.get('current_node'),
+                                                    dedup=store is not None)
+            for msg_id, error in errors[:5]:
+                print(f"    ⚠️ Error en mensaje {msg_id}: {error}")
+            if sidecar_stale:
+                # Antes de prepare(): con el almacén, las filas pierden el texto de los cuerpos largos
+                with metrics.phase('sidecar'):
+                    refresh_sidecar(sidecar, sidecar_projects, conv, conv_id, rows)
+            if store:
+                rows = store.prepare(rows)
+            with metrics.phase('write'):
+                cursor.execute(UPSERT_CONVERSATION_SQL, row)
+                if rows:
+                    cursor.executemany(insert_messages_sql, rows)
+            messages_written += len(rows)
+            stats.add_conversation(conv_id, project_id, row[_MODEL], row[_CREATE_TIME], message_groups(rows))
+
+            pending_commit += 1
+            if pending_commit >= COMMIT_EVERY:
+                if store:
+                    with metrics.phase('write'):
+                        store.flush()
+                with metrics.phase('stats'):
+                    stats.apply(cursor)
+                if sidecar:
+                    # Antes que MySQL: al reanudar tras el checkpoint el índice local no puede quedar atrás
+                    with metrics.phase('sidecar'):
+                        sidecar.commit()
+                with metrics.phase('commit'):
+                    connection.commit()
+                    checkpoint.save(stream.index, stream.offset, conv_id, counts=counts,
+                                    messages_written=messages_written, messages_deleted=messages_deleted)
+                pending_commit = 0
+                metrics.set('rows', messages_written)
+                metrics.set('bytes', stream.offset)
+                metrics.set('conversations', counts['new'] + counts['changed'])
+                metrics.progress()
+                progress = stream.offset / total_bytes * 100 if total_bytes else 0
+                print(f"    🔄 {counts['new']:,} nuevas | {counts['changed']:,} modificadas | "
+                      f"{messages_written:,} mensajes ({progress:.1f}%)")
+
+        if store:
+            with metrics.phase('write'):
+                store.flush()
+        with metrics.phase('stats'):
+            stats.apply(cursor)
+        if sidecar:
+            # Las conversaciones que ya no están en el export solo se conocen tras una pasada completa
+            with metrics.phase('sidecar'):
+                sidecar_stats = sidecar.finish(prune=not resumed)
+                sidecar.db.close()
+        with metrics.phase('commit'):
+            connection.commit()
+        conversations_fp.close()
+        checkpoint.clear()
+
+        # Índice de búsqueda: crear si falta y reorganizar tras muchas reescrituras
+        with metrics.phase('index'):
+            ensure_fulltext_indexes(cursor)
+            if messages_deleted >= OPTIMIZE_AFTER_DELETES:
+                print(f"\n🔎 Optimizando índice FULLTEXT ({messages_deleted:,} mensajes reescritos)...")
+                optimize_fulltext(cursor)
+
+        elapsed = time.time() - start_time
+        total = sum(counts.values())
+        rewritten = counts['new'] + counts['changed']
+
+        print(f"\n✅ Importación incremental completada en {elapsed:.1f}s:")
+        print(f"  💬 Conversaciones en el export: {total:,}")
+        print(f"  ✨ Nuevas: {counts['new']:,}")
+        print(f"  🔄 Modificadas: {counts['changed']:,}")
+        print(f"  ⏭️ Sin cambios (omitidas): {counts['unchanged']:,}")
+        if total:
+            print(f"  📊 Trabajo realizado: {rewritten / total * 100:.1f}% de las conversaciones")
+        print(f"  💌 Mensajes escritos: {messages_written:,} (eliminados antes de reescribir: {messages_deleted:,})")
+        if sidecar:
+            print(f"  🔎 Índice local: {sidecar_stats['conversations']:,} conversaciones reindexadas, "
+                  f"{sidecar_stats['removed']:,} eliminadas")
+        if store:
+            print(f"  📦 Almacén de contenidos: {store.summary()}")
+            if messages_deleted:
+                print(f"  ℹ️ Los cuerpos que solo usaban los mensajes reescritos se borran con: python content_store.py gc")
+
+        metrics.set('rows', messages_written)
+        metrics.set('bytes', stream.offset)
+        metrics.set('conversations', rewritten)
+        metrics.print_summary(metrics.close(unchanged=counts['unchanged'], messages_deleted=messages_deleted))
+
+        cursor.close()
+        connection.close()
+        return True
+
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        if metrics:
+            metrics.close(status='error', error=str(e))
+        import traceback
+        traceback.print_exc()
+        return False
+
+if __name__ == "__main__":
+    # Uso: python import_incremental.py [conversations.json | export.zip] [--restart] [--dedup]
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    import_incremental(args[0] if args else None, resume='--restart' not in sys.argv, dedup='--dedup' in sys.argv)
@@ -1,41 +1,52 @@
 #!/usr/bin/env python3
 # Importar mensajes desde conversations.json (Segunda etapa)
 
-import mysql.connector
-import json
 import os
+import sys
 import uuid
 from datetime import datetime
+from conversations_stream import ConversationStream, default_export_path, open_export
+from message_extraction import DEDUP_MESSAGE_COLUMNS, MESSAGE_COLUMNS, default_workers, iter_extracted_rows
+from bulk_loader import BulkLoader
+from content_store import ContentStore, content_store_enabled, ensure_content_store
+from import_checkpoint import ImportCheckpoint
+from import_metrics import ImportMetrics
+from search_index import drop_fulltext_indexes, ensure_fulltext_indexes
+from stats_rollup import StatsDelta, ensure_stats_table, rebuild_stats, stats_initialized
+from db_pool import connect
 
-def import_messages_from_json():
+def import_messages_from_json(export_path=None, workers=None, bulk_load=False, resume=True, dedup=False):
+    metrics = None
     try:
-        # Leer credenciales
-        config_path = os.path.join(os.path.dirname(__file__), 'db_config.json')
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-        
-        # Cargar conversations.json
-        conversations_file = os.path.join(os.path.dirname(__file__), 'extracted', 'conversations.json')
-        print(f"📋 Cargando mensajes desde {conversations_file}...")
-        
-        with open(conversations_file, 'r', encoding='utf-8') as f:
-            conversations_data = json.load(f)
-        
-        print(f"✅ Cargadas {len(conversations_data)} conversaciones del JSON")
-        
-        # Conectar a base remota
-        connection = mysql.connector.connect(
-            host=config['host'],
-            port=config['port'],
-            database=config['database'],
-            user=config['user'],
-            password=config['password'],
-            charset='utf8mb4',
-            autocommit=False  # Usar transacciones para mejor rendimiento
+        # Leer conversations.json (o el ZIP del export) en streaming
+        conversations_file = export_path or default_export_path(os.path.dirname(__file__))
+        metrics = ImportMetrics('import_messages_only', conversations_file)
+        conversations_fp, total_bytes = open_export(conversations_file)
+        print(f"📋 Leyendo mensajes desde {conversations_file} ({total_bytes or 0:,} bytes)...")
+        
+        # Conectar a base remota (configuración del .env)
+        connection = connect(
+            autocommit=False,  # Usar transacciones para mejor rendimiento
+            allow_local_infile=bulk_load
         )
         
         cursor = connection.cursor()
         
+        # Los deltas de estadísticas solo tienen sentido sobre una tabla ya calculada
+        ensure_stats_table(cursor)
+        if not stats_initialized(cursor):
+            print(f"📊 Calculando estadísticas iniciales...")
+            rebuild_stats(cursor)
+            connection.commit()
+        
+        # Almacén de contenidos: cada cuerpo largo se guarda una sola vez (si ya está en uso o con --dedup)
+        store = None
+        if dedup or content_store_enabled(cursor):
+            ensure_content_store(cursor)
+            store = ContentStore(cursor)
+            print(f"📦 Cuerpos largos deduplicados en message_contents")
+        columns = DEDUP_MESSAGE_COLUMNS if store else MESSAGE_COLUMNS
+        
         # 1. VERIFICAR conversaciones existentes en BD
         print(f"\n🔍 Verificando conversaciones existentes en BD...")
         
@@ -49,143 +60,199 @@ def import_messages_from_json():
         print(f"  💌 Mensajes existentes: {existing_messages:,}")
         
         if existing_messages > 0:
-            print(f"  ⚠️ Ya existen mensajes, se agregarán a los existentes")
+            print(f"  ⚠️ Ya existen mensajes, se agregarán a los existentes (estadísticas: se recalculan al terminar)")
         
-        # Crear set de conversation_ids válidos
-        cursor.execute("SELECT id FROM conversations")
-        valid_conversation_ids = set(row[0] for row in cursor.fetchall())
+        # conversation_ids válidos, con el proyecto y el modelo que usan las estadísticas
+        cursor.execute("SELECT id, project_id, default_model_slug FROM conversations")
+        conversation_buckets = {conv_id: (project_id, model) for conv_id, project_id, model in cursor.fetchall()}
+        valid_conversation_ids = conversation_buckets.keys()
         print(f"  📋 {len(valid_conversation_ids):,} conversation_ids válidos")
         
-        # 2. CONTAR mensajes totales a importar
-        print(f"\n📊 Analizando mensajes en conversations.json...")
-        
-        total_messages_to_import = 0
-        conversations_with_messages = 0
-        
-        for conv in conversations_data:
-            mapping = conv.get('mapping', {})
-            if mapping:
-                conversations_with_messages += 1
-                total_messages_to_import += len(mapping)
-        
-        print(f"  💬 Conversaciones con mensajes: {conversations_with_messages:,}")
-        print(f"  💌 Total mensajes a importar: {total_messages_to_import:,}")
-        
-        # 3. IMPORTAR mensajes por lotes
+        # 2. IMPORTAR mensajes por lotes
         print(f"\n💌 Importando mensajes por lotes...")
         
         imported_count = 0
         skipped_count = 0
+        total_messages_to_import = 0
+        conversations_with_messages = 0
         batch_size = 500
+        commit_every = 5000
         batch_data = []
-        
-        for conv_idx, conv in enumerate(conversations_data):
-            conv_id = conv.get('id')
+        # Contadores de stats_rollup: se aplican en la misma transacción que los mensajes
+        stats = StatsDelta()
+        
+        # Checkpoint: si una ejecución anterior se cortó, continuar desde el último commit
+        checkpoint = ImportCheckpoint('import_messages_only', conversations_file)
+        if resume and checkpoint.load():
+            imported_count = checkpoint.state['stats'].get('imported_count', 0)
+            print(f"  ⏯️ Reanudando desde la conversación #{checkpoint.index:,} "
+                  f"(byte {checkpoint.offset:,}, {imported_count:,} mensajes ya importados)")
+        
+        # Los deltas por fila solo son exactos si cada fila extraída se inserta: sobre una tabla
+        # con mensajes previos (o si LOAD DATA ignora ids repetidos) se recalcula todo al terminar
+        exact_stats = (checkpoint.state['stats'].get('exact_stats', False) if checkpoint.state
+                       else existing_messages == 0)
+        
+        # Carga inicial en una tabla vacía: el índice FULLTEXT se construye una sola vez al final
+        if existing_messages == 0 and not checkpoint.state:
+            suspended_indexes = drop_fulltext_indexes(cursor, 'messages')
+            if store:
+                suspended_indexes += drop_fulltext_indexes(cursor, 'message_contents')
+            if suspended_indexes:
+                print(f"  ⏸️ Índices FULLTEXT suspendidos durante la carga: {', '.join(suspended_indexes)}")
+        
+        stream = ConversationStream(conversations_fp, start_offset=checkpoint.offset, start_index=checkpoint.index)
+        workers = workers or default_workers()
+        print(f"  ⚙️ Extracción en paralelo con {workers} proceso(s)")
+        
+        last_conv_id = checkpoint.state.get('conversation_id')
+        
+        def conversations_to_import():
+            """Conversaciones del export que existen en BD (filtrado en el proceso principal)"""
+            nonlocal conversations_with_messages, total_messages_to_import, last_conv_id
+            for conv in metrics.timed_iter(stream, 'parse'):
+                conv_id = conv.get('id')
+                last_conv_id = conv_id
+                
+                # Verificar que la conversación existe en BD
+                if not conv_id or conv_id not in valid_conversation_ids:
+                    continue
+                
+                mapping = conv.get('mapping', {})
+                if mapping:
+                    conversations_with_messages += 1
+                    total_messages_to_import += len(mapping)
+                    yield conv
+        
+        def bulk_flush():
+            """Carga lo pendiente del loader; si el servidor omitió filas, los deltas dejan de ser exactos"""
+            nonlocal exact_stats
+            sent = loader.pending
+            with metrics.phase('write'):
+                loaded = loader.flush()
+            if loaded != sent and exact_stats:
+                print(f"    ⚠️ {sent - loaded:,} mensajes ya existían; las estadísticas se recalcularán al terminar")
+                exact_stats = False
+                stats.counters.clear()
+            return loaded
+        
+        def commit_and_checkpoint(position):
+            """Commit y registro de la posición: todo lo anterior a position ya está en BD"""
+            index, offset, conv_id = position
+            if store:
+                with metrics.phase('write'):
+                    store.flush()
+            with metrics.phase('stats'):
+                stats.apply(cursor)
+            with metrics.phase('commit'):
+                connection.commit()
+                checkpoint.save(index, offset, conv_id, imported_count=imported_count, exact_stats=exact_stats)
+            metrics.set('rows', imported_count)
+            metrics.set('bytes', offset)
+            metrics.set('conversations', conversations_with_messages)
+            metrics.progress()
+            progress = offset / total_bytes * 100 if total_bytes else 0
+            print(f"    💌 {imported_count:,} mensajes importados... ({progress:.1f}%)")
+        
+        # Modo carga masiva: TSV temporal + LOAD DATA LOCAL INFILE en lugar de executemany
+        loader = None
+        if bulk_load:
+            loader = BulkLoader(cursor, 'messages', columns, set_clause='created_at = NOW()')
+            print(f"  🚚 Carga masiva con LOAD DATA LOCAL INFILE (cada {loader.flush_rows:,} filas)")
+        
+        insert_sql = f"""
+            INSERT INTO messages ({', '.join(columns)}, created_at)
+            VALUES ({', '.join(['%s'] * len(columns))}, NOW())
+        """
+        uncommitted = 0
+        
+        # Los procesos extraen filas; este proceso es el único escritor.
+        # Los commits se hacen solo al final de una tarea, para que el checkpoint
+        # nunca apunte a mitad de una conversación.
+        # Fases: parse = leer el export, transform = extraer filas (espera a los procesos incluida)
+        for rows, errors, position in metrics.timed_iter(iter_extracted_rows(
+                conversations_to_import(), workers=workers,
+                position=lambda: (stream.index, stream.offset, last_conv_id), dedup=store is not None), 'transform'):
+            for msg_id, error in errors:
+                skipped_count += 1
+                if skipped_count <= 5:
+                    print(f"    ⚠️ Error en mensaje {msg_id}: {error}")
+            if exact_stats:
+                stats.add_message_rows(rows, conversation_buckets)
             
-            # Verificar que la conversación existe en BD
-            if not conv_id or conv_id not in valid_conversation_ids:
+            # Los cuerpos largos pasan al almacén; la fila queda con content_text NULL y el hash
+            if store:
+                rows = store.prepare(rows)
+                if store.is_full():
+                    with metrics.phase('write'):
+                        store.flush()
+            
+            if loader:
+                loader.add_many(rows)
+                if loader.is_full():
+                    imported_count += bulk_flush()
+                    commit_and_checkpoint(position)
                 continue
             
-            # Procesar mensajes de esta conversación
-            mapping = conv.get('mapping', {})
+            batch_data.extend(rows)
             
-            for msg_id, msg_data in mapping.items():
-                try:
-                    message = msg_data.get('message')
-                    if not message:
-                        continue
-                    
-                    # Extraer datos del mensaje
-                    author = message.get('author', {})
-                    author_role = author.get('role', 'user')
-                    author_name = author.get('name', '')
-                    
-                    content = message.get('content', {})
-                    content_type = content.get('content_type', 'text')
-                    
-                    # Extraer texto del contenido
-                    content_text = ""
-                    if content_type == 'text':
-                        parts = content.get('parts', [])
-                        if parts and isinstance(parts, list):
-                            # Filtrar partes válidas y unir
-                            valid_parts = [str(part).strip() for part in parts if part and str(part).strip()]
-                            content_text = '\n'.join(valid_parts)
-                    
-                    # Solo importar mensajes con contenido
-                    if not content_text:
-                        continue
-                    
-                    # Otros datos
-                    create_time = message.get('create_time', 0)
-                    status = message.get('status', 'finished_successfully')
-                    weight = message.get('weight', 1.0)
-                    
-                    # Parent message (puede ser None)
-                    parent_id = msg_data.get('parent')
-                    if parent_id == msg_id:  # Evitar auto-referencia
-                        parent_id = None
-                    
-                    # Agregar al batch
-                    batch_data.append((
-                        msg_id,                 # id
-                        conv_id,               # conversation_id
-                        parent_id,             # parent_message_id
-                        content_type,          # content_type
-                        content_text[:50000],  # content_text (limitar tamaño)
-                        author_role,           # author_role
-                        author_name,           # author_name
-                        create_time,           # create_time
-                        status,                # status
-                        1,                     # end_turn
-                        weight,                # weight
-                        None,                  # channel
-                        'all'                  # recipient
-                    ))
-                    
-                    # Ejecutar batch cuando esté lleno
-                    if len(batch_data) >= batch_size:
-                        cursor.executemany("""
-                            INSERT INTO messages (
-                                id, conversation_id, parent_message_id, content_type,
-                                content_text, author_role, author_name, create_time,
-                                created_at, status, end_turn, weight, channel, recipient
-                            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, NOW(), %s, %s, %s, %s, %s)
-                        """, batch_data)
-                        
-                        imported_count += len(batch_data)
-                        batch_data = []
-                        
-                        # Commit periódico y progreso
-                        if imported_count % 5000 == 0:
-                            connection.commit()
-                            progress = (conv_idx + 1) / len(conversations_data) * 100
-                            print(f"    💌 {imported_count:,} mensajes importados... ({progress:.1f}%)")
-                
-                except Exception as e:
-                    skipped_count += 1
-                    if skipped_count <= 5:
-                        print(f"    ⚠️ Error en mensaje {msg_id}: {str(e)[:100]}")
+            # Ejecutar batches cuando estén llenos
+            while len(batch_data) >= batch_size:
+                with metrics.phase('write'):
+                    cursor.executemany(insert_sql, batch_data[:batch_size])
+                imported_count += batch_size
+                uncommitted += batch_size
+                batch_data = batch_data[batch_size:]
+            
+            # Commit periódico y checkpoint (vaciando el resto del batch de esta tarea)
+            if uncommitted >= commit_every:
+                if batch_data:
+                    with metrics.phase('write'):
+                        cursor.executemany(insert_sql, batch_data)
+                    imported_count += len(batch_data)
+                    batch_data = []
+                commit_and_checkpoint(position)
+                uncommitted = 0
         
         # Ejecutar batch final
-        if batch_data:
-            cursor.executemany("""
-                INSERT INTO messages (
-                    id, conversation_id, parent_message_id, content_type,
-                    content_text, author_role, author_name, create_time,
-                    created_at, status, end_turn, weight, channel, recipient
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, NOW(), %s, %s, %s, %s, %s)
-            """, batch_data)
-            imported_count += len(batch_data)
-        
-        # Commit final
-        connection.commit()
+        with metrics.phase('write'):
+            if store:
+                store.flush()
+            if not loader and batch_data:
+                cursor.executemany(insert_sql, batch_data)
+                imported_count += len(batch_data)
+        if loader:
+            imported_count += bulk_flush()
+        
+        # Commit final (con las estadísticas del último lote): la importación terminó, ya no hace falta el checkpoint
+        with metrics.phase('stats'):
+            if exact_stats:
+                stats.apply(cursor)
+            else:
+                print(f"📊 Recalculando estadísticas...")
+                rebuild_stats(cursor)
+        with metrics.phase('commit'):
+            connection.commit()
+        conversations_fp.close()
+        checkpoint.clear()
+        
+        # Índice de búsqueda (se crea si falta o si se suspendió para la carga)
+        with metrics.phase('index'):
+            ensure_fulltext_indexes(cursor, tables=['messages', 'message_contents'])
+        metrics.set('rows', imported_count)
+        metrics.set('bytes', stream.offset)
+        metrics.set('conversations', conversations_with_messages)
+        metrics.print_summary(metrics.close(skipped=skipped_count))
         
         print(f"\n✅ Importación de mensajes completada:")
+        print(f"  💬 Conversaciones con mensajes: {conversations_with_messages:,}")
+        print(f"  💌 Mensajes en el export: {total_messages_to_import:,}")
         print(f"  💌 Mensajes importados: {imported_count:,}")
         print(f"  ⚠️ Mensajes omitidos: {skipped_count:,}")
+        if store:
+            print(f"  📦 Almacén de contenidos: {store.summary()}")
         
-        # 4. ESTADÍSTICAS FINALES
+        # 3. ESTADÍSTICAS FINALES
         print(f"\n📊 Estadísticas finales:")
         
         cursor.execute("SELECT COUNT(*) FROM conversations")
@@ -243,9 +310,22 @@ def import_messages_from_json():
         
     except Exception as e:
         print(f"❌ Error: {e}")
+        if metrics:
+            metrics.close(status='error', error=str(e))
         import traceback
         traceback.print_exc()
         return False
 
 if __name__ == "__main__":
-    import_messages_from_json()
\ No newline at end of file
+    # Uso: python import_messages_only.py [conversations.json | export.zip] [procesos] [--bulk] [--restart] [--dedup]
+    # (el número de procesos también se puede fijar con IMPORT_WORKERS;
+    #  --restart ignora el checkpoint de una ejecución interrumpida;
+    #  --dedup activa el almacén de contenidos, ver content_store.py)
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    import_messages_from_json(
+        args[0] if len(args) > 0 else None,
+        int(args[1]) if len(args) > 1 else None,
+        bulk_load='--bulk' in sys.argv,
+        resume='--restart' not in sys.argv,
+        dedup='--dedup' in sys.argv
+    )
\ No newline at end of file
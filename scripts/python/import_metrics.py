@@ -0,0 +1,323 @@
+"""
+Métricas por fase para los importadores
+Cada importador abre un ImportMetrics y marca sus fases (parse, transform,
+write, commit, stats, index...). Los tiempos son exclusivos: si una fase se
+abre dentro de otra, la exterior se pausa mientras tanto, así que la suma de
+las fases no cuenta nada dos veces. Además se cuentan filas y bytes y se
+muestrea la memoria (RSS).
+
+Salidas:
+  - log JSON-lines (un evento por línea: start, progress, summary) en
+    IMPORT_METRICS_LOG (por defecto metrics/import_metrics.jsonl; "off" lo desactiva)
+  - archivo de texto para el textfile collector de Prometheus en
+    IMPORT_METRICS_PROM (opcional; se reescribe de forma atómica)
+
+Perfilado opcional, por fase (nombres separados por comas, o "all"):
+  IMPORT_PROFILE=write,commit     cProfile → metrics/<importador>_<run>_<fase>.prof
+  IMPORT_TRACEMALLOC=transform    pico de memoria Python y principales asignaciones
+                                  → metrics/<importador>_<run>_<fase>.tracemalloc.txt
+"""
+import cProfile
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from env_loader import get_metrics_config
+
+METRICS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'metrics')
+DEFAULT_LOG = os.path.join(METRICS_DIR, 'import_metrics.jsonl')
+PROMETHEUS_PREFIX = 'chatbeto_import'
+TRACEMALLOC_TOP = 25
+TRACEMALLOC_SNAPSHOT_INTERVAL = 5.0  # segundos mínimos entre snapshots de una fase
+
+
+def current_rss_bytes() -> int:
+    """RSS actual del proceso (en Linux desde /proc; en otros sistemas, el máximo)"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes() -> int:
+    """RSS máximo del proceso (ru_maxrss está en KB en Linux y en bytes en macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class ImportMetrics:
+    """Tiempos por fase, contadores y memoria de una ejecución de un importador.
+
+    Uso típico:
+        metrics = ImportMetrics('import_messages_only', export_path=path)
+        for conv in metrics.timed_iter(stream, 'parse'): ...
+        with metrics.phase('write'):
+            cursor.executemany(...)
+        metrics.add('rows', len(batch))
+        metrics.progress()      # evento intermedio (tras cada commit)
+        metrics.close()         # resumen final
+    """
+
+    def __init__(self, importer: str, export_path: Optional[str] = None,
+                 settings: Optional[Dict[str, Any]] = None):
+        settings = settings if settings is not None else get_metrics_config()
+        self.importer = importer
+        self.run_id = datetime.now().strftime('%Y%m%d_%H%M%S_') + uuid.uuid4().hex[:6]
+        self.export_path = export_path
+        self.phases: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        self.counters: Dict[str, int] = {}
+        self.started = time.perf_counter()
+        self.closed = False
+
+        log = settings.get('log')
+        self.log_path = None if (log or '').lower() in ('off', 'false', '0', 'none') else (log or DEFAULT_LOG)
+        self.prometheus_path = settings.get('prometheus') or None
+        self.profile_phases = set(settings.get('profile') or [])
+        self.tracemalloc_phases = set(settings.get('tracemalloc') or [])
+
+        # Pila de fases abiertas: [nombre, inicio del tramo actual]
+        self._stack: List[List[Any]] = []
+        self._profilers: Dict[str, cProfile.Profile] = {}
+        self._traced_peaks: Dict[str, int] = {}
+        self._traced_snapshots: Dict[str, Any] = {}
+        self._last_snapshot: Dict[str, float] = {}
+        self._started_tracemalloc = False
+
+        self._emit('start', export_path=export_path,
+                   profile=sorted(self.profile_phases), tracemalloc=sorted(self.tracemalloc_phases))
+
+    # -- fases --------------------------------------------------------------
+
+    def _wants(self, selected: set, name: str) -> bool:
+        return 'all' in selected or name in selected
+
+    def _pause(self, name: str, started: float, now: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + (now - started)
+        profiler = self._profilers.get(name)
+        if profiler:
+            profiler.disable()
+
+    def _resume(self, name: str) -> None:
+        profiler = self._profilers.get(name)
+        if profiler:
+            profiler.enable()
+
+    def enter(self, name: str) -> None:
+        """Abre la fase `name` (pausando la que estuviera abierta)"""
+        now = time.perf_counter()
+        if self._stack:
+            parent = self._stack[-1]
+            self._pause(parent[0], parent[1], now)
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+        if self._wants(self.profile_phases, name):
+            self._profilers.setdefault(name, cProfile.Profile())
+            self._resume(name)
+        if self._wants(self.tracemalloc_phases, name):
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracemalloc = True
+            tracemalloc.reset_peak()
+        self._stack.append([name, time.perf_counter()])
+
+    def exit(self) -> None:
+        """Cierra la fase abierta más reciente y reanuda la anterior"""
+        name, started = self._stack.pop()
+        now = time.perf_counter()
+        self._pause(name, started, now)
+
+        if self._wants(self.tracemalloc_phases, name) and tracemalloc.is_tracing():
+            peak = tracemalloc.get_traced_memory()[1]
+            if peak > self._traced_peaks.get(name, 0):
+                self._traced_peaks[name] = peak
+                # Snapshot de las asignaciones vivas en el momento de un nuevo pico (con un mínimo de intervalo)
+                if now - self._last_snapshot.get(name, 0.0) >= TRACEMALLOC_SNAPSHOT_INTERVAL \
+                        or name not in self._traced_snapshots:
+                    self._traced_snapshots[name] = tracemalloc.take_snapshot()
+                    self._last_snapshot[name] = time.perf_counter()
+
+        if self._stack:
+            parent = self._stack[-1]
+            parent[1] = time.perf_counter()
+            self._resume(parent[0])
+
+    @contextmanager
+    def phase(self, name: str):
+        self.enter(name)
+        try:
+            yield
+        finally:
+            self.exit()
+
+    def timed_iter(self, iterable: Iterable[Any], name: str) -> Iterator[Any]:
+        """Entrega los elementos de `iterable` contando como `name` el tiempo de obtener cada uno"""
+        iterator = iter(iterable)
+        while True:
+            self.enter(name)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.exit()
+            yield item
+
+    # -- contadores y memoria ---------------------------------------------
+
+    def add(self, counter: str, amount: int = 1) -> None:
+        self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def set(self, counter: str, value: int) -> None:
+        self.counters[counter] = value
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Estado actual: tiempos, contadores, throughput y memoria"""
+        elapsed = time.perf_counter() - self.started
+        phases = dict(self.phases)
+        now = time.perf_counter()
+        if self._stack:  # la fase abierta más interna lleva un tramo en curso (las exteriores están pausadas)
+            name, started = self._stack[-1]
+            phases[name] = phases.get(name, 0.0) + (now - started)
+        rss = current_rss_bytes()
+        return {
+            'elapsed': round(elapsed, 3),
+            'phases': {name: round(seconds, 3) for name, seconds in phases.items()},
+            'calls': dict(self.calls),
+            'counters': dict(self.counters),
+            'throughput': {f"{name}_per_sec": round(value / elapsed, 1) if elapsed > 0 else 0.0
+                           for name, value in self.counters.items()},
+            'rss_bytes': rss,
+            'peak_rss_bytes': max(rss, peak_rss_bytes()),
+        }
+
+    # -- salidas ------------------------------------------------------------
+
+    def _emit(self, event: str, **fields) -> None:
+        if not self.log_path:
+            return
+        record = {'ts': datetime.now().isoformat(timespec='milliseconds'), 'event': event,
+                  'importer': self.importer, 'run_id': self.run_id, 'pid': os.getpid()}
+        record.update(fields)
+        directory = os.path.dirname(self.log_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.log_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+
+    def progress(self, **fields) -> Dict[str, Any]:
+        """Evento intermedio (se llama tras cada commit) y actualización del archivo de Prometheus"""
+        state = self.snapshot()
+        state.update(fields)
+        self._emit('progress', **state)
+        self.write_prometheus(state)
+        return state
+
+    def write_prometheus(self, state: Dict[str, Any], status: Optional[str] = None) -> None:
+        if not self.prometheus_path:
+            return
+        label = f'importer="{self.importer}"'
+        lines = [
+            f"# HELP {PROMETHEUS_PREFIX}_phase_seconds Tiempo exclusivo por fase de la última importación",
+            f"# TYPE {PROMETHEUS_PREFIX}_phase_seconds gauge",
+        ]
+        lines += [f'{PROMETHEUS_PREFIX}_phase_seconds{{{label},phase="{name}"}} {seconds}'
+                  for name, seconds in sorted(state['phases'].items())]
+        lines += [
+            f"# HELP {PROMETHEUS_PREFIX}_count Contadores de la última importación (filas, bytes...)",
+            f"# TYPE {PROMETHEUS_PREFIX}_count gauge",
+        ]
+        lines += [f'{PROMETHEUS_PREFIX}_count{{{label},counter="{name}"}} {value}'
+                  for name, value in sorted(state['counters'].items())]
+        lines += [
+            f"# TYPE {PROMETHEUS_PREFIX}_rate_per_second gauge",
+        ]
+        lines += [f'{PROMETHEUS_PREFIX}_rate_per_second{{{label},counter="{name[:-len("_per_sec")]}"}} {value}'
+                  for name, value in sorted(state['throughput'].items())]
+        lines += [
+            f"# TYPE {PROMETHEUS_PREFIX}_elapsed_seconds gauge",
+            f'{PROMETHEUS_PREFIX}_elapsed_seconds{{{label}}} {state["elapsed"]}',
+            f"# TYPE {PROMETHEUS_PREFIX}_rss_bytes gauge",
+            f'{PROMETHEUS_PREFIX}_rss_bytes{{{label}}} {state["rss_bytes"]}',
+            f"# TYPE {PROMETHEUS_PREFIX}_peak_rss_bytes gauge",
+            f'{PROMETHEUS_PREFIX}_peak_rss_bytes{{{label}}} {state["peak_rss_bytes"]}',
+            f"# TYPE {PROMETHEUS_PREFIX}_running gauge",
+            f'{PROMETHEUS_PREFIX}_running{{{label}}} {0 if status else 1}',
+        ]
+        if status == 'ok':
+            lines += [
+                f"# TYPE {PROMETHEUS_PREFIX}_last_success_timestamp_seconds gauge",
+                f'{PROMETHEUS_PREFIX}_last_success_timestamp_seconds{{{label}}} {int(time.time())}',
+            ]
+        # Escritura atómica: el collector nunca lee un archivo a medias
+        directory = os.path.dirname(self.prometheus_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f"{self.prometheus_path}.{os.getpid()}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(temporary, self.prometheus_path)
+
+    def _write_profiles(self) -> List[str]:
+        written = []
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        for name, profiler in self._profilers.items():
+            path = os.path.join(METRICS_DIR, f"{self.importer}_{self.run_id}_{name}.prof")
+            profiler.dump_stats(path)
+            written.append(path)
+        for name, snapshot in self._traced_snapshots.items():
+            path = os.path.join(METRICS_DIR, f"{self.importer}_{self.run_id}_{name}.tracemalloc.txt")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(f"# Fase {name}: pico de memoria Python {self._traced_peaks.get(name, 0):,} bytes\n")
+                f.write(f"# Asignaciones vivas en el pico (top {TRACEMALLOC_TOP} por línea)\n")
+                for stat in snapshot.statistics('lineno')[:TRACEMALLOC_TOP]:
+                    f.write(f"{stat}\n")
+            written.append(path)
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+        return written
+
+    def close(self, status: str = 'ok', **fields) -> Dict[str, Any]:
+        """Cierra las fases abiertas, escribe el resumen y los perfiles; devuelve el resumen"""
+        if self.closed:
+            return {}
+        while self._stack:
+            self.exit()
+        self.closed = True
+        state = self.snapshot()
+        state['status'] = status
+        # Tiempo fuera de cualquier fase (consultas de preparación, informes...)
+        state['unattributed'] = round(max(0.0, state['elapsed'] - sum(state['phases'].values())), 3)
+        state['phase_share'] = {name: round(seconds / state['elapsed'], 3) if state['elapsed'] else 0.0
+                                for name, seconds in state['phases'].items()}
+        if self._traced_peaks:
+            state['tracemalloc_peak_bytes'] = dict(self._traced_peaks)
+        state['profiles'] = self._write_profiles()
+        state.update(fields)
+        self._emit('summary', **state)
+        self.write_prometheus(state, status=status)
+        return state
+
+    def print_summary(self, state: Dict[str, Any]) -> None:
+        """Resumen legible de tiempos por fase"""
+        if not state:
+            return
+        print(f"\n⏱️ Tiempo por fase ({state['elapsed']:.1f}s en total, "
+              f"RSS máximo {state['peak_rss_bytes'] / 1024 / 1024:.0f} MB):")
+        for name, seconds in sorted(state['phases'].items(), key=lambda item: item[1], reverse=True):
+            print(f"  {name:<10} {seconds:>9.2f}s  {state['phase_share'].get(name, 0) * 100:5.1f}%")
+        print(f"  {'(otros)':<10} {state['unattributed']:>9.2f}s")
+        for name, value in state['throughput'].items():
+            print(f"  📈 {name}: {value:,.1f}")
+        for path in state.get('profiles', []):
+            print(f"  🔬 Perfil: {path}")
+        if self.log_path:
+            print(f"  📝 Métricas en {self.log_path} (run {self.run_id})")
@@ -4,7 +4,7 @@ Importar TODAS las conversaciones del archivo conversations.json
 """
 
 import json
-import mysql.connector
+from db_pool import connect
 from datetime import datetime
 
 def importar_todas_las_conversaciones():
@@ -13,10 +13,7 @@ def importar_todas_las_conversaciones():
     print("🚀 IMPORTACIÓN COMPLETA DE CONVERSACIONES")
     
     # Conectar a BD
-    with open('db_config.json', 'r') as f:
-        db_config = json.load(f)
-
-    conn = mysql.connector.connect(**db_config)
+    conn = connect()
     cursor = conn.cursor(dictionary=True)
     
     # Leer archivo conversations.json completo
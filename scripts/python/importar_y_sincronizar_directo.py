@@ -4,7 +4,7 @@ Importador directo de mensajes desde conversations.json
 """
 
 import json
-import mysql.connector
+from db_pool import connect
 from datetime import datetime
 import uuid
 
@@ -37,10 +37,7 @@ def importar_mensajes_conversacion(conversation_id, limit_messages=None):
     print(f"📊 Mapping encontrado con {len(mapping)} nodos")
     
     # Conectar a BD
-    with open('db_config.json', 'r') as f:
-        db_config = json.load(f)
-
-    conn = mysql.connector.connect(**db_config)
+    conn = connect()
     cursor = conn.cursor()
     
     # Verificar si la conversación existe
@@ -145,10 +142,7 @@ def sincronizar_conversacion_completa(conv_id, max_messages=50):
         return False
     
     # 2. Obtener datos de la conversación
-    with open('db_config.json', 'r') as f:
-        db_config = json.load(f)
-
-    conn = mysql.connector.connect(**db_config)
+    conn = connect()
     cursor = conn.cursor(dictionary=True)
     
     cursor.execute("""
@@ -0,0 +1,111 @@
+"""
+Clasificador por palabras clave con un autómata Aho-Corasick
+Compila una vez las tablas {etiqueta: [palabras clave]} y encuentra todas las
+coincidencias en una sola pasada por el texto, en lugar de un `keyword in text`
+por palabra clave.
+
+Las coincidencias respetan límites de palabra: las palabras clave cortas
+(hasta SHORT_KEYWORD caracteres, como 'ia', 'js' o 'wa') solo cuentan como
+palabra completa, y las largas deben empezar al inicio de una palabra (así
+'diseño' sigue encontrando 'diseños' pero 'ia' ya no coincide dentro de 'media').
+"""
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+SHORT_KEYWORD = 3
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == '_'
+
+
+class KeywordAutomaton:
+    """Autómata multi-patrón sobre un diccionario ordenado {etiqueta: palabras clave}.
+
+    El orden del diccionario es la prioridad: ``first_label`` devuelve la
+    primera etiqueta (en ese orden) con alguna coincidencia, igual que los
+    bucles `for etiqueta, palabras in ...: if palabra in texto` que reemplaza.
+    """
+
+    def __init__(self, table: Dict[str, Sequence[str]], short_keyword: int = SHORT_KEYWORD):
+        self.labels: List[str] = list(table)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+        # Por palabra clave: (etiqueta, longitud, exigir límite al inicio, exigir límite al final)
+        self._keywords: List[Tuple[int, int, bool, bool]] = []
+
+        for priority, keywords in enumerate(table.values()):
+            for keyword in keywords:
+                keyword = keyword.lower()
+                if not keyword:
+                    continue
+                # Un borde que ya no es letra/dígito (p. ej. 'vgr-') no necesita verificación
+                start_boundary = _is_word_char(keyword[0])
+                end_boundary = len(keyword) <= short_keyword and _is_word_char(keyword[-1])
+                self._add(keyword, len(self._keywords))
+                self._keywords.append((priority, len(keyword), start_boundary, end_boundary))
+
+        self._build_failure_links()
+
+    def _add(self, keyword: str, keyword_id: int) -> None:
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append(keyword_id)
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state].extend(self._output[self._fail[next_state]])
+
+    def matches(self, text: str) -> Iterator[Tuple[int, int]]:
+        """(posición final, índice de etiqueta) de cada coincidencia válida en text"""
+        text = text.lower()
+        goto, fail, output, keywords = self._goto, self._fail, self._output, self._keywords
+        last = len(text) - 1
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for keyword_id in output[state]:
+                priority, length, start_boundary, end_boundary = keywords[keyword_id]
+                start = position - length + 1
+                if start_boundary and start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                if end_boundary and position < last and _is_word_char(text[position + 1]):
+                    continue
+                yield position, priority
+
+    def labels_in(self, *texts: str) -> Set[str]:
+        """Todas las etiquetas con alguna coincidencia en los textos"""
+        return {self.labels[priority] for text in texts if text for _, priority in self.matches(text)}
+
+    def first_label(self, *texts: str) -> Optional[str]:
+        """Etiqueta de mayor prioridad con alguna coincidencia en los textos, o None"""
+        best = None
+        for text in texts:
+            if not text:
+                continue
+            for _, priority in self.matches(text):
+                if best is None or priority < best:
+                    best = priority
+                    if best == 0:
+                        return self.labels[0]
+        return self.labels[best] if best is not None else None
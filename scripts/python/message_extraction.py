@@ -0,0 +1,170 @@
+"""
+Extracción de mensajes desde el árbol mapping de una conversación
+Convierte cada conversación en filas listas para INSERT en messages y permite
+repartir el trabajo entre varios procesos mientras un único escritor inserta.
+"""
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from content_store import dedup_content
+from message_tree import linearize
+
+CONVERSATIONS_PER_TASK = 25
+
+# Columnas de messages en el mismo orden que las filas devueltas
+MESSAGE_COLUMNS = (
+    'id', 'conversation_id', 'parent_message_id', 'content_type',
+    'content_text', 'author_role', 'author_name', 'create_time',
+    'status', 'end_turn', 'weight', 'channel', 'recipient',
+    'position', 'is_canonical', 'branch_id'
+)
+
+# Con el almacén de contenidos (content_store.py) las filas llevan además el hash del cuerpo
+DEDUP_MESSAGE_COLUMNS = MESSAGE_COLUMNS + ('content_hash',)
+
+
+def extract_message_rows(conv_id: str, mapping: Dict[str, Any], current_node: Optional[str] = None,
+                         dedup: bool = False) -> Tuple[List[tuple], List[Tuple[str, str]]]:
+    """Devuelve (filas, errores) para los mensajes con texto de una conversación.
+
+    Con dedup=True las filas siguen DEDUP_MESSAGE_COLUMNS: los cuerpos largos
+    se normalizan y llevan su hash al final (None si se guardan en línea).
+    """
+    rows = []
+    errors = []
+    # Posición y rama de cada nodo (camino raíz -> current_node = transcripción visible)
+    order = linearize(mapping, current_node)
+
+    for msg_id, msg_data in mapping.items():
+        try:
+            message = msg_data.get('message')
+            if not message:
+                continue
+
+            # Extraer datos del mensaje
+            author = message.get('author', {})
+            author_role = author.get('role', 'user')
+            author_name = author.get('name', '')
+
+            content = message.get('content', {})
+            content_type = content.get('content_type', 'text')
+
+            # Extraer texto del contenido
+            content_text = ""
+            if content_type == 'text':
+                parts = content.get('parts', [])
+                if parts and isinstance(parts, list):
+                    # Filtrar partes válidas y unir
+                    valid_parts = [str(part).strip() for part in parts if part and str(part).strip()]
+                    content_text = '\n'.join(valid_parts)
+
+            # Solo importar mensajes con contenido
+            if not content_text:
+                continue
+
+            # Parent message (puede ser None)
+            parent_id = msg_data.get('parent')
+            if parent_id == msg_id:  # Evitar auto-referencia
+                parent_id = None
+
+            # Almacén de contenidos: cuerpo largo normalizado + hash (calculado aquí, en el proceso de trabajo)
+            digest = None
+            if dedup:
+                content_text, digest = dedup_content(content_text)
+
+            row = (
+                msg_id,                                  # id
+                conv_id,                                 # conversation_id
+                parent_id,                               # parent_message_id
+                content_type,                            # content_type
+                content_text,                            # content_text (completo: la columna es LONGTEXT)
+                author_role,                             # author_role
+                author_name,                             # author_name
+                message.get('create_time', 0),           # create_time
+                message.get('status', 'finished_successfully'),  # status
+                1,                                       # end_turn
+                message.get('weight', 1.0),              # weight
+                None,                                    # channel
+                'all',                                   # recipient
+                order[msg_id].position,                  # position
+                int(order[msg_id].is_canonical),         # is_canonical
+                order[msg_id].branch_id                  # branch_id
+            )
+            rows.append(row + (digest,) if dedup else row)
+        except Exception as e:
+            errors.append((msg_id, str(e)[:100]))
+
+    return rows, errors
+
+
+def _extract_task(conversations: List[Tuple[str, Dict[str, Any], Optional[str]]], dedup: bool = False
+                  ) -> Tuple[List[tuple], List[Tuple[str, str]]]:
+    """Unidad de trabajo de un proceso: varias conversaciones por envío para amortizar el IPC"""
+    rows = []
+    errors = []
+    for conv_id, mapping, current_node in conversations:
+        conv_rows, conv_errors = extract_message_rows(conv_id, mapping, current_node, dedup)
+        rows.extend(conv_rows)
+        errors.extend(conv_errors)
+    return rows, errors
+
+
+def _chunked(conversations: Iterable[Dict[str, Any]], size: int,
+             position: Callable[[], Any]) -> Iterator[Tuple[List[Tuple[str, Dict[str, Any], Optional[str]]], Any]]:
+    chunk = []
+    for conv in conversations:
+        # Solo se envía a los procesos lo que la extracción necesita
+        chunk.append((conv.get('id'), conv.get('mapping') or {}, conv.get('current_node')))
+        if len(chunk) >= size:
+            yield chunk, position()
+            chunk = []
+    if chunk:
+        yield chunk, position()
+
+
+def default_workers() -> int:
+    """Procesos de extracción: IMPORT_WORKERS o, por defecto, un proceso por CPU"""
+    value = os.environ.get('IMPORT_WORKERS')
+    if value and value.isdigit():
+        return max(1, int(value))
+    return os.cpu_count() or 1
+
+
+def iter_extracted_rows(conversations: Iterable[Dict[str, Any]], workers: Optional[int] = None,
+                        conversations_per_task: int = CONVERSATIONS_PER_TASK,
+                        position: Callable[[], Any] = lambda: None, dedup: bool = False
+                        ) -> Iterator[Tuple[List[tuple], List[Tuple[str, str]], Any]]:
+    """Extrae filas de mensajes en paralelo y las entrega en el orden de entrada.
+
+    La lectura del export y la escritura en la BD quedan en el proceso
+    principal; solo el recorrido de mapping se reparte en un ProcessPoolExecutor.
+    Se mantienen como máximo 2 tareas pendientes por proceso para que la memoria
+    siga acotada aunque el export sea enorme. Con workers=1 no se crea el pool.
+
+    Cada resultado es (filas, errores, posición), donde posición es lo que
+    devolvió ``position()`` al cerrar la tarea: el punto del export hasta el
+    que ya están incluidas todas las filas entregadas (útil para checkpoints).
+    Con dedup=True el hash de los cuerpos largos se calcula en los procesos.
+    """
+    if workers is None:
+        workers = default_workers()
+
+    tasks = _chunked(conversations, conversations_per_task, position)
+
+    if workers <= 1:
+        for task, task_position in tasks:
+            yield _extract_task(task, dedup) + (task_position,)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for task, task_position in tasks:
+            pending.append((executor.submit(_extract_task, task, dedup), task_position))
+            if len(pending) >= workers * 2:
+                future, done_position = pending.popleft()
+                yield future.result() + (done_position,)
+        while pending:
+            future, done_position = pending.popleft()
+            yield future.result() + (done_position,)
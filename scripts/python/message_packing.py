@@ -0,0 +1,93 @@
+"""
+Empaquetado de mensajes para threads de OpenAI
+En lugar de truncar cada mensaje al límite de la API (y pagar una solicitud
+por mensaje), los mensajes largos se parten en trozos ordenados y las rachas
+de mensajes cortos consecutivos del mismo rol se unen en uno solo, siempre
+sin superar el límite. No se pierde contenido y las conversaciones con muchos
+mensajes breves necesitan muchas menos solicitudes.
+"""
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+MAX_MESSAGE_CHARS = 32000
+SEPARATOR = '\n\n'
+# Cortes preferidos, de mejor a peor: párrafo, línea, frase, palabra
+_BREAKS = ('\n\n', '\n', '. ', ' ')
+# Un corte natural solo se usa si el trozo conserva al menos esta fracción del límite
+_MIN_FILL = 0.5
+
+
+def api_role(message: Dict[str, Any]) -> str:
+    """Rol de la API para un mensaje de la BD (la API de threads solo admite user/assistant)"""
+    return "user" if message.get('author_role') == 'user' else "assistant"
+
+
+def split_content(text: str, limit: int = MAX_MESSAGE_CHARS) -> List[str]:
+    """Parte `text` en trozos de como máximo `limit` caracteres, en orden.
+
+    Corta por el último salto de párrafo, de línea, fin de frase o espacio
+    dentro del límite; si no hay ninguno razonable, corta en seco. Unir los
+    trozos devuelve el texto original.
+    """
+    if limit <= 0:
+        raise ValueError("El límite debe ser positivo")
+    chunks = []
+    while len(text) > limit:
+        cut = limit
+        for mark in _BREAKS:
+            index = text.rfind(mark, 0, limit - len(mark) + 1)
+            if index >= limit * _MIN_FILL:
+                cut = index + len(mark)
+                break
+        chunks.append(text[:cut])
+        text = text[cut:]
+    if text:
+        chunks.append(text)
+    return chunks
+
+
+def _pieces(messages: Iterable[Dict[str, Any]], limit: int,
+            after: Optional[Tuple[str, int]] = None) -> Iterator[Tuple[bool, Dict[str, Any]]]:
+    """(es el primer trozo de su mensaje, {'role', 'content', 'last'}) a partir de `after`"""
+    resume_id, resume_chunk = after or (None, None)
+    for message in messages:
+        content = message.get('content_text') or ''
+        if not content.strip():
+            continue
+        if resume_id is not None:
+            if message.get('id') != resume_id:
+                continue  # ya enviado
+            resume_id = None
+            skip = resume_chunk + 1  # trozos de este mensaje ya enviados
+        else:
+            skip = 0
+        role = api_role(message)
+        for index, chunk in enumerate(split_content(content, limit)):
+            if index >= skip:
+                yield index == 0, {'role': role, 'content': chunk, 'last': (message.get('id'), index)}
+    if resume_id is not None:
+        raise ValueError(f"El mensaje {resume_id} ya enviado no está en la conversación")
+
+
+def pack_messages(messages: Iterable[Dict[str, Any]], limit: int = MAX_MESSAGE_CHARS,
+                  after: Optional[Tuple[str, int]] = None) -> List[Dict[str, Any]]:
+    """Mensajes de la BD -> [{'role', 'content', 'last'}] listos para la API, sin truncar.
+
+    Los mensajes mayores que `limit` se parten (split_content) y los
+    consecutivos del mismo rol se unen con una línea en blanco mientras quepan
+    (los trozos de un mismo mensaje nunca se vuelven a unir, para no alterar
+    su texto). El orden de la conversación se mantiene.
+
+    'last' = (message_id, trozo) del último contenido incluido en cada elemento:
+    es el punto de reanudación que guarda el diario de sincronización. Con
+    `after` se empaqueta solo lo posterior a ese punto.
+    """
+    packed: List[Dict[str, Any]] = []
+    for first, piece in _pieces(messages, limit, after):
+        last = packed[-1] if packed else None
+        if (first and last is not None and last['role'] == piece['role']
+                and len(last['content']) + len(SEPARATOR) + len(piece['content']) <= limit):
+            last['content'] += SEPARATOR + piece['content']
+            last['last'] = piece['last']
+        else:
+            packed.append(piece)
+    return packed
@@ -0,0 +1,117 @@
+"""
+Linealización del árbol de mensajes (mapping) de una conversación
+En el export cada mensaje apunta a su padre y las regeneraciones/ediciones
+crean ramas; la conversación visible es el camino desde la raíz hasta
+current_node. Aquí se calcula, en O(n), la posición de cada mensaje, si
+pertenece a esa rama canónica y a qué rama pertenece, para guardarlo en
+messages y leer la transcripción por índice en lugar de ordenar.
+"""
+from typing import Any, Dict, List, NamedTuple, Optional
+
+CANONICAL_BRANCH = 0
+
+
+class MessageOrder(NamedTuple):
+    position: int       # profundidad desde la raíz (en la rama canónica, índice en la transcripción)
+    is_canonical: bool  # True si está en el camino raíz -> current_node
+    branch_id: int      # 0 = rama canónica; el resto numera las ramas abandonadas
+
+
+def _parent(mapping: Dict[str, Any], node_id: str) -> Optional[str]:
+    parent = (mapping.get(node_id) or {}).get('parent')
+    return parent if parent in mapping and parent != node_id else None
+
+
+def _children_map(mapping: Dict[str, Any]) -> Dict[str, List[str]]:
+    """Hijos de cada nodo según los enlaces parent, en el orden de su lista children"""
+    children: Dict[str, List[str]] = {}
+    for node_id in mapping:
+        parent = _parent(mapping, node_id)
+        if parent is not None:
+            children.setdefault(parent, []).append(node_id)
+    for parent, nodes in children.items():
+        listed = {child: i for i, child in enumerate((mapping[parent] or {}).get('children') or [])}
+        nodes.sort(key=lambda child: listed.get(child, len(listed)))
+    return children
+
+
+def _latest_leaf(mapping: Dict[str, Any], children: Dict[str, List[str]]) -> Optional[str]:
+    """Sin current_node: seguir desde la raíz siempre al último hijo (la versión más reciente)"""
+    roots = [node_id for node_id in mapping if _parent(mapping, node_id) is None]
+    if not roots:
+        return None
+    node_id = roots[0]
+    while children.get(node_id):
+        node_id = children[node_id][-1]
+    return node_id
+
+
+def canonical_path(mapping: Dict[str, Any], current_node: Optional[str] = None,
+                   children: Optional[Dict[str, List[str]]] = None) -> List[str]:
+    """IDs desde la raíz hasta current_node siguiendo los enlaces parent"""
+    if current_node not in mapping:
+        current_node = _latest_leaf(mapping, children if children is not None else _children_map(mapping))
+    path, seen = [], set()
+    node_id = current_node
+    while node_id is not None and node_id not in seen:  # seen corta ciclos en exports dañados
+        seen.add(node_id)
+        path.append(node_id)
+        node_id = _parent(mapping, node_id)
+    path.reverse()
+    return path
+
+
+def linearize(mapping: Dict[str, Any], current_node: Optional[str] = None) -> Dict[str, MessageOrder]:
+    """{id: MessageOrder} para todos los nodos del mapping.
+
+    La rama canónica recibe branch_id 0. En el resto del árbol un nodo hereda
+    la rama de su padre si es su último hijo y abre una rama nueva si no, de
+    modo que cada rama abandonada queda identificada por separado.
+    """
+    children_of = _children_map(mapping)
+    canonical = canonical_path(mapping, current_node, children_of)
+    canonical_set = set(canonical)
+    order: Dict[str, MessageOrder] = {}
+    next_branch = CANONICAL_BRANCH + 1
+
+    roots = [node_id for node_id in mapping if _parent(mapping, node_id) is None]
+    if canonical:
+        # La raíz canónica primero, para que la rama 0 sea siempre la visible
+        roots.sort(key=lambda node_id: node_id != canonical[0])
+
+    for root in roots:
+        if root in order:
+            continue
+        if root in canonical_set:
+            branch = CANONICAL_BRANCH
+        else:
+            branch, next_branch = next_branch, next_branch + 1
+        stack = [(root, 0, branch)]
+        while stack:
+            node_id, depth, branch = stack.pop()
+            if node_id in order:
+                continue
+            is_canonical = node_id in canonical_set
+            order[node_id] = MessageOrder(depth, is_canonical, branch)
+
+            children = children_of.get(node_id)
+            if not children:
+                continue
+            # Hijo que continúa la rama actual: el canónico si lo hay, si no el último
+            primary = children[-1]
+            if is_canonical:
+                primary = next((child for child in children if child in canonical_set), None)
+            for child in children:
+                if child == primary:
+                    stack.append((child, depth + 1, branch))
+                else:
+                    stack.append((child, depth + 1, next_branch))
+                    next_branch += 1
+
+    # Nodos que no cuelgan de ninguna raíz (ciclos): al final, sin rama canónica
+    for node_id in mapping:
+        if node_id not in order:
+            order[node_id] = MessageOrder(len(order), False, next_branch)
+            next_branch += 1
+
+    return order
@@ -2,40 +2,26 @@
 # Migrar conversations y messages desde conversations.json con estructura correcta
 
 import mysql.connector
-import json
 import os
+import sys
 import uuid
 from datetime import datetime
-from collections import defaultdict
+from conversations_stream import default_export_path, iter_conversations
+from message_tree import linearize
+from db_pool import connect
+from stats_rollup import ensure_stats_table, rebuild_stats
 
-def migrate_from_conversations_json():
+def migrate_from_conversations_json(export_path=None):
     try:
-        # Leer credenciales
-        config_path = os.path.join(os.path.dirname(__file__), 'db_config.json')
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-        
-        # Cargar conversations.json
-        conversations_file = os.path.join(os.path.dirname(__file__), 'extracted', 'conversations.json')
-        print(f"📋 Cargando {conversations_file}...")
-        
-        with open(conversations_file, 'r', encoding='utf-8') as f:
-            conversations_data = json.load(f)
-        
-        print(f"✅ Cargadas {len(conversations_data)} conversaciones del JSON")
-        
-        # Conectar a base remota
-        connection = mysql.connector.connect(
-            host=config['host'],
-            port=config['port'],
-            database=config['database'],
-            user=config['user'],
-            password=config['password'],
-            charset='utf8mb4',
-            autocommit=True
-        )
+        # Leer conversations.json (o el ZIP del export) en streaming
+        conversations_file = export_path or default_export_path(os.path.dirname(__file__))
+        print(f"📋 Leyendo {conversations_file}...")
+        
+        # Conectar a base remota (configuración del .env)
+        connection = connect(autocommit=True)
         
         cursor = connection.cursor()
+        ensure_stats_table(cursor)
         
         # 1. OBTENER proyectos existentes
         print(f"\n📁 Obteniendo proyectos existentes...")
@@ -55,21 +41,21 @@ def migrate_from_conversations_json():
         print(f"  📊 {len(projects)} proyectos encontrados")
         print(f"  🎯 {len(gizmo_to_project_id)} con gizmo_id mapeado")
         
-        # 2. AGRUPAR conversaciones por gizmo_id
+        # 2. AGRUPAR conversaciones por gizmo_id (primera pasada, solo guarda el primer título)
         print(f"\n🔄 Agrupando conversaciones por gizmo_id...")
         
-        gizmo_conversations = defaultdict(list)
-        no_gizmo_conversations = []
+        gizmo_first_title = {}
+        no_gizmo_count = 0
         
-        for conv in conversations_data:
+        for conv in iter_conversations(conversations_file):
             gizmo_id = conv.get('gizmo_id')
             if gizmo_id:
-                gizmo_conversations[gizmo_id].append(conv)
+                gizmo_first_title.setdefault(gizmo_id, conv.get('title'))
             else:
-                no_gizmo_conversations.append(conv)
+                no_gizmo_count += 1
         
-        print(f"  🎯 {len(gizmo_conversations)} gizmo_ids únicos")
-        print(f"  ❓ {len(no_gizmo_conversations)} conversaciones sin gizmo_id")
+        print(f"  🎯 {len(gizmo_first_title)} gizmo_ids únicos")
+        print(f"  ❓ {no_gizmo_count} conversaciones sin gizmo_id")
         
         # 3. MAPEAR gizmo_ids a project_ids y actualizar projects
         print(f"\n🎯 Mapeando gizmo_ids a proyectos...")
@@ -77,7 +63,7 @@ def migrate_from_conversations_json():
         gizmo_project_mapping = {}
         new_projects_created = 0
         
-        for gizmo_id, conversations in gizmo_conversations.items():
+        for gizmo_id, first_title in gizmo_first_title.items():
             if gizmo_id in gizmo_to_project_id:
                 # Ya existe el mapeo
                 project_id = gizmo_to_project_id[gizmo_id]
@@ -103,10 +89,9 @@ def migrate_from_conversations_json():
                     print(f"  🔗 {gizmo_id} -> Asignado a proyecto {project_id} ({project_name})")
                 else:
                     # Crear nuevo proyecto
-                    first_conv = conversations[0]
                     project_name = f"Proyecto {gizmo_id[:8]}"
-                    if first_conv.get('title'):
-                        title_words = first_conv['title'].split()[:3]
+                    if first_title:
+                        title_words = first_title.split()[:3]
                         project_name = ' '.join(title_words)[:50]
                     
                     cursor.execute("""
@@ -128,7 +113,7 @@ def migrate_from_conversations_json():
         conversations_inserted = 0
         conversations_skipped = 0
         
-        for conv in conversations_data:
+        for conv in iter_conversations(conversations_file):
             try:
                 # Generar ID único si no existe
                 conv_id = conv.get('id') or str(uuid.uuid4())
@@ -139,7 +124,7 @@ def migrate_from_conversations_json():
                 
                 if gizmo_id and gizmo_id in gizmo_project_mapping:
                     project_id = gizmo_project_mapping[gizmo_id]
-                elif no_gizmo_conversations and conv in no_gizmo_conversations:
+                elif not gizmo_id:
                     # Asignar a proyecto por defecto (primer proyecto sin gizmo)
                     cursor.execute("SELECT id FROM projects WHERE chatgpt_project_id IS NULL LIMIT 1")
                     default_project = cursor.fetchone()
@@ -179,13 +164,13 @@ def migrate_from_conversations_json():
         print(f"  ✅ {conversations_inserted} conversaciones insertadas")
         print(f"  ⚠️ {conversations_skipped} conversaciones omitidas")
         
-        # 5. INSERTAR mensajes
+        # 5. INSERTAR mensajes (segunda lectura del export, sin retenerlo en memoria)
         print(f"\n💌 Insertando mensajes...")
         
         messages_inserted = 0
         messages_skipped = 0
         
-        for conv in conversations_data:
+        for conv in iter_conversations(conversations_file):
             conv_id = conv.get('id') or str(uuid.uuid4())
             
             # Verificar que la conversación existe
@@ -195,6 +180,8 @@ def migrate_from_conversations_json():
             
             # Insertar mensajes de esta conversación
             mapping = conv.get('mapping', {})
+            # Posición y rama de cada mensaje (transcripción visible = camino hasta current_node)
+            order = linearize(mapping, conv.get('current_node'))
             
             for msg_id, msg_data in mapping.items():
                 try:
@@ -228,12 +215,14 @@ def migrate_from_conversations_json():
                         INSERT INTO messages (
                             id, conversation_id, parent_message_id, content_type,
                             content_text, author_role, author_name, create_time,
-                            created_at, status, end_turn, weight, recipient
-                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, NOW(), %s, %s, %s, %s)
+                            created_at, status, end_turn, weight, recipient,
+                            position, is_canonical, branch_id
+                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, NOW(), %s, %s, %s, %s, %s, %s, %s)
                     """, (
                         msg_id, conv_id, parent_id, content_type,
                         content_text, author_role, author_name, create_time,
-                        status, 1, weight, 'all'
+                        status, 1, weight, 'all',
+                        order[msg_id].position, int(order[msg_id].is_canonical), order[msg_id].branch_id
                     ))
                     
                     messages_inserted += 1
@@ -286,6 +275,11 @@ def migrate_from_conversations_json():
         for i, (name, conv_count, msg_count) in enumerate(top_projects, 1):
             print(f"  {i:2d}. {name[:30]:<30} | {conv_count:3d} conv | {msg_count:5,d} msgs")
         
+        # Estadísticas precalculadas para los dashboards (en una transacción: nunca se ven a medias)
+        connection.start_transaction()
+        rebuild_stats(cursor)
+        connection.commit()
+        
         cursor.close()
         connection.close()
         
@@ -299,4 +293,5 @@ def migrate_from_conversations_json():
         return False
 
 if __name__ == "__main__":
-    migrate_from_conversations_json()
\ No newline at end of file
+    # Uso: python migrate_from_conversations_json.py [conversations.json | export.zip]
+    migrate_from_conversations_json(sys.argv[1] if len(sys.argv) > 1 else None)
\ No newline at end of file
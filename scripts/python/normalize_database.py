@@ -1,5 +1,6 @@
 import mysql.connector
 from datetime import datetime
+from project_counters import print_drift_report, reconcile_project_counters
 
 def connect_to_db():
     """Conectar a la base de datos"""
@@ -114,20 +115,10 @@ def verify_normalization():
     conversations_with_project = cursor.fetchone()[0]
     print(f"Conversaciones con project_id: {conversations_with_project}")
     
-    # Mostrar proyectos con su conteo
-    cursor.execute("""
-        SELECT p.id, p.name, p.conversation_count, COUNT(c.conversation_id) as actual_count
-        FROM projects p
-        LEFT JOIN conversations c ON p.id = c.project_id
-        GROUP BY p.id, p.name, p.conversation_count
-        ORDER BY actual_count DESC
-        LIMIT 10
-    """)
-    
-    print("\nTop 10 proyectos:")
-    for row in cursor.fetchall():
-        project_id, name, stored_count, actual_count = row
-        print(f"  {project_id}: {name} (Almacenado: {stored_count}, Real: {actual_count})")
+    # Contadores almacenados frente a los reales (informe de diferencias, sin modificar)
+    print("\nContadores de proyectos:")
+    drift = reconcile_project_counters(cursor, conversation_key='conversation_id', apply=False)
+    print_drift_report(drift, limit=10)
     
     # Verificar integridad referencial
     cursor.execute("""
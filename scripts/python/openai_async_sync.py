@@ -0,0 +1,181 @@
+"""
+Motor asíncrono de sincronización de conversaciones con threads de OpenAI
+Sincroniza varias conversaciones a la vez (concurrencia acotada) y deja que
+el ritmo lo marque la cuota de la API a través de RateLimiter, en lugar de
+una pausa fija entre conversaciones. Dentro de cada conversación los mensajes
+se envían en orden, uno por solicitud, a un thread que se crea vacío.
+
+El almacenamiento es cualquier objeto con:
+  get_conversation(conversation_id) -> dict | None
+  get_conversation_messages(conversation_id) -> [dict]
+  save_thread_id(conversation_id, thread_id) -> None
+(ChatBETOSync los implementa sobre su conexión MySQL.)
+
+Con un SyncJournal (openai_sync_journal) el progreso de cada conversación se
+confirma tras cada solicitud y una ejecución interrumpida se reanuda sin
+duplicar el thread ni los mensajes ya enviados. El thread se crea sin
+contenido y se registra antes de enviar nada: un corte durante su creación
+solo puede dejar un thread vacío, que queda anotado en el diario.
+"""
+import asyncio
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from message_packing import MAX_MESSAGE_CHARS, pack_messages
+from openai_rate_limit import RateLimiter, call_with_retry, estimate_tokens, is_rate_limited
+
+DEFAULT_CONCURRENCY = 4
+RESUME_METADATA_KEY = 'chatbeto_last'  # metadata de cada mensaje enviado: su punto de reanudación
+
+
+def resume_marker(last: Tuple[str, int]) -> str:
+    """'message_id:trozo' del último contenido incluido en un mensaje enviado"""
+    return f"{last[0]}:{last[1]}"
+
+
+def thread_messages(messages: Iterable[Dict[str, Any]], after: Optional[Tuple[str, int]] = None
+                    ) -> List[Dict[str, Any]]:
+    """Mensajes de la BD en el formato de la API: completos, partidos o agrupados (ver message_packing)"""
+    return pack_messages(messages, MAX_MESSAGE_CHARS, after)
+
+
+class AsyncThreadSync:
+    """Sincroniza conversaciones en paralelo respetando los presupuestos RPM/TPM"""
+
+    def __init__(self, store, api_key: Optional[str] = None, limiter: Optional[RateLimiter] = None,
+                 concurrency: int = DEFAULT_CONCURRENCY, client=None, journal=None, verbose: bool = True):
+        if client is None:
+            from openai import AsyncOpenAI
+            # Los reintentos los gestiona call_with_retry (con el limitador compartido)
+            client = AsyncOpenAI(api_key=api_key or os.getenv('OPENAI_API_KEY'), max_retries=0)
+        self.client = client
+        self.store = store
+        self.journal = journal
+        self.limiter = limiter or RateLimiter.from_env()
+        self.concurrency = max(1, concurrency)
+        self.verbose = verbose  # False: sin una línea por conversación (benchmarks); los errores van en el resumen
+        # La conexión MySQL no admite uso concurrente: los accesos se serializan fuera del event loop
+        self._db_lock = asyncio.Lock()
+
+    async def _db(self, method, *args):
+        async with self._db_lock:
+            return await asyncio.to_thread(method, *args)
+
+    async def _create_thread(self, conversation_id: str, project_chatgpt_id: str, title: str) -> str:
+        """Thread vacío (solo metadata); el contenido se envía después por el camino reanudable"""
+        # Crear un thread no es idempotente: tras un fallo ambiguo podría quedar uno duplicado, solo se reintenta un 429
+        thread = await call_with_retry(self.limiter, lambda: self.client.beta.threads.create(
+            metadata={
+                "chatbeto_project_id": project_chatgpt_id,
+                "chatbeto_conversation_id": conversation_id,  # permite localizar threads huérfanos
+                "conversation_title": (title or '')[:100],  # Limitar longitud
+                "created_by": "chatBETO_sync",
+                "sync_timestamp": str(datetime.now())
+            }
+        ), retryable=is_rate_limited)
+        return thread.id
+
+    async def _landed(self, thread_id: str, message: Dict[str, Any]) -> bool:
+        """True si el último mensaje del thread ya es `message` (comparando su punto de reanudación)"""
+        page = await call_with_retry(self.limiter, lambda: self.client.beta.threads.messages.list(
+            thread_id=thread_id, limit=1, order='desc'))
+        latest = page.data[0] if page.data else None
+        return latest is not None and (latest.metadata or {}).get(RESUME_METADATA_KEY) == resume_marker(message['last'])
+
+    async def _post_message(self, thread_id: str, message: Dict[str, Any]) -> None:
+        # Tras un fallo ambiguo el mensaje pudo haber llegado: se comprueba antes de reenviarlo
+        await call_with_retry(self.limiter, lambda: self.client.beta.threads.messages.create(
+            thread_id=thread_id, role=message['role'], content=message['content'],
+            metadata={RESUME_METADATA_KEY: resume_marker(message['last'])}
+        ), tokens=estimate_tokens(message['content']), landed=lambda: self._landed(thread_id, message))
+
+    async def sync_conversation(self, conversation_id: str, project_chatgpt_id: str) -> Tuple[str, Optional[str]]:
+        """('synced' | 'resumed' | 'skipped' | 'missing', thread_id) de una conversación"""
+        conversation = await self._db(self.store.get_conversation, conversation_id)
+        if not conversation:
+            return 'missing', None
+        if conversation.get('openai_thread_id'):
+            return 'skipped', conversation['openai_thread_id']
+
+        messages = await self._db(self.store.get_conversation_messages, conversation_id)
+        entry = await self._db(self.journal.get, conversation_id) if self.journal else None
+
+        if entry and entry['thread_id']:
+            # Reanudar: el thread ya existe con todo lo enviado hasta last_message_id/last_chunk
+            status, thread_id = 'resumed', entry['thread_id']
+            after = (entry['last_message_id'], entry['last_chunk']) if entry['last_message_id'] else None
+            rest = thread_messages(messages, after)
+            await self._db(self.journal.resumed, conversation_id)
+            # El último envío pudo llegar sin quedar registrado (corte entre la respuesta y el diario)
+            if rest and await self._landed(thread_id, rest[0]):
+                await self._db(self.journal.posted, conversation_id, rest[0]['last'])
+                rest = rest[1:]
+        else:
+            if entry and not entry['thread_id'] and self.verbose:
+                # start() lo anota en el diario (orphaned_threads); el thread, si existe, está vacío
+                print(f"  ⚠️ {conversation_id}: un intento anterior no llegó a registrar su thread "
+                      f"(posible thread vacío con chatbeto_conversation_id={conversation_id})")
+            status = 'synced'
+            rest = thread_messages(messages)
+            if self.journal:
+                await self._db(self.journal.start, conversation_id, project_chatgpt_id)
+            thread_id = await self._create_thread(conversation_id, project_chatgpt_id, conversation.get('title', ''))
+            if self.journal:
+                await self._db(self.journal.thread_created, conversation_id, thread_id, None)
+
+        for message in rest:  # en orden: el thread es una secuencia
+            await self._post_message(thread_id, message)
+            if self.journal:
+                await self._db(self.journal.posted, conversation_id, message['last'])
+
+        await self._db(self.store.save_thread_id, conversation_id, thread_id)
+        if self.journal:
+            await self._db(self.journal.finish, conversation_id)
+        return status, thread_id
+
+    async def sync_many(self, conversations: Iterable[Tuple[str, str]]) -> Dict[str, Any]:
+        """Sincroniza [(conversation_id, project_chatgpt_id)] con como máximo `concurrency` a la vez"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        summary: Dict[str, Any] = {'synced': 0, 'resumed': 0, 'skipped': 0, 'missing': 0, 'failed': 0, 'errors': []}
+
+        async def worker(conversation_id: str, project_chatgpt_id: str) -> None:
+            async with semaphore:
+                try:
+                    status, thread_id = await self.sync_conversation(conversation_id, project_chatgpt_id)
+                except Exception as e:
+                    summary['failed'] += 1
+                    summary['errors'].append((conversation_id, str(e)[:200]))
+                    if self.verbose:
+                        print(f"  ❌ {conversation_id}: {str(e)[:100]}")
+                    if self.journal:
+                        try:
+                            await self._db(self.journal.fail, conversation_id, str(e))
+                        except Exception:
+                            pass  # el progreso ya confirmado sigue en el diario
+                    return
+                summary[status] += 1
+                if not self.verbose:
+                    return
+                if status == 'synced':
+                    print(f"  ✅ {conversation_id} → {thread_id}")
+                elif status == 'resumed':
+                    print(f"  ↪️ {conversation_id} → {thread_id} (reanudada)")
+
+        await asyncio.gather(*(worker(conv_id, project_id) for conv_id, project_id in conversations))
+        summary.update(self.limiter.stats)
+        return summary
+
+
+def run_sync(store, conversations: Iterable[Tuple[str, str]], api_key: Optional[str] = None,
+             concurrency: int = DEFAULT_CONCURRENCY, limiter: Optional[RateLimiter] = None,
+             journal=None, client=None, verbose: bool = True) -> Dict[str, Any]:
+    """Punto de entrada síncrono para código que no usa asyncio (el cliente se cierra al terminar)"""
+    async def main():
+        engine = AsyncThreadSync(store, api_key=api_key, limiter=limiter, concurrency=concurrency,
+                                 client=client, journal=journal, verbose=verbose)
+        try:
+            return await engine.sync_many(list(conversations))
+        finally:
+            await engine.client.close()
+    return asyncio.run(main())
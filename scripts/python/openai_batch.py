@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+"""
+Trabajos masivos con la Batch API de OpenAI (resumen de conversaciones)
+Para operaciones sobre todo el corpus ("resumir cada conversación") no se
+usa un run síncrono por conversación (query_openai_thread): las
+conversaciones se leen en streaming (MySQL o el export), se convierten en
+solicitudes JSONL de la Batch API repartidas en ficheros acotados por número
+de solicitudes y bytes, y los resultados se vuelcan después en la tabla
+conversation_summaries.
+
+Generar e ingerir no necesitan la API: ambos pasos funcionan sin conexión
+sobre ficheros JSONL (ingest --dry-run tampoco necesita MySQL). Solo submit
+y download hablan con OpenAI.
+"""
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from content_store import content_store_enabled, message_text_sql
+from conversations_stream import default_export_path, iter_conversations
+from message_extraction import MESSAGE_COLUMNS, iter_extracted_rows
+
+BATCH_ENDPOINT = '/v1/chat/completions'
+DEFAULT_MODEL = 'gpt-4o-mini'
+DEFAULT_MAX_TOKENS = 400
+DEFAULT_BATCH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'batch_jobs')
+# Límites de la Batch API por fichero: 50 000 solicitudes y 200 MB (se deja margen)
+MAX_REQUESTS_PER_SHARD = 50000
+MAX_SHARD_BYTES = 190 * 1024 * 1024
+MAX_TRANSCRIPT_CHARS = 200000  # ~50k tokens; de las más largas se conserva el inicio y el final
+MYSQL_BATCH = 500              # conversaciones por consulta al leer desde MySQL
+TITLE_WINDOW = 20000           # títulos pendientes como máximo al leer el export
+UPSERT_BATCH = 1000
+
+SUMMARIES_TABLE = 'conversation_summaries'
+
+SUMMARY_PROMPT = (
+    "Eres un asistente que resume conversaciones de ChatGPT para un archivo personal. "
+    "Resume la conversación en español en 3 a 6 frases: tema, qué se pidió, "
+    "conclusiones o código relevante y tareas pendientes. No inventes información."
+)
+
+CREATE_SUMMARIES_TABLE_SQL = f"""
+    CREATE TABLE IF NOT EXISTS {SUMMARIES_TABLE} (
+        conversation_id VARCHAR(36) NOT NULL,
+        summary TEXT NOT NULL,
+        model VARCHAR(100) DEFAULT NULL,
+        batch_request_id VARCHAR(100) DEFAULT NULL,
+        prompt_tokens INT DEFAULT NULL,
+        completion_tokens INT DEFAULT NULL,
+        created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        PRIMARY KEY (conversation_id)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+"""
+
+UPSERT_SUMMARY_SQL = f"""
+    INSERT INTO {SUMMARIES_TABLE}
+        (conversation_id, summary, model, batch_request_id, prompt_tokens, completion_tokens)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE summary = VALUES(summary), model = VALUES(model),
+                            batch_request_id = VALUES(batch_request_id),
+                            prompt_tokens = VALUES(prompt_tokens),
+                            completion_tokens = VALUES(completion_tokens)
+"""
+
+_COLUMN = {name: i for i, name in enumerate(MESSAGE_COLUMNS)}
+
+# (conversation_id, título, [(rol, texto)] en orden de la transcripción)
+Conversation = Tuple[str, str, List[Tuple[str, str]]]
+
+
+# ---------------------------------------------------------------------------
+# Solicitudes
+# ---------------------------------------------------------------------------
+
+def render_transcript(title: str, turns: List[Tuple[str, str]],
+                      max_chars: int = MAX_TRANSCRIPT_CHARS) -> str:
+    """Transcripción en texto plano; si excede max_chars se omite la parte central (se indica)"""
+    text = f"Título: {title or '(sin título)'}\n\n" + '\n\n'.join(f"[{role}] {content}" for role, content in turns)
+    if len(text) <= max_chars:
+        return text
+    head = max_chars // 4
+    tail = max_chars - head
+    omitted = len(text) - head - tail
+    return f"{text[:head]}\n\n[... {omitted:,} caracteres omitidos ...]\n\n{text[-tail:]}"
+
+
+def build_request(conversation_id: str, title: str, turns: List[Tuple[str, str]],
+                  model: str = DEFAULT_MODEL, prompt: str = SUMMARY_PROMPT,
+                  max_tokens: int = DEFAULT_MAX_TOKENS) -> Optional[Dict[str, Any]]:
+    """Línea de la Batch API para resumir una conversación (None si no tiene texto)"""
+    if not turns:
+        return None
+    return {
+        'custom_id': conversation_id,
+        'method': 'POST',
+        'url': BATCH_ENDPOINT,
+        'body': {
+            'model': model,
+            'max_tokens': max_tokens,
+            'messages': [
+                {'role': 'system', 'content': prompt},
+                {'role': 'user', 'content': render_transcript(title, turns)},
+            ],
+        },
+    }
+
+
+class ShardWriter:
+    """Escribe solicitudes JSONL y abre un fichero nuevo al llegar al límite de solicitudes o bytes"""
+
+    def __init__(self, out_dir: str, prefix: str = 'summaries',
+                 max_requests: int = MAX_REQUESTS_PER_SHARD, max_bytes: int = MAX_SHARD_BYTES):
+        self.out_dir = out_dir
+        self.prefix = prefix
+        self.max_requests = max_requests
+        self.max_bytes = max_bytes
+        self.shards: List[Dict[str, Any]] = []  # {'path', 'requests', 'bytes'}
+        self._file = None
+        os.makedirs(out_dir, exist_ok=True)
+
+    def _rotate(self) -> None:
+        self.close()
+        path = os.path.join(self.out_dir, f"{self.prefix}_{len(self.shards) + 1:04d}.jsonl")
+        self._file = open(path, 'wb')
+        self.shards.append({'path': path, 'requests': 0, 'bytes': 0})
+
+    def write(self, request: Dict[str, Any]) -> None:
+        line = (json.dumps(request, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+        if len(line) > self.max_bytes:
+            raise ValueError(f"La solicitud {request.get('custom_id')} ocupa más que un fichero completo")
+        shard = self.shards[-1] if self.shards else None
+        if (self._file is None or shard['requests'] >= self.max_requests
+                or shard['bytes'] + len(line) > self.max_bytes):
+            self._rotate()
+            shard = self.shards[-1]
+        self._file.write(line)
+        shard['requests'] += 1
+        shard['bytes'] += len(line)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def build_batch(conversations: Iterable[Conversation], out_dir: str = DEFAULT_BATCH_DIR,
+                model: str = DEFAULT_MODEL, prefix: str = 'summaries',
+                max_requests: int = MAX_REQUESTS_PER_SHARD, max_bytes: int = MAX_SHARD_BYTES
+                ) -> List[Dict[str, Any]]:
+    """Genera los ficheros de solicitudes y devuelve [{'path', 'requests', 'bytes'}]"""
+    writer = ShardWriter(out_dir, prefix, max_requests, max_bytes)
+    try:
+        for conversation_id, title, turns in conversations:
+            request = build_request(conversation_id, title, turns, model=model)
+            if request is not None:
+                writer.write(request)
+    finally:
+        writer.close()
+    return writer.shards
+
+
+# ---------------------------------------------------------------------------
+# Orígenes de conversaciones (en streaming)
+# ---------------------------------------------------------------------------
+
+def iter_export_conversations(export_path: Optional[str] = None,
+                              workers: Optional[int] = None) -> Iterator[Conversation]:
+    """Conversaciones del export (conversations.json o ZIP), solo la rama canónica"""
+    conversations_file = export_path or default_export_path(os.path.dirname(os.path.abspath(__file__)))
+    titles: Dict[str, str] = {}
+
+    def conversations() -> Iterator[Dict[str, Any]]:
+        for conv in iter_conversations(conversations_file):
+            if conv.get('id'):
+                titles[conv['id']] = conv.get('title') or ''
+                # Las conversaciones sin texto nunca se retiran: se descartan las más antiguas,
+                # que ya salieron de la ventana de tareas en curso
+                while len(titles) > TITLE_WINDOW:
+                    titles.pop(next(iter(titles)))
+                yield conv
+
+    role, content = _COLUMN['author_role'], _COLUMN['content_text']
+    conv_col, position, canonical = _COLUMN['conversation_id'], _COLUMN['position'], _COLUMN['is_canonical']
+    for rows, _errors, _position in iter_extracted_rows(conversations(), workers=workers):
+        by_conversation: Dict[str, List[tuple]] = {}
+        for row in rows:
+            if row[canonical]:
+                by_conversation.setdefault(row[conv_col], []).append(row)
+        for conv_id, conv_rows in by_conversation.items():
+            conv_rows.sort(key=lambda row: row[position])
+            yield conv_id, titles.pop(conv_id, ''), [(row[role], row[content]) for row in conv_rows]
+
+
+def iter_mysql_conversations(cursor, project: Optional[str] = None, limit: Optional[int] = None,
+                             only_missing: bool = True) -> Iterator[Conversation]:
+    """Conversaciones de MySQL en lotes de MYSQL_BATCH (transcripción canónica ordenada).
+
+    Con only_missing se omiten las que ya tienen resumen en conversation_summaries.
+    """
+    conditions, params = [], []
+    if project:
+        conditions.append("p.name = %s")
+        params.append(project)
+    if only_missing:
+        conditions.append("s.conversation_id IS NULL")
+    cursor.execute(f"""
+        SELECT c.id, c.title
+        FROM conversations c
+        LEFT JOIN projects p ON p.id = c.project_id
+        LEFT JOIN {SUMMARIES_TABLE} s ON s.conversation_id = c.id
+        {('WHERE ' + ' AND '.join(conditions)) if conditions else ''}
+        ORDER BY c.create_time DESC
+        {f'LIMIT {int(limit)}' if limit else ''}
+    """, params)
+    conversations = cursor.fetchall()
+
+    # Con el almacén de contenidos los cuerpos largos están en message_contents
+    text, contents_join = message_text_sql(content_store_enabled(cursor))
+    for start in range(0, len(conversations), MYSQL_BATCH):
+        batch = conversations[start:start + MYSQL_BATCH]
+        placeholders = ', '.join(['%s'] * len(batch))
+        cursor.execute(f"""
+            SELECT m.conversation_id, m.author_role, {text}
+            FROM messages m
+            {contents_join}
+            WHERE m.conversation_id IN ({placeholders}) AND m.is_canonical = 1 AND {text} IS NOT NULL
+            ORDER BY m.conversation_id, m.position
+        """, [conv_id for conv_id, _title in batch])
+        turns: Dict[str, List[Tuple[str, str]]] = {}
+        for conv_id, role, content in cursor.fetchall():
+            turns.setdefault(conv_id, []).append((role, content))
+        for conv_id, title in batch:
+            yield conv_id, title or '', turns.get(conv_id, [])
+
+
+# ---------------------------------------------------------------------------
+# Resultados
+# ---------------------------------------------------------------------------
+
+def parse_result_line(line: str) -> Tuple[str, Optional[Dict[str, Any]], Optional[str]]:
+    """(custom_id, {'summary', 'model', 'request_id', tokens} o None, error o None) de una línea de salida"""
+    item = json.loads(line)
+    custom_id = item.get('custom_id')
+    if item.get('error'):
+        error = item['error']
+        return custom_id, None, f"{error.get('code')}: {error.get('message')}" if isinstance(error, dict) else str(error)
+    response = item.get('response') or {}
+    body = response.get('body') or {}
+    if response.get('status_code') != 200:
+        message = (body.get('error') or {}).get('message') if isinstance(body, dict) else None
+        return custom_id, None, f"HTTP {response.get('status_code')}: {message or 'sin detalle'}"
+    try:
+        summary = body['choices'][0]['message']['content'].strip()
+    except (KeyError, IndexError, TypeError, AttributeError):
+        return custom_id, None, "Respuesta sin contenido"
+    usage = body.get('usage') or {}
+    return custom_id, {
+        'summary': summary,
+        'model': body.get('model'),
+        'request_id': response.get('request_id'),
+        'prompt_tokens': usage.get('prompt_tokens'),
+        'completion_tokens': usage.get('completion_tokens'),
+    }, None
+
+
+def iter_results(paths: Iterable[str]) -> Iterator[Tuple[str, Optional[Dict[str, Any]], Optional[str]]]:
+    """Resultados de uno o varios ficheros de salida (o de errores) de la Batch API"""
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield parse_result_line(line)
+                except (ValueError, AttributeError) as e:
+                    yield f"{os.path.basename(path)}:{number}", None, f"Línea no válida: {e}"
+
+
+def ensure_summaries_table(cursor) -> None:
+    """Crea conversation_summaries si no existe (DDL: commit implícito)"""
+    cursor.execute(CREATE_SUMMARIES_TABLE_SQL)
+
+
+def ingest_results(cursor, paths: Iterable[str], dry_run: bool = False) -> Dict[str, Any]:
+    """Vuelca los resúmenes en conversation_summaries (no confirma la transacción).
+
+    Devuelve {'stored', 'failed', 'errors': [(custom_id, error)]}; con dry_run
+    solo se validan los ficheros y no se usa el cursor.
+    """
+    stats: Dict[str, Any] = {'stored': 0, 'failed': 0, 'errors': []}
+    rows = []
+
+    def flush() -> None:
+        if rows and not dry_run:
+            cursor.executemany(UPSERT_SUMMARY_SQL, rows)
+        stats['stored'] += len(rows)
+        rows.clear()
+
+    for custom_id, result, error in iter_results(paths):
+        if error:
+            stats['failed'] += 1
+            stats['errors'].append((custom_id, error))
+            continue
+        rows.append((custom_id, result['summary'], result['model'], result['request_id'],
+                     result['prompt_tokens'], result['completion_tokens']))
+        if len(rows) >= UPSERT_BATCH:
+            flush()
+    flush()
+    return stats
+
+
+def write_retry_file(request_paths: Iterable[str], failed_ids: Iterable[str], out_path: str) -> int:
+    """Copia a out_path las solicitudes originales de las conversaciones que fallaron"""
+    failed = set(failed_ids)
+    written = 0
+    with open(out_path, 'w', encoding='utf-8') as out:
+        for path in request_paths:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip() and json.loads(line).get('custom_id') in failed:
+                        out.write(line if line.endswith('\n') else line + '\n')
+                        written += 1
+    return written
+
+
+# ---------------------------------------------------------------------------
+# Envío y descarga (únicos pasos que usan la API)
+# ---------------------------------------------------------------------------
+
+def submit_shards(paths: Iterable[str], client=None) -> List[Tuple[str, str]]:
+    """Sube cada fichero y crea su batch; devuelve [(ruta, batch_id)]"""
+    if client is None:
+        from openai import OpenAI
+        client = OpenAI()
+    submitted = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            uploaded = client.files.create(file=f, purpose='batch')
+        batch = client.batches.create(input_file_id=uploaded.id, endpoint=BATCH_ENDPOINT,
+                                      completion_window='24h',
+                                      metadata={'created_by': 'chatBETO_batch', 'shard': os.path.basename(path)})
+        submitted.append((path, batch.id))
+    return submitted
+
+
+def download_results(batch_id: str, out_dir: str = DEFAULT_BATCH_DIR, client=None) -> Tuple[str, List[str]]:
+    """(estado, [ficheros descargados]) de un batch; descarga salida y errores si ya terminó"""
+    if client is None:
+        from openai import OpenAI
+        client = OpenAI()
+    batch = client.batches.retrieve(batch_id)
+    downloaded = []
+    if batch.status == 'completed':
+        os.makedirs(out_dir, exist_ok=True)
+        for kind, file_id in (('output', batch.output_file_id), ('errors', batch.error_file_id)):
+            if not file_id:
+                continue
+            path = os.path.join(out_dir, f"{batch_id}_{kind}.jsonl")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(client.files.content(file_id).text)
+            downloaded.append(path)
+    return batch.status, downloaded
+
+
+def _options(args: List[str]) -> Tuple[List[str], Dict[str, str]]:
+    """Separa argumentos posicionales de opciones --clave=valor"""
+    positional, options = [], {}
+    for arg in args:
+        if arg.startswith('--'):
+            key, _, value = arg[2:].partition('=')
+            options[key] = value
+        else:
+            positional.append(arg)
+    return positional, options
+
+
+if __name__ == "__main__":
+    # Uso:
+    #   python openai_batch.py build [conversations.json | export.zip] [--out=dir] [--model=...]
+    #   python openai_batch.py build --mysql [--project=nombre] [--limit=N] [--all] [--out=dir] [--model=...]
+    #   python openai_batch.py submit batch_jobs/summaries_0001.jsonl ...
+    #   python openai_batch.py download batch_id [--out=dir]
+    #   python openai_batch.py ingest salida.jsonl ... [--dry-run] [--requests=a.jsonl,b.jsonl --retry-out=reintento.jsonl]
+    command = sys.argv[1] if len(sys.argv) > 1 else ''
+    args, options = _options(sys.argv[2:])
+    out_dir = options.get('out') or DEFAULT_BATCH_DIR
+
+    if command == 'build':
+        started = time.time()
+        model = options.get('model') or DEFAULT_MODEL
+        if 'mysql' in options:
+            from db_pool import connect
+            connection = connect(autocommit=True)
+            cursor = connection.cursor()
+            ensure_summaries_table(cursor)
+            print("🗄️ Generando solicitudes desde MySQL...")
+            shards = build_batch(iter_mysql_conversations(cursor, project=options.get('project'),
+                                                          limit=int(options['limit']) if options.get('limit') else None,
+                                                          only_missing='all' not in options),
+                                 out_dir, model=model)
+            cursor.close()
+            connection.close()
+        else:
+            print("📁 Generando solicitudes desde el export...")
+            shards = build_batch(iter_export_conversations(args[0] if args else None), out_dir, model=model)
+        for shard in shards:
+            print(f"  📄 {shard['path']}: {shard['requests']:,} solicitudes, {shard['bytes'] / 1048576:.1f} MB")
+        print(f"✅ {sum(shard['requests'] for shard in shards):,} solicitudes en {len(shards)} ficheros "
+              f"({time.time() - started:.1f}s)")
+    elif command == 'submit' and args:
+        for path, batch_id in submit_shards(args):
+            print(f"🚀 {os.path.basename(path)} → {batch_id}")
+        print("   Descarga con: python openai_batch.py download <batch_id> (disponible en hasta 24 h)")
+    elif command == 'download' and args:
+        status, paths = download_results(args[0], out_dir)
+        print(f"📦 Batch {args[0]}: {status}")
+        for path in paths:
+            print(f"  📄 {path}")
+    elif command == 'ingest' and args:
+        dry_run = 'dry-run' in options
+        connection = cursor = None
+        if not dry_run:
+            from db_pool import connect
+            connection = connect(autocommit=False)
+            cursor = connection.cursor()
+            ensure_summaries_table(cursor)
+        stats = ingest_results(cursor, args, dry_run=dry_run)
+        if connection:
+            connection.commit()
+            cursor.close()
+            connection.close()
+        print(f"✅ {'[DRY RUN] ' if dry_run else ''}{stats['stored']:,} resúmenes {'válidos' if dry_run else 'guardados'} | "
+              f"{stats['failed']:,} con error")
+        for custom_id, error in stats['errors'][:10]:
+            print(f"  ❌ {custom_id}: {error[:100]}")
+        if stats['failed'] and options.get('requests') and options.get('retry-out'):
+            written = write_retry_file(options['requests'].split(','), [custom_id for custom_id, _ in stats['errors']],
+                                       options['retry-out'])
+            print(f"🔁 {written:,} solicitudes para reenviar en {options['retry-out']}")
+    else:
+        print("Uso: python openai_batch.py build [export | --mysql] | submit ficheros... | "
+              "download batch_id | ingest salida.jsonl... [--dry-run]")
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Servidor local que imita los endpoints de threads de OpenAI
+Implementa lo que usan chatbeto_openai_sync.py y openai_async_sync.py
+(threads, messages y runs, con streaming de eventos) con latencia
+configurable, un límite de solicitudes por minuto que responde 429 con
+Retry-After, e inyección de 429/500 con semilla fija para que las
+mediciones sean reproducibles. Sirve para pruebas y benchmarks sin clave ni
+cuota (ver openai_sync_benchmark.py):
+
+    client = OpenAI(base_url=server.base_url, api_key='mock')
+
+Solo usa la biblioteca estándar y guarda todo en memoria.
+"""
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+DEFAULT_PORT = 8089
+
+
+class MockConfig:
+    """Comportamiento del servidor simulado"""
+
+    def __init__(self, latency: float = 0.02, jitter: float = 0.01, rpm: int = 0,
+                 rate_limit_rate: float = 0.0, server_error_rate: float = 0.0,
+                 retry_after: float = 0.5, run_duration: float = 0.5,
+                 reply: str = "Respuesta simulada del asistente.", seed: int = 42):
+        self.latency = latency                      # segundos por solicitud
+        self.jitter = jitter                        # ± aleatorio sobre latency
+        self.rpm = rpm                              # límite de solicitudes por minuto (0 = sin límite)
+        self.rate_limit_rate = rate_limit_rate      # fracción de solicitudes con 429 inyectado
+        self.server_error_rate = server_error_rate  # fracción de solicitudes con 500 inyectado
+        self.retry_after = retry_after              # Retry-After de los 429 inyectados
+        self.run_duration = run_duration            # segundos hasta que un run termina
+        self.reply = reply
+        self.seed = seed
+
+
+class MockState:
+    """Datos en memoria, límite de velocidad y contadores (protegidos por un lock)"""
+
+    def __init__(self, config: MockConfig):
+        self.config = config
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self.lock:
+            self.threads: Dict[str, Dict[str, Any]] = {}
+            self.messages: Dict[str, list] = {}
+            self.runs: Dict[str, Dict[str, Any]] = {}
+            self.stats: Counter = Counter()
+            self.random = random.Random(self.config.seed)
+            self._tokens = float(self.config.rpm)
+            self._updated = time.monotonic()
+
+    def admit(self) -> Tuple[int, Optional[float]]:
+        """(código HTTP, retry-after) de la siguiente solicitud: 200, 429 o 500"""
+        config = self.config
+        with self.lock:
+            self.stats['requests'] += 1
+            if config.rpm:
+                now = time.monotonic()
+                self._tokens = min(config.rpm, self._tokens + (now - self._updated) * config.rpm / 60.0)
+                self._updated = now
+                if self._tokens < 1:
+                    self.stats['rate_limited'] += 1
+                    return 429, (1 - self._tokens) * 60.0 / config.rpm
+                self._tokens -= 1
+            roll = self.random.random()
+            if roll < config.rate_limit_rate:
+                self.stats['rate_limited'] += 1
+                self.stats['injected_429'] += 1
+                return 429, config.retry_after
+            if roll < config.rate_limit_rate + config.server_error_rate:
+                self.stats['server_errors'] += 1
+                return 500, None
+            self.stats['ok'] += 1
+            return 200, None
+
+    def delay(self) -> float:
+        with self.lock:
+            jitter = self.random.uniform(-self.config.jitter, self.config.jitter)
+        return max(0.0, self.config.latency + jitter)
+
+
+def _new_id(prefix: str) -> str:
+    return f"{prefix}_{uuid.uuid4().hex[:24]}"
+
+
+def _message(thread_id: str, role: str, content: Any, run_id: Optional[str] = None,
+             metadata: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    text = content if isinstance(content, str) else json.dumps(content, ensure_ascii=False)
+    return {
+        'id': _new_id('msg'), 'object': 'thread.message', 'created_at': int(time.time()),
+        'thread_id': thread_id, 'role': role, 'status': 'completed',
+        'content': [{'type': 'text', 'text': {'value': text, 'annotations': []}}],
+        'assistant_id': 'asst_mock' if role == 'assistant' else None,
+        'run_id': run_id, 'attachments': [], 'metadata': metadata or {},
+    }
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    state: MockState = None  # se asigna en make_server
+
+    ROUTES = (
+        ('POST', re.compile(r'^/v1/threads$'), 'create_thread'),
+        ('POST', re.compile(r'^/v1/threads/(?P<thread_id>[^/]+)/messages$'), 'create_message'),
+        ('GET', re.compile(r'^/v1/threads/(?P<thread_id>[^/]+)/messages$'), 'list_messages'),
+        ('POST', re.compile(r'^/v1/threads/(?P<thread_id>[^/]+)/runs$'), 'create_run'),
+        ('GET', re.compile(r'^/v1/threads/(?P<thread_id>[^/]+)/runs/(?P<run_id>[^/]+)$'), 'retrieve_run'),
+        ('POST', re.compile(r'^/v1/threads/(?P<thread_id>[^/]+)/runs/(?P<run_id>[^/]+)/cancel$'), 'cancel_run'),
+    )
+
+    def log_message(self, format, *args):
+        pass  # sin una línea por solicitud
+
+    # -- respuesta -----------------------------------------------------------
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status: int, message: str, kind: str, headers: Optional[Dict[str, str]] = None) -> None:
+        self._send_json(status, {'error': {'message': message, 'type': kind, 'code': kind, 'param': None}}, headers)
+
+    def _dispatch(self, method: str) -> None:
+        url = urlparse(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}') if length else {}
+        for route_method, pattern, handler in self.ROUTES:
+            match = pattern.match(url.path)
+            if route_method == method and match:
+                break
+        else:
+            self._error(404, f"Ruta no simulada: {method} {url.path}", 'not_found')
+            return
+
+        time.sleep(self.state.delay())
+        status, retry_after = self.state.admit()
+        if status == 429:
+            self._error(429, "Rate limit reached (simulado)", 'rate_limit_exceeded',
+                        {'retry-after-ms': str(int(retry_after * 1000)), 'retry-after': f"{retry_after:.3f}"})
+            return
+        if status == 500:
+            self._error(500, "Error interno simulado", 'server_error')
+            return
+        with self.state.lock:
+            self.state.stats[handler] += 1
+        getattr(self, handler)(body, parse_qs(url.query), **match.groupdict())
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    # -- endpoints -----------------------------------------------------------
+
+    def create_thread(self, body, query):
+        thread_id = _new_id('thread')
+        thread = {'id': thread_id, 'object': 'thread', 'created_at': int(time.time()),
+                  'metadata': body.get('metadata') or {}, 'tool_resources': None}
+        messages = [_message(thread_id, item.get('role', 'user'), item.get('content', ''),
+                             metadata=item.get('metadata'))
+                    for item in body.get('messages') or []]
+        with self.state.lock:
+            self.state.threads[thread_id] = thread
+            self.state.messages[thread_id] = messages
+            self.state.stats['messages_stored'] += len(messages)
+        self._send_json(200, thread)
+
+    def _thread_exists(self, thread_id: str) -> bool:
+        if thread_id not in self.state.threads:
+            self._error(404, f"No thread found with id '{thread_id}'.", 'not_found')
+            return False
+        return True
+
+    def create_message(self, body, query, thread_id):
+        if not self._thread_exists(thread_id):
+            return
+        message = _message(thread_id, body.get('role', 'user'), body.get('content', ''),
+                           metadata=body.get('metadata'))
+        with self.state.lock:
+            self.state.messages[thread_id].append(message)
+            self.state.stats['messages_stored'] += 1
+        self._send_json(200, message)
+
+    def list_messages(self, body, query, thread_id):
+        if not self._thread_exists(thread_id):
+            return
+        self._complete_runs(thread_id)
+        with self.state.lock:
+            data = list(self.state.messages[thread_id])
+        run_id = (query.get('run_id') or [None])[0]
+        if run_id:
+            data = [message for message in data if message['run_id'] == run_id]
+        if (query.get('order') or ['desc'])[0] == 'desc':
+            data.reverse()
+        data = data[:int((query.get('limit') or [20])[0])]
+        self._send_json(200, {'object': 'list', 'data': data, 'has_more': False,
+                              'first_id': data[0]['id'] if data else None,
+                              'last_id': data[-1]['id'] if data else None})
+
+    def _run_payload(self, run: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: value for key, value in run.items() if not key.startswith('_')}
+
+    def _complete_runs(self, thread_id: str) -> None:
+        """Los runs cuyo tiempo ya pasó terminan y dejan su respuesta en el thread"""
+        now = time.monotonic()
+        with self.state.lock:
+            for run in self.state.runs.values():
+                if (run['thread_id'] == thread_id and run['status'] in ('queued', 'in_progress')
+                        and now >= run['_finishes']):
+                    run['status'] = 'completed'
+                    run['completed_at'] = int(time.time())
+                    self.state.messages[thread_id].append(
+                        _message(thread_id, 'assistant', self.state.config.reply, run['id']))
+                elif run['thread_id'] == thread_id and run['status'] == 'queued':
+                    run['status'] = 'in_progress'
+
+    def create_run(self, body, query, thread_id):
+        if not self._thread_exists(thread_id):
+            return
+        run = {'id': _new_id('run'), 'object': 'thread.run', 'created_at': int(time.time()),
+               'thread_id': thread_id, 'assistant_id': body.get('assistant_id'), 'status': 'queued',
+               'model': 'mock', 'instructions': '', 'tools': [], 'metadata': {},
+               '_finishes': time.monotonic() + self.state.config.run_duration}
+        with self.state.lock:
+            self.state.runs[run['id']] = run
+        if body.get('stream'):
+            self._stream_run(run)
+        else:
+            self._send_json(200, self._run_payload(run))
+
+    def _stream_run(self, run: Dict[str, Any]) -> None:
+        """Eventos SSE: run creado, deltas de texto repartidos en run_duration, run completado"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        def event(name: str, data: Any) -> None:
+            payload = data if isinstance(data, str) else json.dumps(data)
+            self.wfile.write(f"event: {name}\ndata: {payload}\n\n".encode('utf-8'))
+            self.wfile.flush()
+
+        event('thread.run.created', self._run_payload(run))
+        run['status'] = 'in_progress'
+        event('thread.run.in_progress', self._run_payload(run))
+        reply = self.state.config.reply
+        words = reply.split(' ')
+        message_id = _new_id('msg')
+        for index, word in enumerate(words):
+            time.sleep(self.state.config.run_duration / max(1, len(words)))
+            text = word if index == 0 else ' ' + word
+            event('thread.message.delta', {'id': message_id, 'object': 'thread.message.delta',
+                                           'delta': {'content': [{'index': 0, 'type': 'text',
+                                                                  'text': {'value': text, 'annotations': []}}]}})
+        with self.state.lock:
+            run['status'] = 'completed'
+            run['completed_at'] = int(time.time())
+            message = _message(run['thread_id'], 'assistant', reply, run['id'])
+            message['id'] = message_id
+            self.state.messages[run['thread_id']].append(message)
+        event('thread.message.completed', message)
+        event('thread.run.completed', self._run_payload(run))
+        event('done', '[DONE]')
+
+    def retrieve_run(self, body, query, thread_id, run_id):
+        run = self.state.runs.get(run_id)
+        if not run or run['thread_id'] != thread_id:
+            self._error(404, f"No run found with id '{run_id}'.", 'not_found')
+            return
+        self._complete_runs(thread_id)
+        self._send_json(200, self._run_payload(run))
+
+    def cancel_run(self, body, query, thread_id, run_id):
+        run = self.state.runs.get(run_id)
+        if not run or run['thread_id'] != thread_id:
+            self._error(404, f"No run found with id '{run_id}'.", 'not_found')
+            return
+        with self.state.lock:
+            if run['status'] in ('queued', 'in_progress'):
+                run['status'] = 'cancelled'
+                run['cancelled_at'] = int(time.time())
+        self._send_json(200, self._run_payload(run))
+
+
+def make_server(config: Optional[MockConfig] = None, host: str = '127.0.0.1',
+                port: int = 0) -> ThreadingHTTPServer:
+    """Servidor listo para serve_forever(); port=0 elige un puerto libre.
+
+    server.state expone datos y contadores; server.base_url es la URL para el cliente.
+    """
+    state = MockState(config or MockConfig())
+    handler = type('BoundMockHandler', (MockHandler,), {'state': state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.state = state
+    server.base_url = f"http://{host}:{server.server_address[1]}/v1"
+    return server
+
+
+def start_background(config: Optional[MockConfig] = None, host: str = '127.0.0.1',
+                     port: int = 0) -> ThreadingHTTPServer:
+    """Arranca el servidor en un hilo daemon (detener con server.shutdown())"""
+    server = make_server(config, host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _options(args):
+    """Opciones --clave=valor"""
+    return dict(arg[2:].partition('=')[::2] for arg in args if arg.startswith('--'))
+
+
+if __name__ == "__main__":
+    # Uso: python openai_mock_server.py [--port=8089] [--latency=0.02] [--rpm=0]
+    #                                   [--rate-limit-rate=0.0] [--server-error-rate=0.0] [--run-duration=0.5]
+    options = _options(sys.argv[1:])
+    config = MockConfig(
+        latency=float(options.get('latency') or 0.02),
+        rpm=int(options.get('rpm') or 0),
+        rate_limit_rate=float(options.get('rate-limit-rate') or 0),
+        server_error_rate=float(options.get('server-error-rate') or 0),
+        run_duration=float(options.get('run-duration') or 0.5),
+    )
+    server = make_server(config, port=int(options.get('port') or DEFAULT_PORT))
+    print(f"🧪 OpenAI simulado en {server.base_url}")
+    print(f"   export OPENAI_BASE_URL={server.base_url} OPENAI_API_KEY=mock")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n📊 {dict(server.state.stats)}")
+        server.server_close()
@@ -0,0 +1,157 @@
+"""
+Limitador de velocidad para la API de OpenAI (token bucket)
+Dos cubetas, una por presupuesto: solicitudes por minuto (RPM) y tokens por
+minuto (TPM). Cada llamada espera a tener cupo en ambas en lugar de dormir un
+tiempo fijo, y un 429 con Retry-After pausa el limitador completo el tiempo
+que indica el servidor, de modo que todas las tareas concurrentes frenan a la vez.
+"""
+import asyncio
+import os
+import random
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+import openai
+
+DEFAULT_RPM = 500
+DEFAULT_TPM = 200000
+MAX_RETRIES = 6
+BACKOFF_BASE = 1.0   # segundos; se duplica en cada reintento sin Retry-After
+BACKOFF_MAX = 60.0
+CHARS_PER_TOKEN = 4  # estimación sin tokenizer: ~4 caracteres por token
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    return len(text or '') // CHARS_PER_TOKEN + 1
+
+
+class TokenBucket:
+    """Cubeta de capacidad `capacity` que se rellena a `per_minute` unidades por minuto"""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.tokens = self.capacity
+        self._clock = clock
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Segundos hasta que haya `amount` unidades disponibles (0 si ya las hay)"""
+        self._refill()
+        amount = min(amount, self.capacity)  # una solicitud mayor que la cubeta espera a tenerla llena
+        return max(0.0, (amount - self.tokens) / self.rate)
+
+    async def acquire(self, amount: float = 1) -> None:
+        # El lock mantiene el orden de llegada: nadie se adelanta a una solicitud grande que espera
+        async with self._lock:
+            while True:
+                delay = self.wait_time(amount)
+                if delay <= 0:
+                    self.tokens -= min(amount, self.capacity)
+                    return
+                await asyncio.sleep(delay)
+
+
+class RateLimiter:
+    """Presupuestos RPM y TPM compartidos por todas las tareas de una sincronización"""
+
+    def __init__(self, rpm: float = DEFAULT_RPM, tpm: float = DEFAULT_TPM,
+                 clock: Callable[[], float] = time.monotonic):
+        self.requests = TokenBucket(rpm, clock=clock)
+        self.tokens = TokenBucket(tpm, clock=clock)
+        self._clock = clock
+        self._paused_until = 0.0
+        self.stats = {'requests': 0, 'retries': 0, 'rate_limited': 0, 'already_applied': 0, 'waited': 0.0}
+
+    @classmethod
+    def from_env(cls) -> 'RateLimiter':
+        """Presupuestos desde OPENAI_RPM / OPENAI_TPM (los límites de la organización)"""
+        return cls(rpm=float(os.getenv('OPENAI_RPM', DEFAULT_RPM)),
+                   tpm=float(os.getenv('OPENAI_TPM', DEFAULT_TPM)))
+
+    def pause(self, seconds: float) -> None:
+        """Detiene todas las solicitudes durante `seconds` (Retry-After del servidor)"""
+        self._paused_until = max(self._paused_until, self._clock() + seconds)
+
+    async def acquire(self, tokens: int = 0) -> None:
+        started = self._clock()
+        while True:
+            pause = self._paused_until - self._clock()
+            if pause <= 0:
+                break
+            await asyncio.sleep(pause)
+        await self.requests.acquire(1)
+        if tokens:
+            await self.tokens.acquire(tokens)
+        self.stats['requests'] += 1
+        self.stats['waited'] += self._clock() - started
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Segundos indicados por el servidor en retry-after-ms / retry-after, si los hay"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000.0
+        if headers.get('retry-after'):
+            return float(headers['retry-after'])
+    except (TypeError, ValueError):
+        pass  # Retry-After también puede ser una fecha HTTP: se usa el backoff propio
+    return None
+
+
+def is_retryable(error: BaseException) -> bool:
+    """429, errores 5xx y fallos de conexión/timeout"""
+    return isinstance(error, (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError))
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """429: el servidor rechazó la solicitud sin aplicarla (único reintento seguro para un POST que crea algo)"""
+    return isinstance(error, openai.RateLimitError)
+
+
+def is_ambiguous(error: BaseException) -> bool:
+    """Fallo tras el que no se sabe si el servidor aplicó la solicitud (conexión, timeout o 5xx)"""
+    return is_retryable(error) and not is_rate_limited(error)
+
+
+async def call_with_retry(limiter: RateLimiter, request: Callable[[], Awaitable[Any]],
+                          tokens: int = 0, retries: int = MAX_RETRIES,
+                          retryable: Callable[[BaseException], bool] = is_retryable,
+                          landed: Optional[Callable[[], Awaitable[bool]]] = None) -> Any:
+    """Ejecuta `request()` respetando el limitador y reintenta los errores transitorios.
+
+    Un 429 pausa el limitador completo durante Retry-After (o el backoff
+    exponencial si el servidor no lo indica), no solo esta tarea.
+
+    `retryable` decide qué errores se reintentan. Para un POST no idempotente,
+    `landed()` se consulta antes de repetirlo tras un fallo ambiguo: si la
+    solicitud ya llegó al servidor se devuelve None en lugar de duplicarla.
+    """
+    for attempt in range(retries + 1):
+        await limiter.acquire(tokens)
+        try:
+            return await request()
+        except Exception as error:
+            if attempt >= retries or not retryable(error):
+                raise
+            delay = retry_after(error)
+            if delay is None:
+                delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * (0.5 + random.random() / 2)
+            limiter.stats['retries'] += 1
+            if is_rate_limited(error):
+                limiter.stats['rate_limited'] += 1
+                limiter.pause(delay)
+            else:
+                await asyncio.sleep(delay)
+                if landed is not None and await landed():
+                    limiter.stats['already_applied'] += 1
+                    return None
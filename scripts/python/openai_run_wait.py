@@ -0,0 +1,155 @@
+"""
+Espera de runs de OpenAI (threads/assistants)
+En lugar de consultar runs.retrieve cada 2 s sin límite, la primera consulta
+llega a los pocos milisegundos y el intervalo crece exponencialmente hasta un
+máximo: las respuestas rápidas se devuelven en cuanto terminan y las lentas no
+saturan la API. Hay un plazo total (al vencer se cancela el run), cancelación
+desde otro hilo con un threading.Event y, opcionalmente, streaming de eventos
+para recibir el texto mientras se genera.
+"""
+import queue
+import threading
+import time
+from typing import Callable, Optional
+
+import openai
+
+PENDING_STATUSES = ('queued', 'in_progress', 'cancelling')
+INITIAL_POLL_INTERVAL = 0.1  # segundos
+MAX_POLL_INTERVAL = 2.0
+POLL_BACKOFF = 1.6
+DEFAULT_DEADLINE = 120.0
+STREAM_POLL_INTERVAL = 0.05  # segundos entre comprobaciones de plazo y cancelación mientras no llegan eventos
+
+
+class RunTimeout(Exception):
+    """El run no terminó dentro del plazo (ya se solicitó su cancelación)"""
+
+
+class RunCancelled(Exception):
+    """La espera se canceló desde fuera (ya se solicitó la cancelación del run)"""
+
+
+def poll_intervals(initial: float = INITIAL_POLL_INTERVAL, maximum: float = MAX_POLL_INTERVAL,
+                   factor: float = POLL_BACKOFF):
+    """initial, initial*factor, ... hasta maximum (infinito)"""
+    interval = initial
+    while True:
+        yield interval
+        interval = min(maximum, interval * factor)
+
+
+def _cancel_run(client, thread_id: str, run_id: str) -> None:
+    try:
+        client.beta.threads.runs.cancel(thread_id=thread_id, run_id=run_id)
+    except Exception:
+        pass  # el run pudo terminar entre tanto; la espera ya se abandonó
+
+
+def wait_for_run(client, thread_id: str, run, deadline: float = DEFAULT_DEADLINE,
+                 cancel: Optional[threading.Event] = None,
+                 initial_interval: float = INITIAL_POLL_INTERVAL,
+                 max_interval: float = MAX_POLL_INTERVAL):
+    """Consulta el run con backoff exponencial hasta que sale de queued/in_progress.
+
+    Devuelve el run en su estado final (completed, failed, requires_action...).
+    Lanza RunTimeout si vence `deadline` segundos y RunCancelled si se activa
+    `cancel`; en ambos casos se pide a la API que cancele el run.
+    """
+    expires = time.monotonic() + deadline
+    for interval in poll_intervals(initial_interval, max_interval):
+        if run.status not in PENDING_STATUSES:
+            return run
+        remaining = expires - time.monotonic()
+        if remaining <= 0:
+            _cancel_run(client, thread_id, run.id)
+            raise RunTimeout(f"Run {run.id} sin terminar tras {deadline:g}s (estado: {run.status})")
+        # Event.wait duerme el intervalo pero despierta en cuanto se cancela
+        if cancel is not None:
+            if cancel.wait(min(interval, remaining)):
+                _cancel_run(client, thread_id, run.id)
+                raise RunCancelled(f"Espera del run {run.id} cancelada")
+        else:
+            time.sleep(min(interval, remaining))
+        run = client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run.id)
+
+
+def _pump_events(stream, events: queue.Queue) -> None:
+    """Lee el stream en un hilo aparte y deja en la cola cada evento, el final o el error"""
+    try:
+        for event in stream:
+            events.put(('event', event))
+        events.put(('end', None))
+    except BaseException as error:
+        events.put(('error', error))
+
+
+def stream_run(client, thread_id: str, assistant_id: str, on_text: Optional[Callable[[str], None]] = None,
+               deadline: float = DEFAULT_DEADLINE, cancel: Optional[threading.Event] = None):
+    """Crea el run con stream=True y devuelve (estado final, texto de la respuesta).
+
+    on_text recibe cada fragmento de texto en cuanto llega. Con plazo vencido o
+    `cancel` activado se corta el stream, se cancela el run y se lanza
+    RunTimeout / RunCancelled. El plazo se cumple aunque el stream deje de
+    enviar eventos: la lectura corre en un hilo aparte y este solo espera en
+    la cola hasta el plazo; además ninguna lectura espera más que `deadline`
+    (el cliente usa 600 s por defecto), así que ese hilo también termina.
+    """
+    expires = time.monotonic() + deadline
+    try:
+        stream = client.beta.threads.runs.create(thread_id=thread_id, assistant_id=assistant_id, stream=True,
+                                                 timeout=deadline)
+    except openai.APITimeoutError as error:
+        raise RunTimeout(f"El run no empezó dentro del plazo de {deadline:g}s") from error
+    parts = []
+    status, run_id = None, None
+
+    def stop(reason: str) -> Exception:
+        if run_id:
+            _cancel_run(client, thread_id, run_id)
+        if reason == 'cancelled':
+            return RunCancelled(f"Stream del run {run_id} cancelado")
+        return RunTimeout(f"Run {run_id} sin terminar tras {deadline:g}s (estado: {status})")
+
+    events: queue.Queue = queue.Queue()
+    threading.Thread(target=_pump_events, args=(stream, events), daemon=True).start()
+    try:
+        while True:
+            if cancel is not None and cancel.is_set():
+                raise stop('cancelled')
+            remaining = expires - time.monotonic()
+            if remaining <= 0:
+                raise stop('timeout')
+            try:
+                kind, item = events.get(timeout=min(STREAM_POLL_INTERVAL, remaining))
+            except queue.Empty:
+                continue
+            if kind == 'end':
+                break
+            if kind == 'error':
+                # Lectura vencida (timeout=deadline) o error de la API durante el stream
+                if isinstance(item, (openai.APITimeoutError, TimeoutError)) or time.monotonic() >= expires:
+                    raise stop('timeout') from item
+                raise item
+
+            event, data = item, getattr(item, 'data', None)
+            if event.event.startswith('thread.run.') and not event.event.startswith('thread.run.step.'):
+                run_id = data.id
+                status = data.status
+            elif event.event == 'thread.message.delta':
+                for block in data.delta.content or []:
+                    text = getattr(getattr(block, 'text', None), 'value', None)
+                    if text:
+                        parts.append(text)
+                        if on_text:
+                            on_text(text)
+            elif event.event == 'error':
+                status = 'failed'
+    finally:
+        close = getattr(stream, 'close', None)
+        if close:
+            try:
+                close()
+            except Exception:
+                pass  # el hilo lector termina solo al cortarse el stream o vencer la lectura
+    return status, ''.join(parts)
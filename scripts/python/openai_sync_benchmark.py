@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la sincronización con OpenAI contra el servidor simulado
+Genera conversaciones sintéticas en memoria (sin MySQL), arranca
+openai_mock_server en segundo plano y mide el motor de openai_async_sync con
+distintas concurrencias: conversaciones/s, solicitudes/s, 429 y tiempo
+esperando cupo del limitador. Se ejecuta el mismo camino que la
+sincronización real (run_sync con diario): el diario de MySQL se sustituye
+por uno en SQLite con el mismo comportamiento, que confirma tras cada paso. Con la misma semilla los resultados son
+comparables entre ejecuciones, lo que permite ajustar concurrencia,
+OPENAI_RPM/OPENAI_TPM y el empaquetado de mensajes sin gastar cuota.
+
+También mide la latencia de respuesta de query_openai_thread (espera de runs)
+frente a la duración real del run.
+"""
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+import warnings
+from typing import Any, Dict, List, Optional, Tuple
+
+from openai_async_sync import run_sync
+from openai_mock_server import MockConfig, start_background
+from openai_rate_limit import RateLimiter
+from openai_run_wait import wait_for_run
+
+
+class MemoryStore:
+    """Almacén en memoria con la interfaz que espera AsyncThreadSync"""
+
+    def __init__(self, conversations: Dict[str, Dict[str, Any]], messages: Dict[str, List[Dict[str, Any]]]):
+        self.conversations = conversations
+        self.messages = messages
+
+    def get_conversation(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        return self.conversations.get(conversation_id)
+
+    def get_conversation_messages(self, conversation_id: str) -> List[Dict[str, Any]]:
+        return self.messages.get(conversation_id, [])
+
+    def save_thread_id(self, conversation_id: str, thread_id: str) -> None:
+        self.conversations[conversation_id]['openai_thread_id'] = thread_id
+
+
+def synthetic_store(conversations: int = 100, messages: int = 30, mean_chars: int = 600,
+                    seed: int = 7) -> MemoryStore:
+    """Conversaciones alternando user/assistant; longitudes con distribución exponencial
+    (muchos mensajes cortos y algunos muy largos, como en el export real)"""
+    rng = random.Random(seed)
+    store_conversations, store_messages = {}, {}
+    for c in range(conversations):
+        conv_id = f"bench-{c:06d}"
+        store_conversations[conv_id] = {'id': conv_id, 'title': f"Conversación {c}", 'openai_thread_id': None}
+        store_messages[conv_id] = [
+            {'id': f"{conv_id}-{m:04d}", 'author_role': 'user' if m % 2 == 0 else 'assistant',
+             'content_text': 'x' * max(1, int(rng.expovariate(1.0 / mean_chars)))}
+            for m in range(messages)
+        ]
+    return MemoryStore(store_conversations, store_messages)
+
+
+class SQLiteJournal:
+    """Diario con la interfaz y el comportamiento de SyncJournal sobre SQLite (':memory:' o un fichero)"""
+
+    def __init__(self, path: str = ':memory:'):
+        # Los accesos llegan serializados desde hilos de asyncio.to_thread
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS openai_sync_journal (
+                conversation_id TEXT PRIMARY KEY,
+                project_chatgpt_id TEXT,
+                thread_id TEXT,
+                status TEXT NOT NULL DEFAULT 'creating',
+                last_message_id TEXT,
+                last_chunk INTEGER,
+                requests_sent INTEGER NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 1,
+                orphaned_threads INTEGER NOT NULL DEFAULT 0,
+                error TEXT
+            )
+        """)
+        self.connection.commit()
+
+    def _execute(self, sql: str, params: tuple = ()) -> None:
+        self.connection.execute(sql, params)
+        self.connection.commit()
+
+    def get(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        row = self.connection.execute("SELECT * FROM openai_sync_journal WHERE conversation_id = ?",
+                                      (conversation_id,)).fetchone()
+        return dict(row) if row else None
+
+    def start(self, conversation_id: str, project_chatgpt_id: str) -> None:
+        self._execute("""
+            INSERT INTO openai_sync_journal (conversation_id, project_chatgpt_id, status) VALUES (?, ?, 'creating')
+            ON CONFLICT (conversation_id) DO UPDATE SET
+                orphaned_threads = orphaned_threads + (thread_id IS NULL),
+                project_chatgpt_id = excluded.project_chatgpt_id, status = 'creating', thread_id = NULL,
+                last_message_id = NULL, last_chunk = NULL, attempts = attempts + 1, error = NULL
+        """, (conversation_id, project_chatgpt_id))
+
+    def thread_created(self, conversation_id: str, thread_id: str, last: Optional[Tuple[str, int]] = None) -> None:
+        last_message_id, last_chunk = last or (None, None)
+        self._execute("""
+            UPDATE openai_sync_journal
+            SET thread_id = ?, status = 'posting', last_message_id = ?, last_chunk = ?,
+                requests_sent = requests_sent + 1
+            WHERE conversation_id = ?
+        """, (thread_id, last_message_id, last_chunk, conversation_id))
+
+    def posted(self, conversation_id: str, last: Tuple[str, int]) -> None:
+        self._execute("""
+            UPDATE openai_sync_journal
+            SET status = 'posting', last_message_id = ?, last_chunk = ?, requests_sent = requests_sent + 1
+            WHERE conversation_id = ?
+        """, (last[0], last[1], conversation_id))
+
+    def resumed(self, conversation_id: str) -> None:
+        self._execute("UPDATE openai_sync_journal SET attempts = attempts + 1, error = NULL WHERE conversation_id = ?",
+                      (conversation_id,))
+
+    def finish(self, conversation_id: str) -> None:
+        self._execute("UPDATE openai_sync_journal SET status = 'done', error = NULL WHERE conversation_id = ?",
+                      (conversation_id,))
+
+    def fail(self, conversation_id: str, error: str) -> None:
+        self._execute("UPDATE openai_sync_journal SET status = 'failed', error = ? WHERE conversation_id = ?",
+                      (error[:1000], conversation_id))
+
+    def summary(self) -> Dict[str, int]:
+        """{estado: conversaciones}"""
+        return dict(self.connection.execute(
+            "SELECT status, COUNT(*) FROM openai_sync_journal GROUP BY status").fetchall())
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+def benchmark_sync(server, concurrency: int, conversations: int, messages: int, mean_chars: int,
+                   rpm: float, tpm: float, journal_path: str = ':memory:') -> Dict[str, Any]:
+    """Una pasada completa de run_sync (con diario) con `concurrency`; devuelve métricas"""
+    from openai import AsyncOpenAI
+
+    server.state.reset()
+    store = synthetic_store(conversations, messages, mean_chars)
+    limiter = RateLimiter(rpm=rpm, tpm=tpm)
+    if journal_path != ':memory:' and os.path.exists(journal_path):
+        os.remove(journal_path)  # cada pasada empieza sin progreso guardado
+    journal = SQLiteJournal(journal_path)
+    client = AsyncOpenAI(base_url=server.base_url, api_key='mock', max_retries=0)
+    started = time.perf_counter()
+    summary = run_sync(store, [(conv_id, 'proj_bench') for conv_id in store.conversations],
+                       concurrency=concurrency, limiter=limiter, journal=journal, client=client, verbose=False)
+    elapsed = time.perf_counter() - started
+    journal_status = journal.summary()
+    journal.close()
+    stats = server.state.stats
+    return {
+        'concurrency': concurrency,
+        'conversations': summary['synced'],
+        'failed': summary['failed'],
+        'seconds': round(elapsed, 3),
+        'conversations_per_sec': round(summary['synced'] / elapsed, 2),
+        'requests': stats['requests'],
+        'requests_per_sec': round(stats['requests'] / elapsed, 2),
+        'messages_stored': stats['messages_stored'],
+        'source_messages': conversations * messages,
+        'server_429': stats['rate_limited'],
+        'server_500': stats['server_errors'],
+        'client_retries': summary['retries'],
+        'limiter_wait_sec': round(summary['waited'], 3),
+        'journal_done': journal_status.get('done', 0),
+    }
+
+
+def benchmark_run_wait(server, queries: int = 5) -> Dict[str, Any]:
+    """Latencia desde runs.create hasta tener la respuesta, frente a la duración del run
+    (sin límites ni errores inyectados: solo se mide la espera)"""
+    from openai import OpenAI
+
+    config = server.state.config
+    saved = (config.rpm, config.rate_limit_rate, config.server_error_rate)
+    config.rpm, config.rate_limit_rate, config.server_error_rate = 0, 0.0, 0.0
+    server.state.reset()
+    client = OpenAI(base_url=server.base_url, api_key='mock', max_retries=0)
+    thread = client.beta.threads.create(messages=[{'role': 'user', 'content': 'hola'}])
+    latencies = []
+    for _ in range(queries):
+        started = time.perf_counter()
+        run = client.beta.threads.runs.create(thread_id=thread.id, assistant_id='asst_mock')
+        wait_for_run(client, thread.id, run)
+        latencies.append(time.perf_counter() - started)
+    client.close()
+    config.rpm, config.rate_limit_rate, config.server_error_rate = saved
+    run_duration = config.run_duration
+    mean = sum(latencies) / len(latencies)
+    return {'queries': queries, 'run_duration': run_duration, 'mean_latency': round(mean, 3),
+            'max_latency': round(max(latencies), 3), 'mean_overhead': round(mean - run_duration, 3)}
+
+
+def _options(args: List[str]) -> Dict[str, str]:
+    """Opciones --clave=valor"""
+    return dict(arg[2:].partition('=')[::2] for arg in args if arg.startswith('--'))
+
+
+if __name__ == "__main__":
+    # Uso: python openai_sync_benchmark.py [--conversations=100] [--messages=30] [--chars=600]
+    #        [--concurrency=1,4,8,16] [--latency=0.02] [--server-rpm=0] [--rate-limit-rate=0.0]
+    #        [--server-error-rate=0.0] [--rpm=100000] [--tpm=100000000] [--journal=diario.db]
+    #        [--json=resultados.json]
+    warnings.simplefilter('ignore', DeprecationWarning)  # la SDK marca la API de Assistants como obsoleta
+    options = _options(sys.argv[1:])
+    config = MockConfig(
+        latency=float(options.get('latency') or 0.02),
+        rpm=int(options.get('server-rpm') or 0),
+        rate_limit_rate=float(options.get('rate-limit-rate') or 0),
+        server_error_rate=float(options.get('server-error-rate') or 0),
+        retry_after=float(options.get('retry-after') or 0.2),
+        run_duration=float(options.get('run-duration') or 0.5),
+    )
+    server = start_background(config)
+    conversations = int(options.get('conversations') or 100)
+    messages = int(options.get('messages') or 30)
+    mean_chars = int(options.get('chars') or 600)
+    # Por defecto el limitador del cliente no frena: se mide el motor y el servidor simulado
+    rpm = float(options.get('rpm') or 100000)
+    tpm = float(options.get('tpm') or 100000000)
+    # Diario en memoria por defecto; con un fichero se incluye el coste real de cada commit
+    journal_path = options.get('journal') or ':memory:'
+
+    print(f"🧪 Servidor simulado en {server.base_url} (latencia {config.latency * 1000:.0f} ms, "
+          f"límite {config.rpm or 'sin límite'} rpm, 429 inyectados {config.rate_limit_rate:.0%})")
+    print(f"   {conversations} conversaciones × {messages} mensajes (~{mean_chars} caracteres de media)\n")
+    print(f"{'conc':>5} {'conv/s':>8} {'req/s':>8} {'solicitudes':>11} {'429':>5} {'reintentos':>10} {'espera':>8} {'tiempo':>8}")
+
+    results = {'config': {'conversations': conversations, 'messages': messages, 'mean_chars': mean_chars,
+                          'latency': config.latency, 'server_rpm': config.rpm,
+                          'rate_limit_rate': config.rate_limit_rate, 'rpm': rpm, 'tpm': tpm,
+                          'journal': journal_path},
+               'sync': []}
+    for concurrency in [int(value) for value in (options.get('concurrency') or '1,4,8,16').split(',')]:
+        result = benchmark_sync(server, concurrency, conversations, messages, mean_chars, rpm, tpm, journal_path)
+        results['sync'].append(result)
+        print(f"{concurrency:>5} {result['conversations_per_sec']:>8.2f} {result['requests_per_sec']:>8.1f} "
+              f"{result['requests']:>11,} {result['server_429']:>5} {result['client_retries']:>10} "
+              f"{result['limiter_wait_sec']:>7.1f}s {result['seconds']:>7.1f}s"
+              + (f"  ⚠️ {result['failed']} fallidas" if result['failed'] else ''))
+
+    first = results['sync'][0]
+    print(f"\n📦 Empaquetado: {first['source_messages']:,} mensajes de origen → "
+          f"{first['messages_stored']:,} mensajes en threads")
+
+    results['run_wait'] = benchmark_run_wait(server)
+    run_wait = results['run_wait']
+    print(f"⏱️ Espera de runs: {run_wait['mean_latency'] * 1000:.0f} ms de media para runs de "
+          f"{run_wait['run_duration'] * 1000:.0f} ms (sobrecoste {run_wait['mean_overhead'] * 1000:.0f} ms)")
+
+    if options.get('json'):
+        with open(options['json'], 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Resultados en {options['json']}")
+    server.shutdown()
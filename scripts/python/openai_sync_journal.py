@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Diario de sincronización con OpenAI (tabla openai_sync_journal)
+conversations.openai_thread_id solo se escribe al terminar de enviar todos
+los mensajes. El diario guarda el progreso intermedio de cada conversación,
+confirmado tras cada paso: el thread creado y el último mensaje (y trozo,
+ver message_packing) enviado con éxito. Una nueva ejecución reanuda en ese
+punto: no crea un thread duplicado ni reenvía lo que ya está en OpenAI.
+
+Estados: creating (se pidió el thread), posting (thread creado, enviando
+mensajes), done (completo) y failed (último error; se reanuda igual).
+
+El thread se crea vacío y se registra antes de enviar contenido. Si un intento
+no llegó a registrarlo (creating, o failed sin thread_id), el siguiente lo
+anota en orphaned_threads: puede existir un thread vacío con
+chatbeto_conversation_id en su metadata.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+JOURNAL_TABLE = 'openai_sync_journal'
+
+CREATE_JOURNAL_TABLE_SQL = f"""
+    CREATE TABLE IF NOT EXISTS {JOURNAL_TABLE} (
+        conversation_id VARCHAR(36) NOT NULL,
+        project_chatgpt_id VARCHAR(100) DEFAULT NULL,
+        thread_id VARCHAR(100) DEFAULT NULL,
+        status VARCHAR(20) NOT NULL DEFAULT 'creating',
+        last_message_id VARCHAR(36) DEFAULT NULL,
+        last_chunk INT DEFAULT NULL,
+        requests_sent INT NOT NULL DEFAULT 0,
+        attempts INT NOT NULL DEFAULT 1,
+        orphaned_threads INT NOT NULL DEFAULT 0,
+        error TEXT DEFAULT NULL,
+        started_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        PRIMARY KEY (conversation_id),
+        KEY idx_status (status)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+"""
+
+
+class SyncJournal:
+    """Progreso de sincronización por conversación; cada escritura se confirma al momento"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def _execute(self, sql: str, params: tuple = ()) -> None:
+        cursor = self.connection.cursor()
+        cursor.execute(sql, params)
+        self.connection.commit()
+        cursor.close()
+
+    def ensure_table(self) -> None:
+        """Crea la tabla si no existe y agrega las columnas nuevas (DDL: commit implícito)"""
+        self._execute(CREATE_JOURNAL_TABLE_SQL)
+        cursor = self.connection.cursor()
+        cursor.execute(f"""
+            SELECT COUNT(*) FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = '{JOURNAL_TABLE}' AND COLUMN_NAME = 'orphaned_threads'
+        """)
+        missing = cursor.fetchone()[0] == 0
+        cursor.close()
+        if missing:
+            self._execute(f"ALTER TABLE {JOURNAL_TABLE} ADD COLUMN orphaned_threads INT NOT NULL DEFAULT 0 AFTER attempts")
+
+    def get(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        cursor = self.connection.cursor(dictionary=True)
+        cursor.execute(f"SELECT * FROM {JOURNAL_TABLE} WHERE conversation_id = %s", (conversation_id,))
+        entry = cursor.fetchone()
+        cursor.close()
+        return entry
+
+    def start(self, conversation_id: str, project_chatgpt_id: str) -> None:
+        """Se va a crear el thread vacío (si la ejecución muere antes de thread_created, puede quedar huérfano).
+
+        Un intento anterior sin thread registrado se suma a orphaned_threads en lugar de olvidarse.
+        """
+        # orphaned_threads va primero: MySQL evalúa las asignaciones en orden, con los valores ya cambiados
+        self._execute(f"""
+            INSERT INTO {JOURNAL_TABLE} (conversation_id, project_chatgpt_id, status)
+            VALUES (%s, %s, 'creating')
+            ON DUPLICATE KEY UPDATE orphaned_threads = orphaned_threads + IF(thread_id IS NULL, 1, 0),
+                                    project_chatgpt_id = VALUES(project_chatgpt_id), status = 'creating',
+                                    thread_id = NULL, last_message_id = NULL, last_chunk = NULL,
+                                    attempts = attempts + 1, error = NULL
+        """, (conversation_id, project_chatgpt_id))
+
+    def thread_created(self, conversation_id: str, thread_id: str, last: Optional[Tuple[str, int]] = None) -> None:
+        """Thread creado (vacío: last = None; o con contenido hasta `last` = (message_id, trozo))"""
+        last_message_id, last_chunk = last or (None, None)
+        self._execute(f"""
+            UPDATE {JOURNAL_TABLE}
+            SET thread_id = %s, status = 'posting', last_message_id = %s, last_chunk = %s,
+                requests_sent = requests_sent + 1
+            WHERE conversation_id = %s
+        """, (thread_id, last_message_id, last_chunk, conversation_id))
+
+    def posted(self, conversation_id: str, last: Tuple[str, int]) -> None:
+        """Mensaje enviado con éxito hasta `last` = (message_id, trozo)"""
+        self._execute(f"""
+            UPDATE {JOURNAL_TABLE}
+            SET status = 'posting', last_message_id = %s, last_chunk = %s, requests_sent = requests_sent + 1
+            WHERE conversation_id = %s
+        """, (last[0], last[1], conversation_id))
+
+    def resumed(self, conversation_id: str) -> None:
+        self._execute(f"UPDATE {JOURNAL_TABLE} SET attempts = attempts + 1, error = NULL WHERE conversation_id = %s",
+                      (conversation_id,))
+
+    def finish(self, conversation_id: str) -> None:
+        self._execute(f"UPDATE {JOURNAL_TABLE} SET status = 'done', error = NULL WHERE conversation_id = %s",
+                      (conversation_id,))
+
+    def fail(self, conversation_id: str, error: str) -> None:
+        """Registra el error; el progreso guardado se conserva para reanudar"""
+        self._execute(f"UPDATE {JOURNAL_TABLE} SET status = 'failed', error = %s WHERE conversation_id = %s",
+                      (error[:1000], conversation_id))
+
+    def summary(self) -> List[Tuple[str, int]]:
+        """[(estado, conversaciones)]"""
+        cursor = self.connection.cursor()
+        cursor.execute(f"SELECT status, COUNT(*) FROM {JOURNAL_TABLE} GROUP BY status ORDER BY status")
+        rows = cursor.fetchall()
+        cursor.close()
+        return rows
+
+
+if __name__ == "__main__":
+    # Uso: python openai_sync_journal.py   # resumen del diario y conversaciones pendientes
+    from db_pool import connect
+
+    connection = connect()
+    journal = SyncJournal(connection)
+    journal.ensure_table()
+
+    print(f"📒 Diario de sincronización ({JOURNAL_TABLE}):")
+    for status, count in journal.summary():
+        print(f"  {status:<10} {count:>8,}")
+
+    cursor = connection.cursor()
+    cursor.execute(f"SELECT COUNT(*), COALESCE(SUM(orphaned_threads), 0) FROM {JOURNAL_TABLE} WHERE orphaned_threads > 0")
+    conversations, orphaned = cursor.fetchone()
+    cursor.close()
+    if orphaned:
+        print(f"\n🧹 {int(orphaned):,} posibles threads vacíos huérfanos en {conversations:,} conversaciones "
+              f"(búscalos por metadata chatbeto_conversation_id)")
+
+    cursor = connection.cursor()
+    cursor.execute(f"""
+        SELECT conversation_id, status, thread_id, requests_sent, attempts, error
+        FROM {JOURNAL_TABLE}
+        WHERE status <> 'done'
+        ORDER BY updated_at DESC
+        LIMIT 20
+    """)
+    pending = cursor.fetchall()
+    if pending:
+        print("\n⏳ Pendientes (se reanudan en la próxima sincronización):")
+        for conversation_id, status, thread_id, requests_sent, attempts, error in pending:
+            print(f"  {conversation_id} {status:<9} {thread_id or '-':<32} {requests_sent} envíos, "
+                  f"{attempts} intentos{(' | ' + error[:60]) if error else ''}")
+    cursor.close()
+    connection.close()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Conciliación de contadores de proyectos (projects.conversation_count,
+message_count y last_activity)
+Calcula los valores reales de todos los proyectos en una sola pasada agrupada
+(o desde stats_rollup, que mantienen los importadores), los compara con los
+guardados y aplica solo las diferencias con un único UPDATE con JOIN. El número
+de consultas no depende de la cantidad de proyectos.
+"""
+import sys
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+COUNTER_COLUMNS = ('conversation_count', 'message_count', 'last_activity')
+INSERT_BATCH_SIZE = 1000
+
+
+class CounterDrift(NamedTuple):
+    project_id: int
+    name: str
+    columns: Tuple[str, ...]  # columnas conciliadas, en el orden de stored/actual
+    stored: Tuple[Any, ...]
+    actual: Tuple[Any, ...]
+
+
+def _counter_columns(cursor) -> List[str]:
+    """Columnas de contadores presentes en projects (los esquemas antiguos no tienen todas)"""
+    cursor.execute("""
+        SELECT COLUMN_NAME FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'projects'
+    """)
+    existing = {row[0] for row in cursor.fetchall()}
+    return [column for column in COUNTER_COLUMNS if column in existing]
+
+
+def _normalize(value: Any) -> Any:
+    """Decimal/None comparables entre lo guardado y lo calculado"""
+    if value is None:
+        return None
+    return float(value) if not isinstance(value, int) else value
+
+
+def actual_counters(cursor, conversation_key: str = 'id', with_messages: bool = True,
+                    with_last_activity: bool = True) -> Dict[int, Tuple[int, int, Optional[float]]]:
+    """{project_id: (conversaciones, mensajes, última actividad)} en una sola consulta agrupada.
+
+    conversation_key es la columna de conversations a la que apunta
+    messages.conversation_id: 'id' en el esquema actual, 'conversation_id' en el anterior.
+    Sin with_messages no se recorre messages y los mensajes quedan en 0.
+    """
+    if conversation_key not in ('id', 'conversation_id'):
+        raise ValueError(f"Columna de conversación no válida: {conversation_key}")
+    messages_sql, join_sql = "0", ""
+    if with_messages:
+        messages_sql = "COALESCE(SUM(mc.total), 0)"
+        join_sql = f"""
+        LEFT JOIN (
+            SELECT conversation_id, COUNT(*) AS total
+            FROM messages
+            GROUP BY conversation_id
+        ) mc ON mc.conversation_id = c.{conversation_key}"""
+    last_activity_sql = "MAX(c.update_time)" if with_last_activity else "NULL"
+    cursor.execute(f"""
+        SELECT c.project_id, COUNT(*), {messages_sql}, {last_activity_sql}
+        FROM conversations c{join_sql}
+        WHERE c.project_id IS NOT NULL
+        GROUP BY c.project_id
+    """)
+    return {project_id: (int(conversations), int(messages), _normalize(last_activity))
+            for project_id, conversations, messages, last_activity in cursor.fetchall()}
+
+
+def rollup_counters(cursor) -> Dict[int, Tuple[int, int, None]]:
+    """{project_id: (conversaciones, mensajes, None)} desde stats_rollup, sin recorrer messages"""
+    cursor.execute("""
+        SELECT bucket, conversations, messages FROM stats_rollup
+        WHERE dimension = 'project' AND bucket <> ''
+    """)
+    return {int(bucket): (int(conversations), int(messages), None)
+            for bucket, conversations, messages in cursor.fetchall()}
+
+
+def reconcile_project_counters(cursor, conversation_key: str = 'id', from_rollup: bool = False,
+                               apply: bool = True) -> List[CounterDrift]:
+    """Compara los contadores guardados con los reales y (con apply) corrige los que difieren.
+
+    Devuelve la lista de proyectos con diferencias. No confirma la transacción.
+    Con from_rollup, last_activity no se concilia (stats_rollup no la guarda).
+    """
+    columns = _counter_columns(cursor)
+    if from_rollup and 'last_activity' in columns:
+        columns.remove('last_activity')
+    if not columns:
+        return []
+
+    if from_rollup:
+        actual = rollup_counters(cursor)
+    else:
+        actual = actual_counters(cursor, conversation_key, with_messages='message_count' in columns,
+                                 with_last_activity='last_activity' in columns)
+    empty = (0, 0, None)
+    indexes = [COUNTER_COLUMNS.index(column) for column in columns]
+    column_names = tuple(columns)
+
+    cursor.execute(f"SELECT id, name, {', '.join(columns)} FROM projects")
+    drift = []
+    for project_id, name, *stored in cursor.fetchall():
+        stored = tuple(_normalize(value) for value in stored)
+        expected = tuple(actual.get(project_id, empty)[i] for i in indexes)
+        if stored != expected:
+            drift.append(CounterDrift(project_id, name, column_names, stored, expected))
+
+    if apply and drift:
+        cursor.execute(f"""
+            CREATE TEMPORARY TABLE tmp_project_counters (
+                project_id INT NOT NULL PRIMARY KEY,
+                conversation_count INT NOT NULL,
+                message_count INT NOT NULL,
+                last_activity DECIMAL(20,6) NULL
+            )
+        """)
+        rows = [(item.project_id, *(actual.get(item.project_id, empty))) for item in drift]
+        for start in range(0, len(rows), INSERT_BATCH_SIZE):
+            cursor.executemany("""
+                INSERT INTO tmp_project_counters (project_id, conversation_count, message_count, last_activity)
+                VALUES (%s, %s, %s, %s)
+            """, rows[start:start + INSERT_BATCH_SIZE])
+        cursor.execute(f"""
+            UPDATE projects p
+            INNER JOIN tmp_project_counters t ON t.project_id = p.id
+            SET {', '.join(f'p.{column} = t.{column}' for column in columns)}
+        """)
+        cursor.execute("DROP TEMPORARY TABLE IF EXISTS tmp_project_counters")
+
+    return drift
+
+
+def print_drift_report(drift: List[CounterDrift], limit: int = 20) -> None:
+    """Resumen de las diferencias encontradas (guardado -> real)"""
+    if not drift:
+        print("  ✅ Contadores de proyectos al día (sin diferencias)")
+        return
+    print(f"  ⚠️ {len(drift)} proyectos con contadores desactualizados:")
+    # Primero los proyectos con mayor diferencia en los conteos
+    worst = sorted(drift, key=lambda item: -sum(abs((actual or 0) - (stored or 0))
+                                                 for column, stored, actual in zip(item.columns, item.stored, item.actual)
+                                                 if column.endswith('_count')))
+    for item in worst[:limit]:
+        changes = ', '.join(f"{column}: {stored} → {actual}"
+                            for column, stored, actual in zip(item.columns, item.stored, item.actual)
+                            if stored != actual)
+        print(f"    {item.project_id:4d}. {item.name[:35]:<35} {changes}")
+    if len(drift) > limit:
+        print(f"    ... y {len(drift) - limit} más")
+
+
+if __name__ == "__main__":
+    # Uso: python project_counters.py [--dry-run] [--from-rollup] [--legacy]
+    #   --dry-run      solo informar las diferencias
+    #   --from-rollup  usar stats_rollup en lugar de recorrer messages
+    #   --legacy       esquema anterior (messages.conversation_id = conversations.conversation_id)
+    from db_pool import connect
+
+    connection = connect(autocommit=False)
+    cursor = connection.cursor()
+
+    print("📊 Conciliando contadores de proyectos...")
+    drift = reconcile_project_counters(
+        cursor,
+        conversation_key='conversation_id' if '--legacy' in sys.argv else 'id',
+        from_rollup='--from-rollup' in sys.argv,
+        apply='--dry-run' not in sys.argv,
+    )
+    print_drift_report(drift)
+    if drift and '--dry-run' not in sys.argv:
+        connection.commit()
+        print(f"✅ {len(drift)} proyectos corregidos")
+
+    cursor.close()
+    connection.close()
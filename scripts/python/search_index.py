@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Índice FULLTEXT y búsqueda rankeada sobre messages.content_text
+Mantiene los índices FULLTEXT de MySQL (creación, suspensión durante recargas
+completas y optimización tras importaciones incrementales) y ofrece una
+búsqueda con puntaje de relevancia y fragmentos, en lugar de `LIKE '%texto%'`
+que recorre la tabla completa en cada consulta.
+"""
+import re
+import sys
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from content_store import content_store_enabled, message_text_sql
+
+# (tabla, nombre del índice, columna). Se crean solo si la columna existe:
+# messages.parts es la columna del esquema anterior que usa buscar_chat_with_filters.php
+FULLTEXT_INDEXES = (
+    ('messages', 'ft_messages_content', 'content_text'),
+    ('messages', 'ft_messages_parts', 'parts'),
+    ('message_contents', 'ft_message_contents_text', 'content_text'),  # almacén de contenidos (content_store.py)
+    ('conversations', 'ft_conversations_title', 'title'),
+)
+
+FT_MIN_TOKEN = 3      # innodb_ft_min_token_size por defecto: palabras más cortas no se indexan
+SNIPPET_RADIUS = 80   # caracteres de contexto a cada lado de la primera coincidencia
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def search_terms(query: str) -> List[str]:
+    """Palabras de la consulta que el índice FULLTEXT puede encontrar"""
+    terms = []
+    for token in _TOKEN_RE.findall(query.lower()):
+        if len(token) >= FT_MIN_TOKEN and token not in terms:
+            terms.append(token)
+    return terms
+
+
+def boolean_query(terms: Sequence[str]) -> str:
+    """Consulta IN BOOLEAN MODE: todas las palabras obligatorias, por prefijo (búsqueda mientras se escribe)"""
+    return ' '.join(f'+{term}*' for term in terms)
+
+
+def make_snippet(text: str, terms: Sequence[str], radius: int = SNIPPET_RADIUS,
+                 mark: Tuple[str, str] = ('«', '»')) -> str:
+    """Fragmento alrededor de la primera coincidencia con los términos resaltados"""
+    if not text:
+        return ''
+    lower = text.lower()
+    positions = [lower.find(term) for term in terms]
+    positions = [pos for pos in positions if pos >= 0]
+    center = min(positions) if positions else 0
+
+    start = max(0, center - radius)
+    end = min(len(text), center + radius * 2)
+    snippet = ' '.join(text[start:end].split())
+    if terms:
+        pattern = re.compile('(' + '|'.join(re.escape(term) + r'\w*' for term in terms) + ')', re.IGNORECASE)
+        snippet = pattern.sub(lambda m: f'{mark[0]}{m.group(0)}{mark[1]}', snippet)
+    return ('…' if start > 0 else '') + snippet + ('…' if end < len(text) else '')
+
+
+# ---------------------------------------------------------------------------
+# Mantenimiento del índice
+# ---------------------------------------------------------------------------
+
+def _existing_columns(cursor, table: str) -> set:
+    cursor.execute("""
+        SELECT COLUMN_NAME FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+    """, (table,))
+    return {row[0] for row in cursor.fetchall()}
+
+
+def existing_fulltext_indexes(cursor) -> set:
+    """{(tabla, índice)} de los índices FULLTEXT ya creados"""
+    cursor.execute("""
+        SELECT DISTINCT TABLE_NAME, INDEX_NAME FROM information_schema.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND INDEX_TYPE = 'FULLTEXT'
+    """)
+    return {(table, index) for table, index in cursor.fetchall()}
+
+
+def ensure_fulltext_indexes(cursor, tables: Optional[Iterable[str]] = None) -> List[str]:
+    """Crea los índices FULLTEXT que falten; devuelve los nombres creados"""
+    tables = set(tables) if tables else None
+    existing = existing_fulltext_indexes(cursor)
+    columns_by_table: Dict[str, set] = {}
+    created = []
+    for table, index, column in FULLTEXT_INDEXES:
+        if tables is not None and table not in tables:
+            continue
+        if (table, index) in existing:
+            continue
+        if table not in columns_by_table:
+            columns_by_table[table] = _existing_columns(cursor, table)
+        if column not in columns_by_table[table]:
+            continue
+        print(f"  🔎 Creando índice FULLTEXT {index} sobre {table}.{column}...")
+        cursor.execute(f"ALTER TABLE {table} ADD FULLTEXT INDEX {index} ({column})")
+        created.append(index)
+    return created
+
+
+def drop_fulltext_indexes(cursor, table: str) -> List[str]:
+    """Elimina los índices FULLTEXT gestionados de una tabla; devuelve los eliminados.
+
+    Para recargas completas: cargar sin índice y construirlo una sola vez al
+    final (ensure_fulltext_indexes) es más rápido que actualizarlo fila por fila.
+    """
+    existing = existing_fulltext_indexes(cursor)
+    dropped = []
+    for index_table, index, _ in FULLTEXT_INDEXES:
+        if index_table == table and (table, index) in existing:
+            cursor.execute(f"ALTER TABLE {table} DROP INDEX {index}")
+            dropped.append(index)
+    return dropped
+
+
+def optimize_fulltext(cursor, table: str = 'messages') -> bool:
+    """Fusiona el índice tras muchas bajas/altas (importación incremental).
+
+    Con innodb_optimize_fulltext_only, OPTIMIZE TABLE solo reorganiza el
+    índice FULLTEXT; sin permiso para activarlo se omite, porque reconstruiría
+    la tabla entera.
+    """
+    try:
+        cursor.execute("SET GLOBAL innodb_optimize_fulltext_only = ON")
+    except Exception as e:
+        print(f"  ℹ️ Optimización del índice FULLTEXT omitida (sin permisos): {str(e)[:80]}")
+        return False
+    try:
+        cursor.execute(f"OPTIMIZE TABLE {table}")
+        cursor.fetchall()
+        return True
+    finally:
+        cursor.execute("SET GLOBAL innodb_optimize_fulltext_only = OFF")
+
+
+# ---------------------------------------------------------------------------
+# Búsqueda
+# ---------------------------------------------------------------------------
+
+def search_messages(cursor, query: str, project_id: Optional[int] = None, role: Optional[str] = None,
+                    canonical_only: bool = False, limit: int = 20, offset: int = 0) -> List[Dict[str, Any]]:
+    """Mensajes que coinciden con query en su contenido o en el título de su conversación,
+    ordenados por relevancia, cada uno con un fragmento resaltado"""
+    terms = search_terms(query)
+    if not terms:
+        return []
+    against = boolean_query(terms)
+
+    filters = []
+    filter_params: List[Any] = []
+    if project_id:
+        filters.append("c.project_id = %s")
+        filter_params.append(project_id)
+    if role:
+        filters.append("m.author_role = %s")
+        filter_params.append(role)
+    if canonical_only:
+        filters.append("m.is_canonical = 1")
+    extra = ''.join(f" AND {condition}" for condition in filters)
+
+    # Con el almacén de contenidos (content_store.py) los cuerpos largos se buscan en message_contents
+    store = content_store_enabled(cursor)
+    text, contents_join = message_text_sql(store)
+    has_text = "(m.content_text IS NOT NULL OR m.content_hash IS NOT NULL)" if store else "m.content_text IS NOT NULL"
+    contents_branch = f"""
+                UNION ALL
+                SELECT m.id, MATCH(mc.content_text) AGAINST (%s IN BOOLEAN MODE) AS score
+                FROM message_contents mc
+                INNER JOIN messages m ON m.content_hash = mc.content_hash
+                INNER JOIN conversations c ON c.id = m.conversation_id
+                WHERE MATCH(mc.content_text) AGAINST (%s IN BOOLEAN MODE){extra}""" if store else ''
+    contents_params = [against, against, *filter_params] if store else []
+
+    # Cada rama del UNION usa su propio índice FULLTEXT (un OR entre ambas recorrería la tabla)
+    cursor.execute(f"""
+        SELECT m.id, m.conversation_id, c.title, c.project_id, m.author_role,
+               {text}, m.create_time, hits.score
+        FROM (
+            SELECT id, MAX(score) AS score
+            FROM (
+                SELECT m.id, MATCH(m.content_text) AGAINST (%s IN BOOLEAN MODE) AS score
+                FROM messages m
+                INNER JOIN conversations c ON c.id = m.conversation_id
+                WHERE MATCH(m.content_text) AGAINST (%s IN BOOLEAN MODE){extra}
+                UNION ALL
+                SELECT m.id, MATCH(c.title) AGAINST (%s IN BOOLEAN MODE) AS score
+                FROM conversations c
+                INNER JOIN messages m ON m.conversation_id = c.id
+                WHERE MATCH(c.title) AGAINST (%s IN BOOLEAN MODE){extra}
+                  AND {has_text}{contents_branch}
+            ) matched
+            GROUP BY id
+            ORDER BY score DESC
+            LIMIT %s OFFSET %s
+        ) hits
+        INNER JOIN messages m ON m.id = hits.id
+        INNER JOIN conversations c ON c.id = m.conversation_id
+        {contents_join}
+        ORDER BY hits.score DESC
+    """, [against, against, *filter_params, against, against, *filter_params, *contents_params, limit, offset])
+
+    results = []
+    for message_id, conversation_id, title, project, author_role, content, create_time, score in cursor.fetchall():
+        results.append({
+            'message_id': message_id,
+            'conversation_id': conversation_id,
+            'conversation_title': title,
+            'project_id': project,
+            'author_role': author_role,
+            'create_time': float(create_time) if create_time is not None else None,
+            'score': float(score),
+            'snippet': make_snippet(content or '', terms),
+        })
+    return results
+
+
+if __name__ == "__main__":
+    # Uso:
+    #   python search_index.py build                   # crear índices FULLTEXT que falten
+    #   python search_index.py optimize                # reorganizar el índice de messages
+    #   python search_index.py search "texto" [proyecto] [rol]
+    from db_pool import connect
+
+    command = sys.argv[1] if len(sys.argv) > 1 else 'build'
+    connection = connect(autocommit=True)
+    cursor = connection.cursor()
+
+    if command == 'build':
+        created = ensure_fulltext_indexes(cursor)
+        print(f"✅ Índices FULLTEXT creados: {', '.join(created) if created else 'ninguno (ya existían)'}")
+    elif command == 'optimize':
+        if optimize_fulltext(cursor):
+            print("✅ Índice FULLTEXT de messages optimizado")
+    elif command == 'search' and len(sys.argv) > 2:
+        project = int(sys.argv[3]) if len(sys.argv) > 3 else None
+        role = sys.argv[4] if len(sys.argv) > 4 else None
+        for i, hit in enumerate(search_messages(cursor, sys.argv[2], project, role), 1):
+            print(f"{i:2d}. [{hit['score']:.2f}] {hit['conversation_title'][:50]} ({hit['author_role']})")
+            print(f"    {hit['snippet']}")
+    else:
+        print("Uso: python search_index.py build | optimize | search \"texto\" [proyecto] [rol]")
+
+    cursor.close()
+    connection.close()
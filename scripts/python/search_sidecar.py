@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Índice de búsqueda local en SQLite FTS5 (sidecar)
+Construye un archivo SQLite con una tabla virtual FTS5 sobre los mensajes
+(título, rol, contenido, proyecto) a partir del export o de MySQL, para buscar
+sin conexión y sin cargar el servidor MySQL compartido. La reconstrucción es
+incremental: solo se reindexan las conversaciones cuyo update_time cambió.
+
+Las consultas se ordenan por BM25 y devuelven fragmentos resaltados.
+"""
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from content_store import content_store_enabled, message_text_sql
+from conversations_stream import default_export_path, iter_conversations
+from message_extraction import MESSAGE_COLUMNS, iter_extracted_rows
+
+DEFAULT_SIDECAR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'search_sidecar.db')
+PROJECT_MAPPING_FILE = 'conversation_project_mapping.json'
+MYSQL_BATCH = 500          # conversaciones por consulta al leer desde MySQL
+SNIPPET_TOKENS = 24        # palabras por fragmento
+PROGRESS_EVERY = 40        # tareas de extracción entre mensajes de progreso
+
+# Pesos BM25 por columna de messages_fts: title, role, content, project
+BM25_WEIGHTS = (4.0, 0.0, 1.0, 2.0)
+
+_COLUMN = {name: i for i, name in enumerate(MESSAGE_COLUMNS)}
+_SIDECAR_FIELDS = [_COLUMN[name] for name in ('id', 'conversation_id', 'author_role', 'content_text',
+                                              'create_time', 'position', 'is_canonical')]
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    id TEXT PRIMARY KEY,
+    title TEXT,
+    project TEXT,
+    update_time REAL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    rowid INTEGER PRIMARY KEY,
+    message_id TEXT NOT NULL,
+    conversation_id TEXT NOT NULL,
+    role TEXT,
+    create_time REAL,
+    position INTEGER,
+    is_canonical INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_messages_conversation ON messages (conversation_id);
+CREATE INDEX IF NOT EXISTS idx_messages_time ON messages (create_time);
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    title, role, content, project,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def open_sidecar(path: str = DEFAULT_SIDECAR) -> sqlite3.Connection:
+    """Abre (y crea si hace falta) la base del sidecar"""
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA journal_mode = WAL")
+    db.executescript(SCHEMA)
+    return db
+
+
+def fts_query(text: str) -> str:
+    """Convierte texto libre en una consulta FTS5 segura: cada palabra entre comillas y por prefijo"""
+    return ' '.join(f'"{token}"*' for token in _TOKEN_RE.findall(text.lower()))
+
+
+def parse_date(value: Optional[str]) -> Optional[float]:
+    """'AAAA-MM-DD' (o un timestamp) -> segundos epoch"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.strptime(value, '%Y-%m-%d').timestamp()
+
+
+def sidecar_rows(rows: Iterable[tuple]) -> Iterator[tuple]:
+    """Filas de message_extraction (con o sin content_hash) -> tuplas de SidecarWriter.add_messages"""
+    return (tuple(row[i] for i in _SIDECAR_FIELDS) for row in rows)
+
+
+def load_project_mapping(path: str = PROJECT_MAPPING_FILE) -> Dict[str, str]:
+    """{conversation_id: nombre del proyecto} desde el mapeo de crear_mapeo_proyectos.py, si existe"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return {item['conversation_id']: item['project_name'] for item in data.get('mapped_conversations', [])}
+
+
+# ---------------------------------------------------------------------------
+# Construcción
+# ---------------------------------------------------------------------------
+
+class SidecarWriter:
+    """Reemplaza conversaciones completas en el sidecar dentro de una transacción"""
+
+    def __init__(self, db: sqlite3.Connection):
+        self.db = db
+        self.indexed = dict(db.execute("SELECT id, update_time FROM conversations"))
+        self.seen = set()
+        self.titles: Dict[str, Tuple[str, str]] = {}
+        self.stats = {'conversations': 0, 'unchanged': 0, 'messages': 0, 'removed': 0}
+
+    def needs_update(self, conv_id: str, update_time: Optional[float]) -> bool:
+        self.seen.add(conv_id)
+        if conv_id in self.indexed and update_time is not None and self.indexed[conv_id] == update_time:
+            self.stats['unchanged'] += 1
+            return False
+        return True
+
+    def _delete_messages(self, conv_id: str) -> None:
+        self.db.execute("""
+            DELETE FROM messages_fts WHERE rowid IN (SELECT rowid FROM messages WHERE conversation_id = ?)
+        """, (conv_id,))
+        self.db.execute("DELETE FROM messages WHERE conversation_id = ?", (conv_id,))
+
+    def replace_conversation(self, conv_id: str, title: str, project: Optional[str],
+                             update_time: Optional[float]) -> None:
+        if conv_id in self.indexed:
+            self._delete_messages(conv_id)
+        self.db.execute("""
+            INSERT OR REPLACE INTO conversations (id, title, project, update_time) VALUES (?, ?, ?, ?)
+        """, (conv_id, title, project, update_time))
+        self.titles[conv_id] = (title or '', project or '')
+        self.stats['conversations'] += 1
+
+    def add_messages(self, rows: Iterable[Tuple[str, str, str, str, Optional[float], Optional[int], int]]) -> None:
+        """rows: (message_id, conversation_id, role, content, create_time, position, is_canonical)"""
+        for message_id, conv_id, role, content, create_time, position, is_canonical in rows:
+            cursor = self.db.execute("""
+                INSERT INTO messages (message_id, conversation_id, role, create_time, position, is_canonical)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (message_id, conv_id, role, create_time, position, is_canonical))
+            title, project = self.titles.get(conv_id, ('', ''))
+            self.db.execute("""
+                INSERT INTO messages_fts (rowid, title, role, content, project) VALUES (?, ?, ?, ?, ?)
+            """, (cursor.lastrowid, title, role, content, project))
+            self.stats['messages'] += 1
+
+    def commit(self) -> None:
+        """Confirma lo escrito hasta ahora (para ir a la par de una importación con checkpoint)"""
+        self.db.commit()
+
+    def finish(self, prune: bool = True) -> Dict[str, int]:
+        """Elimina lo que ya no está en el origen, optimiza el índice y confirma"""
+        if prune:
+            for conv_id in set(self.indexed) - self.seen:
+                self._delete_messages(conv_id)
+                self.db.execute("DELETE FROM conversations WHERE id = ?", (conv_id,))
+                self.stats['removed'] += 1
+        if self.stats['conversations'] or self.stats['removed']:
+            self.db.execute("INSERT INTO messages_fts (messages_fts) VALUES ('optimize')")
+        self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('built_at', ?)", (str(time.time()),))
+        self.db.commit()
+        return self.stats
+
+
+def build_from_export(db: sqlite3.Connection, export_path: Optional[str] = None,
+                      project_mapping: Optional[Dict[str, str]] = None,
+                      workers: Optional[int] = None) -> Dict[str, int]:
+    """Indexa (o actualiza) el sidecar desde conversations.json o el ZIP del export"""
+    conversations_file = export_path or default_export_path(os.path.dirname(os.path.abspath(__file__)))
+    projects = project_mapping if project_mapping is not None else load_project_mapping()
+    writer = SidecarWriter(db)
+
+    def changed_conversations() -> Iterator[Dict[str, Any]]:
+        # Corre en el proceso principal: registra la conversación antes de extraer sus mensajes
+        for conv in iter_conversations(conversations_file):
+            conv_id = conv.get('id')
+            if not conv_id or not writer.needs_update(conv_id, conv.get('update_time')):
+                continue
+            writer.replace_conversation(conv_id, conv.get('title') or '', projects.get(conv_id),
+                                        conv.get('update_time'))
+            yield conv
+
+    for task, (rows, _errors, _position) in enumerate(iter_extracted_rows(changed_conversations(), workers=workers), 1):
+        writer.add_messages(sidecar_rows(rows))
+        if task % PROGRESS_EVERY == 0:
+            print(f"    🔄 {writer.stats['conversations']:,} conversaciones | {writer.stats['messages']:,} mensajes indexados")
+
+    return writer.finish()
+
+
+def build_from_mysql(db: sqlite3.Connection) -> Dict[str, int]:
+    """Indexa (o actualiza) el sidecar leyendo conversations/messages/projects de MySQL"""
+    from db_pool import connect
+
+    connection = connect(autocommit=True)
+    cursor = connection.cursor()
+    writer = SidecarWriter(db)
+
+    cursor.execute("""
+        SELECT c.id, c.title, p.name, c.update_time
+        FROM conversations c
+        LEFT JOIN projects p ON p.id = c.project_id
+    """)
+    changed = []
+    for conv_id, title, project, update_time in cursor.fetchall():
+        update_time = float(update_time) if update_time is not None else None
+        if writer.needs_update(conv_id, update_time):
+            writer.replace_conversation(conv_id, title, project, update_time)
+            changed.append(conv_id)
+
+    # Con el almacén de contenidos los cuerpos largos están en message_contents
+    text, contents_join = message_text_sql(content_store_enabled(cursor))
+    for start in range(0, len(changed), MYSQL_BATCH):
+        batch = changed[start:start + MYSQL_BATCH]
+        placeholders = ', '.join(['%s'] * len(batch))
+        cursor.execute(f"""
+            SELECT m.id, m.conversation_id, m.author_role, {text}, m.create_time, m.position, m.is_canonical
+            FROM messages m
+            {contents_join}
+            WHERE m.conversation_id IN ({placeholders}) AND {text} IS NOT NULL
+        """, batch)
+        writer.add_messages(
+            (msg_id, conv_id, role, content, float(create_time) if create_time is not None else None,
+             position, is_canonical)
+            for msg_id, conv_id, role, content, create_time, position, is_canonical in cursor.fetchall()
+        )
+        print(f"    🔄 {min(start + MYSQL_BATCH, len(changed)):,}/{len(changed):,} conversaciones | "
+              f"{writer.stats['messages']:,} mensajes indexados")
+
+    cursor.close()
+    connection.close()
+    return writer.finish()
+
+
+# ---------------------------------------------------------------------------
+# Consulta
+# ---------------------------------------------------------------------------
+
+def search(db: sqlite3.Connection, query: str, project: Optional[str] = None,
+           since: Optional[float] = None, until: Optional[float] = None, role: Optional[str] = None,
+           canonical_only: bool = False, limit: int = 20, offset: int = 0,
+           mark: Tuple[str, str] = ('«', '»')) -> List[Dict[str, Any]]:
+    """Mensajes que coinciden con query ordenados por BM25 (mejor primero), con fragmento resaltado"""
+    match = fts_query(query)
+    if not match:
+        return []
+
+    filters = []
+    params: List[Any] = [mark[0], mark[1], SNIPPET_TOKENS, match]
+    if project:
+        filters.append("c.project = ?")
+        params.append(project)
+    if since is not None:
+        filters.append("m.create_time >= ?")
+        params.append(since)
+    if until is not None:
+        filters.append("m.create_time < ?")
+        params.append(until)
+    if role:
+        filters.append("m.role = ?")
+        params.append(role)
+    if canonical_only:
+        filters.append("m.is_canonical = 1")
+    extra = ''.join(f" AND {condition}" for condition in filters)
+    params.extend([limit, offset])
+
+    weights = ', '.join(str(weight) for weight in BM25_WEIGHTS)
+    rows = db.execute(f"""
+        SELECT m.message_id, m.conversation_id, c.title, c.project, m.role, m.create_time,
+               bm25(messages_fts, {weights}) AS score,
+               snippet(messages_fts, 2, ?, ?, '…', ?) AS snippet
+        FROM messages_fts
+        INNER JOIN messages m ON m.rowid = messages_fts.rowid
+        INNER JOIN conversations c ON c.id = m.conversation_id
+        WHERE messages_fts MATCH ?{extra}
+        ORDER BY score
+        LIMIT ? OFFSET ?
+    """, params).fetchall()
+
+    return [{
+        'message_id': message_id,
+        'conversation_id': conversation_id,
+        'conversation_title': title,
+        'project': project_name,
+        'author_role': author_role,
+        'create_time': create_time,
+        'score': -score,  # bm25() es negativo: más bajo = más relevante
+        'snippet': snippet,
+    } for message_id, conversation_id, title, project_name, author_role, create_time, score, snippet in rows]
+
+
+def _options(args: List[str]) -> Tuple[List[str], Dict[str, str]]:
+    """Separa argumentos posicionales de opciones --clave=valor"""
+    positional, options = [], {}
+    for arg in args:
+        if arg.startswith('--'):
+            key, _, value = arg[2:].partition('=')
+            options[key] = value
+        else:
+            positional.append(arg)
+    return positional, options
+
+
+if __name__ == "__main__":
+    # Uso:
+    #   python search_sidecar.py build [conversations.json | export.zip] [--db=ruta]
+    #   python search_sidecar.py build --mysql [--db=ruta]
+    #   python search_sidecar.py search "texto" [--project=nombre] [--since=AAAA-MM-DD]
+    #                                  [--until=AAAA-MM-DD] [--role=user] [--limit=20] [--db=ruta]
+    command = sys.argv[1] if len(sys.argv) > 1 else ''
+    args, options = _options(sys.argv[2:])
+    db = open_sidecar(options.get('db') or DEFAULT_SIDECAR)
+
+    if command == 'build':
+        started = time.time()
+        if 'mysql' in options:
+            print("🗄️ Construyendo índice local desde MySQL...")
+            stats = build_from_mysql(db)
+        else:
+            print("📁 Construyendo índice local desde el export...")
+            stats = build_from_export(db, args[0] if args else None)
+        print(f"\n✅ Índice local actualizado en {time.time() - started:.1f}s:")
+        print(f"  💬 Conversaciones reindexadas: {stats['conversations']:,} (sin cambios: {stats['unchanged']:,})")
+        print(f"  💌 Mensajes indexados: {stats['messages']:,}")
+        if stats['removed']:
+            print(f"  🗑️ Conversaciones eliminadas: {stats['removed']:,}")
+    elif command == 'search' and args:
+        started = time.time()
+        hits = search(db, args[0], project=options.get('project'),
+                      since=parse_date(options.get('since')), until=parse_date(options.get('until')),
+                      role=options.get('role'), limit=int(options.get('limit') or 20))
+        for i, hit in enumerate(hits, 1):
+            print(f"{i:2d}. [{hit['score']:.2f}] {(hit['conversation_title'] or '')[:50]} "
+                  f"({hit['author_role']}, {hit['project'] or 'sin proyecto'})")
+            print(f"    {hit['snippet']}")
+        print(f"\n🔎 {len(hits)} resultados en {(time.time() - started) * 1000:.1f} ms")
+    else:
+        print("Uso: python search_sidecar.py build [export | --mysql] | search \"texto\" [--project=...] "
+              "[--since=AAAA-MM-DD] [--until=AAAA-MM-DD] [--role=...] [--db=ruta]")
+
+    db.close()
@@ -3,10 +3,10 @@
 Importar mensajes desde conversations.json e identificar conversaciones prioritarias para sincronizar
 """
 
-import json
-import mysql.connector
+from db_pool import connect
 import subprocess
 from datetime import datetime
+from content_store import resolve_contents
 
 def importar_mensajes_prioritarios():
     """Importar mensajes de las conversaciones más importantes y sincronizar con OpenAI"""
@@ -14,10 +14,7 @@ def importar_mensajes_prioritarios():
     print("🚀 IMPORTANDO MENSAJES Y PREPARANDO SINCRONIZACIÓN")
     
     # Conectar a BD
-    with open('db_config.json', 'r') as f:
-        db_config = json.load(f)
-
-    conn = mysql.connector.connect(**db_config)
+    conn = connect()
     cursor = conn.cursor(dictionary=True)
     
     print("🔍 ANALIZANDO CONVERSATIONS.JSON PARA MENSAJES...")
@@ -156,10 +153,7 @@ def sincronizar_conversacion_con_openai(conv_data):
         openai_client = OpenAI(api_key=api_key)
         
         # Conectar a BD
-        with open('db_config.json', 'r') as f:
-            db_config = json.load(f)
-        
-        conn = mysql.connector.connect(**db_config)
+        conn = connect()
         cursor = conn.cursor(dictionary=True)
         
         # 1. Importar mensajes si es necesario
@@ -184,7 +178,7 @@ def sincronizar_conversacion_con_openai(conv_data):
             ORDER BY create_time ASC, created_at ASC
         """, (conv_data['conv_id'],))
         
-        messages = cursor.fetchall()
+        messages = resolve_contents(cursor, cursor.fetchall())  # cuerpos largos del almacén de contenidos
         print(f"   📨 Mensajes disponibles: {len(messages)}")
         
         if len(messages) == 0:
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Estadísticas precalculadas (tabla stats_rollup)
+Los dashboards leen filas ya agregadas en lugar de ejecutar COUNT(*) y
+GROUP BY sobre messages en cada carga de página. Los importadores mantienen
+los contadores con deltas en la misma transacción que sus inserts, y
+`python stats_rollup.py rebuild` los recalcula completos.
+
+Dimensiones (dimension, bucket):
+  total        ''                 conversaciones y mensajes totales
+  project      id del proyecto    ('' = sin proyecto)
+  model        default_model_slug ('' = sin modelo)
+  month        'AAAA-MM' (UTC)    conversaciones por create_time de la conversación,
+                                  mensajes por create_time del mensaje
+  role         author_role        solo mensajes
+  conversation id de conversación mensajes por conversación (top de conversaciones)
+"""
+import sys
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from message_extraction import MESSAGE_COLUMNS
+
+STATS_TABLE = 'stats_rollup'
+NO_BUCKET = ''
+UPSERT_BATCH = 1000
+
+_CONVERSATION = MESSAGE_COLUMNS.index('conversation_id')
+_ROLE = MESSAGE_COLUMNS.index('author_role')
+_CREATE_TIME = MESSAGE_COLUMNS.index('create_time')
+
+CREATE_STATS_TABLE_SQL = f"""
+    CREATE TABLE IF NOT EXISTS {STATS_TABLE} (
+        dimension VARCHAR(20) NOT NULL,
+        bucket VARCHAR(100) NOT NULL,
+        conversations BIGINT NOT NULL DEFAULT 0,
+        messages BIGINT NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        PRIMARY KEY (dimension, bucket),
+        KEY idx_dimension_conversations (dimension, conversations),
+        KEY idx_dimension_messages (dimension, messages)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+"""
+
+UPSERT_STATS_SQL = f"""
+    INSERT INTO {STATS_TABLE} (dimension, bucket, conversations, messages)
+    VALUES (%s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE conversations = conversations + VALUES(conversations),
+                            messages = messages + VALUES(messages)
+"""
+
+# Mes igual que month_bucket(): rebuild_stats fija la sesión en UTC; 0/NULL = sin fecha
+_MONTH_SQL = "IF({col} > 0, DATE_FORMAT(FROM_UNIXTIME({col}), '%%Y-%%m'), '')"  # %% por los parámetros %s
+
+# (dimensión, bucket de conversaciones o None, bucket de mensajes o None).
+# Las expresiones usan c = conversations y m = messages.
+_REBUILD_BUCKETS = (
+    ('total', "''", "''"),
+    ('project', "COALESCE(CAST(c.project_id AS CHAR), '')", "COALESCE(CAST(c.project_id AS CHAR), '')"),
+    ('model', "COALESCE(c.default_model_slug, '')", "COALESCE(c.default_model_slug, '')"),
+    ('month', _MONTH_SQL.format(col='c.create_time'), _MONTH_SQL.format(col='m.create_time')),
+    ('role', None, "m.author_role"),
+    ('conversation', "c.id", "m.conversation_id"),
+)
+_MESSAGES_NEED_CONVERSATION = {'project', 'model'}
+
+
+def month_bucket(timestamp: Any) -> str:
+    """'AAAA-MM' (UTC) de un timestamp epoch; '' si no hay fecha"""
+    try:
+        timestamp = float(timestamp or 0)
+    except (TypeError, ValueError):
+        return NO_BUCKET
+    if timestamp <= 0:
+        return NO_BUCKET
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m')
+
+
+def message_groups(rows: Iterable[tuple]) -> Counter:
+    """{(rol, mes): mensajes} de filas con el orden de MESSAGE_COLUMNS"""
+    return Counter((row[_ROLE], month_bucket(row[_CREATE_TIME])) for row in rows)
+
+
+def messages_by_conversation(rows: Iterable[tuple]) -> Dict[str, Counter]:
+    """{conversation_id: {(rol, mes): mensajes}} de filas con el orden de MESSAGE_COLUMNS"""
+    groups: Dict[str, Counter] = defaultdict(Counter)
+    for row in rows:
+        groups[row[_CONVERSATION]][(row[_ROLE], month_bucket(row[_CREATE_TIME]))] += 1
+    return groups
+
+
+def stored_message_groups(cursor, conv_id: str) -> Counter:
+    """{(rol, mes): mensajes} de los mensajes ya guardados de una conversación"""
+    cursor.execute("SELECT author_role, create_time FROM messages WHERE conversation_id = %s", (conv_id,))
+    return Counter((role, month_bucket(create_time)) for role, create_time in cursor.fetchall())
+
+
+class StatsDelta:
+    """Acumula cambios de contadores y los aplica con un upsert por lote"""
+
+    def __init__(self):
+        self.counters: Dict[Tuple[str, str], List[int]] = defaultdict(lambda: [0, 0])
+
+    def __bool__(self) -> bool:
+        return any(conversations or messages for conversations, messages in self.counters.values())
+
+    def _add(self, dimension: str, bucket: Any, conversations: int = 0, messages: int = 0) -> None:
+        counter = self.counters[(dimension, NO_BUCKET if bucket is None else str(bucket))]
+        counter[0] += conversations
+        counter[1] += messages
+
+    def add_conversation(self, conv_id: str, project_id: Optional[int], model: Optional[str],
+                         create_time: Any, messages: Counter, sign: int = 1) -> None:
+        """Suma (sign=1) o resta (sign=-1) una conversación con sus mensajes agrupados por (rol, mes)"""
+        for dimension, bucket in (('total', NO_BUCKET), ('project', project_id), ('model', model),
+                                  ('conversation', conv_id)):
+            self._add(dimension, bucket, conversations=sign)
+        self._add('month', month_bucket(create_time), conversations=sign)
+        self.add_messages(conv_id, project_id, model, messages, sign)
+
+    def add_messages(self, conv_id: str, project_id: Optional[int], model: Optional[str],
+                     messages: Counter, sign: int = 1) -> None:
+        """Suma (o resta) solo mensajes de una conversación ya contada, agrupados por (rol, mes)"""
+        total = sum(messages.values())
+        for dimension, bucket in (('total', NO_BUCKET), ('project', project_id), ('model', model),
+                                  ('conversation', conv_id)):
+            self._add(dimension, bucket, messages=sign * total)
+        for (role, month), count in messages.items():
+            self._add('role', role, messages=sign * count)
+            self._add('month', month, messages=sign * count)
+
+    def add_message_rows(self, rows: Iterable[tuple],
+                         conversations: Dict[str, Tuple[Optional[int], Optional[str]]]) -> None:
+        """Suma filas de messages (orden de MESSAGE_COLUMNS) de conversaciones ya guardadas;
+        conversations: {id: (project_id, default_model_slug)}"""
+        for conv_id, messages in messages_by_conversation(rows).items():
+            project_id, model = conversations.get(conv_id, (None, None))
+            self.add_messages(conv_id, project_id, model, messages)
+
+    def apply(self, cursor) -> int:
+        """Aplica los deltas pendientes (dentro de la transacción del llamador) y los descarta"""
+        rows = [(dimension, bucket, conversations, messages)
+                for (dimension, bucket), (conversations, messages) in self.counters.items()
+                if conversations or messages]
+        for start in range(0, len(rows), UPSERT_BATCH):
+            cursor.executemany(UPSERT_STATS_SQL, rows[start:start + UPSERT_BATCH])
+        self.counters.clear()
+        return len(rows)
+
+
+def ensure_stats_table(cursor) -> None:
+    """Crea stats_rollup si no existe. Es DDL (commit implícito): llamar antes de abrir la transacción"""
+    cursor.execute(CREATE_STATS_TABLE_SQL)
+
+
+def stats_initialized(cursor) -> bool:
+    """True si stats_rollup ya tiene los contadores calculados (existe la fila total).
+
+    Con conversations o messages vacía se devuelve False: si se vaciaron con DELETE
+    sin tocar stats_rollup, los contadores son de datos borrados, y recalcular sobre
+    tablas vacías es barato.
+    """
+    cursor.execute(f"SELECT 1 FROM {STATS_TABLE} WHERE dimension = 'total' LIMIT 1")
+    if cursor.fetchone() is None:
+        return False
+    for table in ('conversations', 'messages'):
+        cursor.execute(f"SELECT 1 FROM {table} LIMIT 1")
+        if cursor.fetchone() is None:
+            return False
+    return True
+
+
+def rebuild_stats(cursor, dimensions: Optional[Iterable[str]] = None) -> int:
+    """Recalcula los contadores con un GROUP BY por dimensión (no confirma la transacción).
+
+    Con dimensions solo se recalculan esas (p. ej. ('project',) tras reasignar
+    conversaciones a otros proyectos); por defecto, todas.
+    """
+    buckets = _REBUILD_BUCKETS
+    if dimensions is not None:
+        dimensions = set(dimensions)
+        unknown = dimensions - {dimension for dimension, _conv, _msg in _REBUILD_BUCKETS}
+        if unknown:
+            raise ValueError(f"Dimensiones desconocidas: {', '.join(sorted(unknown))}")
+        buckets = [bucket for bucket in _REBUILD_BUCKETS if bucket[0] in dimensions]
+    cursor.execute("SELECT @@session.time_zone")
+    session_time_zone = cursor.fetchone()[0]
+    cursor.execute("SET time_zone = '+00:00'")
+    if dimensions is None:
+        cursor.execute(f"DELETE FROM {STATS_TABLE}")
+    else:
+        cursor.execute(f"DELETE FROM {STATS_TABLE} WHERE dimension IN ({', '.join(['%s'] * len(buckets))})",
+                       [dimension for dimension, _conv, _msg in buckets])
+    for dimension, conversation_bucket, message_bucket in buckets:
+        # La fila total existe siempre, aunque las tablas estén vacías
+        group_by = "" if dimension == 'total' else "GROUP BY bucket"
+        if conversation_bucket is not None:
+            cursor.execute(f"""
+                INSERT INTO {STATS_TABLE} (dimension, bucket, conversations)
+                SELECT %s, {conversation_bucket} AS bucket, COUNT(*)
+                FROM conversations c
+                {group_by}
+            """, (dimension,))
+        join = "INNER JOIN conversations c ON c.id = m.conversation_id" if dimension in _MESSAGES_NEED_CONVERSATION else ""
+        cursor.execute(f"""
+            INSERT INTO {STATS_TABLE} (dimension, bucket, messages)
+            SELECT %s, {message_bucket} AS bucket, COUNT(*)
+            FROM messages m {join}
+            {group_by}
+            ON DUPLICATE KEY UPDATE messages = VALUES(messages)
+        """, (dimension,))
+    cursor.execute("SET time_zone = %s", (session_time_zone,))
+    cursor.execute(f"SELECT COUNT(*) FROM {STATS_TABLE}")
+    return cursor.fetchone()[0]
+
+
+def read_stats(cursor, dimension: str, order_by: str = 'bucket', limit: Optional[int] = None
+               ) -> List[Tuple[str, int, int]]:
+    """[(bucket, conversaciones, mensajes)] de una dimensión"""
+    if order_by not in ('bucket', 'conversations', 'messages'):
+        raise ValueError(f"Orden no válido: {order_by}")
+    direction = 'ASC' if order_by == 'bucket' else 'DESC'
+    sql = f"SELECT bucket, conversations, messages FROM {STATS_TABLE} WHERE dimension = %s ORDER BY {order_by} {direction}"
+    if limit:
+        sql += f" LIMIT {int(limit)}"
+    cursor.execute(sql, (dimension,))
+    return [(bucket, int(conversations), int(messages)) for bucket, conversations, messages in cursor.fetchall()]
+
+
+if __name__ == "__main__":
+    # Uso:
+    #   python stats_rollup.py rebuild            # recalcular todos los contadores
+    #   python stats_rollup.py rebuild project    # solo esas dimensiones (tras reasignar proyectos a mano)
+    #   python stats_rollup.py show      # mostrar los contadores actuales
+    from db_pool import connect
+
+    command = sys.argv[1] if len(sys.argv) > 1 else 'show'
+    connection = connect(autocommit=False)
+    cursor = connection.cursor()
+    ensure_stats_table(cursor)
+
+    if command == 'rebuild':
+        dimensions = sys.argv[2:] or None
+        print(f"📊 Recalculando estadísticas{' (' + ', '.join(dimensions) + ')' if dimensions else ''}...")
+        rows = rebuild_stats(cursor, dimensions)
+        connection.commit()
+        print(f"✅ {rows:,} filas en {STATS_TABLE}")
+    elif command == 'show':
+        for bucket, conversations, messages in read_stats(cursor, 'total'):
+            print(f"📊 Total: {conversations:,} conversaciones | {messages:,} mensajes")
+        for dimension in ('project', 'model', 'role'):
+            print(f"\n📁 Por {dimension}:")
+            for bucket, conversations, messages in read_stats(cursor, dimension, 'messages', limit=10):
+                print(f"  {bucket or '(ninguno)':<30} {conversations:>8,} conv | {messages:>10,} msg")
+        print(f"\n📅 Últimos meses:")
+        for bucket, conversations, messages in read_stats(cursor, 'month')[-12:]:
+            print(f"  {bucket or '(sin fecha)':<10} {conversations:>8,} conv | {messages:>10,} msg")
+    else:
+        print("Uso: python stats_rollup.py rebuild | show")
+
+    cursor.close()
+    connection.close()
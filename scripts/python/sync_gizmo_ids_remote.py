@@ -1,142 +1,133 @@
 #!/usr/bin/env python3
 # Sincronizar gizmo_ids desde conversations.json a la base remota
 
-import mysql.connector
-import json
 import os
-from collections import defaultdict
+import sys
+from conversations_stream import default_export_path, iter_conversations
+from db_pool import connect
+from project_counters import print_drift_report, reconcile_project_counters
+from stats_rollup import ensure_stats_table, rebuild_stats, stats_initialized
 
-def sync_gizmo_ids():
+INSERT_BATCH_SIZE = 1000  # filas por INSERT multi-fila al cargar las tablas temporales
+
+def load_temp_table(cursor, table, columns, rows):
+    """Carga filas en una tabla temporal con INSERT multi-fila por lotes"""
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        cursor.executemany(sql, rows[start:start + INSERT_BATCH_SIZE])
+
+def sync_gizmo_ids(export_path=None):
     try:
-        # Leer credenciales de la base remota
-        config_path = os.path.join(os.path.dirname(__file__), 'db_config.json')
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-        
-        # Cargar conversations.json
-        conversations_file = os.path.join(os.path.dirname(__file__), 'extracted', 'conversations.json')
+        # Leer conversations.json (o el ZIP del export) en streaming
+        conversations_file = export_path or default_export_path(os.path.dirname(__file__))
         print(f"Cargando {conversations_file}...")
         
-        with open(conversations_file, 'r', encoding='utf-8') as f:
-            conversations_data = json.load(f)
-        
-        print(f"✅ Cargadas {len(conversations_data)} conversaciones del JSON")
-        
-        # Conectar a la base remota
-        connection = mysql.connector.connect(
-            host=config['host'],
-            port=config['port'],
-            database=config['database'],
-            user=config['user'],
-            password=config['password'],
-            charset='utf8mb4',
-            autocommit=True
-        )
-        
-        cursor = connection.cursor()
-        
-        # Mapear gizmo_ids por conversation_id
+        # Mapear gizmo_ids por conversation_id (y el primer título de cada gizmo para nombrar proyectos)
         gizmo_mapping = {}
-        project_gizmos = defaultdict(set)
+        gizmo_first_title = {}
+        total_conversations = 0
         
-        for conv in conversations_data:
+        for conv in iter_conversations(conversations_file):
+            total_conversations += 1
             conv_id = conv.get('id', '')
-            if conv_id and 'gizmo_id' in conv and conv['gizmo_id']:
-                gizmo_id = conv['gizmo_id']
+            gizmo_id = conv.get('gizmo_id')
+            if conv_id and gizmo_id:
                 gizmo_mapping[conv_id] = gizmo_id
-                project_gizmos[gizmo_id].add(conv_id)
+                if gizmo_id not in gizmo_first_title:
+                    gizmo_first_title[gizmo_id] = conv.get('title')
         
+        print(f"✅ Cargadas {total_conversations} conversaciones del JSON")
         print(f"📋 Encontrados {len(gizmo_mapping)} conversation_ids con gizmo_id")
-        print(f"🎯 Detectados {len(project_gizmos)} gizmo_ids únicos")
+        print(f"🎯 Detectados {len(gizmo_first_title)} gizmo_ids únicos")
+        
+        # Conectar a la base remota (una transacción para toda la sincronización)
+        connection = connect(autocommit=False)
+        cursor = connection.cursor()
+        ensure_stats_table(cursor)  # DDL (commit implícito): antes de empezar la transacción
         
-        # Actualizar gizmo_ids en conversations
+        # Actualizar gizmo_ids en conversations: carga masiva + un único UPDATE con JOIN
         print("\n🔄 Actualizando gizmo_ids en conversations...")
-        updated_conversations = 0
-        
-        for conv_id, gizmo_id in gizmo_mapping.items():
-            cursor.execute("""
-                UPDATE conversations 
-                SET gizmo_id = %s 
-                WHERE conversation_id = %s
-            """, (gizmo_id, conv_id))
-            
-            if cursor.rowcount > 0:
-                updated_conversations += 1
+        
+        cursor.execute("""
+            CREATE TEMPORARY TABLE tmp_gizmo_sync (
+                conversation_id VARCHAR(255) NOT NULL PRIMARY KEY,
+                gizmo_id VARCHAR(255) NOT NULL
+            ) DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
+        """)
+        load_temp_table(cursor, 'tmp_gizmo_sync', ('conversation_id', 'gizmo_id'), list(gizmo_mapping.items()))
+        
+        cursor.execute("""
+            UPDATE conversations c
+            INNER JOIN tmp_gizmo_sync t ON t.conversation_id = c.conversation_id
+            SET c.gizmo_id = t.gizmo_id
+            WHERE NOT (c.gizmo_id <=> t.gizmo_id)
+        """)
+        updated_conversations = cursor.rowcount
         
         print(f"  ✅ Actualizadas {updated_conversations} conversaciones con gizmo_id")
         
-        # Actualizar o crear proyectos por gizmo_id
+        # Crear proyectos faltantes por gizmo_id y vincular conversaciones, todo en SQL por conjuntos
         print("\n🎯 Sincronizando proyectos por gizmo_id...")
         
-        for gizmo_id, conv_ids in project_gizmos.items():
-            # Buscar si ya existe un proyecto con este gizmo_id
-            cursor.execute("SELECT id, name FROM projects WHERE gizmo_id = %s", (gizmo_id,))
-            existing_project = cursor.fetchone()
-            
-            if existing_project:
-                project_id = existing_project[0]
-                print(f"  📁 Proyecto existente: {existing_project[1]} ({gizmo_id})")
-            else:
-                # Crear nuevo proyecto para este gizmo_id
-                # Obtener info del primer conversation
-                first_conv = conversations_data[0]  # Simplificado, deberíamos buscar por ID
-                for conv in conversations_data:
-                    if conv.get('id') in conv_ids:
-                        first_conv = conv
-                        break
-                
-                project_name = f"Proyecto {gizmo_id[:8]}"
-                if 'title' in first_conv:
-                    project_name = first_conv['title'][:50]
-                
-                cursor.execute("""
-                    INSERT INTO projects (name, gizmo_id, description, created_at) 
-                    VALUES (%s, %s, %s, NOW())
-                """, (project_name, gizmo_id, f"Proyecto para gizmo {gizmo_id}"))
-                
-                project_id = cursor.lastrowid
-                print(f"  ✨ Nuevo proyecto creado: {project_name} (ID: {project_id})")
-            
-            # Actualizar project_id en todas las conversaciones de este gizmo
-            cursor.execute("""
-                UPDATE conversations 
-                SET project_id = %s 
-                WHERE gizmo_id = %s
-            """, (str(project_id), gizmo_id))
-            
-            updated_count = cursor.rowcount
-            if updated_count > 0:
-                print(f"    🔗 {updated_count} conversaciones vinculadas al proyecto")
-        
-        # Actualizar contadores finales
-        print("\n📊 Recalculando contadores...")
-        
-        # Actualizar message_count en conversations
         cursor.execute("""
-            UPDATE conversations c 
-            SET message_count = (
-                SELECT COUNT(*) FROM messages m 
-                WHERE m.conversation_id = c.conversation_id
-            )
+            CREATE TEMPORARY TABLE tmp_gizmo_projects (
+                gizmo_id VARCHAR(255) NOT NULL PRIMARY KEY,
+                name VARCHAR(255) NOT NULL,
+                description TEXT
+            ) DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci
         """)
+        load_temp_table(cursor, 'tmp_gizmo_projects', ('gizmo_id', 'name', 'description'), [
+            (gizmo_id, (title or f"Proyecto {gizmo_id[:8]}")[:50], f"Proyecto para gizmo {gizmo_id}")
+            for gizmo_id, title in gizmo_first_title.items()
+        ])
         
-        # Actualizar contadores en projects
         cursor.execute("""
-            UPDATE projects p 
-            SET conversation_count = (
-                SELECT COUNT(*) FROM conversations c 
-                WHERE c.project_id = p.id
-            ),
-            message_count = (
-                SELECT COUNT(*) FROM messages m 
-                INNER JOIN conversations c ON m.conversation_id = c.conversation_id
-                WHERE c.project_id = p.id
-            ),
-            last_activity = (
-                SELECT MAX(c.update_time) FROM conversations c 
-                WHERE c.project_id = p.id
-            )
+            SELECT t.name, t.gizmo_id
+            FROM tmp_gizmo_projects t
+            LEFT JOIN projects p ON p.gizmo_id = t.gizmo_id
+            WHERE p.id IS NULL
         """)
+        new_projects = cursor.fetchall()
+        
+        cursor.execute("""
+            INSERT INTO projects (name, gizmo_id, description, created_at)
+            SELECT t.name, t.gizmo_id, t.description, NOW()
+            FROM tmp_gizmo_projects t
+            LEFT JOIN projects p ON p.gizmo_id = t.gizmo_id
+            WHERE p.id IS NULL
+        """)
+        
+        print(f"  📁 Proyectos existentes: {len(gizmo_first_title) - len(new_projects)}")
+        print(f"  ✨ Nuevos proyectos creados: {len(new_projects)}")
+        for project_name, gizmo_id in new_projects[:10]:
+            print(f"    - {project_name} ({gizmo_id})")
+        if len(new_projects) > 10:
+            print(f"    ... y {len(new_projects) - 10} más")
+        
+        # Si hay proyectos duplicados para un gizmo se usa el primero (el de menor id)
+        cursor.execute("""
+            UPDATE conversations c
+            INNER JOIN (
+                SELECT p.gizmo_id, MIN(p.id) AS project_id
+                FROM projects p
+                INNER JOIN tmp_gizmo_projects t ON t.gizmo_id = p.gizmo_id
+                GROUP BY p.gizmo_id
+            ) gp ON gp.gizmo_id = c.gizmo_id
+            SET c.project_id = gp.project_id
+            WHERE NOT (c.project_id <=> gp.project_id)
+        """)
+        relinked = cursor.rowcount
+        print(f"    🔗 {relinked} conversaciones vinculadas a su proyecto")
+        
+        # Las conversaciones cambiaron de proyecto: los buckets 'project' de stats_rollup se recalculan
+        if relinked and stats_initialized(cursor):
+            rebuild_stats(cursor, ('project',))
+            print(f"    📊 Estadísticas por proyecto (stats_rollup) recalculadas")
+        
+        # Conciliar contadores de proyectos (este esquema enlaza messages por conversations.conversation_id)
+        print("\n📊 Conciliando contadores de proyectos...")
+        drift = reconcile_project_counters(cursor, conversation_key='conversation_id', apply=True)
+        print_drift_report(drift, limit=10)
         
         # Estadísticas finales
         cursor.execute("SELECT COUNT(*) FROM projects WHERE gizmo_id IS NOT NULL")
@@ -149,6 +140,9 @@ def sync_gizmo_ids():
         print(f"  🎯 Proyectos con gizmo_id: {projects_with_gizmo}")
         print(f"  💬 Conversaciones con gizmo_id: {conversations_with_gizmo}")
         
+        cursor.execute("DROP TEMPORARY TABLE IF EXISTS tmp_gizmo_sync, tmp_gizmo_projects")
+        connection.commit()
+        
         cursor.close()
         connection.close()
         
@@ -161,4 +155,5 @@ def sync_gizmo_ids():
         return False
 
 if __name__ == "__main__":
-    sync_gizmo_ids()
\ No newline at end of file
+    # Uso: python sync_gizmo_ids_remote.py [conversations.json | export.zip]
+    sync_gizmo_ids(sys.argv[1] if len(sys.argv) > 1 else None)
\ No newline at end of file
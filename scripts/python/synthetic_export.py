@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Generador de exports sintéticos de ChatGPT (conversations.json) para pruebas de escala
+Produce conversaciones con la misma forma que el export real: árbol mapping
+con ramas (regeneraciones y ediciones) y current_node, mensajes de sistema
+ocultos, llamadas a herramientas, partes multimodales (imágenes), gizmo_id
+de proyectos (g-p-...) y de GPTs personalizados, texto con acentos, emoji,
+CJK y bloques de código, y longitudes con distribución log-normal (muchos
+mensajes cortos y una cola de mensajes muy largos).
+
+Se escribe en streaming (una conversación a la vez), por número de
+conversaciones o hasta alcanzar un tamaño, en JSON o dentro de un ZIP como
+el que descarga ChatGPT. Con la misma semilla el resultado es idéntico.
+"""
+import json
+import math
+import os
+import random
+import sys
+import time
+import uuid
+import zipfile
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from conversations_stream import EXPORT_MEMBER
+
+_WORDS = (
+    "el la de que y en los se del las un por con no una su para es al lo como más pero sus le ya o "
+    "este sí porque esta entre cuando muy sin sobre también me hasta hay donde quien desde todo nos "
+    "durante todos uno les ni contra otros ese eso ante ellos e esto mí antes algunos qué unos yo otro "
+    "código función servidor base datos consulta proyecto archivo error configuración usuario mensaje "
+    "conversación índice tabla columna script python php mysql docker nginx wordpress plugin tema "
+    "ejemplo resultado versión instalación despliegue rendimiento memoria proceso importación exportación "
+    "análisis diseño presentación clase estudiantes evaluación proyectual audiovisual cámara edición "
+    "teléfono batería pantalla actualización cuenta factura cliente presupuesto reunión calendario"
+).split()
+_UNICODE_SNIPPETS = (
+    "ñandú", "acción", "pingüino", "über", "façade", "naïve", "Ωmega", "Δx", "→", "✓", "…", "«cita»",
+    "😀", "🚀", "👍", "🇦🇷", "🧪", "日本語", "中文字符", "한국어", "Привет", "مرحبا", "שלום", "ẞ", "𝔘𝔫𝔦",
+)
+_CODE_SNIPPETS = (
+    "def main():\n    print('hola')\n",
+    "SELECT id, title FROM conversations WHERE project_id = 3 ORDER BY create_time DESC;",
+    "<?php echo json_encode($data, JSON_UNESCAPED_UNICODE); ?>",
+    "docker compose up -d --build",
+    "for (let i = 0; i < items.length; i++) {\n  console.log(items[i]);\n}",
+)
+_MODELS = (('gpt-4o', 0.55), ('gpt-4', 0.15), ('o1', 0.05), ('gpt-4o-mini', 0.15), ('text-davinci-002-render-sha', 0.10))
+
+
+class SyntheticConfig:
+    """Parámetros del export sintético (los valores por defecto imitan el export real)"""
+
+    def __init__(self, conversations: int = 1000, seed: int = 1, turns_mean: float = 8.0,
+                 user_chars_median: int = 120, assistant_chars_median: int = 1200, length_sigma: float = 1.0,
+                 max_chars: int = 200000, branch_rate: float = 0.08, branch_factor: int = 3,
+                 project_rate: float = 0.35, gpt_rate: float = 0.10, projects: int = 66, gpts: int = 12,
+                 multimodal_rate: float = 0.04, tool_rate: float = 0.05, unicode_rate: float = 0.15,
+                 code_rate: float = 0.20, archived_rate: float = 0.05,
+                 start: float = 1672531200.0, end: float = 1760000000.0):
+        self.conversations = conversations
+        self.seed = seed
+        self.turns_mean = turns_mean                      # pares pregunta/respuesta por conversación (media)
+        self.user_chars_median = user_chars_median
+        self.assistant_chars_median = assistant_chars_median
+        self.length_sigma = length_sigma                  # dispersión log-normal de las longitudes
+        self.max_chars = max_chars
+        self.branch_rate = branch_rate                    # probabilidad de regenerar/editar un turno
+        self.branch_factor = branch_factor                # versiones máximas de un turno ramificado
+        self.project_rate = project_rate                  # fracción con gizmo_id de proyecto (g-p-...)
+        self.gpt_rate = gpt_rate                          # fracción con GPT personalizado (g-...)
+        self.projects = projects
+        self.gpts = gpts
+        self.multimodal_rate = multimodal_rate            # mensajes de usuario con imagen
+        self.tool_rate = tool_rate                        # turnos con llamada a herramienta (code/execution_output)
+        self.unicode_rate = unicode_rate
+        self.code_rate = code_rate
+        self.archived_rate = archived_rate
+        self.start = start                                # rango de create_time (epoch)
+        self.end = end
+
+
+class _Generator:
+    def __init__(self, config: SyntheticConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        rng = random.Random(config.seed + 1)  # catálogos estables aunque cambie el resto
+        self.project_gizmos = [f"g-p-{rng.getrandbits(128):032x}" for _ in range(config.projects)]
+        self.gpt_gizmos = [f"g-{''.join(rng.choices('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789', k=9))}"
+                           for _ in range(config.gpts)]
+        self.models, self.model_weights = zip(*_MODELS)
+
+    def _id(self) -> str:
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def _length(self, median: int) -> int:
+        return max(1, min(self.config.max_chars, int(self.rng.lognormvariate(math.log(median), self.config.length_sigma))))
+
+    def _text(self, median: int) -> str:
+        rng, config = self.rng, self.config
+        target = self._length(median)
+        words = rng.choices(_WORDS, k=max(1, target // 6))
+        if rng.random() < config.unicode_rate:
+            for _ in range(1 + len(words) // 40):
+                words.insert(rng.randrange(len(words) + 1), rng.choice(_UNICODE_SNIPPETS))
+        text = ' '.join(words)
+        if rng.random() < config.code_rate:
+            text += f"\n\n```\n{rng.choice(_CODE_SNIPPETS)}\n```\n"
+        return text[0].upper() + text[1:]
+
+    def _node(self, mapping: Dict[str, Any], parent: Optional[str], role: str, content: Dict[str, Any],
+              create_time: Optional[float], model: str, **extra) -> str:
+        node_id = self._id()
+        message = {
+            'id': node_id,
+            'author': {'role': role, 'name': extra.pop('author_name', None), 'metadata': {}},
+            'create_time': create_time,
+            'update_time': None,
+            'content': content,
+            'status': 'finished_successfully',
+            'end_turn': extra.pop('end_turn', True if role == 'assistant' else None),
+            'weight': extra.pop('weight', 1.0),
+            'metadata': extra.pop('metadata', {'model_slug': model} if role == 'assistant' else {}),
+            'recipient': extra.pop('recipient', 'all'),
+            'channel': None,
+        }
+        mapping[node_id] = {'id': node_id, 'message': message, 'parent': parent, 'children': []}
+        if parent is not None:
+            mapping[parent]['children'].append(node_id)
+        return node_id
+
+    def _user_content(self) -> Dict[str, Any]:
+        text = self._text(self.config.user_chars_median)
+        if self.rng.random() >= self.config.multimodal_rate:
+            return {'content_type': 'text', 'parts': [text]}
+        width, height = self.rng.choice(((1024, 768), (1536, 2048), (800, 600), (4032, 3024)))
+        image = {
+            'content_type': 'image_asset_pointer',
+            'asset_pointer': f"file-service://file-{self.rng.getrandbits(96):024x}",
+            'size_bytes': self.rng.randint(40000, 4000000),
+            'width': width, 'height': height, 'fovea': None, 'metadata': None,
+        }
+        return {'content_type': 'multimodal_text', 'parts': [image, text]}
+
+    def _turn(self, mapping: Dict[str, Any], parent: str, clock: List[float], model: str) -> str:
+        """Pregunta + respuesta (con herramienta a veces); devuelve el último nodo"""
+        rng = self.rng
+        clock[0] += rng.uniform(5, 900)
+        node = self._node(mapping, parent, 'user', self._user_content(), clock[0], model)
+        if rng.random() < self.config.tool_rate:
+            clock[0] += rng.uniform(1, 20)
+            node = self._node(mapping, node, 'assistant',
+                              {'content_type': 'code', 'language': 'unknown', 'text': rng.choice(_CODE_SNIPPETS)},
+                              clock[0], model, recipient='python', end_turn=False)
+            clock[0] += rng.uniform(1, 10)
+            node = self._node(mapping, node, 'tool',
+                              {'content_type': 'execution_output', 'text': self._text(80)},
+                              clock[0], model, author_name='python')
+        clock[0] += rng.uniform(2, 60)
+        return self._node(mapping, node, 'assistant',
+                          {'content_type': 'text', 'parts': [self._text(self.config.assistant_chars_median)]},
+                          clock[0], model)
+
+    def _gizmo(self) -> Tuple[Optional[str], Optional[str]]:
+        roll = self.rng.random()
+        if roll < self.config.project_rate:
+            # Pocos proyectos concentran la mayoría de las conversaciones (como en el export real)
+            index = min(int(self.rng.paretovariate(1.2)) - 1, len(self.project_gizmos) - 1)
+            return self.project_gizmos[index], 'snorlax'
+        if roll < self.config.project_rate + self.config.gpt_rate and self.gpt_gizmos:
+            return self.rng.choice(self.gpt_gizmos), 'gpt'
+        return None, None
+
+    def conversation(self) -> Dict[str, Any]:
+        rng, config = self.rng, self.config
+        conv_id = self._id()
+        model = rng.choices(self.models, weights=self.model_weights)[0]
+        gizmo_id, gizmo_type = self._gizmo()
+        create_time = rng.uniform(config.start, config.end)
+        clock = [create_time]
+
+        mapping: Dict[str, Any] = {}
+        root = self._id()
+        mapping[root] = {'id': root, 'message': None, 'parent': None, 'children': []}
+        current = self._node(mapping, root, 'system', {'content_type': 'text', 'parts': ['']}, None, model,
+                             weight=0.0, metadata={'is_visually_hidden_from_conversation': True})
+
+        turns = max(1, int(rng.expovariate(1.0 / config.turns_mean)) + 1)
+        for _ in range(turns):
+            if rng.random() < config.branch_rate:
+                # Versiones anteriores del turno (regeneración o edición): ramas abandonadas;
+                # la conversación sigue por la última, como en ChatGPT
+                for _ in range(rng.randint(1, max(1, config.branch_factor - 1))):
+                    self._turn(mapping, current, clock, model)
+            current = self._turn(mapping, current, clock, model)
+
+        title_words = rng.choices(_WORDS, k=rng.randint(2, 6))
+        if rng.random() < config.unicode_rate:
+            title_words.append(rng.choice(_UNICODE_SNIPPETS))
+        return {
+            'title': ' '.join(title_words).capitalize(),
+            'create_time': create_time,
+            'update_time': clock[0],
+            'mapping': mapping,
+            'moderation_results': [],
+            'current_node': current,
+            'plugin_ids': None,
+            'conversation_id': conv_id,
+            'conversation_template_id': gizmo_id,
+            'gizmo_id': gizmo_id,
+            'gizmo_type': gizmo_type,
+            'is_archived': rng.random() < config.archived_rate,
+            'is_starred': None,
+            'safe_urls': [],
+            'default_model_slug': model,
+            'conversation_origin': None,
+            'voice': None,
+            'async_status': None,
+            'id': conv_id,
+        }
+
+
+def iter_synthetic_conversations(config: Optional[SyntheticConfig] = None,
+                                 count: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """Conversaciones sintéticas una a una (count=None: config.conversations; -1: sin fin)"""
+    config = config or SyntheticConfig()
+    generator = _Generator(config)
+    total = config.conversations if count is None else count
+    produced = 0
+    while total < 0 or produced < total:
+        yield generator.conversation()
+        produced += 1
+
+
+def write_export(path: str, config: Optional[SyntheticConfig] = None,
+                 target_bytes: Optional[int] = None, progress_every: int = 10000) -> Dict[str, Any]:
+    """Escribe el export en `path` (.json o .zip con conversations.json dentro).
+
+    Con target_bytes se generan conversaciones hasta alcanzar ese tamaño sin
+    comprimir; si no, config.conversations. Devuelve estadísticas.
+    """
+    config = config or SyntheticConfig()
+    stats = {'conversations': 0, 'messages': 0, 'bytes': 0}
+    archive = None
+    if path.endswith('.zip'):
+        archive = zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED)
+        out = archive.open(EXPORT_MEMBER, 'w', force_zip64=True)
+    else:
+        out = open(path, 'wb')
+
+    def write(text: str) -> None:
+        data = text.encode('utf-8')
+        out.write(data)
+        stats['bytes'] += len(data)
+
+    started = time.time()
+    try:
+        write('[')
+        for conv in iter_synthetic_conversations(config, count=-1 if target_bytes else None):
+            if stats['conversations']:
+                write(', ')
+            write(json.dumps(conv, ensure_ascii=False))
+            stats['conversations'] += 1
+            stats['messages'] += len(conv['mapping']) - 1
+            if progress_every and stats['conversations'] % progress_every == 0:
+                print(f"    🔄 {stats['conversations']:,} conversaciones | {stats['bytes'] / 1048576:,.0f} MB "
+                      f"| {time.time() - started:.0f}s")
+            if target_bytes and stats['bytes'] >= target_bytes:
+                break
+        write(']')
+    finally:
+        out.close()
+        if archive is not None:
+            archive.close()
+    return stats
+
+
+def parse_size(value: str) -> int:
+    """'500MB', '2GB', '750k' -> bytes"""
+    value = value.strip().upper().rstrip('B')
+    units = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+    if value and value[-1] in units:
+        return int(float(value[:-1]) * units[value[-1]])
+    return int(value)
+
+
+def _options(args: List[str]) -> Tuple[List[str], Dict[str, str]]:
+    """Separa argumentos posicionales de opciones --clave=valor"""
+    positional, options = [], {}
+    for arg in args:
+        if arg.startswith('--'):
+            key, _, value = arg[2:].partition('=')
+            options[key] = value
+        else:
+            positional.append(arg)
+    return positional, options
+
+
+if __name__ == "__main__":
+    # Uso: python synthetic_export.py salida.json|salida.zip [--conversations=1000 | --size=500MB]
+    #        [--seed=1] [--turns=8] [--branching=0.08] [--multimodal=0.04] [--projects=66]
+    #        [--project-rate=0.35] [--gpt-rate=0.10] [--unicode=0.15] [--assistant-chars=1200]
+    args, options = _options(sys.argv[1:])
+    if not args:
+        print("Uso: python synthetic_export.py salida.json|salida.zip [--conversations=N | --size=500MB] [--seed=1]")
+        sys.exit(1)
+
+    config = SyntheticConfig(
+        conversations=int(options.get('conversations') or 1000),
+        seed=int(options.get('seed') or 1),
+        turns_mean=float(options.get('turns') or 8.0),
+        branch_rate=float(options.get('branching') or 0.08),
+        multimodal_rate=float(options.get('multimodal') or 0.04),
+        projects=int(options.get('projects') or 66),
+        project_rate=float(options.get('project-rate') or 0.35),
+        gpt_rate=float(options.get('gpt-rate') or 0.10),
+        unicode_rate=float(options.get('unicode') or 0.15),
+        assistant_chars_median=int(options.get('assistant-chars') or 1200),
+    )
+    target = parse_size(options['size']) if options.get('size') else None
+    started = time.time()
+    print(f"🧪 Generando export sintético en {args[0]} "
+          f"({'hasta ' + options['size'] if target else f'{config.conversations:,} conversaciones'}, semilla {config.seed})")
+    stats = write_export(args[0], config, target_bytes=target)
+    print(f"✅ {stats['conversations']:,} conversaciones | {stats['messages']:,} mensajes | "
+          f"{stats['bytes'] / 1048576:,.1f} MB sin comprimir | {os.path.getsize(args[0]) / 1048576:,.1f} MB en disco "
+          f"| {time.time() - started:.1f}s")
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Pruebas de openai_batch.py sin API ni MySQL (ficheros JSONL de ejemplo en fixtures/)
+
+    cd scripts/python && python -m unittest discover tests
+"""
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openai_batch import (ShardWriter, build_request, ingest_results, parse_result_line,  # noqa: E402
+                          write_retry_file)
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+OUTPUT_FILE = os.path.join(FIXTURES, 'batch_output.jsonl')
+ERRORS_FILE = os.path.join(FIXTURES, 'batch_errors.jsonl')
+REQUESTS_FILE = os.path.join(FIXTURES, 'batch_requests.jsonl')
+
+
+def fixture_lines(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line for line in f if line.strip()]
+
+
+def read_jsonl(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def sample_request(conversation_id, text='Hola'):
+    return build_request(conversation_id, f"Título {conversation_id}", [('user', text), ('assistant', 'Respuesta')])
+
+
+class ShardWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write_all(self, writer, requests):
+        try:
+            for request in requests:
+                writer.write(request)
+        finally:
+            writer.close()
+        return writer.shards
+
+    def test_rota_al_llegar_a_max_requests(self):
+        shards = self.write_all(ShardWriter(self.tmp.name, max_requests=2),
+                                [sample_request(f"conv-{i}") for i in range(5)])
+        self.assertEqual([shard['requests'] for shard in shards], [2, 2, 1])
+        self.assertEqual([os.path.basename(shard['path']) for shard in shards],
+                         ['summaries_0001.jsonl', 'summaries_0002.jsonl', 'summaries_0003.jsonl'])
+        ids = [request['custom_id'] for shard in shards for request in read_jsonl(shard['path'])]
+        self.assertEqual(ids, [f"conv-{i}" for i in range(5)])
+
+    def test_rota_al_llegar_a_max_bytes(self):
+        requests = [sample_request(f"conv-{i}") for i in range(4)]
+        line_bytes = len((json.dumps(requests[0], ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8'))
+        # Caben dos líneas por fichero, no tres
+        shards = self.write_all(ShardWriter(self.tmp.name, max_bytes=line_bytes * 2 + line_bytes // 2), requests)
+        self.assertEqual([shard['requests'] for shard in shards], [2, 2])
+        for shard in shards:
+            self.assertEqual(os.path.getsize(shard['path']), shard['bytes'])
+            self.assertLessEqual(shard['bytes'], line_bytes * 2 + line_bytes // 2)
+
+    def test_solicitud_mayor_que_un_fichero(self):
+        writer = ShardWriter(self.tmp.name, max_bytes=100)
+        with self.assertRaises(ValueError):
+            writer.write(sample_request('conv-grande', 'x' * 200))
+        writer.close()
+        self.assertEqual(writer.shards, [])
+
+
+class ParseResultLineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.output = fixture_lines(OUTPUT_FILE)
+
+    def test_exito(self):
+        custom_id, result, error = parse_result_line(self.output[0])
+        self.assertEqual(custom_id, 'conv-a')
+        self.assertIsNone(error)
+        self.assertEqual(result, {
+            'summary': 'Se pidió un script de importación en Python; queda pendiente probarlo.',
+            'model': 'gpt-4o-mini-2024-07-18',
+            'request_id': 'req_a',
+            'prompt_tokens': 812,
+            'completion_tokens': 64,
+        })
+
+    def test_error_http(self):
+        custom_id, result, error = parse_result_line(self.output[1])
+        self.assertEqual(custom_id, 'conv-b')
+        self.assertIsNone(result)
+        self.assertEqual(error, "HTTP 400: This model's maximum context length is 128000 tokens.")
+
+    def test_error_del_batch(self):
+        custom_id, result, error = parse_result_line(fixture_lines(ERRORS_FILE)[0])
+        self.assertEqual(custom_id, 'conv-d')
+        self.assertIsNone(result)
+        self.assertTrue(error.startswith('batch_expired: '))
+
+    def test_respuesta_sin_contenido(self):
+        custom_id, result, error = parse_result_line(self.output[4])
+        self.assertEqual((custom_id, result, error), ('conv-e', None, 'Respuesta sin contenido'))
+
+    def test_linea_mal_formada(self):
+        with self.assertRaises(ValueError):
+            parse_result_line(self.output[3])
+
+
+class IngestResultsTest(unittest.TestCase):
+
+    def test_dry_run_no_usa_el_cursor(self):
+        # cursor=None: cualquier escritura fallaría
+        stats = ingest_results(None, [OUTPUT_FILE, ERRORS_FILE], dry_run=True)
+        self.assertEqual(stats['stored'], 2)
+        self.assertEqual(stats['failed'], 4)
+        errors = dict(stats['errors'])
+        self.assertEqual(set(errors), {'conv-b', 'batch_output.jsonl:4', 'conv-e', 'conv-d'})
+        self.assertTrue(errors['batch_output.jsonl:4'].startswith('Línea no válida'))
+
+
+class WriteRetryFileTest(unittest.TestCase):
+
+    def test_copia_solo_las_solicitudes_fallidas(self):
+        stats = ingest_results(None, [OUTPUT_FILE, ERRORS_FILE], dry_run=True)
+        with tempfile.TemporaryDirectory() as tmp:
+            out_path = os.path.join(tmp, 'reintento.jsonl')
+            written = write_retry_file([REQUESTS_FILE], [custom_id for custom_id, _ in stats['errors']], out_path)
+            self.assertEqual(written, 3)
+            retried = read_jsonl(out_path)
+        self.assertEqual([request['custom_id'] for request in retried], ['conv-b', 'conv-d', 'conv-e'])
+        originals = {request['custom_id']: request for request in read_jsonl(REQUESTS_FILE)}
+        for request in retried:
+            self.assertEqual(request, originals[request['custom_id']])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+Índice invertido de trigramas para comparación difusa de títulos y proyectos
+En lugar de ejecutar SequenceMatcher para cada par (proyecto, título), el
+índice preselecciona por trigramas compartidos los k candidatos más parecidos
+y solo a esos les calcula la similitud completa.
+"""
+import heapq
+from itertools import chain
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+DEFAULT_CANDIDATES = 10
+# Marca de inicio/fin: no aparece en el texto, así los trigramas de borde nunca
+# coinciden con los trigramas internos de otra cadena
+BOUNDARY = '\x02'
+
+
+def normalize(text: str) -> str:
+    return ' '.join(text.lower().split())
+
+
+def trigrams(text: str, padded: bool = True) -> Set[str]:
+    """Trigramas de caracteres; con padded se marcan también inicio y fin de la cadena"""
+    if padded:
+        text = f"{BOUNDARY * 2}{text}{BOUNDARY}"
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def similarity(a: str, b: str) -> float:
+    """Similitud completa (la misma que usaban los scripts con difflib)"""
+    return SequenceMatcher(None, a.lower(), b.lower()).ratio()
+
+
+class TrigramIndex:
+    """Índice de trigramas sobre un conjunto de textos (nombres de proyecto o títulos).
+
+    - ``exact(q)``: textos iguales a q ignorando mayúsculas.
+    - ``contained_in(q)``: textos que aparecen dentro de q.
+    - ``containing(q)``: textos que contienen a q.
+    - ``best_match(q)``: el más parecido según SequenceMatcher, evaluando
+      solo los ``k`` candidatos con más trigramas en común.
+    """
+
+    def __init__(self, texts: Iterable[str] = ()):
+        self.texts: List[str] = []
+        self._normalized: List[str] = []
+        self._sizes: List[int] = []
+        self._inner_sizes: List[int] = []
+        self._short: List[int] = []  # textos de menos de 3 caracteres (sin trigramas internos)
+        self._exact: Dict[str, List[int]] = defaultdict(list)
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+        for text in texts:
+            self.add(text)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def add(self, text: str) -> None:
+        entry = len(self.texts)
+        normalized = normalize(text)
+        grams = trigrams(normalized)
+
+        self.texts.append(text)
+        self._normalized.append(normalized)
+        self._sizes.append(len(grams))
+        self._inner_sizes.append(len(trigrams(normalized, padded=False)))
+        self._exact[normalized].append(entry)
+        if len(normalized) < 3:
+            self._short.append(entry)
+        for gram in grams:
+            self._postings[gram].append(entry)
+
+    def _count_shared(self, grams: Iterable[str]) -> Counter:
+        """{entrada: trigramas de grams que contiene}"""
+        return Counter(chain.from_iterable(self._postings.get(gram, ()) for gram in grams))
+
+    def exact(self, query: str) -> List[str]:
+        return [self.texts[entry] for entry in self._exact.get(normalize(query), [])]
+
+    def contained_in(self, query: str) -> List[str]:
+        """Textos del índice que aparecen como subcadena de query"""
+        normalized = normalize(query)
+        hits = self._count_shared(trigrams(normalized, padded=False))
+        # Un texto contenido tiene todos sus trigramas internos en query; se verifica con `in`
+        candidates = [entry for entry, count in hits.items() if count == self._inner_sizes[entry]]
+        candidates.extend(self._short)
+        return [self.texts[entry] for entry in sorted(candidates)
+                if self._normalized[entry] and self._normalized[entry] in normalized]
+
+    def containing(self, query: str) -> List[str]:
+        """Textos del índice que contienen a query como subcadena"""
+        normalized = normalize(query)
+        grams = trigrams(normalized, padded=False)
+        if not grams:
+            candidates = range(len(self.texts))
+        else:
+            postings = sorted((self._postings.get(gram, []) for gram in grams), key=len)
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                candidates.intersection_update(posting)
+                if not candidates:
+                    break
+            candidates = sorted(candidates)
+        return [self.texts[entry] for entry in candidates if normalized in self._normalized[entry]]
+
+    def candidates(self, query: str, k: int = DEFAULT_CANDIDATES) -> List[Tuple[int, float]]:
+        """Los k textos con mayor coeficiente de Dice sobre trigramas: [(entrada, score)]"""
+        grams = trigrams(normalize(query))
+        shared = self._count_shared(grams)
+        size = len(grams)
+        return heapq.nlargest(k, ((entry, 2.0 * count / (size + self._sizes[entry]))
+                                  for entry, count in shared.items()), key=lambda item: item[1])
+
+    def best_match(self, query: str, k: int = DEFAULT_CANDIDATES) -> Tuple[Optional[str], float]:
+        """(texto, similitud) del candidato más parecido, o (None, 0.0) si no hay ninguno"""
+        best_text, best_score = None, 0.0
+        for entry, _ in self.candidates(query, k):
+            score = similarity(self.texts[entry], query)
+            if score > best_score:
+                best_text, best_score = self.texts[entry], score
+        return best_text, best_score
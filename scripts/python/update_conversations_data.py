@@ -7,14 +7,10 @@ import pymysql
 import json
 import sys
 from datetime import datetime
+from db_pool import connect
 
-# Configuración de conexión
-DB_CONFIG = {
-    'host': 'sv46.byethost46.org',
-    'user': 'iunaorg_b3toh',
-    'password': 'elgeneral2018',
-    'database': 'iunaorg_chatBeto',
-    'charset': 'utf8mb4',
+# Configuración de conexión: credenciales del .env (env_loader.get_db_config), aquí solo opciones del conector
+DB_OPTIONS = {
     'connect_timeout': 60,
     'read_timeout': 60,
     'write_timeout': 60,
@@ -23,7 +19,7 @@ DB_CONFIG = {
 
 def create_connection():
     try:
-        connection = pymysql.connect(**DB_CONFIG)
+        connection = connect(driver=pymysql.connect, **DB_OPTIONS)
         return connection
     except Exception as e:
         print(f"❌ Error conexión: {e}")